@@ -17,6 +17,8 @@
 
 [필요 패키지]
 pip install pandas requests openpyxl python-dateutil PyJWT
+pip install websocket-client  (선택: AFTER 단계 kline 웹소켓 스트림)
+pip install psutil  (선택: 단계별 프로파일러 RSS 측정)
 """
 import os
 import time
@@ -24,7 +26,9 @@ import datetime as dt
 from typing import Optional, List, Union, Any
 import gc  # 가비지 컬렉션 추가
 import json
+import tempfile
 import threading
+from functools import lru_cache
 import sys
 import csv
 import concurrent.futures  # 병렬 수집을 위한 모듈
@@ -37,13 +41,97 @@ import openpyxl
 import subprocess
 
 # ---------- 공통 데이터 정제 함수 ----------
+# Date(UTC) 규약: 수집 → 병합 → 지표 → 신호 전 구간에서 datetime64[ms] 한 가지 타입으로 유지합니다.
+# - datetime64[ms]의 저장값이 곧 int64 epoch ms → 버킷/정렬/중복 비교는 .view(np.int64)로 복사 없이 정수 연산
+# - 문자열 → 시간 파싱은 utc_time_ms() 한 곳에서만 (엑셀 previous 시트 읽기 등 경계에서 한 번)
+# - "YY/MM/DD,HH:MM" 문자열 렌더링은 엑셀 저장 직전(_force_date_text)에서 한 번만
+UTC_TIME_DTYPE = "datetime64[ms]"
+UTC_TEXT_FORMAT = "%y/%m/%d,%H:%M"
+NO_TIME_MS = np.iinfo(np.int64).min
+
+
+def utc_time_ms(values, text_general: bool = True) -> np.ndarray:
+    """
+    시간 열 → int64 epoch ms (결측 = NO_TIME_MS, 타임존은 벽시계 기준으로 제거).
+    datetime64 열은 복사 없이 정수로 보며(읽기 전용), Timestamp·문자열 혼합 열만 파싱합니다.
+    문자열: "YY/MM/DD,HH:MM" → (text_general이면) "YY/MM/DD HH:MM" → 일반 파싱 순서로 시도
+    """
+    s = values if isinstance(values, pd.Series) else pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(s.dtype):
+        if s.dt.tz is not None:
+            s = s.dt.tz_localize(None)
+        out = s.to_numpy(dtype=UTC_TIME_DTYPE).view(np.int64)
+        out.flags.writeable = False
+        return out
+    raw = s.to_numpy(dtype=object)
+    out = np.full(len(raw), NO_TIME_MS, dtype=np.int64)
+    is_text = np.fromiter((isinstance(v, str) for v in raw), dtype=bool, count=len(raw))
+    has_time = np.fromiter((not isinstance(v, str) and hasattr(v, "strftime") for v in raw), dtype=bool, count=len(raw))
+    parsed = []
+    if has_time.any():
+        parsed.append((has_time, pd.to_datetime(pd.Series(raw[has_time]), errors="coerce")))
+    if is_text.any():
+        text = pd.Series(raw[is_text], dtype=object).str.strip()
+        comma = text.str.contains(",", regex=False).to_numpy(dtype=bool)
+        text_dt = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+        if comma.any():
+            text_dt[comma] = pd.to_datetime(text[comma], format=UTC_TEXT_FORMAT, errors="coerce")
+        if text_general:
+            if (~comma).any():
+                text_dt[~comma] = pd.to_datetime(text[~comma], format="%y/%m/%d %H:%M", errors="coerce")
+            failed = text_dt.isna().to_numpy() & (text != "").to_numpy()
+            if failed.any():
+                import warnings
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore", UserWarning)
+                    text_dt[failed] = pd.to_datetime(text[failed], format="mixed", errors="coerce")
+        parsed.append((is_text, text_dt))
+    for mask, stamps in parsed:
+        if getattr(stamps.dt, "tz", None) is not None:
+            stamps = stamps.dt.tz_localize(None)
+        out[mask] = stamps.to_numpy(dtype=UTC_TIME_DTYPE).view(np.int64)
+    return out
+
+
+def utc_time_column(values, text_general: bool = True) -> pd.Series:
+    """시간 열 → datetime64[ms] 열 (인덱스 유지, 결측 = NaT)"""
+    index = values.index if isinstance(values, pd.Series) else None
+    return pd.Series(utc_time_ms(values, text_general).astype(UTC_TIME_DTYPE), index=index)
+
+
+def ensure_utc_time(df: pd.DataFrame, column: str = 'Date(UTC)') -> pd.DataFrame:
+    """df의 시간 열이 datetime64가 아니면 한 번만 변환 (이미 datetime64면 그대로, df를 직접 수정)"""
+    if df is not None and column in df.columns and not pd.api.types.is_datetime64_any_dtype(df[column].dtype):
+        df[column] = utc_time_column(df[column])
+    return df
+
+
+def drop_overlapping_candles(df_prev: pd.DataFrame, df_new: pd.DataFrame, floor_minutes: Optional[int] = None,
+                             newest_only: bool = False) -> pd.DataFrame:
+    """
+    previous 프레임에서 새 캔들과 같은 시간(floor_minutes 분 단위 내림, None이면 정확히 같은 시간)의 행 제거.
+    newest_only=True면 새 프레임의 첫 행(최신)만 비교합니다. Date(UTC) 기준 (KST는 사용하지 않음)
+    """
+    if 'Date(UTC)' not in df_prev.columns or 'Date(UTC)' not in df_new.columns or len(df_new) == 0:
+        return df_prev
+    new_ms = utc_time_ms(df_new['Date(UTC)'].iloc[:1] if newest_only else df_new['Date(UTC)'])
+    new_ms = new_ms[new_ms != NO_TIME_MS]
+    if len(new_ms) == 0:
+        return df_prev
+    prev_ms = utc_time_ms(df_prev['Date(UTC)'])
+    if floor_minutes:
+        step = floor_minutes * 60_000
+        new_ms, prev_ms = new_ms // step, np.where(prev_ms == NO_TIME_MS, NO_TIME_MS, prev_ms // step)
+    return df_prev[~np.isin(prev_ms, new_ms)].copy()
+
+
 def clean_df_display_format(df, sheet_type=None):
-    """섞인 날짜 타입을 하나로 통일하고 숫자 쉼표 제거 (시트별 포맷 개별화)
+    """섞인 날짜 타입을 datetime64[ms] 하나로 통일하고 숫자 쉼표 제거
     
     Args:
         df: DataFrame
         sheet_type: 시트 타입 ('1m', '5m', '15m', '1h', '1h4x', '1d', 'w' 또는 None)
-                   None이면 자동 감지 시도
+                   하위 호환용 (모든 시트가 같은 "YY/MM/DD,HH:MM" 규칙이라 날짜 파싱에는 사용하지 않음)
     """
     if df is None or df.empty:
         return df
@@ -51,67 +139,9 @@ def clean_df_display_format(df, sheet_type=None):
     # 0. 필수: 원본 보호 및 슬라이스 경고 방지
     df = df.copy()
     
-    # 1. 날짜 정규화: 이미 datetime64 타입이면 변환 스킵, 문자열만 처리
+    # 1. 날짜 정규화: 이미 datetime64 타입이면 변환 스킵, 문자열/Timestamp 혼합만 datetime64[ms]로 한 번 변환
     if 'Date(UTC)' in df.columns:
-        # 이미 datetime64 타입이면 변환 스킵 (데이터 파괴 방지)
-        if pd.api.types.is_datetime64_any_dtype(df['Date(UTC)']):
-            # 이미 Timestamp 객체이면 그대로 사용
-            pass
-        else:
-            # 문자열인 경우에만 처리
-            s = df['Date(UTC)'].astype(str).str.strip()
-            
-            # 시트별 포맷 정의
-            if sheet_type is None:
-                # 자동 감지: 샘플 데이터로 포맷 추정
-                sample = s.iloc[0] if len(s) > 0 else ''
-                if ',' in sample and ':' in sample.split(',')[1] and len(sample.split(',')[1].split(':')) == 2:
-                    # 분까지 있는 경우 (1M, 5M, 15M)
-                    sheet_type = 'minute'
-                elif ',' in sample and ':00' in sample:
-                    # 시간만 있는 경우 (1H, 1H4x, 1D, W)
-                    sheet_type = 'hour'
-                else:
-                    sheet_type = 'minute'  # 기본값
-            
-            # 시트별 포맷 적용
-            if sheet_type in ['1m', '5m', '15m', 'minute']:
-                # 1M, 5M, 15M: %y/%m/%d,%H:%M (쉼표 포함, 분까지)
-                mask_comma = s.str.contains(',', na=False)
-                if mask_comma.any():
-                    s_comma = s[mask_comma].str.replace(',', ' ', regex=False)
-                    df.loc[mask_comma, 'Date(UTC)'] = pd.to_datetime(s_comma, format='%y/%m/%d %H:%M', errors='coerce')
-                # 쉼표 없는 형식 fallback
-                mask_no_comma = ~mask_comma
-                if mask_no_comma.any():
-                    df.loc[mask_no_comma, 'Date(UTC)'] = pd.to_datetime(s[mask_no_comma], format='%y/%m/%d %H:%M', errors='coerce')
-            elif sheet_type in ['1h', '1h4x', '1d', 'w', 'hour']:
-                # 1H, 1H4x, 1D, W: %y/%m/%d,%H:00 (쉼표 포함, 시간만)
-                mask_comma = s.str.contains(',', na=False)
-                if mask_comma.any():
-                    s_comma = s[mask_comma].str.replace(',', ' ', regex=False)
-                    df.loc[mask_comma, 'Date(UTC)'] = pd.to_datetime(s_comma, format='%y/%m/%d %H:%M', errors='coerce')
-                # 쉼표 없는 형식 fallback
-                mask_no_comma = ~mask_comma
-                if mask_no_comma.any():
-                    df.loc[mask_no_comma, 'Date(UTC)'] = pd.to_datetime(s[mask_no_comma], format='%y/%m/%d %H:%M', errors='coerce')
-            else:
-                # 알 수 없는 타입: 기본 처리
-                mask_comma = s.str.contains(',', na=False)
-                if mask_comma.any():
-                    s_comma = s[mask_comma].str.replace(',', ' ', regex=False)
-                    df.loc[mask_comma, 'Date(UTC)'] = pd.to_datetime(s_comma, format='%y/%m/%d %H:%M', errors='coerce')
-                mask_no_comma = ~mask_comma
-                if mask_no_comma.any():
-                    df.loc[mask_no_comma, 'Date(UTC)'] = pd.to_datetime(s[mask_no_comma], format='%y/%m/%d %H:%M', errors='coerce')
-            
-            # 파싱 실패한 경우 경고 억제하고 자동 인식
-            mask_failed = df['Date(UTC)'].isna()
-            if mask_failed.any():
-                import warnings
-                with warnings.catch_warnings():
-                    warnings.simplefilter("ignore", UserWarning)
-                    df.loc[mask_failed, 'Date(UTC)'] = pd.to_datetime(s[mask_failed], errors='coerce')
+        ensure_utc_time(df)
         
         # NaT 제거 안 하면 정렬 시 또 터짐 (데이터 유실 방지)
         df = df.dropna(subset=['Date(UTC)'])
@@ -182,6 +212,380 @@ def calculate_collection_count(y: int = Y) -> dict:
 BINANCE_API_BASE = "https://api.binance.com"
 BINANCE_FUTURES_BASE = "https://fapi.binance.com"
 
+# ---------- 공용 HTTP 전송 계층 (호스트별 keep-alive 세션) ----------
+# 모든 REST 호출(스팟·선물·서명 엔드포인트·디스코드)이 호스트별 requests.Session을 공유하여
+# 매 호출마다 TCP+TLS 핸드셰이크를 새로 하지 않도록 합니다.
+# 재시도 어댑터는 연결 단계 실패만 재시도합니다 (요청이 전송된 뒤의 읽기 실패/상태코드는 재시도하지 않음 → 주문 중복 방지).
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+HTTP_POOL_CONNECTIONS = 4     # 세션당 유지할 호스트 풀 개수
+HTTP_POOL_MAXSIZE = 16        # 호스트당 keep-alive 연결 수 (병렬 캔들 수집 워커 수 이상)
+HTTP_DEFAULT_TIMEOUT = 10     # timeout 미지정 시 기본값 (초)
+HTTP_CONNECT_RETRIES = 2      # 연결 실패 시 재시도 횟수
+_http_sessions = {}
+_http_sessions_lock = threading.Lock()
+
+def _http_session(url: str) -> requests.Session:
+    """URL 호스트에 해당하는 공유 세션 반환 (없으면 생성)."""
+    host = urlsplit(url).netloc
+    with _http_sessions_lock:
+        session = _http_sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            retry = Retry(
+                total=HTTP_CONNECT_RETRIES, connect=HTTP_CONNECT_RETRIES,
+                read=0, status=0, redirect=0, backoff_factor=0.1, raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=retry)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _http_sessions[host] = session
+        return session
+
+# ---------- 요청 weight 기반 레이트리미터 ----------
+# 바이낸스는 IP별로 1분 단위 요청 weight(X-MBX-USED-WEIGHT-1M)와 주문 개수(X-MBX-ORDER-COUNT-10S/1M)를
+# 고정 창(window)으로 집계합니다. 리미터는 엔드포인트별 weight를 요청 전에 차감하고, 응답 헤더의 실제 사용량으로
+# 보정하며, 한도를 넘을 때만 다음 창까지 대기합니다. 스팟(api*)과 선물(fapi*)은 한도가 별도이며,
+# 같은 그룹의 대체 도메인(fapi1/2/3 등)은 같은 IP 한도를 공유합니다.
+from urllib.parse import parse_qsl
+from collections import deque
+
+RATE_LIMIT_SAFETY_RATIO = 0.9  # 거래소 한도의 90%까지만 사용
+BINANCE_RATE_LIMITS = {
+    # 그룹: {"weight_1m": 요청 weight/분, "orders_10s": 주문/10초, "orders_1m": 주문/분}
+    "fapi": {"weight_1m": 2400, "orders_10s": 300, "orders_1m": 1200},
+    "api": {"weight_1m": 6000, "orders_10s": 100, "orders_1m": 1000},
+}
+
+def _rate_limit_group(host: str, path: str = "") -> Optional[str]:
+    """호스트 → 레이트리밋 그룹 ("fapi"/"api"), 바이낸스가 아니면 None. 대역 서버는 경로로 구분."""
+    if host in _BINANCE_STAND_IN_HOSTS:
+        return "fapi" if path.startswith("/fapi") else "api"
+    if not host.endswith("binance.com"):
+        return None
+    return "fapi" if host.startswith("fapi") else "api"
+
+def binance_request_weight(group: str, method: str, path: str, params: dict) -> tuple:
+    """
+    엔드포인트별 요청 weight와 주문 여부 (바이낸스 문서 기준).
+
+    Returns:
+        tuple: (weight, is_order)
+    """
+    try:
+        limit = int(params.get("limit", 0) or 0)
+    except (TypeError, ValueError):
+        limit = 0
+    has_symbol = "symbol" in params
+    if group == "fapi":
+        if path.endswith("/klines"):
+            return (_kline_request_weight(limit or 500), False)
+        if path.endswith("/depth"):
+            lim = limit or 500
+            return ((2 if lim <= 50 else 5 if lim <= 100 else 10 if lim <= 500 else 20), False)
+        if path.endswith(("/positionRisk", "/account")):
+            return (5, False)
+        if path.endswith("/openOrders"):
+            return ((1 if has_symbol else 40), False)
+        if path.endswith("/ticker/price"):
+            return ((1 if has_symbol else 2), False)
+        if path.endswith(("/order", "/algoOrder")) and method == "POST":
+            return (0, True)
+        return (1, False)
+    if path.endswith("/klines"):
+        return (2, False)
+    if path.endswith("/depth"):
+        lim = limit or 100
+        return ((5 if lim <= 100 else 25 if lim <= 500 else 50 if lim <= 1000 else 250), False)
+    if path.endswith(("/exchangeInfo", "/account")):
+        return (20, False)
+    if path.endswith("/ticker/price"):
+        return ((2 if has_symbol else 4), False)
+    if path.endswith("/order"):
+        return ((1, True) if method == "POST" else (4, False))
+    if path.endswith("/order/test"):
+        return (1, False)
+    return (1, False)
+
+class BinanceBanActiveError(requests.exceptions.RequestException):
+    """418/429 보류 시간 중 주문·취소 요청 (대기 후 보내면 시세·서명 시각이 낡으므로 바로 실패 처리)."""
+
+class BinanceRateLimiter:
+    """그룹별 고정 창(weight 1분, 주문 10초/1분) 카운터. acquire()는 한도 초과 시에만 대기합니다."""
+
+    def __init__(self, limits: dict, safety_ratio: float = RATE_LIMIT_SAFETY_RATIO):
+        self._cond = threading.Condition()
+        self._caps = {}
+        self._windows = {}
+        for group, lim in limits.items():
+            self._caps[group] = {
+                ("weight", 60): int(lim["weight_1m"] * safety_ratio),
+                ("orders", 10): int(lim["orders_10s"] * safety_ratio),
+                ("orders", 60): int(lim["orders_1m"] * safety_ratio),
+            }
+            # (창 시작 구간 번호, 사용량)
+            self._windows[group] = {key: [0, 0] for key in self._caps[group]}
+        self._banned_until = {group: 0.0 for group in limits}
+        self.total_wait_sec = {group: 0.0 for group in limits}
+
+    def _usage(self, group, key, now):
+        window = self._windows[group][key]
+        slot = int(now // key[1])
+        if window[0] != slot:
+            window[0], window[1] = slot, 0
+        return window
+
+    def acquire(self, group: str, weight: int, is_order: bool = False, block: bool = True) -> float:
+        """
+        weight(및 주문 1건)를 차감. 대기한 시간(초) 반환.
+
+        block=False(주문·취소 등 GET 이 아닌 요청)면 418/429 보류 중에는 기다리지 않고
+        BinanceBanActiveError 를 올립니다. 시세 GET 만 보류가 끝날 때까지 기다립니다.
+        """
+        if group not in self._caps:
+            return 0.0
+        waited = 0.0
+        with self._cond:
+            while True:
+                now = time.time()
+                wait_sec = self._banned_until[group] - now
+                if wait_sec > 0 and not block:
+                    raise BinanceBanActiveError(f"바이낸스 요청 보류 중 ({group}): {wait_sec:.0f}초 남음")
+                if wait_sec <= 0:
+                    needs = [(("weight", 60), weight)]
+                    if is_order:
+                        needs += [(("orders", 10), 1), (("orders", 60), 1)]
+                    for key, amount in needs:
+                        window = self._usage(group, key, now)
+                        if window[1] + amount > self._caps[group][key]:
+                            wait_sec = max(wait_sec, (window[0] + 1) * key[1] - now + 0.05)
+                if wait_sec <= 0:
+                    for key, amount in needs:
+                        self._usage(group, key, now)[1] += amount
+                    break
+                if wait_sec > 1:
+                    print(f"{get_timestamp()} ⏳ 레이트리밋 대기 ({group}): {wait_sec:.1f}초")
+                self._cond.wait(wait_sec)
+                waited += time.time() - now
+            self.total_wait_sec[group] += waited
+        return waited
+
+    def update_from_response(self, group: str, response) -> None:
+        """응답 헤더(X-MBX-USED-WEIGHT-1M, X-MBX-ORDER-COUNT-*)와 418/429의 Retry-After 반영."""
+        if group not in self._caps:
+            return
+        headers = response.headers
+        now = time.time()
+        with self._cond:
+            for header, key in (("X-MBX-USED-WEIGHT-1M", ("weight", 60)),
+                                ("X-MBX-ORDER-COUNT-10S", ("orders", 10)),
+                                ("X-MBX-ORDER-COUNT-1M", ("orders", 60))):
+                value = headers.get(header)
+                if value is None:
+                    continue
+                try:
+                    used = int(value)
+                except ValueError:
+                    continue
+                window = self._usage(group, key, now)
+                window[1] = max(window[1], used)
+            if response.status_code in (418, 429):
+                try:
+                    retry_after = float(headers.get("Retry-After", 0))
+                except ValueError:
+                    retry_after = 0.0
+                if retry_after <= 0:
+                    retry_after = 60 - (now % 60)  # 헤더가 없으면 다음 1분 창까지
+                self._banned_until[group] = max(self._banned_until[group], now + retry_after)
+                print(f"{get_timestamp()} 🚫 바이낸스 {response.status_code} ({group}): {retry_after:.0f}초 요청 보류")
+            self._cond.notify_all()
+
+    def snapshot(self) -> dict:
+        """현재 창의 사용량 / 한도."""
+        now = time.time()
+        with self._cond:
+            return {
+                group: {f"{kind}_{sec}s": f"{self._usage(group, (kind, sec), now)[1]}/{cap}"
+                        for (kind, sec), cap in caps.items()}
+                for group, caps in self._caps.items()
+            }
+
+_rate_limiter = BinanceRateLimiter(BINANCE_RATE_LIMITS)
+
+# ---------- 엔드포인트 상태 추적 (지연시간 순위) ----------
+# 바이낸스 대체 도메인(api1/2/3, fapi1/2/3)별로 최근 요청의 지연시간과 오류(5xx·연결 실패)를 기록하고,
+# 매 요청마다 "정상 → 빠른 순"으로 정렬한 베이스를 사용합니다. 느린 미러 하나가 매번 첫 시도를 잡아먹지 않도록 하기 위함.
+# 헤징: 멱등 GET(캔들·시세)은 1순위 호스트가 p95 지연 안에 응답하지 않으면 2순위 호스트로 같은 요청을 한 번 더 보내
+# 먼저 온 200 응답을 사용합니다. 1순위 요청은 전용 스레드에서 바로 보내므로 헤지 풀 대기열이 p95 대기 시간에
+# 섞이지 않습니다. 주문·취소 등 서명 요청은 헤징하지 않습니다 (중복 주문 방지).
+ENDPOINT_LATENCY_WINDOW = 50      # 호스트별 최근 표본 수
+ENDPOINT_MIN_SAMPLES = 5          # 순위/헤징 지연 계산에 필요한 최소 표본 수
+ENDPOINT_MAX_ERROR_RATE = 0.3     # 최근 표본 중 오류 비율이 이 값을 넘으면 비정상(후순위)
+ENABLE_REQUEST_HEDGING = True
+HEDGE_MIN_DELAY_SEC = 0.05        # 헤지 요청 최소 대기
+HEDGE_MAX_DELAY_SEC = 1.0         # 헤지 요청 최대 대기 (표본 부족 시 기본값)
+
+class EndpointHealthTracker:
+    """호스트별 최근 지연시간/오류율 기록 및 순위 계산."""
+
+    def __init__(self, window: int = ENDPOINT_LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._window = window
+        self._samples = {}   # host -> deque[(지연초, 성공여부)]
+        self._leaders = {}   # 베이스 목록 → 마지막 1순위 (변경 시 로그)
+        self.hedges_sent = 0
+        self.hedges_won = 0
+
+    def record(self, host: str, latency_sec: float, ok: bool) -> None:
+        with self._lock:
+            samples = self._samples.get(host)
+            if samples is None:
+                samples = self._samples[host] = deque(maxlen=self._window)
+            samples.append((latency_sec, ok))
+
+    def count_hedge(self, won: bool = False) -> None:
+        """헤지 요청/헤지 응답 채택 횟수 증가 (여러 수집 스레드에서 호출)."""
+        with self._lock:
+            if won:
+                self.hedges_won += 1
+            else:
+                self.hedges_sent += 1
+
+    def stats(self, host: str) -> dict:
+        """{"n": 표본 수, "p50": 중앙값(초), "p95": 95백분위(초), "error_rate": 오류 비율} (표본 없으면 None 값)."""
+        with self._lock:
+            samples = list(self._samples.get(host, ()))
+        if not samples:
+            return {"n": 0, "p50": None, "p95": None, "error_rate": 0.0}
+        ok_latencies = np.array([lat for lat, ok in samples if ok], dtype=np.float64)
+        errors = sum(1 for _, ok in samples if not ok)
+        return {
+            "n": len(samples),
+            "p50": float(np.percentile(ok_latencies, 50)) if len(ok_latencies) else None,
+            "p95": float(np.percentile(ok_latencies, 95)) if len(ok_latencies) else None,
+            "error_rate": errors / len(samples),
+        }
+
+    def _sort_key(self, base: str) -> tuple:
+        st = self.stats(urlsplit(base).netloc)
+        unhealthy = st["n"] >= ENDPOINT_MIN_SAMPLES and st["error_rate"] > ENDPOINT_MAX_ERROR_RATE
+        # 표본이 없는 호스트는 0초로 취급하여 한 번씩 측정되도록 함
+        return (unhealthy, st["p50"] if st["p50"] is not None else 0.0)
+
+    def ranked(self, bases: List[str]) -> List[str]:
+        """정상 → 빠른 순으로 정렬한 베이스 목록 (동률이면 원래 순서 유지)."""
+        order = sorted(bases, key=self._sort_key)
+        key = tuple(bases)
+        with self._lock:
+            previous = self._leaders.get(key)
+            self._leaders[key] = order[0]
+        # 측정 초기(표본 부족)의 순위 변동은 로그하지 않음
+        if previous is not None and previous != order[0] and self.stats(urlsplit(order[0]).netloc)["n"] >= ENDPOINT_MIN_SAMPLES:
+            print(f"{get_timestamp()} 🏁 엔드포인트 1순위 변경: {urlsplit(previous).netloc} → {urlsplit(order[0]).netloc}")
+        return order
+
+    def hedge_delay(self, base: str) -> float:
+        """헤지 요청 전 대기 시간 = 1순위 호스트 p95 (표본 부족 시 최대값)."""
+        st = self.stats(urlsplit(base).netloc)
+        if st["n"] < ENDPOINT_MIN_SAMPLES or st["p95"] is None:
+            return HEDGE_MAX_DELAY_SEC
+        return min(max(st["p95"], HEDGE_MIN_DELAY_SEC), HEDGE_MAX_DELAY_SEC)
+
+_endpoint_health = EndpointHealthTracker()
+_hedge_executor = concurrent.futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge")
+
+def binance_futures_base() -> str:
+    """현재 가장 빠른 정상 선물(fapi) 베이스 URL (서명 요청·주문용)."""
+    return _endpoint_health.ranked(BINANCE_FUTURES_BASES)[0]
+
+def print_endpoint_ranking(stage_prefix: str = "") -> None:
+    """대체 도메인별 지연시간 순위를 로그로 출력."""
+    prefix = f"[{stage_prefix}] " if stage_prefix else ""
+    for bases in dict.fromkeys((tuple(BINANCE_FUTURES_BASES), tuple(BINANCE_BASES))):  # 대역 서버 사용 시 같은 목록은 한 번만
+        bases = list(bases)
+        parts = []
+        for rank, base in enumerate(_endpoint_health.ranked(bases), 1):
+            host = urlsplit(base).netloc
+            st = _endpoint_health.stats(host)
+            if st["n"] == 0:
+                parts.append(f"{rank}.{host}(표본 없음)")
+                continue
+            p50 = f"{st['p50'] * 1000:.0f}" if st["p50"] is not None else "-"
+            p95 = f"{st['p95'] * 1000:.0f}" if st["p95"] is not None else "-"
+            parts.append(f"{rank}.{host}(p50 {p50}ms/p95 {p95}ms, 오류 {st['error_rate'] * 100:.0f}%, n={st['n']})")
+        print(f"{get_timestamp()} {prefix}🏁 엔드포인트 순위: {' '.join(parts)}")
+    if _endpoint_health.hedges_sent:
+        print(f"{get_timestamp()} {prefix}🏁 헤지 요청 {_endpoint_health.hedges_sent}회, 헤지 응답 채택 {_endpoint_health.hedges_won}회")
+
+def http_request(method: str, url: str, **kwargs) -> requests.Response:
+    """공유 세션으로 HTTP 요청 (requests.request와 동일한 인자). 바이낸스 호스트는 레이트리미터를 거칩니다."""
+    kwargs.setdefault("timeout", HTTP_DEFAULT_TIMEOUT)
+    parts = urlsplit(url)
+    group = _rate_limit_group(parts.netloc, parts.path)
+    if group is not None:
+        params = dict(parse_qsl(parts.query))
+        if isinstance(kwargs.get("params"), dict):
+            params.update(kwargs["params"])
+        weight, is_order = binance_request_weight(group, method, parts.path, params)
+        _rate_limiter.acquire(group, weight, is_order, block=method == "GET")
+    started = time.perf_counter()
+    try:
+        response = _http_session(url).request(method, url, **kwargs)
+    except Exception:
+        if group is not None:
+            _endpoint_health.record(parts.netloc, time.perf_counter() - started, False)
+        raise
+    if group is not None:
+        _endpoint_health.record(parts.netloc, time.perf_counter() - started, response.status_code < 500)
+        _rate_limiter.update_from_response(group, response)
+    return response
+
+def http_get(url: str, **kwargs) -> requests.Response:
+    return http_request("GET", url, **kwargs)
+
+def http_post(url: str, **kwargs) -> requests.Response:
+    return http_request("POST", url, **kwargs)
+
+def http_delete(url: str, **kwargs) -> requests.Response:
+    return http_request("DELETE", url, **kwargs)
+
+def get_http_connection_stats() -> dict:
+    """
+    호스트별 연결 재사용 통계.
+
+    Returns:
+        dict: {host: {"requests": 요청 수, "connections": 새로 연 연결 수, "reused": 재사용 요청 수}}
+    """
+    stats = {}
+    with _http_sessions_lock:
+        sessions = list(_http_sessions.items())
+    for host, session in sessions:
+        total_requests = 0
+        total_connections = 0
+        for adapter in set(session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                total_requests += pool.num_requests
+                total_connections += pool.num_connections
+        stats[host] = {
+            "requests": total_requests,
+            "connections": total_connections,
+            "reused": max(0, total_requests - total_connections),
+        }
+    return stats
+
+def print_http_connection_stats(stage_prefix: str = "") -> None:
+    """호스트별 연결 재사용 통계를 로그로 출력."""
+    prefix = f"[{stage_prefix}] " if stage_prefix else ""
+    for host, st in get_http_connection_stats().items():
+        ratio = (st["reused"] / st["requests"] * 100) if st["requests"] else 0.0
+        print(f"{get_timestamp()} {prefix}🔌 HTTP {host}: 요청 {st['requests']}회, 새 연결 {st['connections']}개, 재사용 {ratio:.1f}%")
+
 # ---------- 선물 전략 설정 (LS 시그널, 종가 기준 1만 달러 단위 식) ----------
 FUTURES_BASE_PRICE = 60_000
 FUTURES_BASE_TOTAL_USDT = 210
@@ -213,7 +617,7 @@ def binance_get_symbol_info(symbol: str) -> dict:
     try:
         if symbol in _symbol_info_cache and (time.time() - _symbol_info_cache[symbol]['_ts'] < 3600):
             return _symbol_info_cache[symbol]['data']
-        r = requests.get(f"{BINANCE_API_BASE}/api/v3/exchangeInfo", params={"symbol": symbol}, timeout=10)
+        r = http_get(f"{BINANCE_API_BASE}/api/v3/exchangeInfo", params={"symbol": symbol}, timeout=10)
         r.raise_for_status()
         data = r.json()
         if 'symbols' in data and data['symbols']:
@@ -307,7 +711,10 @@ DAYS_TO_KEEP = 30
 # ==========================================
 # 스크립트 디렉토리 경로
 script_dir = os.path.dirname(os.path.abspath(__file__))
-LOG_DIR_ABS = os.path.join(script_dir, LOG_DIR)
+# 대역 서버 실행(BINANCE_STAND_IN)은 로그·엑셀·캔들 저장소를 실제 폴더 대신 임시 폴더에 기록 (use_binance_stand_in 참고)
+STAND_IN_SANDBOX_DIR = tempfile.mkdtemp(prefix="binance_stand_in_") if os.environ.get("BINANCE_STAND_IN", "").strip() else None
+LOG_DIR_ABS = os.path.join(STAND_IN_SANDBOX_DIR or script_dir, LOG_DIR)
+OUTPUT_BASE_DIR = os.path.join(STAND_IN_SANDBOX_DIR or script_dir, "cryptodaily15min")  # 티커별 엑셀 저장 위치
 
 # 로그 디렉토리 생성
 if not os.path.exists(LOG_DIR_ABS):
@@ -472,7 +879,7 @@ def get_binance_server_time():
         return _server_time_cache
     
     try:
-        r = requests.get(f"{BINANCE_API_BASE}/api/v3/time", timeout=5)
+        r = http_get(f"{BINANCE_API_BASE}/api/v3/time", timeout=5)
         if r.status_code == 200:
             server_time = r.json()['serverTime']
             _server_time_cache = server_time
@@ -489,7 +896,7 @@ def get_binance_server_time():
 def get_futures_server_time() -> int:
     """선물 서버 시간(ms). 서명 -1022 방지용으로 fapi 기준 사용."""
     try:
-        r = requests.get(f"{BINANCE_FUTURES_BASE}/fapi/v1/time", timeout=5)
+        r = http_get(f"{binance_futures_base()}/fapi/v1/time", timeout=5)
         if r.status_code == 200:
             return int(r.json()["serverTime"])
     except Exception:
@@ -621,7 +1028,7 @@ def binance_test_order(symbol: str, side: str, order_type: str, **kwargs) -> boo
         }
         
         # 드라이런 테스트 실행
-        r = requests.post(f"{BINANCE_API_BASE}/api/v3/order/test", params=final_params, headers=headers, timeout=10)
+        r = http_post(f"{BINANCE_API_BASE}/api/v3/order/test", params=final_params, headers=headers, timeout=10)
         
         if r.status_code == 200:
             print(f"{get_timestamp()} ✅ 드라이런 테스트 성공: {r.json()}")
@@ -638,7 +1045,7 @@ def binance_ticker_price(symbol: str = None) -> float:
     """바이낸스 현재가 조회 (USDT)"""
     if symbol is None:
         symbol = f"{TICKER}USDT"
-    r = requests.get(f"{BINANCE_API_BASE}/api/v3/ticker/price", params={"symbol": symbol}, timeout=10)
+    r = http_get(f"{BINANCE_API_BASE}/api/v3/ticker/price", params={"symbol": symbol}, timeout=10)
     r.raise_for_status()
     data = r.json()
     return float(data["price"])
@@ -647,7 +1054,7 @@ def binance_fapi_ticker_price(symbol: str = None) -> float:
     """바이낸스 선물 현재가 조회 (fapi)"""
     if symbol is None:
         symbol = f"{TICKER}USDT"
-    r = requests.get(f"{BINANCE_FUTURES_BASE}/fapi/v1/ticker/price", params={"symbol": symbol}, timeout=10)
+    r = http_get(f"{binance_futures_base()}/fapi/v1/ticker/price", params={"symbol": symbol}, timeout=10)
     r.raise_for_status()
     data = r.json()
     return float(data["price"])
@@ -655,7 +1062,7 @@ def binance_fapi_ticker_price(symbol: str = None) -> float:
 def get_futures_orderbook_snapshot(symbol: str):
     """선물 호가창(fapi/v1/depth)에서 ask, bid, ask_q, bid_q 조회. 스마트 주문 엔진용."""
     try:
-        r = requests.get(f"{BINANCE_FUTURES_BASE}/fapi/v1/depth", params={"symbol": symbol, "limit": 20}, timeout=10)
+        r = http_get(f"{binance_futures_base()}/fapi/v1/depth", params={"symbol": symbol, "limit": 20}, timeout=10)
         r.raise_for_status()
         data = r.json()
         if data and "asks" in data and "bids" in data and len(data["asks"]) > 0 and len(data["bids"]) > 0:
@@ -686,7 +1093,7 @@ def get_futures_exchange_info(symbol: str = "BTCUSDT", use_cache: bool = False)
     if use_cache and symbol in _futures_exchange_info_cache and (now - _futures_exchange_info_ts) < FUTURES_EXCHANGE_INFO_CACHE_TTL:
         return _futures_exchange_info_cache[symbol]
     try:
-        r = requests.get(f"{BINANCE_FUTURES_BASE}/fapi/v1/exchangeInfo", timeout=10)
+        r = http_get(f"{binance_futures_base()}/fapi/v1/exchangeInfo", timeout=10)
         r.raise_for_status()
         data = r.json()
     except Exception as e:
@@ -786,7 +1193,7 @@ def get_futures_account() -> dict:
     try:
         headers, signature, timestamp, recv_window = _binance_fapi_headers("")
         query_signed = f"timestamp={timestamp}&recvWindow={recv_window}&signature={signature}"
-        r = requests.get(f"{BINANCE_FUTURES_BASE}/fapi/v2/account?{query_signed}", headers=headers, timeout=10)
+        r = http_get(f"{binance_futures_base()}/fapi/v2/account?{query_signed}", headers=headers, timeout=10)
         if r.status_code == 200:
             return r.json()
         return {}
@@ -798,7 +1205,7 @@ def get_futures_position_risk(symbol: str) -> list:
     """선물 포지션 조회 (fapi/v2/positionRisk). 해당 심볼 포지션 목록 반환."""
     headers, signature, timestamp, recv_window = _binance_fapi_headers(f"symbol={symbol}")
     query_signed = f"symbol={symbol}&timestamp={timestamp}&recvWindow={recv_window}&signature={signature}"
-    r = requests.get(f"{BINANCE_FUTURES_BASE}/fapi/v2/positionRisk?{query_signed}", headers=headers, timeout=10)
+    r = http_get(f"{binance_futures_base()}/fapi/v2/positionRisk?{query_signed}", headers=headers, timeout=10)
     r.raise_for_status()
     data = r.json()
     return data if isinstance(data, list) else []
@@ -808,7 +1215,7 @@ def cancel_all_futures_orders(symbol: str) -> bool:
     try:
         headers, signature, timestamp, recv_window = _binance_fapi_headers(f"symbol={symbol}")
         query_signed = f"symbol={symbol}&timestamp={timestamp}&recvWindow={recv_window}&signature={signature}"
-        r = requests.delete(f"{BINANCE_FUTURES_BASE}/fapi/v1/allOpenOrders?{query_signed}", headers=headers, timeout=10)
+        r = http_delete(f"{binance_futures_base()}/fapi/v1/allOpenOrders?{query_signed}", headers=headers, timeout=10)
         if r.status_code == 200:
             print(f"{get_timestamp()} ✅ 선물 미체결 주문 전량 취소 완료: {symbol}")
             return True
@@ -840,7 +1247,7 @@ def get_futures_open_orders(symbol: str) -> list:
     try:
         headers, signature, timestamp, recv_window = _binance_fapi_headers(f"symbol={symbol}")
         query_signed = f"symbol={symbol}&timestamp={timestamp}&recvWindow={recv_window}&signature={signature}"
-        r = requests.get(f"{BINANCE_FUTURES_BASE}/fapi/v1/openOrders?{query_signed}", headers=headers, timeout=10)
+        r = http_get(f"{binance_futures_base()}/fapi/v1/openOrders?{query_signed}", headers=headers, timeout=10)
         if r.status_code == 200:
             data = r.json()
             return data if isinstance(data, list) else []
@@ -855,7 +1262,7 @@ def get_futures_open_algo_orders(symbol: str) -> list:
     try:
         headers, signature, timestamp, recv_window = _binance_fapi_headers(f"symbol={symbol}")
         query_signed = f"symbol={symbol}&timestamp={timestamp}&recvWindow={recv_window}&signature={signature}"
-        r = requests.get(f"{BINANCE_FUTURES_BASE}/fapi/v1/openAlgoOrders?{query_signed}", headers=headers, timeout=10)
+        r = http_get(f"{binance_futures_base()}/fapi/v1/openAlgoOrders?{query_signed}", headers=headers, timeout=10)
         if r.status_code == 200:
             data = r.json()
             if isinstance(data, dict):
@@ -874,7 +1281,7 @@ def cancel_futures_algo_order(algo_id: int) -> bool:
         query_string = urlencode(sorted(params.items()))
         headers, signature, timestamp, recv_window = _binance_fapi_headers(query_string)
         full_query = f"{query_string}&timestamp={timestamp}&recvWindow={recv_window}&signature={signature}"
-        r = requests.delete(f"{BINANCE_FUTURES_BASE}/fapi/v1/algoOrder?{full_query}", headers=headers, timeout=10)
+        r = http_delete(f"{binance_futures_base()}/fapi/v1/algoOrder?{full_query}", headers=headers, timeout=10)
         if r.status_code == 200:
             return True
         return False
@@ -886,7 +1293,7 @@ def cancel_futures_order(symbol: str, order_id: int) -> bool:
     try:
         headers, signature, timestamp, recv_window = _binance_fapi_headers(f"symbol={symbol}&orderId={order_id}")
         query_signed = f"symbol={symbol}&orderId={order_id}&timestamp={timestamp}&recvWindow={recv_window}&signature={signature}"
-        r = requests.delete(f"{BINANCE_FUTURES_BASE}/fapi/v1/order?{query_signed}", headers=headers, timeout=10)
+        r = http_delete(f"{binance_futures_base()}/fapi/v1/order?{query_signed}", headers=headers, timeout=10)
         if r.status_code == 200:
             return True
         return False
@@ -901,8 +1308,8 @@ def set_futures_leverage(symbol: str, leverage: int = 1) -> bool:
         query_string = urlencode(params)
         headers, signature, timestamp, recv_window = _binance_fapi_headers(query_string)
         full_query = f"{query_string}&timestamp={timestamp}&recvWindow={recv_window}&signature={signature}"
-        url = f"{BINANCE_FUTURES_BASE}/fapi/v1/leverage?{full_query}"
-        r = requests.post(url, headers=headers, timeout=10)
+        url = f"{binance_futures_base()}/fapi/v1/leverage?{full_query}"
+        r = http_post(url, headers=headers, timeout=10)
         if r.status_code == 200:
             print(f"{get_timestamp()} ✅ 선물 레버리지 설정: {symbol} {leverage}배")
             return True
@@ -966,8 +1373,8 @@ def binance_fapi_order(symbol: str, side: str, quantity: float, price: Optional[
         headers, signature, timestamp, recv_window = _binance_fapi_headers(query_string)
         # 3. POST 요청 시에도 파라미터를 URL에 포함 (서명 검증과 동일한 문자열로 전달)
         full_query = f"{query_string}&timestamp={timestamp}&recvWindow={recv_window}&signature={signature}"
-        url = f"{BINANCE_FUTURES_BASE}/fapi/v1/order?{full_query}"
-        r = requests.post(url, headers=headers, timeout=10)
+        url = f"{binance_futures_base()}/fapi/v1/order?{full_query}"
+        r = http_post(url, headers=headers, timeout=10)
         if r.status_code == 200:
             return r.json()
         print(f"{get_timestamp()} ❌ 선물 주문 실패: {r.status_code} {r.text}")
@@ -1008,8 +1415,8 @@ def binance_fapi_stop_market(symbol: str, side: str, quantity: float, stop_price
         query_string = urlencode(sorted_pairs)
         headers, signature, timestamp, recv_window = _binance_fapi_headers(query_string)
         full_query = f"{query_string}&timestamp={timestamp}&recvWindow={recv_window}&signature={signature}"
-        url = f"{BINANCE_FUTURES_BASE}/fapi/v1/algoOrder?{full_query}"
-        r = requests.post(url, headers=headers, timeout=10)
+        url = f"{binance_futures_base()}/fapi/v1/algoOrder?{full_query}"
+        r = http_post(url, headers=headers, timeout=10)
         if r.status_code == 200:
             return r.json()
         print(f"{get_timestamp()} ❌ 선물 스탑마켓(SL) 주문 실패(Algo): {r.status_code} {r.text}")
@@ -1282,7 +1689,7 @@ def check_and_move_sl_to_be(symbol: str, stage_prefix: str = ""):
 def binance_orderbook_bid(symbol: str) -> float:
     """바이낸스 매수 1호가(bid) 조회 - 즉시 체결 가능한 가격"""
     try:
-        r = requests.get(f"{BINANCE_API_BASE}/api/v3/depth", params={"symbol": symbol, "limit": 5}, timeout=10)
+        r = http_get(f"{BINANCE_API_BASE}/api/v3/depth", params={"symbol": symbol, "limit": 5}, timeout=10)
         r.raise_for_status()
         data = r.json()
         if data and "bids" in data and len(data["bids"]) > 0:
@@ -1302,7 +1709,7 @@ def get_binance_orderbook_snapshot(symbol: str):
         tuple: (ask, bid, ask_q, bid_q) 또는 실패 시 (None, None, None, None)
     """
     try:
-        r = requests.get(f"{BINANCE_API_BASE}/api/v3/depth", params={"symbol": symbol, "limit": 20}, timeout=10)
+        r = http_get(f"{BINANCE_API_BASE}/api/v3/depth", params={"symbol": symbol, "limit": 20}, timeout=10)
         r.raise_for_status()
         data = r.json()
         if data and "asks" in data and "bids" in data:
@@ -1435,7 +1842,7 @@ def binance_orderbook_cumulative(symbol: str, target_amount: float) -> tuple:
         tuple: (계산된 수량, 예상 총액, 사용된 호가 수, 매수1호가)
     """
     try:
-        r = requests.get(f"{BINANCE_API_BASE}/api/v3/depth", params={"symbol": symbol, "limit": 20}, timeout=10)
+        r = http_get(f"{BINANCE_API_BASE}/api/v3/depth", params={"symbol": symbol, "limit": 20}, timeout=10)
         r.raise_for_status()
         data = r.json()
         
@@ -1509,7 +1916,7 @@ def binance_get_order_status(symbol: str, order_id: int) -> dict:
         query_string = f"symbol={symbol}&orderId={order_id}"
         headers, signature, timestamp, recv_window = _binance_headers(query_string)
         
-        r = requests.get(
+        r = http_get(
             f"{BINANCE_API_BASE}/api/v3/order",
             params={"symbol": symbol, "orderId": order_id, "timestamp": timestamp, "recvWindow": recv_window, "signature": signature},
             headers=headers,
@@ -1554,7 +1961,7 @@ def binance_get_account_balance(asset: str = None, subtract_bnb_fee: bool = True
         query_string = ""
         headers, signature, timestamp, recv_window = _binance_headers(query_string)
         
-        r = requests.get(
+        r = http_get(
             f"{BINANCE_API_BASE}/api/v3/account",
             params={"timestamp": timestamp, "recvWindow": recv_window, "signature": signature},
             headers=headers,
@@ -1671,7 +2078,7 @@ def binance_market_buy(symbol: str, usdt_amount: float, stage_prefix: str = ""):
             "signature": signature
         }
         
-        r = requests.post(f"{BINANCE_API_BASE}/api/v3/order", params=params, headers=headers, timeout=10)
+        r = http_post(f"{BINANCE_API_BASE}/api/v3/order", params=params, headers=headers, timeout=10)
         
         if r.status_code != 200:
             error_data = r.json() if r.text else {}
@@ -1913,7 +2320,7 @@ def binance_market_sell(symbol: str, usdt_amount: float, price_hint: float | Non
         order_msg = f"{get_timestamp()} [{stage_prefix}] 📤매도 주문 전송 중 가격: {smart_price:.6f} USDT, 수량: {final_volume:.{qty_precision}f} {TICKER} ({sell_unit:.2f}U, {expected_trade_usdt:.2f} USDT) 예상수익률: {expected_profit_rate:+.2f}% ({expected_pnl_usdt:+.2f} USDT)"
         print(order_msg)
         send_discord_message(order_msg)
-        r = requests.post(f"{BINANCE_API_BASE}/api/v3/order", params=params, headers=headers, timeout=10)
+        r = http_post(f"{BINANCE_API_BASE}/api/v3/order", params=params, headers=headers, timeout=10)
         
         if r.status_code != 200:
             error_data = r.json() if r.text else {}
@@ -2058,7 +2465,7 @@ def binance_limit_buy(symbol: str, usdt_amount: float, price: float, stage_prefi
         print(order_msg)
         send_discord_message(order_msg)
         
-        r = requests.post(f"{BINANCE_API_BASE}/api/v3/order", params=params, headers=headers, timeout=10)
+        r = http_post(f"{BINANCE_API_BASE}/api/v3/order", params=params, headers=headers, timeout=10)
         
         if r.status_code != 200:
             error_data = r.json() if r.text else {}
@@ -2174,7 +2581,7 @@ def binance_limit_sell(symbol: str, price: float, volume: float, stage_prefix: s
             "signature": signature
         }
         
-        r = requests.post(f"{BINANCE_API_BASE}/api/v3/order", params=params, headers=headers, timeout=10)
+        r = http_post(f"{BINANCE_API_BASE}/api/v3/order", params=params, headers=headers, timeout=10)
         
         if r.status_code != 200:
             error_data = r.json() if r.text else {}
@@ -2494,8 +2901,7 @@ def check_file_cleanup_done_today():
     Returns: True(이미 실행함), False(아직 실행 안 함)
     """
     try:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        log_dir = os.path.join(script_dir, LOG_DIR)
+        log_dir = LOG_DIR_ABS
         marker_file = os.path.join(log_dir, "binance_file_cleanup_last_date.txt")
         
         if not os.path.exists(marker_file):
@@ -2520,8 +2926,7 @@ def mark_file_cleanup_done_today():
     UTC 0시 기준으로 오늘 날짜에 파일 정리를 완료했다고 표시합니다.
     """
     try:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        log_dir = os.path.join(script_dir, LOG_DIR)
+        log_dir = LOG_DIR_ABS
         if not os.path.exists(log_dir):
             os.makedirs(log_dir)
         
@@ -2543,8 +2948,7 @@ def delete_old_excel_files(days_to_keep=7):
     cryptodaily15min 폴더의 티커별 엑셀 생성 폴더에서 생성된 지 days_to_keep일이 지난 
     .xlsx 파일을 삭제합니다. (임시파일 ~$ 제외)
     """
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    base_dir = os.path.join(script_dir, "cryptodaily15min")
+    base_dir = OUTPUT_BASE_DIR
     
     if not os.path.exists(base_dir):
         return
@@ -2597,8 +3001,7 @@ def delete_old_excel_files(days_to_keep=7):
 
 def delete_old_logs_abs():
     """오래된 로그 파일을 삭제합니다."""
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    log_dir_abs = os.path.join(script_dir, LOG_DIR)
+    log_dir_abs = LOG_DIR_ABS
     
     if not os.path.exists(log_dir_abs):
         return
@@ -2606,7 +3009,8 @@ def delete_old_logs_abs():
     cutoff_time = time.time() - (DAYS_TO_KEEP * 24 * 60 * 60)
     for filename in os.listdir(log_dir_abs):
         file_path = os.path.join(log_dir_abs, filename)
-        if os.path.isfile(file_path) and filename.endswith(".txt"):
+        is_profile = filename.startswith("profile_") and filename.endswith(".json")  # 단계별 프로파일 보고서
+        if os.path.isfile(file_path) and (filename.endswith(".txt") or is_profile):
             file_mod_time = os.path.getmtime(file_path)
             if file_mod_time < cutoff_time:
                 try:
@@ -2665,7 +3069,7 @@ def _send_discord_actual_with_delay(msg):
         headers = {"Content-Type": "application/json"}
         
         # 타임아웃 설정 (5초: 네트워크 지연 대응하면서도 매매 로직 방해 최소화)
-        requests.post(DISCORD_WEBHOOK_URL, data=json.dumps(payload), headers=headers, timeout=5)
+        http_post(DISCORD_WEBHOOK_URL, data=json.dumps(payload), headers=headers, timeout=5)
     except Exception as e:
         print(f"⚠️디스코드 전송 실패: {e}")
 
@@ -2984,32 +3388,147 @@ def calculate_1hmsfast_1h4x(close, sma100, sma200):
     # 반올림 처리 제거 - 원본 값 그대로 반환
     return final_value
 
+# ---------- 1H4x 시간 격자 (매 시간 xx:45 캔들) ----------
+# 1H4x 지표는 현재 캔들 + 직전 1~49시간의 'xx:45' 15분봉을 핀포인트로 모아 계산합니다.
+# 행마다 Timedelta/replace 로 49번 딕셔너리를 조회하던 방식을, 시간 단위 격자(시간 → xx:45 행 번호,
+# 결측 = -1)를 한 번 만들고 각 행의 직전 49칸 창을 배열 인덱싱으로 꺼내는 방식으로 바꿨습니다.
+# 결측 시간은 건너뛰고(창 길이는 49시간 고정) 다음 과거 캔들이 앞으로 당겨지는 기존 규칙을 그대로 유지합니다.
+H4X_LOOKBACK_HOURS = 49
+
+def hour45_lookback_matrix(dates, lookback_hours: int = H4X_LOOKBACK_HOURS):
+    """
+    각 행의 1H4x 수집 행 번호 행렬.
+
+    Args:
+        dates: Date(UTC) 값 (최신→과거, Timestamp/datetime64, NaT 허용)
+        lookback_hours: 과거 탐색 시간 수
+
+    Returns:
+        (collected, counts):
+            collected: (n, lookback_hours+1) int64 — [현재 행, 1시간 전 xx:45, 2시간 전 ...] (결측 건너뜀, 뒤는 -1)
+            counts: (n,) int64 — 수집된 개수 (날짜가 NaT인 행은 0)
+    """
+    ts = pd.to_datetime(pd.Series(dates), errors="coerce").reset_index(drop=True)
+    if getattr(ts.dt, "tz", None) is not None:
+        ts = ts.dt.tz_convert(None)
+    n = len(ts)
+    collected = np.full((n, lookback_hours + 1), -1, dtype=np.int64)
+    counts = np.zeros(n, dtype=np.int64)
+    valid = ts.notna().to_numpy()
+    if n == 0 or not valid.any():
+        return collected, counts
+    # 초 이하 버림 → 분 단위 정수 키
+    minutes = np.zeros(n, dtype=np.int64)
+    minutes[valid] = ((ts[valid].dt.floor("min") - pd.Timestamp(0)) // pd.Timedelta(minutes=1)).to_numpy(dtype=np.int64)
+    hours = minutes // 60
+    rows = np.arange(n, dtype=np.int64)
+
+    # 시간 격자: 격자[h] = 해당 시간 xx:45 캔들의 행 번호 (같은 시각이 여러 행이면 마지막 행, 없으면 -1)
+    grid_start = int(hours[valid].min()) - lookback_hours
+    grid = np.full(int(hours[valid].max()) - grid_start + 1, -1, dtype=np.int64)
+    at_45 = valid & (minutes % 60 == 45)
+    np.maximum.at(grid, hours[at_45] - grid_start, rows[at_45])
+
+    # 각 행의 직전 1~lookback 시간 창 → 현재보다 과거 행만 채택 → 채택된 것만 앞으로 당김 (순서 유지)
+    offsets = (hours - grid_start)[:, None] - np.arange(1, lookback_hours + 1)[None, :]
+    candidates = grid[np.clip(offsets, 0, None)]
+    found = (candidates > rows[:, None]) & valid[:, None]
+    order = np.argsort(~found, axis=1, kind="stable")
+    compact = np.take_along_axis(np.where(found, candidates, -1), order, axis=1)
+    collected[:, 0] = np.where(valid, rows, -1)
+    collected[:, 1:] = compact
+    counts = np.where(valid, 1 + found.sum(axis=1), 0)
+    return collected, counts
+
+def _gather_prefix_mean(values: np.ndarray, collected: np.ndarray, counts: np.ndarray, count: int) -> np.ndarray:
+    """수집 행 중 앞에서 count개 평균 (np.mean 과 같은 합산 순서), 부족하면 NaN."""
+    picked = values[collected[:, :count]]
+    out = np.full(len(collected), np.nan)
+    enough = counts >= count
+    out[enough] = picked[enough].sum(axis=1) / count
+    return out
+
+def _python_extreme(first: np.ndarray, second: np.ndarray, third: np.ndarray, take_max: bool) -> np.ndarray:
+    """파이썬 max(a, b, c)/min(a, b, c) 와 같은 순차 비교 (NaN 처리 포함)."""
+    result = first
+    for other in (second, third):
+        result = np.where(other > result, other, result) if take_max else np.where(other < result, other, result)
+    return result
+
+def hour45_window_extrema(df: pd.DataFrame, collected: np.ndarray, counts: np.ndarray, min_count: int = 4):
+    """1H4x Max200/Min200: 수집된 캔들의 (고·시·종 최고, 저·시·종 최저), 수집 개수 < min_count 이면 NaN."""
+    used = np.arange(collected.shape[1])[None, :] < counts[:, None]
+
+    def column_extreme(column, take_max):
+        picked = df[column].to_numpy(dtype=np.float64)[collected]
+        fill = -np.inf if take_max else np.inf
+        masked = np.where(used, picked, fill)
+        return masked.max(axis=1) if take_max else masked.min(axis=1)
+
+    highs = _python_extreme(column_extreme("고", True), column_extreme("시", True), column_extreme("종", True), True)
+    lows = _python_extreme(column_extreme("저", False), column_extreme("시", False), column_extreme("종", False), False)
+    enough = counts >= min_count
+    return np.where(enough, highs, np.nan), np.where(enough, lows, np.nan)
+
+def _hour45_lookback_legacy(dates_series, lookback_hours: int = H4X_LOOKBACK_HOURS):
+    """기존 행 루프 수집 방식 (검증·벤치마크 비교용)."""
+    date_map = {}
+    for idx, dt_val in enumerate(dates_series):
+        if pd.notna(dt_val):
+            date_map[dt_val.replace(second=0, microsecond=0)] = idx
+    collected_all = []
+    for idx in range(len(dates_series)):
+        current_dt = dates_series[idx]
+        if pd.isna(current_dt):
+            collected_all.append([])
+            continue
+        target_dt = current_dt.replace(second=0, microsecond=0)
+        collected_indices = [idx]
+        for _ in range(lookback_hours):
+            target_dt = target_dt - pd.Timedelta(hours=1)
+            target_45 = target_dt.replace(minute=45)
+            if target_45 in date_map and date_map[target_45] > idx:
+                collected_indices.append(date_map[target_45])
+        collected_all.append(collected_indices)
+    return collected_all
+
+def benchmark_1h4x_grid(n_rows: int = 4_000, gap_ratio: float = 0.03, seed: int = 0) -> dict:
+    """
+    1H4x 시간 격자 수집 ↔ 기존 행 루프 비교 (결측 캔들 포함 합성 15분봉).
+    Returns: {"legacy_s", "grid_s", "match"}
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.Series(pd.date_range("2024-01-01", periods=n_rows, freq="15min")[::-1])
+    dates = dates[rng.random(n_rows) >= gap_ratio].reset_index(drop=True)
+    t0 = time.perf_counter()
+    legacy = _hour45_lookback_legacy(dates)
+    legacy_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    collected, counts = hour45_lookback_matrix(dates)
+    grid_s = time.perf_counter() - t0
+    match = all(list(collected[i, :counts[i]]) == legacy[i] for i in range(len(dates)))
+    print(f"{get_timestamp()} {'✅' if match else '❌'}[1H4x 격자 벤치] {len(dates):,}행 (결측 {gap_ratio:.0%}): "
+          f"기존 루프 {legacy_s:.2f}s → 격자 {grid_s * 1000:.1f}ms ({legacy_s / max(grid_s, 1e-9):.0f}배)")
+    return {"legacy_s": legacy_s, "grid_s": grid_s, "match": match}
+
 def calculate_all_indicators_1h4x(df, market_type):
     """
     1H4x 시트용 모든 지표를 한 번에 계산합니다. (정밀도 강화 버전)
     
     [로직 개선]
-    - 기존의 문자열 파싱 및 단순 루프 방식을 제거하고, datetime 객체 기반의 딕셔너리 매핑을 사용합니다.
-    - SMA100 등 계산 시: 현재 캔들 + 과거 (N/4 - 1)개의 '매 시간 45분' 캔들을 핀포인트로 찾아 계산합니다.
+    - 시간 단위 격자(매 시간 xx:45 캔들 행 번호)를 만들어 각 행의 직전 49시간 창을 배열로 꺼냅니다. (hour45_lookback_matrix)
+    - SMA100 등 계산 시: 현재 캔들 + 과거 (N/4 - 1)개의 '매 시간 45분' 캔들을 핀포인트로 찾아 계산합니다. (결측 시간은 건너뜀)
     """
     if df.empty:
         return df
     
-    # Date(UTC) 컬럼 정규화 (Timestamp와 문자열 혼합 방지)
-    if 'Date(UTC)' in df.columns:
-        if df['Date(UTC)'].dtype == 'object':
-            df['Date(UTC)'] = df['Date(UTC)'].astype(str).str.strip().str.replace(',', ' ', regex=False)
-            df['Date(UTC)'] = pd.to_datetime(df['Date(UTC)'], format='%y/%m/%d %H:%M', errors='coerce')
-        else:
-            df['Date(UTC)'] = pd.to_datetime(df['Date(UTC)'], format='%y/%m/%d,%H:%M', errors='coerce')
+    # Date(UTC) 정규화: datetime64가 아니면 한 번만 변환 (Timestamp와 문자열 혼합 방지)
+    ensure_utc_time(df)
     
     # 1. 데이터 정렬 보장 (최신 -> 과거)
     df = df.sort_values("Date(UTC)", ascending=False).reset_index(drop=True)
     
-    # 2. 날짜 파싱 및 인덱스 매핑 (속도 최적화: O(1) 조회)
-    # 모든 날짜를 datetime 객체로 변환하여 딕셔너리에 저장
-    date_map = {}
-    
+    # 2. 날짜 파싱 → 시간 격자로 핀포인트 캔들 수집 (hour45_lookback_matrix)
     # 날짜 파싱 헬퍼 (Timestamp 객체도 처리 가능하도록 수정)
     def parse_dt_safe(date_val):
         try:
@@ -3031,11 +3550,7 @@ def calculate_all_indicators_1h4x(df, market_type):
     else:
         dates_series = df["Date(UTC)"].apply(parse_dt_safe)
     
-    for idx, dt_val in enumerate(dates_series):
-        if pd.notna(dt_val):
-            # 초 단위 제거 (정확한 매칭을 위해)
-            dt_key = dt_val.replace(second=0, microsecond=0)
-            date_map[dt_key] = idx
+    collected, counts = hour45_lookback_matrix(dates_series)
     
     # 3. SMA 설정
     sma_counts = {
@@ -3048,115 +3563,44 @@ def calculate_all_indicators_1h4x(df, market_type):
         "SMA200": 50  # 200/4
     }
     
-    # 결과 저장용 리스트 초기화
-    sma_results = {k: [np.nan] * len(df) for k in sma_counts}
-    max200_results = [np.nan] * len(df)
-    min200_results = [np.nan] * len(df)
-    
-    # 데이터 미리 가져오기 (NumPy 배열로 변환하여 속도 향상)
-    closes = df["종"].values
-    opens = df["시"].values
-    highs = df["고"].values
-    lows = df["저"].values
-    
-    # 4. 전체 행 순회하며 계산
-    for idx in range(len(df)):
-        current_dt = dates_series[idx]
-        
-        if pd.isna(current_dt):
-            continue
-            
-        current_dt = current_dt.replace(second=0, microsecond=0)
-        
-        # --- 과거 데이터 수집 ---
-        # SMA200 기준 최대 50개(현재 포함)가 필요
-        # 현재 행 데이터 담기
-        collected_indices = [idx] 
-        
-        target_dt = current_dt
-        
-        # 최대 49개의 과거 데이터 탐색 (SMA200용)
-        for _ in range(49):
-            # 1시간 전으로 이동
-            target_dt = target_dt - pd.Timedelta(hours=1)
-            # 분을 무조건 45분으로 고정
-            target_45 = target_dt.replace(minute=45)
-            
-            # 딕셔너리에서 인덱스 찾기
-            if target_45 in date_map:
-                found_idx = date_map[target_45]
-                # 현재보다 과거 데이터여야 함 (데이터 정렬이 꼬였을 경우 대비)
-                if found_idx > idx:
-                    collected_indices.append(found_idx)
-            else:
-                # 데이터가 없으면 건너뜀 (결측)
-                pass
-                
-        # 수집된 인덱스로 값 가져오기
-        valid_closes = closes[collected_indices]
-        
-        # --- SMA 계산 ---
-        for sma_name, count in sma_counts.items():
-            if len(valid_closes) >= count:
-                # 필요한 개수만큼 슬라이싱하여 평균
-                sma_results[sma_name][idx] = np.mean(valid_closes[:count])
-        
-        # --- Max200, Min200 계산 ---
-        # 수집된 캔들이 4개 이상일 때만 계산
-        if len(collected_indices) >= 4:
-            # 수집된 모든 인덱스의 OHLC 값을 모음
-            # (해당 시간대의 고가, 저가 등을 모두 포함해야 함)
-            relevant_indices = collected_indices # 이미 수집된 인덱스들
-            
-            # 벡터화된 연산으로 Max/Min 찾기
-            batch_highs = highs[relevant_indices]
-            batch_lows = lows[relevant_indices]
-            batch_opens = opens[relevant_indices]
-            batch_closes = closes[relevant_indices]
-            
-            curr_max = max(batch_highs.max(), batch_opens.max(), batch_closes.max()) # 보통 고가가 Max
-            curr_min = min(batch_lows.min(), batch_opens.min(), batch_closes.min()) # 보통 저가가 Min
-            
-            max200_results[idx] = curr_max
-            min200_results[idx] = curr_min
+    # 4. SMA: 수집된 캔들(현재 포함) 중 앞에서 N/4개 평균, 부족하면 NaN
+    closes = df["종"].to_numpy(dtype=np.float64)
+    for sma_name, count in sma_counts.items():
+        df[sma_name] = _gather_prefix_mean(closes, collected, counts, count)
     
-    # 5. 결과 DataFrame에 할당
-    for sma_name in sma_counts:
-        df[sma_name] = sma_results[sma_name]
-        
-    df["Max200"] = max200_results
-    df["Min200"] = min200_results
+    # 5. Max200, Min200: 수집된 캔들이 4개 이상일 때만 계산
+    df["Max200"], df["Min200"] = hour45_window_extrema(df, collected, counts)
     
     # 하단, 상단 계산 (Max200/Min200이 NaN이면 NaN)
-    df["하단"] = df.apply(lambda row: abs((row["종"] - row["Min200"]) / row["Min200"]) if not pd.isna(row["Min200"]) else np.nan, axis=1)
-    df["상단"] = df.apply(lambda row: abs((row["종"] - row["Max200"]) / row["Max200"]) if not pd.isna(row["Max200"]) else np.nan, axis=1)
+    df["하단"] = band_distance_array(df["종"], df["Min200"])
+    df["상단"] = band_distance_array(df["종"], df["Max200"])
     
     # SFast 계산 (SMA12, SMA20, SMA28 사용)
-    df["SFast"] = df.apply(lambda row: calculate_superfast(row["SMA12"], row["SMA20"], row["SMA28"]), axis=1)
+    df["SFast"] = calculate_superfast_array(df["SMA12"], df["SMA20"], df["SMA28"])
     
     # Fast 계산 (SMA20, SMA28, SMA40 사용)
-    df["Fast"] = df.apply(lambda row: calculate_fast(row["SMA20"], row["SMA28"], row["SMA40"]), axis=1)
+    df["Fast"] = calculate_fast_array(df["SMA20"], df["SMA28"], df["SMA40"])
     
     # Base 계산 (SMA28, SMA40, SMA80 사용)
-    df["Base"] = df.apply(lambda row: calculate_base(row["SMA28"], row["SMA40"], row["SMA80"]), axis=1)
+    df["Base"] = calculate_base_array(df["SMA28"], df["SMA40"], df["SMA80"])
     
     # 4or1 계산
-    df["4or1"] = df.apply(lambda row: calculate_4or1(row["하단"], row["상단"]), axis=1)
+    df["4or1"] = calculate_4or1_array(df["하단"], df["상단"])
     
     # buyside 계산
-    df["buyside"] = df.apply(lambda row: calculate_buyside(row["SFast"], row["Fast"], row["Base"]), axis=1)
+    df["buyside"] = calculate_buyside_array(df["SFast"], df["Fast"], df["Base"])
     
     # sellside 계산
-    df["sellside"] = df.apply(lambda row: calculate_sellside(row["SFast"], row["Fast"], row["Base"]), axis=1)
+    df["sellside"] = calculate_sellside_array(df["SFast"], df["Fast"], df["Base"])
     
     # Buy 계산 (1H4x 시트용: sellside <= 0.1)
-    df["Buy"] = df.apply(lambda row: calculate_buy_1h4x(row["4or1"], row["sellside"]), axis=1)
+    df["Buy"] = calculate_buy_array(df["4or1"], df["sellside"], threshold=0.1)
     
     # Sell 계산 (1H4x 시트용: buyside <= 0.1)
-    df["Sell"] = df.apply(lambda row: calculate_sell_short_1h4x(row["buyside"]), axis=1)
+    df["Sell"] = calculate_sell_short_array(df["buyside"], threshold=0.1150)
     
     # 1HMSFast 계산 (종가, SMA100, SMA200 사용)
-    df["1HMSFast"] = df.apply(lambda row: calculate_1hmsfast_1h4x(row["종"], row["SMA100"], row["SMA200"]), axis=1)
+    df["1HMSFast"] = calculate_1hmsfast_array(df["종"], df["SMA100"], df["SMA200"])
     
     # 숫자 컬럼 정리
     num_cols = ["종", "시", "고", "저", "Vol.", "SMA12", "SMA20", "SMA28", "SMA40", "SMA80", "SMA100", "SMA200", "Max200", "Min200", "하단", "상단", "SFast", "Fast", "Base", "4or1", "buyside", "sellside", "1HMSFast"]
@@ -3182,13 +3626,8 @@ def calculate_latest_row_only_1h4x(df, market_type):
     # 이 과정이 없으면 데이터가 제대로 읽히지 않아 len(df)가 줄어들고 fallback으로 튕김
     df = clean_df_display_format(df)
     
-    # Date(UTC) 컬럼 정규화 (Timestamp와 문자열 혼합 방지)
-    if 'Date(UTC)' in df.columns:
-        if df['Date(UTC)'].dtype == 'object':
-            df['Date(UTC)'] = df['Date(UTC)'].astype(str).str.strip().str.replace(',', ' ', regex=False)
-            df['Date(UTC)'] = pd.to_datetime(df['Date(UTC)'], format='%y/%m/%d %H:%M', errors='coerce')
-        else:
-            df['Date(UTC)'] = pd.to_datetime(df['Date(UTC)'], format='%y/%m/%d,%H:%M', errors='coerce')
+    # Date(UTC) 정규화: datetime64가 아니면 한 번만 변환 (Timestamp와 문자열 혼합 방지)
+    ensure_utc_time(df)
     
     # ⚠️중요: 입력 데이터를 확실하게 현재→과거 순서로 정렬 (SMA 계산 일관성 보장)
     df = df.sort_values("Date(UTC)", ascending=False).reset_index(drop=True)
@@ -3444,6 +3883,432 @@ def calculate_latest_row_only_1h4x(df, market_type):
     
     return df
 
+# ---------- 공용 이동평균 커널 (최신→과거 배열) ----------
+# 모든 calculate_all_indicators_* / calculate_latest_row_only_* 의 SMA가 이 함수 하나를 사용합니다.
+# out[i] = mean(values[i:i+window]) — 기존 df.iloc[i:i+window]["종"].mean() 과 같은 창, 같은 합산 순서
+# (NumPy pairwise 합 → 개수로 나눔, NaN 제외)이므로 결과가 비트 단위로 같습니다.
+# 창은 sliding_window_view(복사 없는 뷰)로 만들어 행마다 pandas 인덱싱을 하지 않습니다.
+from numpy.lib.stride_tricks import sliding_window_view
+
+def _nan_mean_slices(x: np.ndarray, rows, window: int, partial: bool) -> np.ndarray:
+    """지정 행만 평균 (행마다 슬라이스, pandas Series.mean 과 동일 규칙)."""
+    n = len(x)
+    out = np.full(len(rows), np.nan)
+    for k, r in enumerate(rows):
+        r = int(r)
+        if r < 0 or r >= n or (not partial and r + window > n):
+            continue
+        seg = x[r:r + window]
+        mask = np.isnan(seg)
+        if mask.any():
+            cnt = len(seg) - int(mask.sum())
+            if cnt:
+                out[k] = np.where(mask, 0.0, seg).sum() / cnt
+        else:
+            out[k] = seg.sum() / len(seg)
+    return out
+
+def reverse_window_sma(values, window: int, rows=None, partial: bool = False, newest_first: bool = True) -> np.ndarray:
+    """
+    최신→과거 배열의 역방향 창 이동평균.
+
+    Args:
+        values: 종가 배열/Series (newest_first=True면 idx=0이 최신)
+        window: 창 크기
+        rows: 계산할 행 번호 목록 (None이면 전체 행, 반환 길이 = len(rows))
+        partial: False면 창이 다 차지 않는 행은 NaN, True면 남은 행만으로 평균 (무가드 iloc 호출과 동일)
+        newest_first: False면 과거→최신 배열로 보고 같은 창(해당 행 포함 과거 window개)으로 계산
+
+    Returns:
+        np.ndarray: 이동평균 (float64)
+    """
+    x = np.asarray(values, dtype=np.float64)
+    if not newest_first:
+        x = x[::-1]
+        if rows is not None:
+            rows = [len(x) - 1 - int(r) for r in rows]
+    if rows is not None:
+        return _nan_mean_slices(x, rows, window, partial)
+    n = len(x)
+    out = np.full(n, np.nan)
+    full = n - window + 1
+    if full > 0:
+        mask = np.isnan(x)
+        if mask.any():
+            sums = sliding_window_view(np.where(mask, 0.0, x), window).sum(axis=1)
+            counts = window - sliding_window_view(mask, window).sum(axis=1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out[:full] = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+        else:
+            out[:full] = sliding_window_view(x, window).sum(axis=1) / window
+    if partial:
+        tail = np.arange(max(full, 0), n)
+        out[tail] = _nan_mean_slices(x, tail, window, True)
+    return out if newest_first else out[::-1]
+
+def check_sma_kernel_parity(n_rows: int = 1500, windows=(3, 5, 7, 10, 12, 20, 25, 50, 100, 200, 400, 800), seed: int = 0) -> bool:
+    """
+    SMA 커널 ↔ 기존 행 루프(df.iloc[idx:idx+N]["종"].mean()) 비트 일치 검사 (NaN 포함 합성 종가).
+    Returns: 모두 일치하면 True
+    """
+    rng = np.random.default_rng(seed)
+    closes = 50_000 + np.cumsum(rng.normal(0, 50, n_rows))
+    closes[rng.choice(n_rows, size=max(1, n_rows // 200), replace=False)] = np.nan
+    df = pd.DataFrame({"종": closes})
+    ok = True
+    for window in windows:
+        legacy = np.array([df.iloc[idx:idx + window]["종"].mean() if idx + window <= len(df) else np.nan for idx in range(len(df))])
+        legacy_partial = np.array([df.iloc[idx:idx + window]["종"].mean() for idx in range(len(df))])
+        kernel = reverse_window_sma(closes, window)
+        kernel_partial = reverse_window_sma(closes, window, partial=True)
+        same = np.array_equal(legacy, kernel, equal_nan=True) and np.array_equal(legacy_partial, kernel_partial, equal_nan=True)
+        ok = ok and same
+        if not same:
+            diff = np.nanmax(np.abs(legacy - kernel))
+            print(f"{get_timestamp()} ❌[SMA 커널 검증] SMA{window}: 불일치 (최대 차이 {diff})")
+    if ok:
+        print(f"{get_timestamp()} ✅[SMA 커널 검증] {len(windows)}개 창, {n_rows}행: 기존 루프와 비트 일치")
+    return ok
+
+# ---------- 공용 OHLC 최고/최저 커널 (Max70/Max200/Max400/Max15/Max25 ...) ----------
+# 행마다 df.iloc[idx:idx+N][["시","고","저","종"]].values.max() 를 부르던 O(n·N·4) 루프를
+# 블록 분해(van Herk/Gil-Werman) 슬라이딩 최고/최저로 대체: 창 크기와 무관하게 O(n).
+#   1) 행별 시고저종 최고/최저 → 1차원 배열
+#   2) 길이 N 블록마다 앞→뒤 누적(prefix), 뒤→앞 누적(suffix)
+#   3) 창 [i, i+N) = max(suffix[i], prefix[i+N-1])
+# np.maximum/np.minimum 은 NaN을 전파하므로 창 안에 NaN이 있으면 결과도 NaN (.values.max() 와 동일).
+OHLC_COLUMNS = ["시", "고", "저", "종"]
+
+def _sliding_extreme(x: np.ndarray, window: int, ufunc, pad_value: float) -> np.ndarray:
+    """최신→과거 1차원 배열의 창 최고/최저: out[i] = ufunc.reduce(x[i:i+window]), 창이 다 차지 않으면 NaN."""
+    n = len(x)
+    out = np.full(n, np.nan)
+    if window <= 0 or n < window:
+        return out
+    blocks = -(-n // window)
+    padded = np.full(blocks * window, pad_value)
+    padded[:n] = x
+    grid = padded.reshape(blocks, window)
+    prefix = ufunc.accumulate(grid, axis=1).ravel()
+    suffix = ufunc.accumulate(grid[:, ::-1], axis=1)[:, ::-1].ravel()
+    full = n - window + 1
+    out[:full] = ufunc(suffix[:full], prefix[window - 1:window - 1 + full])
+    return out
+
+def ohlc_window_extrema(df: pd.DataFrame, window: int, rows=None, partial: bool = False, newest_first: bool = True):
+    """
+    시고저종 4개 컬럼의 창 최고가/최저가.
+
+    Args:
+        df: 시/고/저/종 컬럼을 가진 DataFrame (newest_first=True면 idx=0이 최신)
+        window: 창 크기 (행 수)
+        rows: 계산할 행 번호 목록 (None이면 전체 행, 반환 길이 = len(rows))
+        partial: rows 사용 시 창이 다 차지 않아도 남은 행만으로 계산 (무가드 iloc 호출과 동일)
+        newest_first: False면 과거→최신 DataFrame으로 보고 해당 행 포함 과거 window개 창
+
+    Returns:
+        (np.ndarray, np.ndarray): (최고가, 최저가)
+    """
+    ohlc = df[OHLC_COLUMNS].to_numpy(dtype=np.float64)
+    row_max = ohlc.max(axis=1) if len(ohlc) else np.empty(0)
+    row_min = ohlc.min(axis=1) if len(ohlc) else np.empty(0)
+    if not newest_first:
+        row_max, row_min = row_max[::-1], row_min[::-1]
+        if rows is not None:
+            rows = [len(row_max) - 1 - int(r) for r in rows]
+    n = len(row_max)
+    if rows is not None:
+        hi = np.full(len(rows), np.nan)
+        lo = np.full(len(rows), np.nan)
+        for k, r in enumerate(rows):
+            r = int(r)
+            if r < 0 or r >= n or (not partial and r + window > n):
+                continue
+            hi[k] = row_max[r:r + window].max()
+            lo[k] = row_min[r:r + window].min()
+        return hi, lo
+    hi = _sliding_extreme(row_max, window, np.maximum, -np.inf)
+    lo = _sliding_extreme(row_min, window, np.minimum, np.inf)
+    if not newest_first:
+        hi, lo = hi[::-1], lo[::-1]
+    return hi, lo
+
+def _synthetic_ohlc_frame(n: int, rng, nan_ratio: float = 0.0) -> pd.DataFrame:
+    """최신→과거 합성 시고저종 DataFrame (nan_ratio 비율의 칸을 NaN 으로)."""
+    close = 50_000 + np.cumsum(rng.normal(0, 50, n))
+    open_ = close + rng.normal(0, 10, n)
+    ohlc = np.column_stack([open_, np.maximum(open_, close) + rng.random(n) * 20,
+                            np.minimum(open_, close) - rng.random(n) * 20, close])
+    if nan_ratio > 0 and n:
+        cells = rng.choice(ohlc.size, size=max(1, int(ohlc.size * nan_ratio)), replace=False)
+        ohlc.ravel()[cells] = np.nan
+    return pd.DataFrame(ohlc, columns=OHLC_COLUMNS)
+
+def benchmark_ohlc_extrema(sizes=(12_000, 100_000), windows=(15, 70, 200, 400), legacy_rows: int = 2_000,
+                           nan_ratio: float = 0.0, seed: int = 0) -> dict:
+    """
+    OHLC 최고/최저 커널 벤치마크 + 검증.
+    - 검증: sliding_window_view 전수 계산(O(n·N))과 비트 일치, 앞 legacy_rows 행은 기존 iloc 루프와 비교
+    - 시간: 커널 vs 전수 계산 (기존 iloc 루프는 legacy_rows 행 기준 시간을 n행으로 환산)
+    - nan_ratio: 합성 시고저종 중 NaN 으로 바꿀 칸 비율 (결측 캔들 전파 검증용)
+    Returns: {(n, window): {"kernel_s", "naive_s", "legacy_est_s", "match"}}
+    """
+    rng = np.random.default_rng(seed)
+    report = {}
+    for n in sizes:
+        df = _synthetic_ohlc_frame(n, rng, nan_ratio)
+        ohlc = df[OHLC_COLUMNS].to_numpy(dtype=np.float64)
+        for window in windows:
+            t0 = time.perf_counter()
+            hi, lo = ohlc_window_extrema(df, window)
+            kernel_s = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            naive_hi = np.full(n, np.nan)
+            naive_lo = np.full(n, np.nan)
+            if n >= window:
+                naive_hi[:n - window + 1] = sliding_window_view(ohlc.max(axis=1), window).max(axis=1)
+                naive_lo[:n - window + 1] = sliding_window_view(ohlc.min(axis=1), window).min(axis=1)
+            naive_s = time.perf_counter() - t0
+            check_rows = min(legacy_rows, n)
+            t0 = time.perf_counter()
+            legacy_hi = [df.iloc[idx:idx + window][OHLC_COLUMNS].values.max() if idx + window <= n else np.nan for idx in range(check_rows)]
+            legacy_lo = [df.iloc[idx:idx + window][OHLC_COLUMNS].values.min() if idx + window <= n else np.nan for idx in range(check_rows)]
+            legacy_est_s = (time.perf_counter() - t0) * n / max(check_rows, 1)
+            match = (np.array_equal(hi, naive_hi, equal_nan=True) and np.array_equal(lo, naive_lo, equal_nan=True)
+                     and np.array_equal(hi[:check_rows], legacy_hi, equal_nan=True) and np.array_equal(lo[:check_rows], legacy_lo, equal_nan=True))
+            report[(n, window)] = {"kernel_s": kernel_s, "naive_s": naive_s, "legacy_est_s": legacy_est_s, "match": match}
+            print(f"{get_timestamp()} {'✅' if match else '❌'}[OHLC 최고/최저 벤치] {n:,}행 창{window}: "
+                  f"커널 {kernel_s * 1000:.1f}ms | 전수 {naive_s * 1000:.1f}ms | 기존 루프(환산) {legacy_est_s:.1f}s")
+    return report
+
+def check_ohlc_extrema_parity(n_rows: int = 1500, windows=(15, 25, 70, 200, 400), nan_ratio: float = 0.005,
+                              bench_rows: int = 12_000, seed: int = 0) -> bool:
+    """
+    OHLC 최고/최저 커널 ↔ 기존 행 루프(df.iloc[idx:idx+N][시고저종].values.max()) 비트 일치 검사 (NaN 포함 합성 캔들).
+    전체 행 / rows+partial / 과거→최신(newest_first=False) 경로를 모두 비교한 뒤 bench_rows 행 벤치마크도 NaN 포함으로 실행합니다.
+    Returns: 모두 일치하면 True
+    """
+    rng = np.random.default_rng(seed)
+    df = _synthetic_ohlc_frame(n_rows, rng, nan_ratio)
+    oldest_first = df.iloc[::-1].reset_index(drop=True)
+    ok = True
+    for window in windows:
+        legacy_hi = np.array([df.iloc[idx:idx + window][OHLC_COLUMNS].values.max() for idx in range(n_rows)])
+        legacy_lo = np.array([df.iloc[idx:idx + window][OHLC_COLUMNS].values.min() for idx in range(n_rows)])
+        full = np.arange(n_rows) + window <= n_rows
+        guarded_hi = np.where(full, legacy_hi, np.nan)
+        guarded_lo = np.where(full, legacy_lo, np.nan)
+        hi, lo = ohlc_window_extrema(df, window)
+        part_hi, part_lo = ohlc_window_extrema(df, window, rows=range(n_rows), partial=True)
+        rev_hi, rev_lo = ohlc_window_extrema(oldest_first, window, newest_first=False)
+        same = (np.array_equal(hi, guarded_hi, equal_nan=True) and np.array_equal(lo, guarded_lo, equal_nan=True)
+                and np.array_equal(part_hi, legacy_hi, equal_nan=True) and np.array_equal(part_lo, legacy_lo, equal_nan=True)
+                and np.array_equal(rev_hi[::-1], guarded_hi, equal_nan=True) and np.array_equal(rev_lo[::-1], guarded_lo, equal_nan=True))
+        ok = ok and same
+        if not same:
+            print(f"{get_timestamp()} ❌[OHLC 최고/최저 검증] 창{window}: 기존 루프와 불일치")
+    if ok:
+        print(f"{get_timestamp()} ✅[OHLC 최고/최저 검증] {len(windows)}개 창, {n_rows}행 (NaN {nan_ratio:.1%}): 기존 루프와 비트 일치")
+    report = benchmark_ohlc_extrema(sizes=(bench_rows,), windows=windows, legacy_rows=500, nan_ratio=nan_ratio, seed=seed)
+    return ok and all(r["match"] for r in report.values())
+
+# ---------- AFTER 단계 증분 지표 상태 (티커·타임프레임별) ----------
+# AFTER 단계는 [새 캔들(idx=0), Previous(idx=1~)] 에서 idx=0 의 SMA(최대 800개 창)와 Max/Min 을 구합니다.
+# 확정 캔들(idx>=1)의 요약을 메모리에 유지해 새 캔들 1개를 O(1)로 계산합니다.
+#   - SMA: 창마다 '최근 (N-1)개 확정 종가 합'을 정확한 정수(종가 × 2^1074, float 는 이 배율에서 항상 정수)로
+#     유지 → 누적 오차 없음. 평균은 정수 ÷ 정수(파이썬은 올바르게 반올림)로 한 번만 반올림
+#   - Max/Min: 최근 (N-1)개 확정 캔들의 행별 최고/최저를 단조 deque 로 유지 → 맨 앞이 창 최고/최저
+#   - 동기화: 상태의 마지막 확정 캔들(Date·시고저종)을 이번 df 의 idx>=1 에서 찾아, 그보다 새로운 확정 캔들
+#     (1분봉은 실행마다 약 15개)을 과거→최신 순서로 넣은 뒤 idx=0 을 계산합니다. 못 찾으면(첫 실행, 재시작,
+#     캔들 교체, 새 캔들이 INDICATOR_STATE_MAX_CATCHUP 초과 등) df 로 상태를 재구성합니다.
+#     계산 후 idx=0 도 확정 캔들로 넣어 다음 실행의 기준으로 삼습니다.
+# SMA 결과는 정확한 합을 한 번 반올림한 값이라 전체 재계산(NumPy pairwise 합)과 최대 1ulp 차이가 날 수 있습니다.
+ENABLE_INDICATOR_STATE = True        # False면 AFTER 단계도 매번 창 전체를 다시 계산
+INDICATOR_STATE_VERIFY = False       # True면 증분 결과를 전체 재계산과 비교해 차이를 로그로 출력
+INDICATOR_STATE_REBUILD_EVERY = 96   # N회 증분 갱신마다 df 로 상태 재구성 (오래된 previous 행 변경 대비)
+INDICATOR_STATE_MAX_CATCHUP = 64     # 한 번에 따라잡을 새 확정 캔들 상한 (넘으면 재구성이 더 저렴)
+
+_EXACT_SCALE_BITS = 1074  # float 최소 단위 2^-1074 → 모든 유한 float 가 종가 × 2^1074 정수로 표현됨
+
+def _exact_units(value: float) -> int:
+    """float → 정확한 정수 (value × 2^1074)."""
+    numerator, denominator = float(value).as_integer_ratio()
+    return numerator << (_EXACT_SCALE_BITS - denominator.bit_length() + 1)
+
+class IncrementalIndicatorState:
+    """확정 캔들 이력 요약: 새 캔들(idx=0)의 SMA/Max/Min 을 O(1)로 계산."""
+
+    def __init__(self, sma_windows, extrema_window: int):
+        self.sma_windows = tuple(sma_windows)
+        self.extrema_window = extrema_window
+        self.keep = max(max(self.sma_windows), extrema_window) - 1
+        self.closes = deque(maxlen=self.keep)   # 과거→최신 (오른쪽이 최신)
+        self.sums = {window: 0 for window in self.sma_windows}
+        self.max_deque = deque()                 # (순번, 행 최고) 단조 감소
+        self.min_deque = deque()                 # (순번, 행 최저) 단조 증가
+        self.seq = 0
+        self.total = 0                           # 확정 캔들 수 (keep 초과분 포함)
+        self.last_key = None
+        self.updates = 0
+
+    @staticmethod
+    def row_key(date_value, ohlc_row) -> tuple:
+        """확정 캔들 식별값: (Date, 시, 고, 저, 종)."""
+        return (pd.Timestamp(date_value),) + tuple(float(value) for value in ohlc_row)
+
+    def rebuild(self, df: pd.DataFrame, total: int) -> bool:
+        """df 의 idx=1~ 확정 캔들로 상태 재구성 (O(keep)). NaN 이 있으면 False."""
+        self.__init__(self.sma_windows, self.extrema_window)
+        history = df.iloc[1:1 + self.keep]
+        ohlc = history[OHLC_COLUMNS].to_numpy(dtype=np.float64)[::-1]
+        if np.isnan(ohlc).any():
+            return False
+        closes = ohlc[:, OHLC_COLUMNS.index("종")].tolist()
+        prefix = [0]
+        for close in closes:
+            prefix.append(prefix[-1] + _exact_units(close))
+        for window in self.sma_windows:
+            span = min(window - 1, len(closes))
+            self.sums[window] = prefix[-1] - prefix[len(closes) - span]
+        self.closes.extend(closes)
+        for row_max, row_min in zip(ohlc.max(axis=1).tolist(), ohlc.min(axis=1).tolist()):
+            self._push_extrema(row_max, row_min)
+        self.total = total
+        self.last_key = self.row_key(history["Date(UTC)"].iat[0], ohlc[-1])
+        return True
+
+    def find_anchor(self, dates: np.ndarray, ohlc: np.ndarray):
+        """마지막 확정 캔들이 있는 df 위치(idx>=1). 없거나 그 사이 새 캔들에 NaN 이 있으면 None."""
+        if self.last_key is None:
+            return None
+        for idx in np.flatnonzero(dates[1:] == self.last_key[0].to_datetime64()) + 1:
+            if self.row_key(dates[idx], ohlc[idx]) == self.last_key:
+                return None if np.isnan(ohlc[1:idx]).any() else int(idx)
+        return None
+
+    def _push_extrema(self, row_max: float, row_min: float) -> None:
+        self.seq += 1
+        span = self.extrema_window - 1
+        while self.max_deque and self.max_deque[-1][1] <= row_max:
+            self.max_deque.pop()
+        self.max_deque.append((self.seq, row_max))
+        while self.min_deque and self.min_deque[-1][1] >= row_min:
+            self.min_deque.pop()
+        self.min_deque.append((self.seq, row_min))
+        while self.max_deque[0][0] <= self.seq - span:
+            self.max_deque.popleft()
+        while self.min_deque[0][0] <= self.seq - span:
+            self.min_deque.popleft()
+
+    def push(self, key, close: float, row_max: float, row_min: float) -> None:
+        """확정 캔들 1개 추가 (O(창 개수))."""
+        exact = _exact_units(close)
+        for window in self.sma_windows:
+            span = window - 1
+            if span == 0:
+                continue
+            self.sums[window] += exact
+            if len(self.closes) >= span:
+                self.sums[window] -= _exact_units(self.closes[-span])
+        self.closes.append(close)
+        self._push_extrema(row_max, row_min)
+        self.total += 1
+        self.last_key = key
+
+    def latest(self, close: float, row_max: float, row_min: float, partial_windows=()):
+        """새 캔들 포함 창 값: ({창: SMA}, 최고, 최저). 창이 다 차지 않으면 NaN (partial_windows 는 있는 만큼 평균)."""
+        exact = _exact_units(close)
+        sma_values = {}
+        for window in self.sma_windows:
+            if self.total >= window - 1:
+                sma_values[window] = (self.sums[window] + exact) / (window << _EXACT_SCALE_BITS)
+            elif window in partial_windows:
+                sma_values[window] = (self.sums[window] + exact) / ((self.total + 1) << _EXACT_SCALE_BITS)
+            else:
+                sma_values[window] = np.nan
+        if self.total >= self.extrema_window - 1 and self.max_deque:
+            high = max(self.max_deque[0][1], row_max)
+            low = min(self.min_deque[0][1], row_min)
+        elif self.extrema_window == 1:
+            high, low = row_max, row_min
+        else:
+            high = low = np.nan
+        return sma_values, high, low
+
+_indicator_states = {}
+_indicator_states_lock = threading.Lock()
+
+def latest_row_indicators_from_state(timeframe: str, df: pd.DataFrame, sma_windows, extrema_window: int, partial_windows=()):
+    """
+    AFTER 단계 idx=0 행의 SMA/Max/Min 을 증분 상태로 계산 (calculate_latest_row_only_* 용).
+
+    Args:
+        timeframe: 상태 구분용 타임프레임 이름 ("15m", "1h", "1m")
+        df: [새 캔들(idx=0), Previous(idx=1~)] 최신→과거 DataFrame
+        sma_windows: SMA 창 목록
+        extrema_window: Max/Min 창 크기
+        partial_windows: 창이 다 차지 않아도 있는 만큼 평균할 SMA 창 (기존 무가드 계산과 동일)
+
+    Returns:
+        ({창: SMA}, Max, Min) 또는 None (상태 사용 불가 → 호출부가 기존 커널로 계산)
+    """
+    if not ENABLE_INDICATOR_STATE or len(df) < 2 or "Date(UTC)" not in df.columns:
+        return None
+    try:
+        # 앞쪽 행만 꺼내 사용 (df 전체 컬럼 접근 없이 O(따라잡을 캔들 수))
+        scan = min(len(df), INDICATOR_STATE_MAX_CATCHUP + 2)
+        head_ohlc = np.column_stack([df[col].to_numpy(dtype=np.float64)[:scan] for col in OHLC_COLUMNS])
+        head_dates = df["Date(UTC)"].to_numpy()[:scan]
+        row0 = head_ohlc[0]
+        if np.isnan(row0).any() or pd.isna(head_dates[0]):
+            return None
+        close_col = OHLC_COLUMNS.index("종")
+        state_key = (TICKER, timeframe)
+        with _indicator_states_lock:
+            state = _indicator_states.get(state_key)
+            anchor = None
+            if (state is not None
+                    and state.sma_windows == tuple(sma_windows)
+                    and state.extrema_window == extrema_window
+                    and state.updates < INDICATOR_STATE_REBUILD_EVERY):
+                anchor = state.find_anchor(head_dates, head_ohlc)
+            if anchor is None:
+                state = IncrementalIndicatorState(sma_windows, extrema_window)
+                if not state.rebuild(df, total=len(df) - 1):
+                    _indicator_states.pop(state_key, None)
+                    return None
+                _indicator_states[state_key] = state
+                anchor = 1
+            # 지난 실행 이후 새로 확정된 캔들(idx=anchor-1 … 1)을 과거→최신 순서로 추가
+            for idx in range(anchor - 1, 0, -1):
+                row = head_ohlc[idx]
+                state.push(IncrementalIndicatorState.row_key(head_dates[idx], row), float(row[close_col]), float(row.max()), float(row.min()))
+            close = float(row0[close_col])
+            result = state.latest(close, float(row0.max()), float(row0.min()), partial_windows)
+            # 다음 AFTER 실행의 기준이 될 캔들로 확정
+            state.push(IncrementalIndicatorState.row_key(head_dates[0], row0), close, float(row0.max()), float(row0.min()))
+            state.updates += 1
+        if INDICATOR_STATE_VERIFY:
+            _verify_indicator_state(timeframe, df, result, extrema_window, partial_windows)
+        return result
+    except Exception as e:
+        print(f"{get_timestamp()} ⚠️[증분 지표] {timeframe} 상태 계산 실패, 전체 창 계산으로 대체: {e}")
+        return None
+
+def _verify_indicator_state(timeframe: str, df: pd.DataFrame, result, extrema_window: int, partial_windows) -> None:
+    """증분 결과 ↔ 전체 창 재계산 비교 로그."""
+    sma_values, high, low = result
+    closes = df["종"].to_numpy(dtype=np.float64)
+    worst = 0.0
+    for window, value in sma_values.items():
+        expected = reverse_window_sma(closes, window, rows=[0], partial=window in partial_windows)[0]
+        if not (np.isnan(expected) and np.isnan(value)):
+            worst = max(worst, abs(expected - value) / max(abs(expected), 1e-300))
+    max_vals, min_vals = ohlc_window_extrema(df, extrema_window, rows=[0])
+    extrema_ok = np.array_equal([max_vals[0], min_vals[0]], [high, low], equal_nan=True)
+    mark = "✅" if worst <= 1e-15 and extrema_ok else "❌"
+    print(f"{get_timestamp()} {mark}[증분 지표 검증] {TICKER} {timeframe}: SMA 최대 상대오차 {worst:.1e}, Max/Min {'일치' if extrema_ok else '불일치'}")
+
 def calculate_all_indicators_1m(df, market_type):
     """
     1분봉용 모든 지표를 계산합니다. (Max400/Min400 사용)
@@ -3466,73 +4331,48 @@ def calculate_all_indicators_1m(df, market_type):
             # 강제 숫자 변환
             df[col] = pd.to_numeric(df[col], errors='coerce')
     
-    # Date(UTC) 컬럼 정규화 (Timestamp와 문자열 혼합 방지)
-    if 'Date(UTC)' in df.columns:
-        if df['Date(UTC)'].dtype == 'object':
-            # format 명시하여 파싱 시도 (연도/일 혼동 방지)
-            try:
-                df['Date(UTC)'] = pd.to_datetime(df['Date(UTC)'], format='%y/%m/%d,%H:%M', errors='coerce')
-            except:
-                # 쉼표 제거 후 형식 시도
-                try:
-                    df['Date(UTC)'] = df['Date(UTC)'].astype(str).str.replace(',', ' ', regex=False).str.strip()
-                    df['Date(UTC)'] = pd.to_datetime(df['Date(UTC)'], format='%y/%m/%d %H:%M', errors='coerce')
-                except:
-                    # fallback: format 없이 파싱
-                    df['Date(UTC)'] = pd.to_datetime(df['Date(UTC)'], errors='coerce')
-        else:
-            # 이미 datetime 타입이면 그대로 사용
-            pass
+    # Date(UTC) 정규화: datetime64가 아니면 한 번만 변환 (Timestamp와 문자열 혼합 방지)
+    ensure_utc_time(df)
     
     # ⚠️중요: 입력 데이터를 확실하게 현재→과거 순서로 정렬 (SMA 계산 일관성 보장)
     # 데이터 수집 과정에서 정렬이 여러 번 섞일 수 있으므로, 계산 직전에 확실하게 정렬
     df = df.sort_values("Date(UTC)", ascending=False).reset_index(drop=True)
     
-    # SMA 계산: 각 행(idx)에서 그 행부터 앞으로(과거로) window개까지의 평균
-    for idx in range(len(df)):
-        df.loc[idx, "SMA15"] = df.iloc[idx:idx+15]["종"].mean() if idx + 15 <= len(df) else np.nan
-        df.loc[idx, "SMA25"] = df.iloc[idx:idx+25]["종"].mean() if idx + 25 <= len(df) else np.nan
-        df.loc[idx, "SMA35"] = df.iloc[idx:idx+35]["종"].mean() if idx + 35 <= len(df) else np.nan
-        df.loc[idx, "SMA50"] = df.iloc[idx:idx+50]["종"].mean() if idx + 50 <= len(df) else np.nan
-        df.loc[idx, "SMA100"] = df.iloc[idx:idx+100]["종"].mean() if idx + 100 <= len(df) else np.nan
+    # SMA 계산: 각 행(idx)에서 그 행부터 앞으로(과거로) window개까지의 평균 (공용 커널)
+    closes = df["종"].to_numpy(dtype=np.float64)
+    for window in (15, 25, 35, 50, 100):
+        df[f"SMA{window}"] = reverse_window_sma(closes, window)
     
     # Max400, Min400 계산: 각 행(idx)에서 그 행부터 앞으로(과거로) 400개까지의 최고가/최저가
-    for idx in range(len(df)):
-        if idx + 400 <= len(df):
-            window_data = df.iloc[idx:idx+400][["시", "고", "저", "종"]]
-            df.loc[idx, "Max400"] = window_data.values.max()
-            df.loc[idx, "Min400"] = window_data.values.min()
-        else:
-            df.loc[idx, "Max400"] = np.nan
-            df.loc[idx, "Min400"] = np.nan
+    df["Max400"], df["Min400"] = ohlc_window_extrema(df, 400)
     
     # 하단, 상단 계산 (Max400/Min400이 NaN이면 NaN)
-    df["하단"] = df.apply(lambda row: abs((row["종"] - row["Min400"]) / row["Min400"]) if not pd.isna(row["Min400"]) else np.nan, axis=1)
-    df["상단"] = df.apply(lambda row: abs((row["종"] - row["Max400"]) / row["Max400"]) if not pd.isna(row["Max400"]) else np.nan, axis=1)
+    df["하단"] = band_distance_array(df["종"], df["Min400"])
+    df["상단"] = band_distance_array(df["종"], df["Max400"])
     
     # SFast 계산 (SMA15, SMA25, SMA35 사용)
-    df["SFast"] = df.apply(lambda row: calculate_superfast(row["SMA15"], row["SMA25"], row["SMA35"]), axis=1)
+    df["SFast"] = calculate_superfast_array(df["SMA15"], df["SMA25"], df["SMA35"])
     
     # Fast 계산 (SMA25, SMA35, SMA50 사용)
-    df["Fast"] = df.apply(lambda row: calculate_fast(row["SMA25"], row["SMA35"], row["SMA50"]), axis=1)
+    df["Fast"] = calculate_fast_array(df["SMA25"], df["SMA35"], df["SMA50"])
     
     # Base 계산 (SMA35, SMA50, SMA100 사용)
-    df["Base"] = df.apply(lambda row: calculate_base(row["SMA35"], row["SMA50"], row["SMA100"]), axis=1)
+    df["Base"] = calculate_base_array(df["SMA35"], df["SMA50"], df["SMA100"])
     
     # 4or1 계산
-    df["4or1"] = df.apply(lambda row: calculate_4or1(row["하단"], row["상단"]), axis=1)
+    df["4or1"] = calculate_4or1_array(df["하단"], df["상단"])
     
     # buyside 계산
-    df["buyside"] = df.apply(lambda row: calculate_buyside(row["SFast"], row["Fast"], row["Base"]), axis=1)
+    df["buyside"] = calculate_buyside_array(df["SFast"], df["Fast"], df["Base"])
     
     # sellside 계산
-    df["sellside"] = df.apply(lambda row: calculate_sellside(row["SFast"], row["Fast"], row["Base"]), axis=1)
+    df["sellside"] = calculate_sellside_array(df["SFast"], df["Fast"], df["Base"])
     
     # Buy 계산
-    df["Buy"] = df.apply(lambda row: calculate_buy(row["4or1"], row["sellside"]), axis=1)
+    df["Buy"] = calculate_buy_array(df["4or1"], df["sellside"])
     
     # Sell 계산 (4or1 없이 buyside만 사용)
-    df["Sell"] = df.apply(lambda row: calculate_sell_short(row["buyside"]), axis=1)
+    df["Sell"] = calculate_sell_short_array(df["buyside"])
     
     # 최신→과거 순서로 다시 정렬
     # 이미 최신→과거 순서이므로 재정렬 불필요 (정렬은 위에서 이미 완료)
@@ -3559,13 +4399,8 @@ def calculate_latest_row_only_1m(df, market_type):
     # 이 과정이 없으면 데이터가 제대로 읽히지 않아 len(df)가 줄어들고 fallback으로 튕김
     df = clean_df_display_format(df)
     
-    # Date(UTC) 컬럼 정규화 (Timestamp와 문자열 혼합 방지)
-    if 'Date(UTC)' in df.columns:
-        if df['Date(UTC)'].dtype == 'object':
-            df['Date(UTC)'] = df['Date(UTC)'].astype(str).str.strip().str.replace(',', ' ', regex=False)
-            df['Date(UTC)'] = pd.to_datetime(df['Date(UTC)'], format='%y/%m/%d %H:%M', errors='coerce')
-        else:
-            df['Date(UTC)'] = pd.to_datetime(df['Date(UTC)'], format='%y/%m/%d,%H:%M', errors='coerce')
+    # Date(UTC) 정규화: datetime64가 아니면 한 번만 변환 (Timestamp와 문자열 혼합 방지)
+    ensure_utc_time(df)
     
     # ⚠️중요: 입력 데이터를 확실하게 현재→과거 순서로 정렬 (SMA 계산 일관성 보장)
     df = df.sort_values("Date(UTC)", ascending=False).reset_index(drop=True)
@@ -3603,23 +4438,29 @@ def calculate_latest_row_only_1m(df, market_type):
     if not new_data_indices:
         return df
     
+    # 새 행이 idx=0 하나뿐이면 증분 상태로 O(1) 계산. 새 행이 여러 개면(1분봉은 실행마다 약 15개) 어차피
+    # 공용 커널이 나머지 행을 계산하므로 idx=0 까지 한 번에 커널로 계산 (상태는 다음 단일 행 호출 때 따라잡음)
+    state_values = latest_row_indicators_from_state("1m", df, (15, 25, 35, 50, 100), 400) if new_data_indices == [0] else None
+    kernel_rows = new_data_indices[1:] if state_values is not None else new_data_indices
+    if state_values is not None:
+        sma_values, max_state, min_state = state_values
+        for window, value in sma_values.items():
+            df.loc[0, f"SMA{window}"] = value
+        df.loc[0, "Max400"] = max_state
+        df.loc[0, "Min400"] = min_state
+    if kernel_rows:
+        # SMA 계산: 새 데이터 행만, idx 포함하여 계산 (공용 커널)
+        closes = df["종"].to_numpy(dtype=np.float64)
+        for window in (15, 25, 35, 50, 100):
+            df.loc[kernel_rows, f"SMA{window}"] = reverse_window_sma(closes, window, rows=kernel_rows)
+        
+        # Max400, Min400 계산: idx 포함 400개 캔들 (공용 커널)
+        max_vals, min_vals = ohlc_window_extrema(df, 400, rows=kernel_rows)
+        df.loc[kernel_rows, "Max400"] = max_vals
+        df.loc[kernel_rows, "Min400"] = min_vals
+    
     # 새 데이터의 각 행에 대해 지표 계산
     for idx in new_data_indices:
-        # SMA 계산: idx 포함하여 계산
-        df.loc[idx, "SMA15"] = df.iloc[idx:idx+15]["종"].mean() if idx + 15 <= len(df) else np.nan
-        df.loc[idx, "SMA25"] = df.iloc[idx:idx+25]["종"].mean() if idx + 25 <= len(df) else np.nan
-        df.loc[idx, "SMA35"] = df.iloc[idx:idx+35]["종"].mean() if idx + 35 <= len(df) else np.nan
-        df.loc[idx, "SMA50"] = df.iloc[idx:idx+50]["종"].mean() if idx + 50 <= len(df) else np.nan
-        df.loc[idx, "SMA100"] = df.iloc[idx:idx+100]["종"].mean() if idx + 100 <= len(df) else np.nan
-        
-        # Max400, Min400 계산: idx 포함 400개 캔들
-        if idx + 400 <= len(df):
-            window_data = df.iloc[idx:idx+400][["시", "고", "저", "종"]]
-            df.loc[idx, "Max400"] = window_data.values.max()
-            df.loc[idx, "Min400"] = window_data.values.min()
-        else:
-            df.loc[idx, "Max400"] = np.nan
-            df.loc[idx, "Min400"] = np.nan
         
         # 하단, 상단 계산
         current_price = df.loc[idx, "종"]
@@ -3657,13 +4498,11 @@ def calculate_latest_row_only_1m(df, market_type):
 def calculate_sb1m_for_15m(df_15m, df_1m):
     """
     1분봉 데이터를 기반으로 15분봉에 SB1M 신호를 추가합니다.
-    1분봉 15개씩 묶어서 buy1~buy15, sell1~sell15까지 계산합니다.
+    1분봉 15개씩 묶어서 buy01~buy15, sell01~sell15까지 계산합니다.
     """
     if df_1m.empty or df_15m.empty:
         return df_15m
     
-    # 원본 보존
-    df_1m = df_1m.copy()
     df_15m = df_15m.copy()
     
     if 'Date(UTC)' not in df_1m.columns or 'Date(UTC)' not in df_15m.columns:
@@ -3671,110 +4510,14 @@ def calculate_sb1m_for_15m(df_15m, df_1m):
             df_15m['SB1M'] = ''
         return df_15m
     
-    # 날짜 파싱 (이미 datetime64면 그대로 사용, 문자열만 파싱)
-    if pd.api.types.is_datetime64_any_dtype(df_1m['Date(UTC)']):
-        df_1m['Date(UTC)_dt'] = df_1m['Date(UTC)']
-    else:
-        # 문자열인 경우에만 파싱 (UserWarning 억제)
-        s = df_1m['Date(UTC)'].astype(str).str.strip().str.replace(',', ' ', regex=False)
-        import warnings
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore", UserWarning)
-            df_1m['Date(UTC)_dt'] = pd.to_datetime(s, errors='coerce')
-    df_1m = df_1m[df_1m['Date(UTC)_dt'].notna()].copy()
-    
-    if df_1m.empty:
+    # 15분 버킷별 1분봉 Buy/Sell 개수 → SB1M 라벨 (그룹 리듀스)
+    labels, _, n_groups = reduce_child_signals(df_1m, df_15m['Date(UTC)'], "15m", 15, width=2)
+    if n_groups == 0:
         if 'SB1M' not in df_15m.columns:
             df_15m['SB1M'] = ''
         return df_15m
     
-    # 시간 정렬
-    df_1m = df_1m.sort_values('Date(UTC)_dt', ascending=True).reset_index(drop=True)
-    df_1m['15min_group'] = df_1m['Date(UTC)_dt'].dt.floor('15min')
-    
-    # 15분봉 날짜 파싱 (이미 datetime64면 그대로 사용, 문자열만 파싱)
-    if pd.api.types.is_datetime64_any_dtype(df_15m['Date(UTC)']):
-        df_15m['Date(UTC)_dt'] = df_15m['Date(UTC)']
-    else:
-        # 문자열인 경우에만 파싱 (UserWarning 억제)
-        s = df_15m['Date(UTC)'].astype(str).str.strip().str.replace(',', ' ', regex=False)
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore", UserWarning)
-            df_15m['Date(UTC)_dt'] = pd.to_datetime(s, errors='coerce')
-    
-    if '15min_group' not in df_15m.columns:
-        df_15m['15min_group'] = df_15m['Date(UTC)_dt'].dt.floor('15min')
-    else:
-        mask_na = df_15m['15min_group'].isna()
-        if mask_na.any():
-            df_15m.loc[mask_na, '15min_group'] = df_15m.loc[mask_na, 'Date(UTC)_dt'].dt.floor('15min')
-    
-    # --- 15분 그룹별 SB1M 신호 계산 ---
-    sb1m_data = []
-    for group_time, group_df in df_1m.groupby('15min_group', sort=True):
-        buy_count = 0
-        sell_count = 0
-        
-        for _, row in group_df.iterrows():
-            buy_val = str(row.get('Buy', '')).strip().lower()
-            sell_val = str(row.get('Sell', '')).strip().lower()
-            
-            if buy_val == 'buy':
-                buy_count += 1
-            elif sell_val == 'sell':
-                sell_count += 1
-        
-        # 우선순위 로직: buy15 > buy14 > ... > buy01 > sell15 > sell14 > ... > sell01
-        if buy_count == 15: sb1m_signal = 'buy15'
-        elif buy_count == 14: sb1m_signal = 'buy14'
-        elif buy_count == 13: sb1m_signal = 'buy13'
-        elif buy_count == 12: sb1m_signal = 'buy12'
-        elif buy_count == 11: sb1m_signal = 'buy11'
-        elif buy_count == 10: sb1m_signal = 'buy10'
-        elif buy_count == 9: sb1m_signal = 'buy09'
-        elif buy_count == 8: sb1m_signal = 'buy08'
-        elif buy_count == 7: sb1m_signal = 'buy07'
-        elif buy_count == 6: sb1m_signal = 'buy06'
-        elif buy_count == 5: sb1m_signal = 'buy05'
-        elif buy_count == 4: sb1m_signal = 'buy04'
-        elif buy_count == 3: sb1m_signal = 'buy03'
-        elif buy_count == 2: sb1m_signal = 'buy02'
-        elif buy_count == 1: sb1m_signal = 'buy01'
-        elif sell_count == 15: sb1m_signal = 'sell15'
-        elif sell_count == 14: sb1m_signal = 'sell14'
-        elif sell_count == 13: sb1m_signal = 'sell13'
-        elif sell_count == 12: sb1m_signal = 'sell12'
-        elif sell_count == 11: sb1m_signal = 'sell11'
-        elif sell_count == 10: sb1m_signal = 'sell10'
-        elif sell_count == 9: sb1m_signal = 'sell09'
-        elif sell_count == 8: sb1m_signal = 'sell08'
-        elif sell_count == 7: sb1m_signal = 'sell07'
-        elif sell_count == 6: sb1m_signal = 'sell06'
-        elif sell_count == 5: sb1m_signal = 'sell05'
-        elif sell_count == 4: sb1m_signal = 'sell04'
-        elif sell_count == 3: sb1m_signal = 'sell03'
-        elif sell_count == 2: sb1m_signal = 'sell02'
-        elif sell_count == 1: sb1m_signal = 'sell01'
-        else: sb1m_signal = ''
-        
-        sb1m_data.append({
-            '15min_group': group_time,
-            'SB1M': sb1m_signal
-        })
-    
-    if sb1m_data:
-        sb1m_df = pd.DataFrame(sb1m_data)
-        sb1m_map = dict(zip(sb1m_df['15min_group'], sb1m_df['SB1M']))
-        if 'SB1M' not in df_15m.columns:
-            df_15m['SB1M'] = ''
-        df_15m['SB1M'] = df_15m['15min_group'].map(sb1m_map).fillna('')
-    else:
-        if 'SB1M' not in df_15m.columns:
-            df_15m['SB1M'] = ''
-    
-    # 임시 컬럼 정리
-    cols_to_drop = ['Date(UTC)_dt', '15min_group']
-    df_15m.drop(columns=[c for c in cols_to_drop if c in df_15m.columns], inplace=True)
+    df_15m['SB1M'] = _label_column(labels, df_15m.index)
     
     return df_15m
 
@@ -3788,137 +4531,21 @@ def calculate_sb1m_for_5m(df_5m, df_1m):
     if df_1m.empty or df_5m.empty:
         return df_5m
     
-    # 원본 보존
-    df_1m = df_1m.copy()
     df_5m = df_5m.copy()
     
-    # ⚠️중요: 모든 그룹화와 정렬은 Date(UTC) 기준으로만 수행 (KST는 기록용일 뿐, 정렬/그룹화에는 사용하지 않음)
-    # Date(UTC) 기준 그룹화
     if 'Date(UTC)' not in df_1m.columns or 'Date(UTC)' not in df_5m.columns:
         if 'SB1M' not in df_5m.columns:
             df_5m['SB1M'] = ''
         return df_5m
     
-    # 날짜 파싱 (이미 datetime64면 그대로 사용, 문자열만 파싱)
-    if pd.api.types.is_datetime64_any_dtype(df_1m['Date(UTC)']):
-        df_1m['Date(UTC)_dt'] = df_1m['Date(UTC)']
-    else:
-        # 문자열인 경우에만 파싱 (UserWarning 억제)
-        s = df_1m['Date(UTC)'].astype(str).str.strip().str.replace(',', ' ', regex=False)
-        import warnings
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore", UserWarning)
-            df_1m['Date(UTC)_dt'] = pd.to_datetime(s, errors='coerce')
-    df_1m = df_1m[df_1m['Date(UTC)_dt'].notna()].copy()
-    
-    if df_1m.empty:
+    # 5분 버킷별 1분봉 Buy/Sell 개수 → SB1M 라벨 (그룹 리듀스)
+    labels, _, n_groups = reduce_child_signals(df_1m, df_5m['Date(UTC)'], "5m", 5)
+    if n_groups == 0:
         if 'SB1M' not in df_5m.columns:
             df_5m['SB1M'] = ''
-        if 'Date(UTC)_dt' in df_1m.columns:
-            df_1m = df_1m.drop('Date(UTC)_dt', axis=1)
         return df_5m
     
-    # 시간 정렬 (과거 → 현재)
-    df_1m = df_1m.sort_values('Date(UTC)_dt', ascending=True).reset_index(drop=True)
-    
-    # 1분봉: 5분 그룹 생성
-    df_1m['5min_group'] = df_1m['Date(UTC)_dt'].dt.floor('5min')
-    
-    # 5분봉: 5min_group 생성 (이미 datetime64면 그대로 사용, 문자열만 파싱)
-    if pd.api.types.is_datetime64_any_dtype(df_5m['Date(UTC)']):
-        df_5m['Date(UTC)_dt'] = df_5m['Date(UTC)']
-    else:
-        # 문자열인 경우에만 파싱 (UserWarning 억제)
-        s = df_5m['Date(UTC)'].astype(str).str.strip().str.replace(',', ' ', regex=False)
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore", UserWarning)
-            df_5m['Date(UTC)_dt'] = pd.to_datetime(s, errors='coerce')
-    
-    if '5min_group' not in df_5m.columns:
-        df_5m['5min_group'] = df_5m['Date(UTC)_dt'].dt.floor('5min')
-    else:
-        mask_na = df_5m['5min_group'].isna()
-        if mask_na.any():
-            df_5m.loc[mask_na, '5min_group'] = df_5m.loc[mask_na, 'Date(UTC)_dt'].dt.floor('5min')
-    
-    # --- 5분 그룹별 SB1M 신호 계산 ---
-    sb1m_data = []
-    for group_time, group_df in df_1m.groupby('5min_group', sort=True):
-        buy_count = 0
-        sell_count = 0
-        
-        for _, row in group_df.iterrows():
-            buy_val = row.get('Buy', '')
-            sell_val = row.get('Sell', '')
-            
-            if pd.notna(buy_val) and isinstance(buy_val, str) and buy_val.strip().lower() == 'buy':
-                buy_count += 1
-            elif pd.notna(sell_val) and isinstance(sell_val, str) and sell_val.strip().lower() == 'sell':
-                sell_count += 1
-        
-        if buy_count == 5:
-            sb1m_signal = 'buy5'
-        elif buy_count == 4:
-            sb1m_signal = 'buy4'
-        elif buy_count == 3:
-            sb1m_signal = 'buy3'
-        elif buy_count == 2:
-            sb1m_signal = 'buy2'
-        elif buy_count == 1:
-            sb1m_signal = 'buy1'
-        elif sell_count == 5:
-            sb1m_signal = 'sell5'
-        elif sell_count == 4:
-            sb1m_signal = 'sell4'
-        elif sell_count == 3:
-            sb1m_signal = 'sell3'
-        elif sell_count == 2:
-            sb1m_signal = 'sell2'
-        elif sell_count == 1:
-            sb1m_signal = 'sell1'
-        else:
-            sb1m_signal = ''
-        
-        sb1m_data.append({
-            '5min_group': group_time,
-            'SB1M': sb1m_signal
-        })
-    
-    # --- merge 제거, map 사용 ---
-    if sb1m_data:
-        sb1m_df = pd.DataFrame(sb1m_data)
-        
-        # 타입 통일 (datetime64[ns])
-        try:
-            if sb1m_df['5min_group'].dtype != 'datetime64[ns]':
-                sb1m_df['5min_group'] = pd.to_datetime(sb1m_df['5min_group'], errors='coerce')
-            if df_5m['5min_group'].dtype != 'datetime64[ns]':
-                df_5m['5min_group'] = pd.to_datetime(df_5m['5min_group'], errors='coerce')
-        except Exception:
-            pass
-        
-        # 5min_group → SB1M 매핑 딕셔너리
-        sb1m_map = dict(zip(sb1m_df['5min_group'], sb1m_df['SB1M']))
-        
-        # SB1M 열 추가 (없으면 생성)
-        if 'SB1M' not in df_5m.columns:
-            df_5m['SB1M'] = ''
-        
-        # map을 사용하여 SB1M 값 할당
-        df_5m['SB1M'] = df_5m['5min_group'].map(sb1m_map).fillna('')
-    else:
-        if 'SB1M' not in df_5m.columns:
-            df_5m['SB1M'] = ''
-    
-    # 임시 컬럼 제거
-    if 'Date(UTC)_dt' in df_5m.columns:
-        df_5m = df_5m.drop('Date(UTC)_dt', axis=1)
-    if '5min_group' in df_5m.columns:
-        df_5m = df_5m.drop('5min_group', axis=1)
-    if 'Date(UTC)_dt' in df_1m.columns:
-        df_1m = df_1m.drop('Date(UTC)_dt', axis=1)
-    if '5min_group' in df_1m.columns:
-        df_1m = df_1m.drop('5min_group', axis=1)
+    df_5m['SB1M'] = _label_column(labels, df_5m.index)
     
     return df_5m
 
@@ -4635,10 +5262,204 @@ def trade_on_order_signal(order_value: str, symbol: str = None, samount: float =
         traceback.print_exc()
         return None
 
-def copy_1hclass_to_15m(df_15m: pd.DataFrame, df_1h: pd.DataFrame) -> pd.DataFrame:
+# -------------------- 타임프레임 간 투영 (epoch 버킷 조인) --------------------
+# 하위 타임프레임 행 → 상위 타임프레임 행 매칭을 정수 시간 연산으로 한 번에 수행합니다.
+# - 시간 열을 epoch 분(int64)으로 바꾸고 버킷 시작(1h/1d/1w 등)으로 내림 → 정렬된 상위 키에 searchsorted
+# - 상위 키가 중복되면 마지막 행 우선 (기존 dict 덮어쓰기와 동일), 매칭 실패/결측 시간은 -1 → NaN
+# - 가져온 열의 dtype은 기존 .apply 결과와 같게 추론 (float 열은 그대로 float, 나머지는 infer_objects)
+# 문자열 시간은 utc_time_ms 규칙: "YY/MM/DD,HH:MM" 우선, 그 밖의 형식은 text_general=True일 때만 파싱합니다.
+TIMEFRAME_BUCKET_MINUTES = {"1m": 1, "5m": 5, "15m": 15, "1h": 60, "1d": 1_440, "1w": 10_080}
+_BUCKET_ORIGIN_MINUTES = {"1w": 4 * 1_440}     # 주봉 경계: 1970-01-05(월) 00:00 UTC (바이낸스 주봉 시작)
+_NO_TIME = NO_TIME_MS
+
+
+def _epoch_minutes(times, text_general: bool = True) -> np.ndarray:
+    """시간 열 → epoch 분 int64 (초 이하 버림, 결측 = _NO_TIME). 파싱 규칙은 utc_time_ms와 동일"""
+    ms = utc_time_ms(times, text_general)
+    out = np.full(len(ms), _NO_TIME, dtype=np.int64)
+    ok = ms != NO_TIME_MS
+    out[ok] = ms[ok] // 60_000
+    return out
+
+
+def timeframe_bucket_keys(times, bucket: str, text_general: bool = True) -> np.ndarray:
+    """시간 열 → 버킷 시작 epoch 분 (bucket: TIMEFRAME_BUCKET_MINUTES 키, 결측 = _NO_TIME)"""
+    minutes = _epoch_minutes(times, text_general)
+    size = TIMEFRAME_BUCKET_MINUTES[bucket]
+    origin = _BUCKET_ORIGIN_MINUTES.get(bucket, 0)
+    keys = np.full(len(minutes), _NO_TIME, dtype=np.int64)
+    ok = minutes != _NO_TIME
+    keys[ok] = (minutes[ok] - origin) // size * size + origin
+    return keys
+
+
+def bucket_parent_rows(child_keys: np.ndarray, parent_keys: np.ndarray) -> np.ndarray:
+    """자식 버킷 키마다 같은 키의 상위 행 번호 (중복 키는 마지막 행, 없으면 -1)"""
+    rows = np.full(len(child_keys), -1, dtype=np.int64)
+    valid = np.flatnonzero(parent_keys != _NO_TIME)
+    if len(valid) == 0 or len(child_keys) == 0:
+        return rows
+    order = valid[np.argsort(parent_keys[valid], kind="stable")]
+    sorted_keys = parent_keys[order]
+    last = np.r_[sorted_keys[1:] != sorted_keys[:-1], True]
+    unique_keys, unique_rows = sorted_keys[last], order[last]
+    pos = np.minimum(np.searchsorted(unique_keys, child_keys), len(unique_keys) - 1)
+    hit = (unique_keys[pos] == child_keys) & (child_keys != _NO_TIME)
+    rows[hit] = unique_rows[pos[hit]]
+    return rows
+
+
+def window_parent_rows(child_keys: np.ndarray, parent_starts: np.ndarray, span: int) -> np.ndarray:
+    """자식 키마다 [시작, 시작+span) 구간에 드는 상위 행 번호 (겹치면 시작이 가장 늦은 행, 같은 시작은 마지막 행, 없으면 -1)
+    주봉처럼 시작점이 고정 경계에 맞춰져 있다고 가정할 수 없는 구간 매칭용."""
+    rows = np.full(len(child_keys), -1, dtype=np.int64)
+    valid = np.flatnonzero(parent_starts != _NO_TIME)
+    if len(valid) == 0 or len(child_keys) == 0:
+        return rows
+    order = valid[np.argsort(parent_starts[valid], kind="stable")]
+    sorted_starts = parent_starts[order]
+    last = np.r_[sorted_starts[1:] != sorted_starts[:-1], True]
+    unique_starts, unique_rows = sorted_starts[last], order[last]
+    pos = np.searchsorted(unique_starts, child_keys, side="right") - 1
+    safe = np.maximum(pos, 0)
+    hit = (pos >= 0) & (child_keys != _NO_TIME) & (child_keys < unique_starts[safe] + span)
+    rows[hit] = unique_rows[pos[hit]]
+    return rows
+
+
+def timeframe_parent_rows(child_times, parent_times, bucket: str, child_text_general: bool = False,
+                          parent_text_general: bool = True) -> np.ndarray:
+    """자식/상위 시간 열을 같은 버킷으로 내려 자식 행마다 상위 행 번호 반환 (-1 = 매칭 없음)"""
+    return bucket_parent_rows(timeframe_bucket_keys(child_times, bucket, child_text_general),
+                              timeframe_bucket_keys(parent_times, bucket, parent_text_general))
+
+
+def gather_parent_values(values, rows: np.ndarray):
+    """상위 열 값을 자식 행 순서로 가져옴 (rows=-1은 NaN). 열 대입용 배열 반환 (인덱스 정렬 없음)"""
+    if values is None:
+        return np.full(len(rows), np.nan)
+    arr = values.to_numpy() if isinstance(values, (pd.Series, pd.Index)) else np.asarray(values)
+    hit = rows >= 0
+    if arr.dtype.kind == "f":
+        out = np.full(len(rows), np.nan, dtype=np.float64)
+        out[hit] = arr[rows[hit]]
+        return out
+    out = np.empty(len(rows), dtype=object)
+    out[:] = np.nan
+    out[hit] = arr[rows[hit]]
+    return pd.Series(out).infer_objects().array
+
+
+def _time_column(df: pd.DataFrame) -> Optional[str]:
+    """Date(UTC) 우선, 없으면 KST (하위 호환성)"""
+    return 'Date(UTC)' if 'Date(UTC)' in df.columns else ('KST' if 'KST' in df.columns else None)
+
+
+def _date_utc_times(df: pd.DataFrame):
+    """Date(UTC) 열 (없으면 빈 값 → 매칭 없음)"""
+    return df['Date(UTC)'] if 'Date(UTC)' in df.columns else pd.Series([''] * len(df), dtype=object)
+
+
+# -------------------- 하위 → 상위 타임프레임 신호 집계 (그룹 리듀스) --------------------
+# 하위 봉(1분/5분)의 Buy/Sell을 상위 봉(5분/15분) 버킷별로 세어 buyN/sellN 라벨을 만듭니다 (SB1M, SB5M).
+# - 자식 행: 버킷 키(epoch 분) + 신호 코드(0=없음, 1=buy, 2=sell) → np.unique 역인덱스로 한 번의 bincount
+# - 판정: buy 개수(1~size)가 있으면 buyN, 없으면 sell 개수(1~size)로 sellN, 나머지는 ''
+# - newest=n: 상위 최신 n개 행만 계산하고, 자식은 최신→과거 정렬된 앞쪽 행만 읽음 (AFTER 단계용)
+SIGNAL_CODE_NONE, SIGNAL_CODE_BUY, SIGNAL_CODE_SELL = 0, 1, 2
+
+
+def _text_equals(values, word: str) -> np.ndarray:
+    """문자열 값만 strip().lower() == word 비교 (NaN·숫자 등은 False). 고유값 단위로 판정 후 펼침"""
+    codes, uniques = pd.factorize(pd.Series(np.asarray(values, dtype=object)), use_na_sentinel=True)
+    if len(uniques) == 0:
+        return np.zeros(len(codes), dtype=bool)
+    hits = np.fromiter((isinstance(v, str) and v.strip().lower() == word for v in uniques), dtype=bool, count=len(uniques))
+    return (codes >= 0) & hits[np.maximum(codes, 0)]
+
+
+def signal_codes(df: pd.DataFrame) -> np.ndarray:
+    """Buy/Sell 열 → 행별 신호 코드 (buy 우선, 그다음 sell)"""
+    codes = np.full(len(df), SIGNAL_CODE_NONE, dtype=np.int64)
+    if 'Sell' in df.columns:
+        codes[_text_equals(df['Sell'], 'sell')] = SIGNAL_CODE_SELL
+    if 'Buy' in df.columns:
+        codes[_text_equals(df['Buy'], 'buy')] = SIGNAL_CODE_BUY
+    return codes
+
+
+def group_signal_counts(child_keys: np.ndarray, codes: np.ndarray) -> tuple:
+    """버킷 키별 신호 코드 개수. Returns: (정렬된 그룹 키, counts[그룹, 코드]) — 결측 키 제외"""
+    ok = child_keys != _NO_TIME
+    group_keys, inverse = np.unique(child_keys[ok], return_inverse=True)
+    n_codes = SIGNAL_CODE_SELL + 1
+    counts = np.bincount(inverse * n_codes + codes[ok], minlength=len(group_keys) * n_codes)
+    return group_keys, counts.reshape(len(group_keys), n_codes)
+
+
+def signal_count_labels(counts: np.ndarray, size: int, width: int = 1) -> np.ndarray:
+    """counts[그룹, 코드] → 'buyN'/'sellN'/'' 라벨 (N은 width 자리 0 채움, size 초과 개수는 판정 안 함)"""
+    table = np.array([''] + [f"buy{n:0{width}d}" for n in range(1, size + 1)]
+                     + [f"sell{n:0{width}d}" for n in range(1, size + 1)], dtype=object)
+    buys, sells = counts[:, SIGNAL_CODE_BUY], counts[:, SIGNAL_CODE_SELL]
+    pick = np.where((buys >= 1) & (buys <= size), buys,
+                    np.where((sells >= 1) & (sells <= size), size + sells, 0))
+    return table[pick]
+
+
+def _newest_child_rows(child_times, parent_keys: np.ndarray, bucket: str, size: int) -> int:
+    """최신→과거 정렬된 자식 프레임에서 대상 버킷을 모두 덮는 앞쪽 행 수 (정렬이 깨졌으면 전체)"""
+    targets = parent_keys[parent_keys != _NO_TIME]
+    total = len(child_times)
+    if len(targets) == 0:
+        return 0
+    oldest_target = targets.min()
+    window = size * (len(parent_keys) + 1)
+    while window < total:
+        keys = timeframe_bucket_keys(child_times.iloc[:window], bucket)
+        if (keys == _NO_TIME).any() or (np.diff(keys) > 0).any():
+            return total
+        if keys[-1] < oldest_target:
+            return window
+        window *= 4
+    return total
+
+
+def reduce_child_signals(df_child: pd.DataFrame, parent_times, bucket: str, size: int, width: int = 1,
+                         newest: Optional[int] = None) -> tuple:
     """
-    15분봉 시트에 1시간봉 시트의 1HCLASS 값을 시간 매칭하여 복사합니다 (1HCL로 저장).
-    1시간 구간을 기준으로 1시간봉의 1HCLASS 값을 매칭합니다.
+    하위 봉 Buy/Sell 개수로 상위 봉 행마다 SB 라벨 계산.
+    Args:
+        parent_times: 상위 봉 Date(UTC) 열 / bucket: 상위 봉 버킷 ("5m", "15m")
+        size: 버킷당 자식 봉 수 (buy1~buy{size}) / width: 숫자 자리수 (SB1M 15분봉은 2 → buy01)
+        newest: None이면 전체 이력, n이면 상위 앞쪽(최신) n개 행만
+    Returns: (라벨 object 배열, 상위 행별 자식 봉 수, 자식 그룹 수)
+        - 라벨은 매칭 그룹이 없으면 '', 자식 봉 수는 상위 시간이 결측이면 -1
+    """
+    parent_times = pd.Series(parent_times).reset_index(drop=True)
+    if newest is not None:
+        parent_times = parent_times.iloc[:newest]
+    parent_keys = timeframe_bucket_keys(parent_times, bucket)
+    child_times = df_child['Date(UTC)'].reset_index(drop=True)
+    n_child = len(child_times) if newest is None else _newest_child_rows(child_times, parent_keys, bucket, size)
+    child = df_child.iloc[:n_child]
+    group_keys, counts = group_signal_counts(timeframe_bucket_keys(child_times.iloc[:n_child], bucket), signal_codes(child))
+    rows = bucket_parent_rows(parent_keys, group_keys)
+    matched = rows >= 0
+    labels = np.full(len(parent_keys), '', dtype=object)
+    labels[matched] = signal_count_labels(counts, size, width)[rows[matched]]
+    child_counts = np.where(parent_keys == _NO_TIME, -1, 0)
+    child_counts[matched] = counts.sum(axis=1)[rows[matched]]
+    return labels, child_counts, len(group_keys)
+
+
+def _label_column(labels: np.ndarray, index) -> pd.Series:
+    """라벨 배열 → 문자열 열 (기존 map().fillna('') 결과와 같은 dtype)"""
+    return pd.Series(labels, index=index, dtype=object).infer_objects()
+
+def copy_1hclass_to_15m(df_15m: pd.DataFrame, df_1h: pd.DataFrame) -> pd.DataFrame:
+    """
+    15분봉 시트에 1시간봉 시트의 1HCLASS 값을 시간 매칭하여 복사합니다 (1HCL로 저장).
+    1시간 구간을 기준으로 1시간봉의 1HCLASS 값을 매칭합니다.
     ⚠️중요: Date(UTC) 기준으로만 수행 (KST는 기록용일 뿐, 계산에는 사용하지 않음)
     """
     if df_15m.empty or df_1h.empty:
@@ -4648,56 +5469,15 @@ def copy_1hclass_to_15m(df_15m: pd.DataFrame, df_1h: pd.DataFrame) -> pd.DataFra
     
     # ⚠️중요: 1HCLASS 복사는 Date(UTC) 기준으로만 수행 (KST는 기록용일 뿐, 계산에는 사용하지 않음)
     # Date(UTC) 컬럼이 있으면 우선 사용, 없으면 KST 사용 (하위 호환성)
-    time_col_15m = 'Date(UTC)' if 'Date(UTC)' in df_15m_copy.columns else ('KST' if 'KST' in df_15m_copy.columns else None)
-    time_col_1h = 'Date(UTC)' if 'Date(UTC)' in df_1h.columns else ('KST' if 'KST' in df_1h.columns else None)
+    time_col_15m = _time_column(df_15m_copy)
+    time_col_1h = _time_column(df_1h)
     
     if time_col_15m is None or time_col_1h is None:
         return df_15m_copy
     
-    # 1시간봉 데이터를 딕셔너리로 변환
-    hourly_dict = {}
-    
-    for _, row in df_1h.iterrows():
-        time_val = row.get(time_col_1h, '')
-        # Timestamp 객체인 경우 문자열로 변환
-        if isinstance(time_val, pd.Timestamp) or hasattr(time_val, 'strftime'):
-            time_str = time_val.strftime("%y/%m/%d,%H:%M") if hasattr(time_val, 'strftime') else str(time_val)
-        else:
-            time_str = str(time_val)
-        
-        if time_str and ',' in time_str:
-            # YY/MM/DD,HH:MM 형식 직접 파싱
-            hour_dt = pd.to_datetime(time_str, format="%y/%m/%d,%H:%M", errors='coerce')
-        else:
-            # 콤마가 없는 경우 일반 파싱 시도
-            hour_dt = pd.to_datetime(time_str, errors='coerce')
-        
-        if pd.notna(hour_dt):
-            # 1시간 구간의 시작 시간을 키로 사용
-            hour_start = hour_dt.replace(minute=0, second=0, microsecond=0)
-            hour_key = hour_start.strftime("%y/%m/%d,%H:%M")
-            hourly_dict[hour_key] = row.get('1HCLASS', np.nan)
-    
-    def get_1hclass_value(time_str):
-        # Timestamp 객체인 경우 문자열로 변환
-        if hasattr(time_str, 'strftime'):
-            time_str = time_str.strftime("%y/%m/%d,%H:%M")
-        
-        time_str = str(time_str)
-        if time_str and ',' in time_str:
-            # YY/MM/DD,HH:MM 형식 직접 파싱
-            time_dt = pd.to_datetime(time_str, format="%y/%m/%d,%H:%M", errors='coerce')
-            if pd.notna(time_dt):
-                # 해당 1시간 구간의 시작 시간 계산
-                hour_start = time_dt.replace(minute=0, second=0, microsecond=0)
-                hour_key = hour_start.strftime("%y/%m/%d,%H:%M")
-                
-                if hour_key in hourly_dict:
-                    return hourly_dict[hour_key]
-        return np.nan
-    
-    # 1HCL 열에 값 복사 (1HCLASS를 1HCL로 저장)
-    df_15m_copy['1HCL'] = df_15m_copy[time_col_15m].apply(get_1hclass_value)
+    # 1시간 구간 시작(epoch 분)으로 1시간봉 행 매칭 → 1HCL 열에 값 복사 (1HCLASS를 1HCL로 저장)
+    rows = timeframe_parent_rows(df_15m_copy[time_col_15m], df_1h[time_col_1h], "1h")
+    df_15m_copy['1HCL'] = gather_parent_values(df_1h.get('1HCLASS'), rows)
     
     return df_15m_copy
 
@@ -4714,56 +5494,15 @@ def copy_minus_1hclass_to_15m(df_15m: pd.DataFrame, df_1h: pd.DataFrame) -> pd.D
     
     # ⚠️중요: -1HCLASS 복사는 Date(UTC) 기준으로만 수행 (KST는 기록용일 뿐, 계산에는 사용하지 않음)
     # Date(UTC) 컬럼이 있으면 우선 사용, 없으면 KST 사용 (하위 호환성)
-    time_col_15m = 'Date(UTC)' if 'Date(UTC)' in df_15m_copy.columns else ('KST' if 'KST' in df_15m_copy.columns else None)
-    time_col_1h = 'Date(UTC)' if 'Date(UTC)' in df_1h.columns else ('KST' if 'KST' in df_1h.columns else None)
+    time_col_15m = _time_column(df_15m_copy)
+    time_col_1h = _time_column(df_1h)
     
     if time_col_15m is None or time_col_1h is None:
         return df_15m_copy
     
-    # 1시간봉 데이터를 딕셔너리로 변환
-    hourly_dict = {}
-    
-    for _, row in df_1h.iterrows():
-        time_val = row.get(time_col_1h, '')
-        # Timestamp 객체인 경우 문자열로 변환
-        if isinstance(time_val, pd.Timestamp) or hasattr(time_val, 'strftime'):
-            time_str = time_val.strftime("%y/%m/%d,%H:%M") if hasattr(time_val, 'strftime') else str(time_val)
-        else:
-            time_str = str(time_val)
-        
-        if time_str and ',' in time_str:
-            # YY/MM/DD,HH:MM 형식 직접 파싱
-            hour_dt = pd.to_datetime(time_str, format="%y/%m/%d,%H:%M", errors='coerce')
-        else:
-            # 콤마가 없는 경우 일반 파싱 시도
-            hour_dt = pd.to_datetime(time_str, errors='coerce')
-        
-        if pd.notna(hour_dt):
-            # 1시간 구간의 시작 시간을 키로 사용
-            hour_start = hour_dt.replace(minute=0, second=0, microsecond=0)
-            hour_key = hour_start.strftime("%y/%m/%d,%H:%M")
-            hourly_dict[hour_key] = row.get('-1HCLASS', np.nan)
-    
-    def get_minus_1hclass_value(time_str):
-        # Timestamp 객체인 경우 문자열로 변환
-        if hasattr(time_str, 'strftime'):
-            time_str = time_str.strftime("%y/%m/%d,%H:%M")
-        
-        time_str = str(time_str)
-        if time_str and ',' in time_str:
-            # YY/MM/DD,HH:MM 형식 직접 파싱
-            time_dt = pd.to_datetime(time_str, format="%y/%m/%d,%H:%M", errors='coerce')
-            if pd.notna(time_dt):
-                # 해당 1시간 구간의 시작 시간 계산
-                hour_start = time_dt.replace(minute=0, second=0, microsecond=0)
-                hour_key = hour_start.strftime("%y/%m/%d,%H:%M")
-                
-                if hour_key in hourly_dict:
-                    return hourly_dict[hour_key]
-        return np.nan
-    
-    # -1HCL 열에 값 복사 (-1HCLASS를 -1HCL로 저장)
-    df_15m_copy['-1HCL'] = df_15m_copy[time_col_15m].apply(get_minus_1hclass_value)
+    # 1시간 구간 시작(epoch 분)으로 1시간봉 행 매칭 → -1HCL 열에 값 복사 (-1HCLASS를 -1HCL로 저장)
+    rows = timeframe_parent_rows(df_15m_copy[time_col_15m], df_1h[time_col_1h], "1h")
+    df_15m_copy['-1HCL'] = gather_parent_values(df_1h.get('-1HCLASS'), rows)
     
     return df_15m_copy
 
@@ -4777,49 +5516,16 @@ def copy_p1h_to_15m_and_set_p(df_15m: pd.DataFrame, df_1h: pd.DataFrame) -> pd.D
     
     df_15m_copy = df_15m.copy()
     
-    time_col_15m = 'Date(UTC)' if 'Date(UTC)' in df_15m_copy.columns else ('KST' if 'KST' in df_15m_copy.columns else None)
-    time_col_1h = 'Date(UTC)' if 'Date(UTC)' in df_1h.columns else ('KST' if 'KST' in df_1h.columns else None)
+    time_col_15m = _time_column(df_15m_copy)
+    time_col_1h = _time_column(df_1h)
     
     if time_col_15m is None or time_col_1h is None:
         return df_15m_copy
     
-    hourly_dict = {}
-    for _, row in df_1h.iterrows():
-        time_val = row.get(time_col_1h, '')
-        if isinstance(time_val, pd.Timestamp) or hasattr(time_val, 'strftime'):
-            time_str = time_val.strftime("%y/%m/%d,%H:%M") if hasattr(time_val, 'strftime') else str(time_val)
-        else:
-            time_str = str(time_val)
-        if time_str and ',' in time_str:
-            hour_dt = pd.to_datetime(time_str, format="%y/%m/%d,%H:%M", errors='coerce')
-        else:
-            hour_dt = pd.to_datetime(time_str, errors='coerce')
-        if pd.notna(hour_dt):
-            hour_start = hour_dt.replace(minute=0, second=0, microsecond=0)
-            hour_key = hour_start.strftime("%y/%m/%d,%H:%M")
-            p1h_val = row.get('p1H', np.nan)
-            try:
-                p1h_val = float(p1h_val) if pd.notna(p1h_val) else np.nan
-            except (TypeError, ValueError):
-                p1h_val = np.nan
-            hourly_dict[hour_key] = p1h_val
-    
-    def get_p_value(time_str):
-        if hasattr(time_str, 'strftime'):
-            time_str = time_str.strftime("%y/%m/%d,%H:%M")
-        time_str = str(time_str)
-        if time_str and ',' in time_str:
-            time_dt = pd.to_datetime(time_str, format="%y/%m/%d,%H:%M", errors='coerce')
-            if pd.notna(time_dt):
-                hour_start = time_dt.replace(minute=0, second=0, microsecond=0)
-                hour_key = hour_start.strftime("%y/%m/%d,%H:%M")
-                if hour_key in hourly_dict:
-                    p1h = hourly_dict[hour_key]
-                    if pd.notna(p1h):
-                        return 3 + p1h
-        return np.nan
-    
-    df_15m_copy['p'] = df_15m_copy[time_col_15m].apply(get_p_value)
+    # p1H는 숫자로 변환 (변환 불가 → NaN), 1시간 구간 매칭 후 p = 3 + p1H
+    p1h = pd.to_numeric(df_1h['p1H'], errors='coerce').astype(np.float64) if 'p1H' in df_1h.columns else None
+    rows = timeframe_parent_rows(df_15m_copy[time_col_15m], df_1h[time_col_1h], "1h")
+    df_15m_copy['p'] = 3 + gather_parent_values(p1h, rows)
     
     return df_15m_copy
 
@@ -5119,8 +5825,7 @@ def check_today_snapshot_exists():
     Returns: True(이미 있음), False(없음, 기록 필요)
     """
     try:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        log_dir = os.path.join(script_dir, LOG_DIR)
+        log_dir = LOG_DIR_ABS
         csv_filename = os.path.join(log_dir, "BINANCE_balance_history_detail.csv")
         
         if not os.path.exists(csv_filename):
@@ -5168,8 +5873,7 @@ def record_total_balance_snapshot(stage_prefix: str = "[자산기록]"):
     """
     try:
         # 파일 경로 설정 (logs 폴더에 저장)
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        log_dir = os.path.join(script_dir, LOG_DIR)
+        log_dir = LOG_DIR_ABS
         if not os.path.exists(log_dir):
             os.makedirs(log_dir)
         csv_filename = os.path.join(log_dir, "BINANCE_balance_history_detail.csv")
@@ -5199,8 +5903,7 @@ def record_total_balance_snapshot(stage_prefix: str = "[자산기록]"):
             
             # 15분봉 파일에서 직전행 TP 읽기
             try:
-                script_dir = os.path.dirname(os.path.abspath(__file__))
-                base_dir = os.path.join(script_dir, "cryptodaily15min")
+                base_dir = OUTPUT_BASE_DIR
                 ticker_folder_map = {
                     "BTC": "F BINANCE 1BTC",
                     "ETH": "F BINANCE 2ETH",
@@ -5541,8 +6244,7 @@ def check_recent_after_files_exist():
     Returns:
         (bool, List[str]): (모든 티커 성공 여부, 실패한 티커 목록)
     """
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    base_dir = os.path.join(script_dir, "cryptodaily15min")
+    base_dir = OUTPUT_BASE_DIR
     
     # Binance용 티커 폴더 매핑 (공백 포함)
     ticker_folder_mapping = {
@@ -5715,442 +6417,1501 @@ BINANCE_FUTURES_BASES = [
     "https://fapi3.binance.com",
 ]
 
-def _binance_get(path, params, timeout=20, max_retries=5, pause=0.05):
+def _start_primary_future(fn, *args, **kwargs) -> concurrent.futures.Future:
+    """fn 을 새 데몬 스레드에서 바로 실행하고 Future 로 반환 (헤지 풀 대기열을 거치지 않음)."""
+    future = concurrent.futures.Future()
+
+    def _run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=_run, name="hedge-primary", daemon=True).start()
+    return future
+
+def _hedged_get(bases: List[str], path: str, params, timeout) -> requests.Response:
+    """
+    1순위 베이스로 GET (전용 스레드에서 바로 전송). 1순위 시작 후 p95 지연 안에 응답이 없으면 헤지 풀에서
+    2순위 베이스로 헤지 요청을 보내고, 둘 중 먼저 온 200 응답을 반환합니다 (늦은 쪽은 무시).
+    200이 없으면 1순위 응답(없으면 헤지 응답)을 반환하고, 모두 예외면 1순위 예외를 올립니다.
+    """
+    headers = {"User-Agent": "Mozilla/5.0"}
+    if not ENABLE_REQUEST_HEDGING or len(bases) < 2:
+        return http_get(f"{bases[0]}{path}", params=params, timeout=timeout, headers=headers)
+    hedge_at = time.monotonic() + _endpoint_health.hedge_delay(bases[0])
+    primary = _start_primary_future(http_get, f"{bases[0]}{path}", params=params, timeout=timeout, headers=headers)
+
+    def _send_hedge():
+        # 풀 대기열에서 기다린 시간도 지연에 포함 (1순위 시작 기준 p95 시점에 발사)
+        concurrent.futures.wait([primary], timeout=max(0.0, hedge_at - time.monotonic()))
+        if primary.done():
+            return None
+        _endpoint_health.count_hedge()
+        return http_get(f"{bases[1]}{path}", params=params, timeout=timeout, headers=headers)
+
+    hedge = _hedge_executor.submit(_send_hedge)
+    responses, errors = {}, {}
+    pending = {primary, hedge}
+    while pending:
+        done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+        for fut in done:
+            try:
+                r = fut.result()
+            except Exception as e:
+                errors[fut] = e
+                continue
+            if r is None:
+                continue  # 1순위가 p95 전에 끝나 헤지를 보내지 않음
+            if r.status_code == 200:
+                if fut is hedge:
+                    _endpoint_health.count_hedge(won=True)
+                return r
+            responses[fut] = r
+        # 1순위가 p95 전에 실패로 끝났고 헤지가 아직 풀 대기열에 있으면 기다리지 않음
+        if primary.done() and hedge in pending and hedge.cancel():
+            pending.discard(hedge)
+    if primary in responses:
+        return responses[primary]
+    if hedge in responses:
+        return responses[hedge]
+    raise errors.get(primary) or errors[hedge]
+
+def _binance_get_with_failover(bases: List[str], label: str, path, params, timeout=20, max_retries=5, pause=0.05):
+    """지연시간 순위대로 베이스를 시도하는 공용 GET (헤징 + 재시도/백오프)."""
     last_err = None
     backoff = pause
     for _ in range(max_retries):
-        for base in BINANCE_BASES:
-            url = f"{base}{path}"
+        order = _endpoint_health.ranked(bases)
+        for i in range(len(order)):
             try:
-                r = requests.get(
-                    url, params=params, timeout=timeout,
-                    headers={"User-Agent": "Mozilla/5.0"}
-                )
+                r = _hedged_get(order[i:], path, params, timeout)
                 if r.status_code == 200:
                     return r
-                if r.status_code in (418, 429) or 500 <= r.status_code < 600:
-                    # 레이트리밋/서버 오류: 잠깐 대기 후 다음 베이스/재시도
+                if r.status_code in (418, 429):
+                    # 레이트리밋: Retry-After만큼 레이트리미터가 다음 요청을 보류 (고정 sleep 없음)
+                    last_err = Exception(f"{label} HTTP {r.status_code}: {r.text[:200]}")
+                    continue
+                if 500 <= r.status_code < 600:
+                    # 서버 오류: 잠깐 대기 후 다음 베이스/재시도
                     time.sleep(backoff)
-                    last_err = Exception(f"Binance HTTP {r.status_code}: {r.text[:200]}")
+                    last_err = Exception(f"{label} HTTP {r.status_code}: {r.text[:200]}")
                     continue
                 r.raise_for_status()
             except Exception as e:
                 last_err = e
                 time.sleep(backoff)
         backoff = min(backoff * 2, 1.5)  # 지수 백오프(최대 1.5초)
-    raise last_err if last_err else RuntimeError("Binance request failed")
+    raise last_err if last_err else RuntimeError(f"{label} request failed")
+
+def _binance_get(path, params, timeout=20, max_retries=5, pause=0.05):
+    """바이낸스 스팟 API GET (지연시간 순 대체 도메인 + 재시도)."""
+    return _binance_get_with_failover(BINANCE_BASES, "Binance", path, params, timeout, max_retries, pause)
 
 def _binance_futures_get(path, params, timeout=20, max_retries=5, pause=0.05):
-    """캔들 수집 전용: 바이낸스 USDT-M 선물 API GET (대체 도메인 + 재시도)."""
-    last_err = None
-    backoff = pause
-    for _ in range(max_retries):
-        for base in BINANCE_FUTURES_BASES:
-            url = f"{base}{path}"
-            try:
-                r = requests.get(
-                    url, params=params, timeout=timeout,
-                    headers={"User-Agent": "Mozilla/5.0"}
-                )
-                if r.status_code == 200:
-                    return r
-                if r.status_code in (418, 429) or 500 <= r.status_code < 600:
-                    time.sleep(backoff)
-                    last_err = Exception(f"Binance Futures HTTP {r.status_code}: {r.text[:200]}")
-                    continue
-                r.raise_for_status()
-            except Exception as e:
-                last_err = e
-                time.sleep(backoff)
-        backoff = min(backoff * 2, 1.5)
-    raise last_err if last_err else RuntimeError("Binance Futures request failed")
+    """캔들 수집 전용: 바이낸스 USDT-M 선물 API GET (지연시간 순 대체 도메인 + 재시도)."""
+    return _binance_get_with_failover(BINANCE_FUTURES_BASES, "Binance Futures", path, params, timeout, max_retries, pause)
 
 # (업비트 API 제거)
 
-# -------------------- 바이낸스 일봉 (선물 캔들) --------------------
+# -------------------- 바이낸스 캔들 공용 수집기 (페이지 병렬) --------------------
 BINANCE_KLINES = "https://fapi.binance.com/fapi/v1/klines"
 BINANCE_LIMIT = 1000
 
-def fetch_binance_daily(symbol: str, total_days: int, include_today: bool = False, fixed_end_time_ms: Optional[int] = None) -> pd.DataFrame:
+# 인터벌별 캔들 길이 (ms) - 고정 간격이므로 모든 페이지의 endTime을 미리 계산 가능
+BINANCE_INTERVAL_MS = {
+    "1m": 60_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "1h": 3_600_000,
+    "1d": 86_400_000,
+    "1w": 604_800_000,
+}
+KLINE_FETCH_MAX_WORKERS = 4       # 한 번의 수집에서 동시에 요청할 최대 페이지 수
+KLINE_FETCH_WEIGHT_BUDGET = 20    # 한 번의 수집에서 동시에 진행 중일 수 있는 요청 weight 합계
+
+def _kline_request_weight(limit: int) -> int:
+    """선물 klines 요청 weight (바이낸스 문서 기준: limit 구간별 1/2/5/10)."""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+# -------------------- 로컬 캔들 저장소 (심볼/인터벌별, open_time 키) --------------------
+# 완성된 캔들만 {symbol}_{interval}.npy (구조화 NumPy 배열)로 보관하고, 수집기는 저장소에 없는
+# 최신 구간과 중간 공백만 API로 요청합니다. 진행 중(미완성) 캔들은 저장하지 않으므로 항상 새로 조회됩니다.
+# ※ Windows에서는 mmap으로 열린 파일을 교체(os.replace)할 수 없으므로 np.load로 메모리에 읽은 뒤 사용합니다.
+ENABLE_CANDLE_STORE = True
+CANDLE_STORE_DIR = os.path.join(script_dir, "candle_store")
+CANDLE_STORE_MAX_ROWS = 20_000  # 심볼/인터벌별 보관 상한 (1분봉 12400개 수집을 충분히 커버)
+_CANDLE_STORE_DTYPE = np.dtype([
+    ("open_time", "<i8"), ("close_time", "<i8"),
+    ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"), ("volume", "<f8"),
+])
+_candle_store_lock = threading.Lock()
+
+def _candle_store_path(symbol: str, interval: str) -> str:
+    """저장소 파일 경로 (예: candle_store/BTCUSDT_1m.npy)"""
+    return os.path.join(CANDLE_STORE_DIR, f"{symbol}_{interval}.npy")
+
+def candle_store_load(symbol: str, interval: str) -> np.ndarray:
+    """저장된 완성 캔들 배열 반환 (open_time 오름차순). 없거나 손상되면 빈 배열."""
+    path = _candle_store_path(symbol, interval)
+    if not os.path.exists(path):
+        return np.empty(0, dtype=_CANDLE_STORE_DTYPE)
+    try:
+        arr = np.load(path, allow_pickle=False)
+        if arr.dtype != _CANDLE_STORE_DTYPE:
+            return np.empty(0, dtype=_CANDLE_STORE_DTYPE)
+        return arr
+    except Exception as e:
+        print(f"{get_timestamp()} ⚠️ 캔들 저장소 읽기 실패 ({symbol} {interval}): {e}")
+        return np.empty(0, dtype=_CANDLE_STORE_DTYPE)
+
+def candle_store_save(symbol: str, interval: str, rows: List[list], now_ms: Optional[int] = None) -> int:
     """
-    바이낸스 1d klines, UTC 기준으로 통일하여 반환.
-    페이징 방법 B (backward): endTime부터 과거로 진행
-    
-    바이낸스 API 문서:
-    - 스팟: GET /api/v3/klines — limit 기본 500, 최대 1000
-    - 페이징 방법 B: endTime부터 시작, 가장 오래된 캔들의 openTime - 1ms로 갱신하여 과거로 진행
-    - 선물의 경우 startTime-endTime 간 최대 200일 제약 (스팟은 제약 없음)
-    
+    klines 원본 행 중 완성된 캔들(close_time < now_ms)만 저장소에 병합합니다.
+    같은 open_time은 새 값으로 덮어쓰고, 최신 CANDLE_STORE_MAX_ROWS개만 유지합니다.
+
     Args:
-        symbol: 심볼 (예: "BTCUSDT")
-        total_days: 수집할 일봉 개수
-        include_today: True면 오늘 진행중 캔들 포함 (UTC 기준으로 판단)
-        fixed_end_time_ms: 조회 기준 시간 (UTC milliseconds, None이면 현재 시간)
-    
+        now_ms: 완성 판정 기준 시각. 응답을 받은 뒤의 현재 시각을 쓰면 요청 도중 마감된 캔들이
+                미완성 값 그대로 저장되므로, 수집기는 요청 시작 시각을 넘깁니다 (None이면 현재 시각).
+
     Returns:
-        DataFrame: Date(UTC), KST, 종, 시, 고, 저, Vol. 컬럼 포함
-        - Date(UTC): UTC 기준 시간 (계산에 사용)
-        - KST: 참고용 (계산 로직에는 사용하지 않음)
+        int: 병합 대상이 된 완성 캔들 개수
     """
-    path = "/fapi/v1/klines"
-    all_rows: List[list] = []
-    seen = set()  # 이미 본 open_time 추적 (중복 방지)
-    remaining = total_days
-    current_end_time = fixed_end_time_ms  # 현재 페이징의 endTime (과거로 진행하면서 갱신됨)
-
-    while remaining > 0:
-        # 바이낸스 스팟 API: limit 최대 1000
-        limit = min(1000, remaining)
-        params = {"symbol": symbol, "interval": "1d", "limit": limit}
-        
-        # 페이징 방법 B: endTime 사용 (과거로 진행)
-        if current_end_time is not None:
-            params["endTime"] = current_end_time
-        # endTime이 None이면 가장 최근 캔들 반환 (바이낸스 API 기본 동작)
-
-        r = _binance_futures_get(path, params)
-        batch = r.json()
-        if not batch:
-            break
+    if not ENABLE_CANDLE_STORE or not rows:
+        return 0
+    if now_ms is None:
+        now_ms = int(time.time() * 1000)
+    closed = [r for r in rows if int(r[6]) < now_ms]
+    if not closed:
+        return 0
+    new = np.array(
+        [(int(r[0]), int(r[6]), float(r[1]), float(r[2]), float(r[3]), float(r[4]), float(r[5])) for r in closed],
+        dtype=_CANDLE_STORE_DTYPE,
+    )
+    path = _candle_store_path(symbol, interval)
+    try:
+        with _candle_store_lock:
+            merged = np.concatenate([candle_store_load(symbol, interval), new])
+            # 안정 정렬 → 같은 open_time 중 마지막(새 값)만 유지
+            merged = merged[np.argsort(merged["open_time"], kind="stable")]
+            keep = np.ones(len(merged), dtype=bool)
+            keep[:-1] = merged["open_time"][1:] != merged["open_time"][:-1]
+            merged = merged[keep][-CANDLE_STORE_MAX_ROWS:]
+            os.makedirs(CANDLE_STORE_DIR, exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, merged, allow_pickle=False)
+            os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"{get_timestamp()} ⚠️ 캔들 저장소 쓰기 실패 ({symbol} {interval}): {e}")
+        return 0
+    return len(closed)
+
+def _candle_store_rows(arr: np.ndarray) -> List[list]:
+    """저장소 배열을 klines 원본 행 형식으로 변환 (fetch_binance_* 후처리와 호환)."""
+    return [
+        [int(r["open_time"]), float(r["open"]), float(r["high"]), float(r["low"]), float(r["close"]),
+         float(r["volume"]), int(r["close_time"]), "0", 0, "0", "0", "0"]
+        for r in arr
+    ]
+
+def _kline_open_floor(ts_ms: int, interval: str) -> int:
+    """ts_ms 시점이 속한 캔들의 open_time. 주봉은 월요일 00:00 UTC 기준 (epoch 목요일 → +4일 보정)."""
+    interval_ms = BINANCE_INTERVAL_MS[interval]
+    offset = 4 * 86_400_000 if interval == "1w" else 0
+    return ((ts_ms - offset) // interval_ms) * interval_ms + offset
+
+# -------------------- 웹소켓 캔들 수신 (AFTER 단계 선수집) --------------------
+# <symbol>@kline_<interval> 결합 스트림을 구독하여 완성 캔들을 링버퍼에 보관합니다.
+# _collect_binance_klines가 저장소보다 먼저 이 버퍼를 조회하므로, 캔들 마감 직후의 AFTER 선수집은
+# REST 호출 없이 채워지고, 버퍼에 없는 구간(연결 끊김 등)만 REST로 보수됩니다.
+# websocket-client 패키지가 없으면 자동으로 REST 경로만 사용합니다 (pip install websocket-client).
+import base64
+import socket
+
+try:
+    import websocket  # websocket-client (선택 패키지)
+except ImportError:
+    websocket = None
+
+ENABLE_KLINE_STREAM = True
+BINANCE_FUTURES_WS_BASE = "wss://fstream.binance.com"
+KLINE_STREAM_INTERVALS = ["1m", "5m", "15m", "1h", "1d"]
+KLINE_STREAM_BUFFER_SIZE = 64       # (심볼, 인터벌)별 보관할 완성 캔들 개수
+KLINE_STREAM_STALE_SEC = 10         # 마지막 수신 후 이 시간이 지나면 버퍼를 신뢰하지 않음 (REST 사용)
+KLINE_STREAM_CLOSE_WAIT_SEC = 2.0   # AFTER 선수집 시 마감 캔들 도착 대기 상한
+
+class KlineStreamIngestor:
+    """
+    바이낸스 선물 결합 kline 스트림 수신기.
 
-        # 중복 방지: 이미 본 open_time은 제외
-        new_rows_count = 0
-        for row in batch:
-            ot = row[0]  # open_time (ms)
-            if ot in seen:
-                continue
-            seen.add(ot)
-            all_rows.append(row)
-            new_rows_count += 1
-        
-        # 페이징 방법 B: 가장 오래된 캔들의 openTime - 1ms로 endTime 갱신 (과거로 진행)
-        # batch는 시간순 정렬되어 있으므로 [0]이 가장 오래된 캔들
-        earliest_open = batch[0][0]  # 배치의 가장 오래된 봉 open_time
-        current_end_time = earliest_open - 1  # 다음 요청: 더 과거로
-        
-        # remaining 감소: 실제로 추가된 새 행 개수만큼만 감소
-        remaining -= new_rows_count
-        
-        # 더 이상 새 데이터가 없으면 종료
-        if new_rows_count == 0:
-            break
-        
-        time.sleep(0.05)  # API 호출 간 안전 여유 (최적화: 0.1 → 0.05)
+    - 완성 캔들(k.x=True): (심볼, 인터벌)별 링버퍼(deque)에 klines 원본 행 형식으로 보관
+    - 진행 중 캔들: 최신 1개만 보관 (미완성 캔들 제거 로직이 REST와 동일하게 동작하도록)
+    - record_path 지정 시 수신 원문을 JSONL로 기록 → KlineReplayServer로 재생하여 테스트 가능
+    """
 
-    if not all_rows:
-        return pd.DataFrame()
+    def __init__(self, tickers: List[str], intervals: Optional[List[str]] = None, ws_base: Optional[str] = None,
+                 buffer_size: int = KLINE_STREAM_BUFFER_SIZE, record_path: Optional[str] = None):
+        self.symbols = [f"{t}USDT" for t in tickers]
+        self.intervals = list(intervals or KLINE_STREAM_INTERVALS)
+        self.ws_base = (ws_base or BINANCE_FUTURES_WS_BASE).rstrip("/")
+        self.buffer_size = buffer_size
+        self.record_path = record_path
+        self._buffers = {}
+        self._live = {}
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self._ws = None
+        self.connected = False
+        self.last_message_ts = 0.0
+        self.message_count = 0
+
+    @property
+    def stream_url(self) -> str:
+        streams = "/".join(f"{s.lower()}@kline_{iv}" for s in self.symbols for iv in self.intervals)
+        return f"{self.ws_base}/stream?streams={streams}"
+
+    def handle_message(self, raw) -> None:
+        """결합 스트림 프레임 1개 처리 ({"stream": ..., "data": {"e": "kline", "k": {...}}})."""
+        try:
+            msg = json.loads(raw)
+        except (TypeError, ValueError):
+            return
+        data = msg.get("data", msg) if isinstance(msg, dict) else None
+        if not isinstance(data, dict) or data.get("e") != "kline":
+            return
+        k = data.get("k", {})
+        key = (k.get("s"), k.get("i"))
+        row = [int(k["t"]), k["o"], k["h"], k["l"], k["c"], k["v"], int(k["T"]),
+               k.get("q", "0"), int(k.get("n", 0)), k.get("V", "0"), k.get("Q", "0"), "0"]
+        if self.record_path:
+            try:
+                with open(self.record_path, "a", encoding="utf-8") as f:
+                    f.write(raw if isinstance(raw, str) else raw.decode("utf-8"))
+                    f.write("\n")
+            except OSError:
+                pass
+        with self._cond:
+            if k.get("x"):
+                buf = self._buffers.setdefault(key, deque(maxlen=self.buffer_size))
+                if buf and buf[-1][0] == row[0]:
+                    buf[-1] = row
+                elif not buf or buf[-1][0] < row[0]:
+                    buf.append(row)
+                live = self._live.get(key)
+                if live is not None and live[0] <= row[0]:
+                    self._live.pop(key, None)
+                self._cond.notify_all()
+            else:
+                self._live[key] = row
+            self.last_message_ts = time.time()
+            self.message_count += 1
 
-    cols = ["open_time","open","high","low","close","volume","close_time",
-            "quote_asset_volume","trades","taker_buy_base","taker_buy_quote","ignore"]
-    df = pd.DataFrame(all_rows, columns=cols)
-
-    # 안정 정렬 + 중복제거(최종 안전벨트)
-    df["open_time"] = df["open_time"].astype("int64", copy=False)
-    df = df.sort_values("open_time", kind="mergesort", ignore_index=True)
-    df = df.loc[~df["open_time"].duplicated(keep="last")].reset_index(drop=True)
-
-    # UTC 기준 날짜 사용 - [수정] Timestamp 객체로 반환 (문자열 변환 제거)
-    df["DateUTC"] = pd.to_datetime(df["open_time"], unit="ms", utc=True)
-    # [수정] strftime 제거: Timestamp 객체 그대로 사용 (나중에 엑셀 저장 시에만 문자열로 변환)
-    df["DateUTC_dt"] = df["DateUTC"].dt.tz_localize(None)  # timezone 제거하여 naive datetime으로 변환
-
-    # 심볼에 따른 식별자 설정
-    identifier = symbol.replace("USDT", "") + "USD"
-
-    # KST 시간 계산 (UTC+9) - 참고용으로만 사용 (계산 로직에는 사용하지 않음)
-    # 일봉은 UTC 00:00 = KST 09:00
-    kst_dates = []
-    for utc_dt in df["DateUTC"]:
-        # KST로 변환 (일봉은 UTC 00:00 = KST 09:00)
-        kst_dt = utc_dt.astimezone(KST)
-        kst_dates.append(kst_dt.strftime("%y/%m/%d,09:00"))
-
-    out = pd.DataFrame({
-        "Date(UTC)": df["DateUTC_dt"],  # UTC 기준 시간 (계산에 사용, Timestamp 객체)
-        "KST": kst_dates,  # KST 시간 (참고용, 계산 로직에는 사용하지 않음, YY/MM/DD,09:00 형식)
-        "종": pd.to_numeric(df["close"], errors="coerce"),
-        "시": pd.to_numeric(df["open"], errors="coerce"),
-        "고": pd.to_numeric(df["high"], errors="coerce"),
-        "저": pd.to_numeric(df["low"], errors="coerce"),
-        "Vol.": pd.to_numeric(df["volume"], errors="coerce"),
-    })
+    def is_fresh(self) -> bool:
+        """연결 중이고 최근 KLINE_STREAM_STALE_SEC 이내에 수신했으면 True."""
+        return self.connected and (time.time() - self.last_message_ts) < KLINE_STREAM_STALE_SEC
 
-    if not include_today:
-        # UTC 기준으로 오늘 날짜 판단 (미완성 캔들 제거)
-        today_utc = dt.datetime.now(tz.UTC).date()
-        # 문자열 날짜를 date 객체로 변환하여 비교 (UTC 기준, YY/MM/DD,00:00 형식)
-        out["Date_only"] = out["Date(UTC)"].apply(lambda x: x.split(',')[0] if ',' in str(x) else str(x))
-        out = out[pd.to_datetime(out["Date_only"], format="%y/%m/%d").dt.date < today_utc]
-        out = out.drop("Date_only", axis=1)
-
-    out = out.sort_values("Date(UTC)", ascending=False).reset_index(drop=True)
-    return out
+    def get_rows(self, symbol: str, interval: str, oldest_open: int, newest_open: int, now_ms: Optional[int] = None) -> dict:
+        """
+        [oldest_open, newest_open] 구간의 행을 {open_time: row}로 반환 (진행 중 캔들 포함).
+        진행 중(x=False) 행은 마감 시각(row[6])이 now_ms(요청 시각, None이면 현재 시각) 이후일 때만 포함합니다.
+        이미 마감됐는데 완성(x=True) 프레임이 아직 오지 않은 행은 마감 직전 값이므로 버립니다 (저장소·REST 사용).
+        """
+        if now_ms is None:
+            now_ms = int(time.time() * 1000)
+        key = (symbol, interval)
+        with self._cond:
+            rows = {row[0]: row for row in self._buffers.get(key, ()) if oldest_open <= row[0] <= newest_open}
+            live = self._live.get(key)
+            if live is not None and oldest_open <= live[0] <= newest_open and live[6] > now_ms:
+                rows[live[0]] = live
+        return rows
+
+    def wait_for_closed(self, symbols: List[str], interval: str, open_time: int, timeout: float) -> bool:
+        """모든 심볼의 interval 버퍼에 open_time 이상 완성 캔들이 들어올 때까지 대기."""
+        deadline = time.time() + timeout
+
+        def _ready():
+            for sym in symbols:
+                buf = self._buffers.get((sym, interval))
+                if not buf or buf[-1][0] < open_time:
+                    return False
+            return True
 
-# (업비트 API 제거)
+        with self._cond:
+            while not _ready():
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _run(self) -> None:
+        backoff = 1.0
+        while not self._stop.is_set():
+            def _on_open(ws):
+                self.connected = True
+                print(f"{get_timestamp()} 📡 캔들 스트림 연결: {len(self.symbols)}개 심볼 × {len(self.intervals)}개 인터벌")
+
+            def _on_close(ws, *args):
+                self.connected = False
+
+            def _on_error(ws, err):
+                print(f"{get_timestamp()} ⚠️ 캔들 스트림 오류: {err}")
+
+            self._ws = websocket.WebSocketApp(
+                self.stream_url,
+                on_open=_on_open,
+                on_message=lambda ws, m: self.handle_message(m),
+                on_close=_on_close,
+                on_error=_on_error,
+            )
+            started = time.time()
+            try:
+                self._ws.run_forever(ping_interval=180, ping_timeout=10)
+            except Exception as e:
+                print(f"{get_timestamp()} ⚠️ 캔들 스트림 예외: {e}")
+            self.connected = False
+            if self._stop.is_set():
+                break
+            # 바이낸스는 24시간마다 연결을 끊음 → 재접속 (짧게 끊긴 경우만 지수 백오프)
+            backoff = 1.0 if time.time() - started > 60 else min(backoff * 2, 30.0)
+            self._stop.wait(backoff)
 
+    def start(self) -> bool:
+        if websocket is None:
+            print(f"{get_timestamp()} ℹ️ websocket-client 미설치 → 캔들 스트림 비활성 (REST 수집 사용)")
+            return False
+        if self._thread is not None and self._thread.is_alive():
+            return True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="kline-stream", daemon=True)
+        self._thread.start()
+        return True
 
+    def stop(self) -> None:
+        self._stop.set()
+        if self._ws is not None:
+            try:
+                self._ws.close()
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.connected = False
 
-def fetch_binance_minutes1(symbol: str, total_count: int, include_today: bool = False, fixed_end_time_ms: Optional[int] = None, stage_prefix: str = "") -> pd.DataFrame:
+_kline_stream: Optional[KlineStreamIngestor] = None
+
+def start_kline_stream(tickers: Optional[List[str]] = None, ws_base: Optional[str] = None) -> Optional[KlineStreamIngestor]:
+    """ROTATION_TICKERS 결합 kline 스트림 시작 (ENABLE_KLINE_STREAM=False 또는 패키지 미설치 시 None)."""
+    global _kline_stream
+    if not ENABLE_KLINE_STREAM:
+        return None
+    if _kline_stream is None:
+        _kline_stream = KlineStreamIngestor(tickers or ROTATION_TICKERS, ws_base=ws_base)
+    if not _kline_stream.start():
+        _kline_stream = None
+    return _kline_stream
+
+def wait_for_stream_candle_close(tickers: List[str], fixed_end_time_ms: int, timeout: float = KLINE_STREAM_CLOSE_WAIT_SEC) -> bool:
     """
-    바이낸스 1m klines, UTC 기준으로 통일하여 반환.
-    페이징 방법 B (backward): endTime부터 과거로 진행
-    
-    바이낸스 API 문서:
-    - 스팟: GET /api/v3/klines — limit 기본 500, 최대 1000
-    - 페이징 방법 B: endTime부터 시작, 가장 오래된 캔들의 openTime - 1ms로 갱신하여 과거로 진행
-    
-    Args:
-        symbol: 심볼 (예: "BTCUSDT")
-        total_count: 수집할 1분봉 개수
-        include_today: True면 오늘 진행중 캔들 포함 (UTC 기준으로 판단)
-        fixed_end_time_ms: 조회 기준 시간 (UTC milliseconds, None이면 현재 시간)
-    
-    Returns:
-        DataFrame: Date(UTC), KST, 종, 시, 고, 저, Vol. 컬럼 포함
-        - Date(UTC): UTC 기준 시간 (계산에 사용)
-        - KST: 참고용 (계산 로직에는 사용하지 않음)
+    AFTER 선수집 전, 실행 시점 직전에 마감된 1분봉이 스트림에 도착할 때까지 대기합니다.
+    스트림이 없거나 오래됐으면 즉시 False (REST 경로 사용).
     """
-    path = "/fapi/v1/klines"
-    all_rows: List[list] = []
-    seen = set()  # 이미 본 open_time 추적 (중복 방지)
-    remaining = total_count
-    current_end_time = fixed_end_time_ms  # 현재 페이징의 endTime (과거로 진행하면서 갱신됨)
-
-    while remaining > 0:
-        # 바이낸스 스팟 API: limit 최대 1000
-        limit = min(1000, remaining)
-        params = {"symbol": symbol, "interval": "1m", "limit": limit}
-        
-        # 페이징 방법 B: endTime 사용 (과거로 진행)
-        if current_end_time is not None:
-            params["endTime"] = current_end_time
-        # endTime이 None이면 가장 최근 캔들 반환 (바이낸스 API 기본 동작)
-
-        r = _binance_futures_get(path, params)
-        batch = r.json()
-        if not batch:
-            break
+    if _kline_stream is None or not _kline_stream.is_fresh():
+        return False
+    now_ms = min(int(time.time() * 1000), fixed_end_time_ms)
+    expected_open = _kline_open_floor(now_ms, "1m") - BINANCE_INTERVAL_MS["1m"]
+    symbols = [f"{t}USDT" for t in tickers]
+    return _kline_stream.wait_for_closed(symbols, "1m", expected_open, timeout)
 
-        # 중복 방지: 이미 본 open_time은 제외
-        new_rows_count = 0
-        for row in batch:
-            ot = row[0]  # open_time (ms)
-            if ot in seen:
-                continue
-            seen.add(ot)
-            all_rows.append(row)
-            new_rows_count += 1
-        
-        # 페이징 방법 B: 가장 오래된 캔들의 openTime - 1ms로 endTime 갱신 (과거로 진행)
-        # batch는 시간순 정렬되어 있으므로 [0]이 가장 오래된 캔들
-        earliest_open = batch[0][0]  # 배치의 가장 오래된 봉 open_time
-        current_end_time = earliest_open - 1  # 다음 요청: 더 과거로
-        
-        # remaining 감소: 실제로 추가된 새 행 개수만큼만 감소
-        remaining -= new_rows_count
-        
-        # 더 이상 새 데이터가 없으면 종료
-        if new_rows_count == 0:
-            break
-        
-        time.sleep(0.05)  # API 호출 간 안전 여유
+class KlineReplayServer:
+    """
+    테스트/벤치마크용 로컬 웹소켓 대역 서버 (표준 라이브러리만 사용).
+    기록된 결합 스트림 프레임(JSONL, KlineStreamIngestor(record_path=...)로 기록)을 접속한 클라이언트에게
+    순서대로 재생합니다. BINANCE_FUTURES_WS_BASE 또는 start_kline_stream(ws_base=server.ws_base)로 연결.
+    """
 
-    if not all_rows:
-        return pd.DataFrame()
+    _WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+    def __init__(self, frames: List[str], host: str = "127.0.0.1", port: int = 0, frame_interval: float = 0.0):
+        self.frames = list(frames)
+        self.frame_interval = frame_interval
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((host, port))
+        self._sock.listen(4)
+        self.host, self.port = self._sock.getsockname()[:2]
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "KlineReplayServer":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls([line.strip() for line in f if line.strip()], **kwargs)
+
+    @property
+    def ws_base(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    @staticmethod
+    def _encode_text_frame(payload: bytes) -> bytes:
+        n = len(payload)
+        if n < 126:
+            header = bytes([0x81, n])
+        elif n < 65536:
+            header = bytes([0x81, 126]) + n.to_bytes(2, "big")
+        else:
+            header = bytes([0x81, 127]) + n.to_bytes(8, "big")
+        return header + payload
 
-    cols = ["open_time","open","high","low","close","volume","close_time",
-            "quote_asset_volume","trades","taker_buy_base","taker_buy_quote","ignore"]
-    df = pd.DataFrame(all_rows, columns=cols)
-
-    # 안정 정렬 + 중복제거(최종 안전벨트)
-    df["open_time"] = df["open_time"].astype("int64", copy=False)
-    df = df.sort_values("open_time", kind="mergesort", ignore_index=True)
-    df = df.loc[~df["open_time"].duplicated(keep="last")].reset_index(drop=True)
-
-    # UTC 기준 날짜 사용 - [수정] Timestamp 객체로 반환 (문자열 변환 제거)
-    df["DateUTC"] = pd.to_datetime(df["open_time"], unit="ms", utc=True)
-    # [수정] strftime 제거: Timestamp 객체 그대로 사용 (나중에 엑셀 저장 시에만 문자열로 변환)
-    df["DateUTC_dt"] = df["DateUTC"].dt.tz_localize(None)  # timezone 제거하여 naive datetime으로 변환
-
-    # KST 시간 계산 (UTC+9) - 참고용으로만 사용 (계산 로직에는 사용하지 않음)
-    kst_dates = []
-    for utc_dt in df["DateUTC"]:
-        kst_dt = utc_dt.astimezone(KST)
-        kst_dates.append(kst_dt.strftime("%y/%m/%d,%H:%M"))
-
-    out = pd.DataFrame({
-        "Date(UTC)": df["DateUTC_dt"],  # UTC 기준 시간 (계산에 사용, Timestamp 객체)
-        "KST": kst_dates,  # KST 시간 (참고용, 계산 로직에는 사용하지 않음, YY/MM/DD,HH:MM 형식)
-        "종": pd.to_numeric(df["close"], errors="coerce"),
-        "시": pd.to_numeric(df["open"], errors="coerce"),
-        "고": pd.to_numeric(df["high"], errors="coerce"),
-        "저": pd.to_numeric(df["low"], errors="coerce"),
-        "Vol.": pd.to_numeric(df["volume"], errors="coerce"),
-    })
+    def _serve_client(self, conn) -> None:
+        try:
+            request = b""
+            while b"\r\n\r\n" not in request:
+                chunk = conn.recv(4096)
+                if not chunk:
+                    return
+                request += chunk
+            key = ""
+            for line in request.decode("latin-1").split("\r\n"):
+                if line.lower().startswith("sec-websocket-key:"):
+                    key = line.split(":", 1)[1].strip()
+            accept = base64.b64encode(hashlib.sha1((key + self._WS_GUID).encode()).digest()).decode()
+            conn.sendall((
+                "HTTP/1.1 101 Switching Protocols\r\n"
+                "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+            ).encode())
+            for frame in self.frames:
+                if self._stop.is_set():
+                    break
+                conn.sendall(self._encode_text_frame(frame.encode("utf-8")))
+                if self.frame_interval > 0:
+                    time.sleep(self.frame_interval)
+            # 재생 후 종료 요청까지 연결 유지 (실제 스트림처럼)
+            self._stop.wait()
+            conn.sendall(bytes([0x88, 0x00]))
+        except OSError:
+            pass
+        finally:
+            conn.close()
 
-    if not include_today:
-        # UTC 기준으로 오늘 날짜 판단 (미완성 캔들 제거)
-        today_utc = dt.datetime.now(tz.UTC).date()
-        # 문자열 날짜를 date 객체로 변환하여 비교 (UTC 기준, YY/MM/DD,HH:MM 형식)
-        out["Date_only"] = out["Date(UTC)"].apply(lambda x: x.split(',')[0] if ',' in str(x) else str(x))
-        out = out[pd.to_datetime(out["Date_only"], format="%y/%m/%d").dt.date < today_utc]
-        out = out.drop("Date_only", axis=1)
+    def _accept_loop(self) -> None:
+        self._sock.settimeout(0.5)
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            threading.Thread(target=self._serve_client, args=(conn,), daemon=True).start()
 
-    out = out.sort_values("Date(UTC)", ascending=False).reset_index(drop=True)
-    
-    # ⚠️중요: 1분봉 간격 검증 (페이징 누락 방지 확인)
-    if len(out) > 1 and 'Date(UTC)' in out.columns:
-        # Date(UTC)를 datetime으로 변환하여 간격 검증
-        df_dt = pd.to_datetime(out['Date(UTC)'], format='%y/%m/%d,%H:%M', errors='coerce')
-        # 내림차순 정렬 확인 (최신→과거)
-        if df_dt.is_monotonic_decreasing:
-            # 각 행과 다음 행의 시간 차이 계산 (분 단위)
-            time_diffs = (df_dt.iloc[:-1].values - df_dt.iloc[1:].values) / np.timedelta64(1, 'm')
-            # 1분이 아닌 간격이 있는지 확인
-            non_1m_indices = np.where((time_diffs != 1) & (~np.isnan(time_diffs)))[0]
-            if len(non_1m_indices) > 0:
-                print(f"{get_timestamp()} [{stage_prefix}] ⚠️[1분봉 검증] {symbol}: 1분 간격이 아닌 구간 발견 ({len(non_1m_indices)}개)")
-                for idx in non_1m_indices[:5]:  # 최대 5개만 출력
-                    diff_minutes = time_diffs[idx]
-                    print(f"{get_timestamp()} [{stage_prefix}]    인덱스 {idx}→{idx+1}: {out.iloc[idx]['Date(UTC)']} → {out.iloc[idx+1]['Date(UTC)']} ({diff_minutes:.1f}분 차이)")
-                if len(non_1m_indices) > 5:
-                    print(f"{get_timestamp()} [{stage_prefix}]    ... 외 {len(non_1m_indices)-5}개 구간")
-            else:
-                print(f"{get_timestamp()} [{stage_prefix}] ✅[1분봉 검증] {symbol}: 모든 간격이 1분입니다 ({len(out)}개 캔들)")
-    
-    return out
+    def start(self) -> "KlineReplayServer":
+        self._thread = threading.Thread(target=self._accept_loop, name="kline-replay", daemon=True)
+        self._thread.start()
+        return self
 
-# -------------------- 바이낸스 15분봉 (선물) --------------------
-BINANCE_KLINES_15M = "https://fapi.binance.com/fapi/v1/klines"
-BINANCE_LIMIT = 1000
+    def stop(self) -> None:
+        self._stop.set()
+        try:
+            self._sock.close()
+        except OSError:
+            pass
 
-# -------------------- 바이낸스 주봉 (선물) --------------------
-BINANCE_KLINES_WEEKLY = "https://fapi.binance.com/fapi/v1/klines"
+# -------------------- 오프라인 바이낸스 대역 서버 (벤치마크·회귀 테스트용) --------------------
+# fapi.binance.com 없이 main() / run_rotation_sequence / execute_futures_strategy 를 노트북에서 결정적으로 돌리기 위한
+# 로컬 HTTP 서버 (표준 라이브러리 http.server). klines·depth·exchangeInfo·time·ticker/price·positionRisk·account·
+# openOrders·order·allOpenOrders·openAlgoOrders·algoOrder·leverage (+ 스팟 api/v3 대응 경로)를 제공합니다.
+# - 캔들: 캔들 저장소(candle_store)에 기록된 값이 있으면 그대로, 없으면 시드 고정 합성 1분 가격 경로에서 집계
+#         (모든 인터벌이 같은 1분 경로에서 나오므로 1분봉 파생 결과와 일치)
+# - 지연: latency_ms + 0~jitter_ms 균등 지연, 경로별 path_latency_ms 로 덮어쓰기
+# - 레이트리밋: weight_limit_1m 초과 시 429 + Retry-After, 모든 응답에 X-MBX-USED-WEIGHT-1M 헤더
+# - 오류 주입: error_rate 확률로 503, inject_error(경로, 상태코드, 횟수)로 지정 응답
+# - 주문: 메모리 내 계정 (MARKET 즉시 체결·포지션 반영, LIMIT/Algo 는 미체결로 보관). 서명은 검증하지 않으므로
+#         binanceaccountinfo 폴더의 키 파일은 아무 값이어도 됩니다.
+# 사용: server = BinanceStandInServer(latency_ms=30).start(); use_binance_stand_in(server.base_url)
+#       또는 환경변수 BINANCE_STAND_IN=local (프로세스 내 서버 자동 시작) / BINANCE_STAND_IN=http://호스트:포트
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_BINANCE_STAND_IN_HOSTS = set()   # use_binance_stand_in()으로 등록된 호스트 (레이트리미터·엔드포인트 추적 대상)
+
+STAND_IN_SYMBOL_SPECS = {
+    # 심볼: (시작가, tickSize, stepSize, minQty, notional, pricePrecision, quantityPrecision)
+    "BTCUSDT": (60_000.0, "0.10", "0.001", "0.001", "100", 2, 3),
+    "ETHUSDT": (3_000.0, "0.01", "0.001", "0.001", "20", 2, 3),
+    "XRPUSDT": (0.6, "0.0001", "0.1", "0.1", "5", 4, 1),
+    "SOLUSDT": (150.0, "0.010", "1", "1", "5", 2, 0),
+    "BNBUSDT": (550.0, "0.010", "0.01", "0.01", "5", 2, 2),
+}
 
-def fetch_binance_minutes15(symbol: str, total_count: int, include_today: bool = False, fixed_end_time_ms: Optional[int] = None) -> pd.DataFrame:
+class BinanceStandInServer:
     """
-    바이낸스 15m klines, UTC 기준으로 통일하여 반환.
-    페이징 방법 B (backward): endTime부터 과거로 진행
-    
-    바이낸스 API 문서:
-    - 스팟: GET /api/v3/klines — limit 기본 500, 최대 1000
-    - 페이징 방법 B: endTime부터 시작, 가장 오래된 캔들의 openTime - 1ms로 갱신하여 과거로 진행
-    
+    로컬 바이낸스 대역 HTTP 서버.
+
     Args:
-        symbol: 심볼 (예: "BTCUSDT")
-        total_count: 수집할 15분봉 개수
-        include_today: True면 오늘 진행중 캔들 포함 (UTC 기준으로 판단)
-        fixed_end_time_ms: 조회 기준 시간 (UTC milliseconds, None이면 현재 시간)
-    
-    Returns:
-        DataFrame: Date(UTC), KST, 종, 시, 고, 저, Vol. 컬럼 포함
-        - Date(UTC): UTC 기준 시간 (계산에 사용)
-        - KST: 참고용 (계산 로직에는 사용하지 않음)
+        symbols: 제공할 심볼 (기본 STAND_IN_SYMBOL_SPECS 전체)
+        latency_ms / jitter_ms: 응답 지연 (기본값 + 0~jitter 균등)
+        path_latency_ms: {경로 접미사: 지연 ms} 경로별 지연
+        weight_limit_1m: 1분 요청 weight 한도 (초과 시 429)
+        error_rate: 무작위 503 확률
+        seed: 합성 가격·지연·오류 난수 시드
+        use_candle_store: True면 candle_store에 기록된 캔들을 우선 제공
+        wallet_usdt: 선물 지갑 잔고
     """
-    path = "/fapi/v1/klines"
-    all_rows: List[list] = []
-    seen = set()  # 이미 본 open_time 추적 (중복 방지)
-    remaining = total_count
-    current_end_time = fixed_end_time_ms  # 현재 페이징의 endTime (과거로 진행하면서 갱신됨)
-
-    while remaining > 0:
-        # 바이낸스 스팟 API: limit 최대 1000
-        limit = min(1000, remaining)
-        params = {"symbol": symbol, "interval": "15m", "limit": limit}
-        
-        # 페이징 방법 B: endTime 사용 (과거로 진행)
-        if current_end_time is not None:
-            params["endTime"] = current_end_time
-        # endTime이 None이면 가장 최근 캔들 반환 (바이낸스 API 기본 동작)
-
-        r = _binance_futures_get(path, params)
-        batch = r.json()
-        if not batch:
-            break
 
-        # 중복 방지: 이미 본 open_time은 제외
-        new_rows_count = 0
-        for row in batch:
-            ot = row[0]  # open_time (ms)
-            if ot in seen:
-                continue
-            seen.add(ot)
-            all_rows.append(row)
-            new_rows_count += 1
-        
-        # 페이징 방법 B: 가장 오래된 캔들의 openTime - 1ms로 endTime 갱신 (과거로 진행)
-        # batch는 시간순 정렬되어 있으므로 [0]이 가장 오래된 캔들
-        earliest_open = batch[0][0]  # 배치의 가장 오래된 봉 open_time
-        current_end_time = earliest_open - 1  # 다음 요청: 더 과거로
-        
-        # remaining 감소: 실제로 추가된 새 행 개수만큼만 감소
-        remaining -= new_rows_count
-        
-        # 더 이상 새 데이터가 없으면 종료
-        if new_rows_count == 0:
-            break
-        
-        time.sleep(0.05)  # API 호출 간 안전 여유 (최적화: 0.1 → 0.05)
+    def __init__(self, symbols: Optional[List[str]] = None, host: str = "127.0.0.1", port: int = 0,
+                 latency_ms: float = 0.0, jitter_ms: float = 0.0, path_latency_ms: Optional[dict] = None,
+                 weight_limit_1m: int = BINANCE_RATE_LIMITS["fapi"]["weight_1m"], error_rate: float = 0.0,
+                 seed: int = 0, use_candle_store: bool = False, wallet_usdt: float = 3000.0):
+        self.symbols = list(symbols or STAND_IN_SYMBOL_SPECS)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.path_latency_ms = dict(path_latency_ms or {})
+        self.weight_limit_1m = weight_limit_1m
+        self.error_rate = error_rate
+        self.seed = seed
+        self.use_candle_store = use_candle_store
+        self.wallet_usdt = wallet_usdt
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self._weight_window = [0, 0]           # (분 번호, 사용 weight)
+        self._order_windows = {10: [0, 0], 60: [0, 0]}
+        self._injected = []                    # [경로 접미사, 상태코드, 남은 횟수, 본문]
+        self._next_id = 1
+        self.open_orders = {}                  # orderId -> 주문 dict
+        self.algo_orders = {}                  # algoId -> 주문 dict
+        self.positions = {}                    # symbol -> {"amt", "entry"}
+        self.leverage = {}
+        self.request_counts = {}               # (method, path) -> 횟수
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, fmt, *args):  # 요청 로그 출력 안 함
+                pass
 
-    if not all_rows:
-        return pd.DataFrame()
+            def _dispatch(self):
+                parts = urlsplit(self.path)
+                params = dict(parse_qsl(parts.query))
+                length = int(self.headers.get("Content-Length", 0) or 0)
+                if length:
+                    params.update(dict(parse_qsl(self.rfile.read(length).decode("utf-8"))))
+                status, body, headers = server.handle(self.command, parts.path, params)
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in headers.items():
+                    self.send_header(key, str(value))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_DELETE = do_PUT = _dispatch
+
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self.host, self.port = self._httpd.server_address[:2]
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "BinanceStandInServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="binance-stand-in", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def inject_error(self, path_suffix: str, status: int = 503, count: int = 1, body: Optional[dict] = None) -> None:
+        """다음 count번의 path_suffix 요청에 status 응답 (예: inject_error("/klines", 429, 2))."""
+        with self._lock:
+            self._injected.append([path_suffix, status, count, body or {"code": -1, "msg": "injected error"}])
+
+    # ---------- 합성 가격 ----------
+    def _minute_prices(self, symbol: str, minutes: np.ndarray) -> np.ndarray:
+        """분 번호 배열 → 결정적 합성 가격 (시드·심볼별 고정, 완만한 추세 + 주기 + 잡음)."""
+        base = STAND_IN_SYMBOL_SPECS.get(symbol, (100.0,))[0]
+        phase = (sum(symbol.encode()) + self.seed * 7919) % 10_000
+        m = minutes.astype(np.float64) + phase
+        noise = np.modf(np.abs(np.sin(m * 12.9898 + self.seed) * 43758.5453))[0] - 0.5
+        return base * np.exp(0.03 * np.sin(m / 1440.0) + 0.008 * np.sin(m / 97.0) + 0.001 * noise)
+
+    def _synthetic_klines(self, symbol: str, interval: str, open_times: np.ndarray) -> List[list]:
+        interval_ms = BINANCE_INTERVAL_MS[interval]
+        children = interval_ms // 60_000
+        rows = []
+        # 1주봉 1000개처럼 큰 요청도 메모리를 넘지 않도록 약 200만 분 단위로 나눠 집계
+        chunk = max(1, 2_000_000 // children)
+        for start in range(0, len(open_times), chunk):
+            ot = open_times[start:start + chunk]
+            minutes = (ot // 60_000)[:, None] + np.arange(children + 1)[None, :]
+            prices = self._minute_prices(symbol, minutes)
+            opens, closes = prices[:, :-1], prices[:, 1:]
+            wiggle = np.modf(np.abs(np.sin(minutes[:, :-1] * 78.233) * 12345.678))[0]
+            highs = np.maximum(opens, closes) * (1 + 0.0006 * wiggle)
+            lows = np.minimum(opens, closes) * (1 - 0.0006 * (1 - wiggle))
+            vols = 5.0 + 50.0 * wiggle
+            for i, open_time in enumerate(ot):
+                vol = float(vols[i].sum())
+                o, c = float(opens[i, 0]), float(closes[i, -1])
+                rows.append([int(open_time), f"{o:.8f}", f"{highs[i].max():.8f}", f"{lows[i].min():.8f}", f"{c:.8f}",
+                             f"{vol:.3f}", int(open_time) + interval_ms - 1, f"{vol * c:.4f}", children * 7,
+                             f"{vol / 2:.3f}", f"{vol * c / 2:.4f}", "0"])
+        return rows
+
+    def klines(self, symbol: str, interval: str, limit: int = 500, start_time: Optional[int] = None,
+               end_time: Optional[int] = None) -> List[list]:
+        interval_ms = BINANCE_INTERVAL_MS[interval]
+        now_ms = int(time.time() * 1000)
+        limit = max(1, min(int(limit), BINANCE_LIMIT if interval != "1m" else 1500))
+        newest = _kline_open_floor(min(end_time if end_time is not None else now_ms, now_ms), interval)
+        if start_time is not None:
+            oldest = _kline_open_floor(int(start_time) + interval_ms - 1, interval)
+            newest = min(newest, oldest + (limit - 1) * interval_ms)
+        else:
+            oldest = newest - (limit - 1) * interval_ms
+        if newest < oldest:
+            return []
+        open_times = np.arange(oldest, newest + 1, interval_ms, dtype=np.int64)
+        rows = self._synthetic_klines(symbol, interval, open_times)
+        if self.use_candle_store:
+            recorded = {int(r[0]): r for r in _candle_store_rows(candle_store_load(symbol, interval))}
+            rows = [recorded.get(r[0], r) for r in rows]
+        return rows
+
+    def _price(self, symbol: str) -> float:
+        return float(self._minute_prices(symbol, np.array([int(time.time() // 60)]))[0])
+
+    def _tick(self, symbol: str) -> float:
+        return float(STAND_IN_SYMBOL_SPECS.get(symbol, (0, "0.01"))[1])
+
+    # ---------- 요청 처리 ----------
+    def _weight_headers(self, weight: int, is_order: bool, now: float) -> tuple:
+        """weight 차감 → (한도 초과 여부, 응답 헤더)."""
+        slot = int(now // 60)
+        if self._weight_window[0] != slot:
+            self._weight_window[:] = [slot, 0]
+        self._weight_window[1] += weight
+        headers = {"X-MBX-USED-WEIGHT-1M": self._weight_window[1]}
+        if is_order:
+            for sec, window in self._order_windows.items():
+                order_slot = int(now // sec)
+                if window[0] != order_slot:
+                    window[:] = [order_slot, 0]
+                window[1] += 1
+                headers[f"X-MBX-ORDER-COUNT-{'10S' if sec == 10 else '1M'}"] = window[1]
+        exceeded = self._weight_window[1] > self.weight_limit_1m
+        if exceeded:
+            headers["Retry-After"] = int(60 - now % 60) + 1
+        return exceeded, headers
+
+    def handle(self, method: str, path: str, params: dict) -> tuple:
+        """(status, JSON 본문, 헤더) 반환. HTTP 핸들러와 테스트에서 직접 호출 가능."""
+        delay_ms = self.latency_ms
+        for suffix, ms in self.path_latency_ms.items():
+            if path.endswith(suffix):
+                delay_ms = ms
+        with self._lock:
+            self.request_counts[(method, path)] = self.request_counts.get((method, path), 0) + 1
+            if self.jitter_ms:
+                delay_ms += float(self._rng.uniform(0, self.jitter_ms))
+            random_error = self.error_rate > 0 and self._rng.random() < self.error_rate
+            injected = None
+            for entry in self._injected:
+                if path.endswith(entry[0]) and entry[2] > 0:
+                    entry[2] -= 1
+                    injected = entry
+                    break
+            self._injected = [e for e in self._injected if e[2] > 0]
+            group = "fapi" if path.startswith("/fapi") else "api"
+            weight, is_order = binance_request_weight(group, method, path, params)
+            exceeded, headers = self._weight_headers(weight, is_order, time.time())
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000.0)
+        if injected is not None:
+            if injected[1] in (418, 429):
+                headers.setdefault("Retry-After", 1)
+            return injected[1], injected[3], headers
+        if exceeded:
+            return 429, {"code": -1003, "msg": "Too many requests (stand-in)"}, headers
+        if random_error:
+            return 503, {"code": -1001, "msg": "Service unavailable (stand-in)"}, headers
+        try:
+            with self._lock:
+                status, body = self._route(method, path, params)
+        except Exception as e:
+            status, body = 400, {"code": -1100, "msg": f"stand-in error: {e}"}
+        return status, body, headers
+
+    def _route(self, method: str, path: str, params: dict) -> tuple:
+        symbol = params.get("symbol", "")
+        endpoint = path.rsplit("/", 1)[-1]
+        if endpoint == "time":
+            return 200, {"serverTime": int(time.time() * 1000)}
+        if endpoint == "klines":
+            return 200, self.klines(symbol, params.get("interval", "1m"), int(params.get("limit", 500)),
+                                    int(params["startTime"]) if "startTime" in params else None,
+                                    int(params["endTime"]) if "endTime" in params else None)
+        if endpoint == "price":
+            symbols = [symbol] if symbol else self.symbols
+            prices = [{"symbol": s, "price": f"{self._price(s):.8f}", "time": int(time.time() * 1000)} for s in symbols]
+            return 200, prices[0] if symbol else prices
+        if endpoint == "depth":
+            price, tick = self._price(symbol), self._tick(symbol)
+            levels = min(int(params.get("limit", 20)), 100)
+            bids = [[f"{price - tick * (i + 1):.8f}", f"{1.0 + i:.3f}"] for i in range(levels)]
+            asks = [[f"{price + tick * (i + 1):.8f}", f"{1.0 + i:.3f}"] for i in range(levels)]
+            return 200, {"lastUpdateId": int(time.time() * 1000), "bids": bids, "asks": asks}
+        if endpoint == "exchangeInfo":
+            return 200, {"timezone": "UTC", "serverTime": int(time.time() * 1000), "symbols": [self._symbol_info(s) for s in self.symbols]}
+        if endpoint == "leverage":
+            self.leverage[symbol] = int(params.get("leverage", 1))
+            return 200, {"symbol": symbol, "leverage": self.leverage[symbol], "maxNotionalValue": "1000000"}
+        if endpoint == "positionRisk":
+            return 200, [self._position_info(s) for s in ([symbol] if symbol else self.symbols)]
+        if endpoint == "account":
+            positions = [self._position_info(s) for s in self.symbols]
+            unrealized = sum(float(p["unRealizedProfit"]) for p in positions)
+            return 200, {"totalWalletBalance": f"{self.wallet_usdt:.8f}", "totalUnrealizedProfit": f"{unrealized:.8f}",
+                         "totalMarginBalance": f"{self.wallet_usdt + unrealized:.8f}", "availableBalance": f"{self.wallet_usdt:.8f}",
+                         "assets": [{"asset": "USDT", "walletBalance": f"{self.wallet_usdt:.8f}", "availableBalance": f"{self.wallet_usdt:.8f}"}],
+                         "positions": positions, "balances": [{"asset": "USDT", "free": f"{self.wallet_usdt:.8f}", "locked": "0"}]}
+        if endpoint == "openOrders":
+            return 200, [o for o in self.open_orders.values() if not symbol or o["symbol"] == symbol]
+        if endpoint == "allOpenOrders":
+            for oid in [oid for oid, o in self.open_orders.items() if o["symbol"] == symbol]:
+                del self.open_orders[oid]
+            return 200, {"code": 200, "msg": "The operation of cancel all open order is done."}
+        if endpoint == "openAlgoOrders":
+            orders = [o for o in self.algo_orders.values() if not symbol or o["symbol"] == symbol]
+            return 200, {"orders": orders, "total": len(orders)}
+        if endpoint == "algoOrder":
+            if method == "DELETE":
+                order = self.algo_orders.pop(int(params.get("algoId", 0)), None)
+                return (200, {"algoId": order["algoId"], "code": "200", "msg": "success"}) if order else (400, {"code": -2011, "msg": "Unknown order sent."})
+            algo_id = self._new_id()
+            order = {"algoId": algo_id, "clientAlgoId": f"standin{algo_id}", "algoType": params.get("algoType", "CONDITIONAL"),
+                     "orderType": params.get("type", "STOP_MARKET"), "symbol": symbol, "side": params.get("side"),
+                     "quantity": params.get("quantity"), "triggerPrice": params.get("triggerPrice"),
+                     "reduceOnly": params.get("reduceOnly") == "true", "algoStatus": "NEW", "createTime": int(time.time() * 1000)}
+            self.algo_orders[algo_id] = order
+            return 200, order
+        if endpoint == "test":
+            return 200, {}
+        if endpoint == "order":
+            if method == "DELETE":
+                order = self.open_orders.pop(int(params.get("orderId", 0)), None)
+                if order is None:
+                    return 400, {"code": -2011, "msg": "Unknown order sent."}
+                order["status"] = "CANCELED"
+                return 200, order
+            if method == "GET":
+                order = self.open_orders.get(int(params.get("orderId", 0)))
+                return (200, order) if order else (400, {"code": -2013, "msg": "Order does not exist."})
+            return self._place_order(path, symbol, params)
+        return 404, {"code": -1, "msg": f"stand-in: unsupported endpoint {method} {path}"}
+
+    def _new_id(self) -> int:
+        self._next_id += 1
+        return self._next_id
+
+    def _symbol_info(self, symbol: str) -> dict:
+        _, tick, step, min_qty, notional, price_prec, qty_prec = STAND_IN_SYMBOL_SPECS.get(
+            symbol, (100.0, "0.01", "0.001", "0.001", "5", 2, 3))
+        return {"symbol": symbol, "status": "TRADING", "baseAsset": symbol[:-4], "quoteAsset": "USDT",
+                "pricePrecision": price_prec, "quantityPrecision": qty_prec,
+                "filters": [{"filterType": "PRICE_FILTER", "tickSize": tick, "minPrice": tick, "maxPrice": "10000000"},
+                            {"filterType": "LOT_SIZE", "stepSize": step, "minQty": min_qty, "maxQty": "100000"},
+                            {"filterType": "MARKET_LOT_SIZE", "stepSize": step, "minQty": min_qty, "maxQty": "100000"},
+                            {"filterType": "MIN_NOTIONAL", "notional": notional, "minNotional": notional}]}
+
+    def _position_info(self, symbol: str) -> dict:
+        pos = self.positions.get(symbol, {"amt": 0.0, "entry": 0.0})
+        mark = self._price(symbol)
+        return {"symbol": symbol, "positionAmt": f"{pos['amt']:.8f}", "entryPrice": f"{pos['entry']:.8f}",
+                "markPrice": f"{mark:.8f}", "unRealizedProfit": f"{(mark - pos['entry']) * pos['amt']:.8f}",
+                "leverage": str(self.leverage.get(symbol, 1)), "positionSide": "BOTH", "marginType": "cross"}
+
+    def _place_order(self, path: str, symbol: str, params: dict) -> tuple:
+        qty = float(params.get("quantity", 0) or 0)
+        side = params.get("side", "BUY")
+        order_type = params.get("type", "MARKET")
+        if qty <= 0:
+            return 400, {"code": -4003, "msg": "Quantity less than or equal to zero."}
+        order_id = self._new_id()
+        now_ms = int(time.time() * 1000)
+        order = {"orderId": order_id, "symbol": symbol, "clientOrderId": f"standin{order_id}", "side": side,
+                 "type": order_type, "origQty": params.get("quantity"), "price": params.get("price", "0"),
+                 "reduceOnly": params.get("reduceOnly") == "true", "timeInForce": params.get("timeInForce", "GTC"),
+                 "updateTime": now_ms, "transactTime": now_ms}
+        if order_type != "MARKET":
+            order.update(status="NEW", executedQty="0", avgPrice="0")
+            self.open_orders[order_id] = order
+            return 200, order
+        fill = self._price(symbol)
+        if path.startswith("/fapi"):
+            pos = self.positions.setdefault(symbol, {"amt": 0.0, "entry": 0.0})
+            signed = qty if side == "BUY" else -qty
+            new_amt = pos["amt"] + signed
+            if pos["amt"] == 0 or (pos["amt"] > 0) == (signed > 0):
+                pos["entry"] = (pos["entry"] * abs(pos["amt"]) + fill * qty) / abs(new_amt)
+            elif new_amt != 0 and (new_amt > 0) != (pos["amt"] > 0):
+                pos["entry"] = fill  # 반대 방향으로 뒤집힘
+            pos["amt"] = round(new_amt, 8)
+            if pos["amt"] == 0:
+                pos["entry"] = 0.0
+        order.update(status="FILLED", executedQty=params.get("quantity"), avgPrice=f"{fill:.8f}",
+                     cumQuote=f"{fill * qty:.8f}", fills=[{"price": f"{fill:.8f}", "qty": params.get("quantity"), "commission": "0", "commissionAsset": "USDT"}])
+        return 200, order
+
+def use_binance_stand_in(base_url: str, ws_base: Optional[str] = None) -> None:
+    """
+    모든 바이낸스 REST 베이스(스팟·선물·대체 도메인)를 base_url로 돌립니다.
+    ws_base가 없으면 kline 웹소켓 스트림은 끕니다 (오프라인 실행).
+    합성 캔들이 실제 데이터에 섞이지 않도록 캔들 저장소는 끄고, 로그·엑셀·저장소 경로는 임시 폴더로 옮깁니다.
+    """
+    global BINANCE_API_BASE, BINANCE_FUTURES_BASE, BINANCE_BASES, BINANCE_FUTURES_BASES
+    global BINANCE_FUTURES_WS_BASE, ENABLE_KLINE_STREAM
+    global ENABLE_CANDLE_STORE, CANDLE_STORE_DIR, STAND_IN_SANDBOX_DIR, LOG_DIR_ABS, OUTPUT_BASE_DIR
+    if STAND_IN_SANDBOX_DIR is None:
+        STAND_IN_SANDBOX_DIR = tempfile.mkdtemp(prefix="binance_stand_in_")
+    ENABLE_CANDLE_STORE = False
+    CANDLE_STORE_DIR = os.path.join(STAND_IN_SANDBOX_DIR, "candle_store")
+    OUTPUT_BASE_DIR = os.path.join(STAND_IN_SANDBOX_DIR, "cryptodaily15min")
+    if LOG_DIR_ABS != os.path.join(STAND_IN_SANDBOX_DIR, LOG_DIR):
+        LOG_DIR_ABS = os.path.join(STAND_IN_SANDBOX_DIR, LOG_DIR)
+        os.makedirs(LOG_DIR_ABS, exist_ok=True)
+        logger.log_dir = LOG_DIR_ABS
+        logger._open_log_file()
+    base_url = base_url.rstrip("/")
+    _BINANCE_STAND_IN_HOSTS.add(urlsplit(base_url).netloc)
+    BINANCE_API_BASE = base_url
+    BINANCE_FUTURES_BASE = base_url
+    BINANCE_BASES = [base_url]
+    BINANCE_FUTURES_BASES = [base_url]
+    if ws_base:
+        BINANCE_FUTURES_WS_BASE = ws_base
+    else:
+        ENABLE_KLINE_STREAM = False
+    print(f"{get_timestamp()} 🧪 바이낸스 대역 서버 사용: {base_url} (웹소켓: {ws_base or '사용 안 함'}, 출력 폴더: {STAND_IN_SANDBOX_DIR})")
 
-    cols = ["open_time","open","high","low","close","volume","close_time",
-            "quote_asset_volume","trades","taker_buy_base","taker_buy_quote","ignore"]
-    df = pd.DataFrame(all_rows, columns=cols)
-
-    # 시간순 정렬 및 중복 제거 (최신→과거 순서로 정렬)
-    df['open_time'] = df['open_time'].astype('int64', copy=False)
-    df = df.sort_values('open_time', kind='mergesort', ascending=False, ignore_index=True)
-    df = df.loc[~df['open_time'].duplicated(keep='last')].reset_index(drop=True)
-
-    # UTC 기준으로 통일 - [수정] Timestamp 객체로 반환 (문자열 변환 제거)
-    df["DateUTC"] = pd.to_datetime(df["open_time"], unit="ms", utc=True)
-    # [수정] strftime 제거: Timestamp 객체 그대로 사용 (나중에 엑셀 저장 시에만 문자열로 변환)
-    df["DateUTC_dt"] = df["DateUTC"].dt.tz_localize(None)  # timezone 제거하여 naive datetime으로 변환
-
-    # 심볼에 따른 식별자 설정
-    identifier = symbol.replace("USDT", "") + "USD15"
-
-    # KST 시간 계산 (UTC+9) - 참고용으로만 사용 (계산 로직에는 사용하지 않음)
-    kst_dates = []
-    for utc_dt in df["DateUTC"]:
-        # KST로 변환 (참고용)
-        kst_dt = utc_dt.astimezone(KST)
-        kst_dates.append(kst_dt.strftime("%y/%m/%d,%H:%M"))
-
-    out = pd.DataFrame({
-        "Date(UTC)": df["DateUTC_dt"],  # UTC 기준 시간 (계산에 사용, Timestamp 객체)
-        "KST": kst_dates,  # KST 시간 (참고용, 계산 로직에는 사용하지 않음)
-        "종": pd.to_numeric(df["close"], errors="coerce"),
-        "시": pd.to_numeric(df["open"], errors="coerce"),
-        "고": pd.to_numeric(df["high"], errors="coerce"),
-        "저": pd.to_numeric(df["low"], errors="coerce"),
-        "Vol.": pd.to_numeric(df["volume"], errors="coerce"),
-    })
+_stand_in_server = None
 
-    if not include_today:
-        # UTC 기준으로 오늘 날짜 판단 (미완성 캔들 제거)
-        today_utc = dt.datetime.now(tz.UTC).date()
-        # Timestamp 객체에서 date만 추출하여 비교
-        out = out[out["Date(UTC)"].dt.date < today_utc]
+def configure_stand_in_from_env() -> Optional[str]:
+    """환경변수 BINANCE_STAND_IN (local 또는 http://호스트:포트)이 있으면 대역 서버로 전환. 사용한 base_url 반환."""
+    global _stand_in_server
+    target = os.environ.get("BINANCE_STAND_IN", "").strip()
+    if not target:
+        return None
+    if target.lower() == "local":
+        _stand_in_server = BinanceStandInServer(
+            latency_ms=float(os.environ.get("BINANCE_STAND_IN_LATENCY_MS", 0) or 0),
+            error_rate=float(os.environ.get("BINANCE_STAND_IN_ERROR_RATE", 0) or 0),
+        ).start()
+        target = _stand_in_server.base_url
+    use_binance_stand_in(target)
+    return target
+
+# -------------------- 1분봉 → 상위 인터벌 파생 (리샘플링) --------------------
+# 5분/15분/1시간/1일봉을 1분봉에서 바이낸스와 동일한 구간 경계(open_time을 인터벌 배수로 내림, UTC 기준)로
+# 집계합니다. 시가=첫 1분봉 시가, 고가=최대, 저가=최소, 종가=마지막 1분봉 종가, 거래량=합계.
+# 직전에 수집한 1분봉(_recent_1m_rows)을 재사용하므로 같은 주기 안의 상위 인터벌 REST 호출이 줄어듭니다.
+# 구간의 1분봉이 하나라도 비면(점검 등) 파생하지 않고 REST로 받습니다.
+KLINE_DERIVE_FROM_1M = True
+KLINE_DERIVABLE_INTERVALS = ("5m", "15m", "1h", "1d")
+KLINE_DERIVE_MAX_AGE_SEC = 30     # 이 시간 안에 수집한 1분봉만 파생 원본으로 사용
+KLINE_DERIVE_VERIFY = False       # True면 파생 캔들을 거래소 캔들과 비교해 불일치를 로그로 출력
+AFTER_1M_FETCH_COUNT = 120        # AFTER 선수집 1분봉 개수 (직전 1시간봉 + 진행 중 1시간봉 파생 가능)
+_recent_1m_rows = {}              # symbol -> (수집 시각, 1분봉 원본 행 오름차순)
+_recent_1m_lock = threading.Lock()
+
+def resample_1m_rows(rows_1m: List[list], interval: str, include_partial_last: bool = True) -> List[list]:
+    """
+    1분봉 원본 행(오름차순)을 상위 인터벌 klines 원본 행으로 집계합니다.
 
-    out = out.sort_values("Date(UTC)", ascending=False).reset_index(drop=True)
+    Args:
+        rows_1m: 1분봉 klines 원본 행 (open_time 오름차순, 중복 없음)
+        interval: "5m", "15m", "1h", "1d"
+        include_partial_last: True면 마지막 구간이 구간 시작부터 연속이면 진행 중 캔들로 포함
 
+    Returns:
+        list: 파생 klines 행 [open_time, open, high, low, close, volume, close_time, quote_volume, trades,
+              taker_base, taker_quote, "0"] (완성 구간 + 선택적 진행 중 마지막 구간)
+    """
+    if not rows_1m:
+        return []
+    interval_ms = BINANCE_INTERVAL_MS[interval]
+    minute_ms = BINANCE_INTERVAL_MS["1m"]
+    children = interval_ms // minute_ms
+    ot = np.array([int(r[0]) for r in rows_1m], dtype=np.int64)
+    cols = np.array([[r[1], r[2], r[3], r[4], r[5], r[7], r[8], r[9], r[10]] for r in rows_1m], dtype=np.float64)
+    bucket = (ot // interval_ms) * interval_ms
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(ot)] - 1
+    counts = ends - starts + 1
+    contiguous = (ot[ends] - ot[starts]) == (counts - 1) * minute_ms
+    complete = contiguous & (counts == children)
+    if include_partial_last:
+        last = len(starts) - 1
+        complete[last] = complete[last] or (contiguous[last] and ot[starts[last]] == bucket[starts[last]])
+    opens = cols[starts, 0]
+    highs = np.maximum.reduceat(cols[:, 1], starts)
+    lows = np.minimum.reduceat(cols[:, 2], starts)
+    closes = cols[ends, 3]
+    sums = np.add.reduceat(cols[:, [4, 5, 6, 7, 8]], starts, axis=0)
+    out = []
+    for i in np.flatnonzero(complete):
+        b = int(bucket[starts[i]])
+        out.append([b, float(opens[i]), float(highs[i]), float(lows[i]), float(closes[i]), float(sums[i, 0]),
+                    b + interval_ms - 1, float(sums[i, 1]), int(sums[i, 2]), float(sums[i, 3]), float(sums[i, 4]), "0"])
     return out
 
-def fetch_binance_minutes5(symbol: str, total_count: int, include_today: bool = False, fixed_end_time_ms: Optional[int] = None) -> pd.DataFrame:
+def _remember_recent_1m_rows(symbol: str, rows: List[list]) -> None:
+    """1분봉 수집 결과를 파생 원본으로 보관 (진행 중 1분봉 포함)."""
+    with _recent_1m_lock:
+        _recent_1m_rows[symbol] = (time.time(), rows)
+
+def derive_klines_from_recent_1m(symbol: str, interval: str, oldest_open: int, newest_open: int) -> dict:
+    """최근 수집한 1분봉으로 [oldest_open, newest_open] 구간 상위 인터벌 캔들 파생 → {open_time: row}."""
+    with _recent_1m_lock:
+        cached = _recent_1m_rows.get(symbol)
+    if cached is None or time.time() - cached[0] > KLINE_DERIVE_MAX_AGE_SEC:
+        return {}
+    rows_1m = cached[1]
+    return {row[0]: row for row in resample_1m_rows(rows_1m, interval) if oldest_open <= row[0] <= newest_open}
+
+def verify_derived_klines(symbol: str, interval: str, derived: dict, rtol: float = 1e-9) -> int:
     """
-    바이낸스 5m klines, UTC 기준으로 통일하여 반환.
-    페이징 방법 B (backward): endTime부터 과거로 진행
-    
-    바이낸스 API 문서:
-    - 스팟: GET /api/v3/klines — limit 기본 500, 최대 1000
+    파생 캔들을 거래소 캔들과 비교 (검증 모드). 불일치 개수 반환.
+    거래량은 부동소수 합산 오차가 있으므로 상대 오차 rtol 이내면 일치로 봅니다.
+    """
+    if not derived:
+        return 0
+    opens = sorted(derived)
+    interval_ms = BINANCE_INTERVAL_MS[interval]
+    mismatches = 0
+    checked = 0
+    end = opens[-1]
+    while end >= opens[0]:
+        limit = min(BINANCE_LIMIT, (end - opens[0]) // interval_ms + 1)
+        batch = _binance_futures_get("/fapi/v1/klines", {"symbol": symbol, "interval": interval, "limit": limit, "endTime": end}).json() or []
+        if not batch:
+            break
+        for row in batch:
+            ot = int(row[0])
+            mine = derived.get(ot)
+            if mine is None or ot > opens[-1]:
+                continue
+            checked += 1
+            a = np.array([float(x) for x in row[1:6]])
+            b = np.array([float(x) for x in mine[1:6]])
+            if not np.allclose(a, b, rtol=rtol, atol=0):
+                mismatches += 1
+                if mismatches <= 5:
+                    print(f"{get_timestamp()} ⚠️[파생 검증] {symbol} {interval} {pd.to_datetime(ot, unit='ms')}: 거래소 {a.tolist()} / 파생 {b.tolist()}")
+        end = int(batch[0][0]) - interval_ms
+    status = "✅" if mismatches == 0 else "❌"
+    print(f"{get_timestamp()} {status}[파생 검증] {symbol} {interval}: {checked}개 비교, 불일치 {mismatches}개")
+    return mismatches
+
+def drop_incomplete_candles(df: pd.DataFrame, interval: str, now_utc: Optional[dt.datetime] = None) -> tuple:
+    """
+    진행 중 캔들(Date(UTC) + 인터벌 > 현재 시각)을 제거합니다. 모든 인터벌 공통 규칙.
+
+    Returns:
+        tuple: (제거 후 DataFrame, 제거된 Date(UTC) 리스트)
+    """
+    if df is None or df.empty or 'Date(UTC)' not in df.columns:
+        return df, []
+    if now_utc is None:
+        now_utc = dt.datetime.now(tz.UTC)
+    now_naive = pd.Timestamp(now_utc).tz_convert("UTC").tz_localize(None)
+    dates = utc_time_column(df['Date(UTC)'])
+    in_progress = (dates + pd.Timedelta(milliseconds=BINANCE_INTERVAL_MS[interval])) > now_naive
+    if not in_progress.any():
+        return df, []
+    return df.loc[~in_progress].reset_index(drop=True), list(dates[in_progress])
+
+def _collect_binance_klines(symbol: str, interval: str, total_count: int, fixed_end_time_ms: Optional[int] = None,
+                            max_workers: Optional[int] = None, weight_budget: Optional[int] = None) -> List[list]:
+    """
+    바이낸스 선물 klines 원본 행을 페이지 병렬로 수집합니다 (모든 fetch_binance_* 공용).
+
+    인터벌이 고정이므로 기준 endTime이 속한 캔들부터 total_count개의 open_time 격자를 미리 계산합니다.
+    로컬 캔들 저장소(ENABLE_CANDLE_STORE)에 이미 있는 완성 캔들은 재사용하고, 저장소에 없는
+    연속 구간(최신 꼬리 + 중간 공백)만 1000개 단위 페이지로 나누어 동시에 요청합니다.
+    거래소 점검 등으로 캔들이 비어 개수가 모자라면 기존 방식(가장 오래된 openTime - 1ms)으로
+    과거 방향 순차 보충합니다. 새로 받은 완성 캔들은 저장소에 병합됩니다.
+
+    Args:
+        symbol: 심볼 (예: "BTCUSDT")
+        interval: "1m", "5m", "15m", "1h", "1d", "1w"
+        total_count: 수집할 캔들 개수
+        fixed_end_time_ms: 조회 기준 시간 (UTC milliseconds, None이면 선물 서버 시간)
+        max_workers: 동시 요청 페이지 수 (None이면 KLINE_FETCH_MAX_WORKERS)
+        weight_budget: 동시 진행 weight 합계 상한 (None이면 KLINE_FETCH_WEIGHT_BUDGET)
+
+    Returns:
+        list: open_time 기준 오름차순·중복 제거된 klines 원본 행 (최대 total_count개, 최신 기준)
+    """
+    if total_count <= 0:
+        return []
+    path = "/fapi/v1/klines"
+    interval_ms = BINANCE_INTERVAL_MS[interval]
+    anchor_end = fixed_end_time_ms if fixed_end_time_ms is not None else get_futures_server_time()
+    # 요청 시작 시각: 이 시각 이전에 마감된 캔들만 완성으로 보고 저장소에 병합 (응답 후 시각 기준이면
+    # 요청 도중 마감된 최신 캔들이 미완성 값으로 저장됨)
+    # endTime이 미래(AFTER 단계의 다음 15분 기준점)면 아직 열리지 않은 캔들은 격자에서 제외
+    request_start_ms = min(anchor_end, int(time.time() * 1000))
+    newest_open = _kline_open_floor(request_start_ms, interval)
+    oldest_open = newest_open - (total_count - 1) * interval_ms
+
+    # 저장소 조회: 요청 구간 안의 완성 캔들
+    stored = {}
+    if ENABLE_CANDLE_STORE:
+        arr = candle_store_load(symbol, interval)
+        if len(arr):
+            sel = arr[(arr["open_time"] >= oldest_open) & (arr["open_time"] <= newest_open)]
+            stored = {row[0]: row for row in _candle_store_rows(sel)}
+
+    # 웹소켓 링버퍼 조회 (수신 중일 때만, 저장소 값보다 우선)
+    streamed = {}
+    if _kline_stream is not None and _kline_stream.is_fresh():
+        streamed = _kline_stream.get_rows(symbol, interval, oldest_open, newest_open, now_ms=request_start_ms)
+        stored.update(streamed)
+
+    # 직전에 수집한 1분봉에서 파생 (저장소·스트림에 없는 캔들만 채움, 저장소에는 저장하지 않음)
+    derived = {}
+    if KLINE_DERIVE_FROM_1M and interval in KLINE_DERIVABLE_INTERVALS:
+        derived = derive_klines_from_recent_1m(symbol, interval, oldest_open, newest_open)
+        if KLINE_DERIVE_VERIFY and derived:
+            verify_derived_klines(symbol, interval, derived)
+        for ot, row in derived.items():
+            stored.setdefault(ot, row)
+
+    # 누락 구간 계산: 격자 중 저장소에 없는 연속 구간 → (구간 최신 open_time, 길이)
+    missing_runs = []
+    k = 0
+    while k < total_count:
+        if newest_open - k * interval_ms in stored:
+            k += 1
+            continue
+        run_start = k
+        while k < total_count and (newest_open - k * interval_ms) not in stored:
+            k += 1
+        missing_runs.append((newest_open - run_start * interval_ms, k - run_start))
+
+    # 페이지 계획: (endTime, limit) - 각 누락 구간의 최신 쪽부터
+    # 최신 구간은 원래 기준 endTime을 그대로 사용 (서버 시각이 로컬보다 앞선 경우도 최신 캔들 포함)
+    pages = []
+    for run_end, run_len in missing_runs:
+        remaining = run_len
+        page_end = run_end
+        while remaining > 0:
+            limit = min(BINANCE_LIMIT, remaining)
+            pages.append((anchor_end if page_end == newest_open else page_end, limit))
+            remaining -= limit
+            page_end -= BINANCE_LIMIT * interval_ms
+
+    if stored:
+        print(f"{get_timestamp()} 💾 캔들 저장소 {symbol} {interval}: {len(stored)}개 재사용, "
+              f"{sum(run_len for _, run_len in missing_runs)}개 요청 ({len(pages)}페이지)")
+
+    def _fetch_page(end_time, limit):
+        params = {"symbol": symbol, "interval": interval, "limit": limit, "endTime": end_time}
+        return _binance_futures_get(path, params).json() or []
+
+    batches = []
+    if pages:
+        # 동시성 결정: 워커 상한과 weight 예산 중 작은 쪽
+        workers = max_workers if max_workers is not None else KLINE_FETCH_MAX_WORKERS
+        budget = weight_budget if weight_budget is not None else KLINE_FETCH_WEIGHT_BUDGET
+        max_page_weight = max(_kline_request_weight(limit) for _, limit in pages)
+        workers = max(1, min(workers, len(pages), budget // max_page_weight if max_page_weight > 0 else workers))
+
+        if workers == 1 or len(pages) == 1:
+            batches = [_fetch_page(end_time, limit) for end_time, limit in pages]
+        else:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                batches = list(executor.map(lambda p: _fetch_page(*p), pages))
+
+    # 병합 + open_time 기준 중복 제거 (API 값 우선)
+    rows_by_open = dict(stored)
+    fetched_rows = []
+    for batch in batches:
+        for row in batch:
+            rows_by_open[int(row[0])] = row
+            fetched_rows.append(row)
+
+    # 보충: 캔들 공백 등으로 개수가 모자라면 가장 오래된 캔들 이전으로 순차 진행 (페이징 방법 B)
+    while len(rows_by_open) < total_count and rows_by_open:
+        current_end_time = min(rows_by_open) - 1
+        limit = min(BINANCE_LIMIT, total_count - len(rows_by_open))
+        batch = _fetch_page(current_end_time, limit)
+        new_rows_count = 0
+        for row in batch:
+            ot = int(row[0])
+            if ot in rows_by_open:
+                continue
+            rows_by_open[ot] = row
+            fetched_rows.append(row)
+            new_rows_count += 1
+        if new_rows_count == 0:
+            break
+
+    # 새로 받은 완성 캔들(REST + 스트림 완성 캔들)을 저장소에 병합 (스트림의 진행 중 캔들은 저장하지 않음)
+    streamed_closed = [row for row in streamed.values() if row[6] < request_start_ms]
+    if ENABLE_CANDLE_STORE and (fetched_rows or streamed_closed):
+        candle_store_save(symbol, interval, fetched_rows + streamed_closed, now_ms=request_start_ms)
+
+    ordered = [rows_by_open[ot] for ot in sorted(rows_by_open)]
+    if interval == "1m":
+        _remember_recent_1m_rows(symbol, ordered)
+    return ordered[-total_count:]
+
+# -------------------- klines 디코딩 (벡터화) --------------------
+# 수집기가 돌려준 원본 행(문자열/숫자 혼합 리스트)을 한 번에 NumPy 배열(int64 open_time, float64 OHLCV)로
+# 변환하고, KST 표시 문자열은 "날짜 부분(고유 날짜별 1회) + 시각 부분(분 단위 조회표)"을 이어 붙여 만듭니다.
+# 행마다 Timestamp.astimezone().strftime()을 호출하던 루프를 대체합니다. (KST는 UTC+9 고정, 서머타임 없음)
+KST_OFFSET_MS = 9 * 3_600_000
+_DAY_MS = 86_400_000
+
+@lru_cache(maxsize=8)
+def _minute_of_day_labels(time_fmt: str) -> np.ndarray:
+    """하루 1440분 각각의 시각 문자열 조회표 (예: "%H:%M" → "00:00" ... "23:59")."""
+    base = dt.datetime(2000, 1, 1)
+    return np.array([(base + dt.timedelta(minutes=m)).strftime(time_fmt) for m in range(1440)])
+
+def kline_time_labels(open_time_ms: np.ndarray, time_fmt: str = "%H:%M", offset_ms: int = KST_OFFSET_MS) -> np.ndarray:
+    """
+    open_time(ms) 배열 → "YY/MM/DD,<time_fmt>" 문자열 배열 (offset_ms 만큼 이동한 현지 시각 기준).
+
+    Args:
+        open_time_ms: UTC 밀리초 int64 배열
+        time_fmt: 시각 부분 형식 ("%H:%M", "%H:00", 일봉은 "09:00" 처럼 고정 문자열도 가능)
+        offset_ms: UTC 대비 오프셋 (기본 KST +9h, 0이면 UTC 표시)
+    """
+    if len(open_time_ms) == 0:
+        return np.array([], dtype=object)
+    shifted = np.asarray(open_time_ms, dtype=np.int64) + offset_ms
+    days = shifted // _DAY_MS
+    unique_days, day_idx = np.unique(days, return_inverse=True)
+    day_labels = np.array([(dt.date(1970, 1, 1) + dt.timedelta(days=int(d))).strftime("%y/%m/%d,") for d in unique_days])
+    minute_idx = (shifted - days * _DAY_MS) // 60_000
+    return np.char.add(day_labels[day_idx], _minute_of_day_labels(time_fmt)[minute_idx]).astype(object)
+
+def decode_binance_klines(rows: List[list]) -> dict:
+    """
+    klines 원본 행 → 타입 지정 NumPy 배열 (open_time 오름차순, 같은 open_time은 마지막 행 유지).
+
+    Returns:
+        dict: open_time(int64), open/high/low/close/volume(float64)
+    """
+    if not rows:
+        empty_f = np.empty(0, dtype=np.float64)
+        return {"open_time": np.empty(0, dtype=np.int64), "open": empty_f, "high": empty_f,
+                "low": empty_f, "close": empty_f, "volume": empty_f}
+    n = len(rows)
+    open_time = np.fromiter((r[0] for r in rows), dtype=np.int64, count=n)
+    ohlcv = np.array([r[1:6] for r in rows], dtype=np.float64)
+    order = np.argsort(open_time, kind="stable")
+    open_time = open_time[order]
+    ohlcv = ohlcv[order]
+    keep = np.r_[open_time[1:] != open_time[:-1], True]  # 중복 시 마지막 행 유지
+    open_time = open_time[keep]
+    ohlcv = ohlcv[keep]
+    return {"open_time": open_time, "open": ohlcv[:, 0], "high": ohlcv[:, 1],
+            "low": ohlcv[:, 2], "close": ohlcv[:, 3], "volume": ohlcv[:, 4]}
+
+def klines_to_frame(rows: List[list], include_today: bool = True, kst_time_fmt: str = "%H:%M") -> pd.DataFrame:
+    """
+    klines 원본 행 → 스크립트 공통 형식 DataFrame (최신→과거 순).
+    컬럼: Date(UTC)(naive Timestamp), KST(참고용 문자열), 종, 시, 고, 저, Vol.
+
+    Args:
+        rows: 수집기(_collect_binance_klines) 반환 행
+        include_today: False면 UTC 오늘 날짜 캔들 제외
+        kst_time_fmt: KST 문자열의 시각 부분 형식
+    """
+    k = decode_binance_klines(rows)
+    open_time = k["open_time"]
+    if not include_today:
+        today_start_ms = int(time.time() * 1000) // _DAY_MS * _DAY_MS
+        mask = open_time < today_start_ms
+        k = {name: arr[mask] for name, arr in k.items()}
+        open_time = k["open_time"]
+    rev = slice(None, None, -1)  # 최신→과거
+    return pd.DataFrame({
+        "Date(UTC)": pd.to_datetime(open_time[rev], unit="ms"),  # UTC 기준 시간 (계산에 사용, Timestamp 객체)
+        "KST": kline_time_labels(open_time[rev], kst_time_fmt),  # KST 시간 (참고용, 계산 로직에는 사용하지 않음)
+        "종": k["close"][rev],
+        "시": k["open"][rev],
+        "고": k["high"][rev],
+        "저": k["low"][rev],
+        "Vol.": k["volume"][rev],
+    })
+
+def benchmark_kline_decode(n_rows: int = 12_400, repeat: int = 5) -> float:
+    """
+    klines 디코딩 벤치마크: 합성 1분봉 n_rows개(바이낸스 JSON과 같은 문자열 행)를 klines_to_frame으로 변환.
+    Returns: 호출당 평균 소요 시간(ms)
+    """
+    t0 = (int(time.time() * 1000) // 60_000 - n_rows) * 60_000
+    rows = [[t0 + i * 60_000, "100.10", "100.50", "99.90", "100.20", "12.345", t0 + i * 60_000 + 59_999,
+             "1236.5", 42, "6.1", "611.0", "0"] for i in range(n_rows)]
+    elapsed = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        klines_to_frame(rows)
+        elapsed.append((time.perf_counter() - start) * 1000)
+    avg_ms = sum(elapsed) / len(elapsed)
+    print(f"{get_timestamp()} ⏱️[klines 디코딩] {n_rows}행: 평균 {avg_ms:.2f}ms (최소 {min(elapsed):.2f}ms, {repeat}회)")
+    return avg_ms
+
+# -------------------- 압축 캔들 테이블 (열 단위 타입 지정 보관) --------------------
+# 보관·전달용 캔들/지표 프레임을 열 단위 NumPy 배열로 압축합니다.
+# - 시간 열(datetime64) → int64 그대로 (NaT 포함 보존), 숫자 열 → float64/int64 (지정 열만 float32)
+# - 신호 라벨 열(ORDER, SB5M, Bomb, PRFT 등 object/문자열 열) → int8/int16 코드 + 열별 라벨표 (-1 = NaN)
+# - KST 문자열이 Date(UTC)에서 kline_time_labels로 만들어지는 형식이면 형식 문자열만 보관
+# 계산은 기존 DataFrame 함수들이 그대로 담당하고, DataFrame 변환은 꺼내 쓸 때(to_frame)와
+# 엑셀 경계(excel_frame)에서만 일어납니다. to_frame()은 열 순서·dtype·값을 그대로 복원합니다.
+CANDLE_TABLE_MAX_LABELS = 4096     # 라벨 열의 고유값이 이보다 많으면 코드화하지 않고 원본 배열 보관
+CANDLE_TABLE_KST_FORMATS = ("%H:%M", "%H:00", "09:00")   # klines_to_frame이 쓰는 KST 시각 형식
+_TIME_UNIT_TO_MS = {"s": None, "ms": 1, "us": 1_000, "ns": 1_000_000}
+
+
+def datetime_text_labels(values, offset_ms: int = 0) -> Optional[np.ndarray]:
+    """
+    datetime64 열 → "YY/MM/DD,HH:MM" 문자열 배열 (_force_date_text와 같은 결과, 기본 UTC).
+    int64 epoch-ms로 한 번에 만들고, NaT가 있으면 None (호출 측에서 기존 strftime 경로 사용).
+    """
+    series = pd.Series(values)
+    if series.dt.tz is not None:
+        series = series.dt.tz_convert("UTC").dt.tz_localize(None)
+    stamps = series.to_numpy(dtype="datetime64[ms]")
+    if np.isnat(stamps).any():
+        return None
+    return kline_time_labels(stamps.view(np.int64), "%H:%M", offset_ms)
+
+
+def _encode_label_column(values: np.ndarray):
+    """
+    object 열 → (코드 배열, 라벨 목록). NaN은 -1, 라벨은 (타입, 값)으로 구분 (72와 72.0, True와 1이 섞이지 않도록).
+    고유값이 CANDLE_TABLE_MAX_LABELS를 넘거나 해시할 수 없는 값이 있으면 None.
+    """
+    codes = np.empty(len(values), dtype=np.int32)
+    labels, lookup = [], {}
+    try:
+        for i, value in enumerate(values):
+            if isinstance(value, float) and value != value:
+                codes[i] = -1
+                continue
+            key = (type(value), value)
+            code = lookup.get(key)
+            if code is None:
+                if len(labels) >= CANDLE_TABLE_MAX_LABELS:
+                    return None
+                code = lookup[key] = len(labels)
+                labels.append(value)
+            codes[i] = code
+    except TypeError:
+        return None
+    return codes.astype(np.int8 if len(labels) < 127 else np.int16), labels
+
+
+def _decode_label_column(codes: np.ndarray, labels: list) -> np.ndarray:
+    table = np.empty(len(labels) + 1, dtype=object)
+    table[:len(labels)] = labels
+    table[-1] = np.nan          # 코드 -1 → 마지막 칸(NaN)
+    return table[codes]
+
+
+class CandleTable:
+    """
+    열 단위 압축 캔들 테이블.
+    columns: {열 이름: (종류, 데이터, 부가정보)}
+      - "time":  int64 배열, 원래 dtype (datetime64[unit] / tz 포함)
+      - "num":   float64/float32/int/bool 배열, 원래 dtype
+      - "label": int8/int16 코드, (라벨 목록, 원래 dtype)
+      - "kst":   None, (KST 형식, 기준 시간 열 이름)
+      - "raw":   원본 배열 (코드화할 수 없는 object 열, 기타 확장 dtype)
+    """
+
+    def __init__(self, columns: dict, order: List[str], n_rows: int, index=None):
+        self.columns = columns
+        self.order = order
+        self.n_rows = n_rows
+        self.index = index          # 기본 RangeIndex가 아닐 때만 보관
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    @staticmethod
+    def _time_ms(values: np.ndarray, dtype) -> Optional[np.ndarray]:
+        """시간 열 int64 → epoch-ms (NaT가 있거나 초 단위면 None)"""
+        factor = _TIME_UNIT_TO_MS.get(getattr(dtype, "unit", None) or np.datetime_data(dtype)[0])
+        if factor is None or (values == np.iinfo(np.int64).min).any():
+            return None
+        return values // factor
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, float32_columns: tuple = ()) -> "CandleTable":
+        """DataFrame → CandleTable (float32_columns에 지정한 열만 float32로 줄임, 나머지는 무손실)"""
+        if not df.columns.is_unique:
+            raise ValueError("CandleTable: 열 이름이 중복된 DataFrame은 압축할 수 없습니다")
+        columns = {}
+        for name in df.columns:
+            series = df[name]
+            dtype = series.dtype
+            if isinstance(dtype, pd.DatetimeTZDtype) or dtype.kind == "M":
+                columns[name] = ("time", np.asarray(series.array.asi8, dtype=np.int64).copy(), dtype)
+            elif dtype.kind in "fiub":
+                data = series.to_numpy(copy=True)
+                if name in float32_columns and dtype.kind == "f":
+                    data = data.astype(np.float32)
+                columns[name] = ("num", data, dtype)
+            elif dtype == object or isinstance(dtype, pd.StringDtype):
+                values = series.to_numpy(dtype=object, na_value=np.nan)
+                kst_fmt = cls._derived_kst_format(name, values, columns)
+                if kst_fmt is not None:
+                    columns[name] = ("kst", None, (kst_fmt, "Date(UTC)", dtype))
+                    continue
+                encoded = _encode_label_column(values)
+                if encoded is not None:
+                    columns[name] = ("label", encoded[0], (encoded[1], dtype))
+                else:
+                    columns[name] = ("raw", series.array.copy(), dtype)
+            else:
+                columns[name] = ("raw", series.array.copy(), dtype)
+        default_index = isinstance(df.index, pd.RangeIndex) and df.index.start == 0 and df.index.step == 1
+        return cls(columns, list(df.columns), len(df), index=None if default_index else df.index.copy())
+
+    @classmethod
+    def _derived_kst_format(cls, name, values: np.ndarray, columns: dict) -> Optional[str]:
+        """KST 열이 Date(UTC)의 kline_time_labels 결과와 같으면 그 형식 (아니면 None)"""
+        base = columns.get("Date(UTC)")
+        if name != "KST" or base is None or base[0] != "time" or len(values) == 0:
+            return None
+        ms = cls._time_ms(base[1], base[2])
+        if ms is None:
+            return None
+        for fmt in CANDLE_TABLE_KST_FORMATS:
+            if np.array_equal(kline_time_labels(ms, fmt, KST_OFFSET_MS), values):
+                return fmt
+        return None
+
+    def _column_values(self, name: str):
+        kind, data, meta = self.columns[name]
+        if kind == "time":
+            if isinstance(meta, pd.DatetimeTZDtype):
+                utc = pd.DatetimeIndex(data.view(f"datetime64[{meta.unit}]")).tz_localize("UTC")
+                return utc.tz_convert(meta.tz).array
+            return data.view(meta)
+        if kind == "num":
+            return data.astype(meta)
+        if kind == "label":
+            labels, dtype = meta
+            values = _decode_label_column(data, labels)
+            return values if dtype == object else pd.array(values, dtype=dtype)
+        if kind == "kst":
+            fmt, base_name, dtype = meta
+            _, base, base_dtype = self.columns[base_name]
+            values = kline_time_labels(self._time_ms(base, base_dtype), fmt, KST_OFFSET_MS)
+            return values if dtype == object else pd.array(values, dtype=dtype)
+        return data.copy()
+
+    def to_frame(self) -> pd.DataFrame:
+        """CandleTable → 원래 DataFrame (열 순서·dtype·값 동일)"""
+        df = pd.DataFrame({name: self._column_values(name) for name in self.order},
+                          index=self.index if self.index is not None else pd.RangeIndex(self.n_rows))
+        return df[self.order] if list(df.columns) != self.order else df
+
+    def excel_frame(self) -> pd.DataFrame:
+        """엑셀 경계용 DataFrame (Date(UTC)/KST를 _force_date_text와 같은 문자열로 변환)"""
+        return _force_date_text(self.to_frame())
+
+    @property
+    def nbytes(self) -> int:
+        """보관 메모리 추정치 (배열 + 라벨표/원본 object 값 크기)"""
+        total = 0
+        for kind, data, meta in self.columns.values():
+            if data is not None:
+                total += data.nbytes
+            if kind == "label":
+                total += sum(sys.getsizeof(label) for label in meta[0])
+            elif kind == "raw" and getattr(data, "dtype", None) == object:
+                total += sum(sys.getsizeof(value) for value in data)
+        return total
+
+
+def benchmark_candle_table(df: Optional[pd.DataFrame] = None, n_rows: int = 800, repeat: int = 5) -> dict:
+    """
+    CandleTable 벤치마크: DataFrame 메모리(deep) 대비 압축 크기, from_frame/to_frame 소요 시간, 복원 일치 여부.
+    df가 없으면 15분봉 보관 프레임과 비슷한 합성 프레임(가격 열 + 신호 라벨 열) n_rows행을 사용합니다.
+    """
+    if df is None:
+        rng = np.random.default_rng(7)
+        t0 = (int(time.time() * 1000) // 900_000) * 900_000
+        open_ms = t0 - np.arange(n_rows, dtype=np.int64) * 900_000
+        close = 100 + rng.standard_normal(n_rows).cumsum()
+        df = pd.DataFrame({
+            "Date(UTC)": pd.to_datetime(open_ms, unit="ms"),
+            "KST": kline_time_labels(open_ms, "%H:%M", KST_OFFSET_MS),
+            "종": close, "시": close + 0.1, "고": close + 0.5, "저": close - 0.5, "Vol.": rng.random(n_rows) * 1e3,
+            "ORDER": rng.choice(np.array(["", "Buy", "Sell", "buy", "sell"], dtype=object), n_rows),
+            "SB5M": rng.choice(np.array(["buy1", "sell1", "", np.nan], dtype=object), n_rows),
+            "Bomb": rng.choice(np.array(["", "Bomb"], dtype=object), n_rows),
+            "PRFT": rng.choice(np.array([72, 0, "", np.nan], dtype=object), n_rows),
+        })
+    frame_bytes = int(df.memory_usage(deep=True).sum())
+    pack_ms, unpack_ms = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        table = CandleTable.from_frame(df)
+        pack_ms.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        restored = table.to_frame()
+        unpack_ms.append((time.perf_counter() - start) * 1000)
+    identical = restored.equals(df) and list(restored.dtypes) == list(df.dtypes)
+    result = {
+        "rows": len(df), "frame_bytes": frame_bytes, "table_bytes": table.nbytes,
+        "pack_ms": sum(pack_ms) / repeat, "unpack_ms": sum(unpack_ms) / repeat, "identical": identical,
+    }
+    print(f"{get_timestamp()} ⏱️[캔들 테이블] {len(df)}행: 메모리 {frame_bytes / 1024:.1f}KB → {table.nbytes / 1024:.1f}KB, "
+          f"압축 {result['pack_ms']:.2f}ms / 복원 {result['unpack_ms']:.2f}ms, 복원 일치={identical}")
+    return result
+
+# -------------------- 바이낸스 일봉 (선물 캔들) --------------------
+
+def fetch_binance_daily(symbol: str, total_days: int, include_today: bool = False, fixed_end_time_ms: Optional[int] = None) -> pd.DataFrame:
+    """
+    바이낸스 1d klines, UTC 기준으로 통일하여 반환.
+    페이징: 공용 수집기(_collect_binance_klines)로 모든 페이지 endTime을 미리 계산해 병렬 수집
+    
+    바이낸스 API 문서:
+    - 스팟: GET /api/v3/klines — limit 기본 500, 최대 1000
     - 페이징 방법 B: endTime부터 시작, 가장 오래된 캔들의 openTime - 1ms로 갱신하여 과거로 진행
+    - 선물의 경우 startTime-endTime 간 최대 200일 제약 (스팟은 제약 없음)
     
     Args:
         symbol: 심볼 (예: "BTCUSDT")
-        total_count: 수집할 5분봉 개수
+        total_days: 수집할 일봉 개수
         include_today: True면 오늘 진행중 캔들 포함 (UTC 기준으로 판단)
         fixed_end_time_ms: 조회 기준 시간 (UTC milliseconds, None이면 현재 시간)
     
@@ -6159,97 +7920,144 @@ def fetch_binance_minutes5(symbol: str, total_count: int, include_today: bool =
         - Date(UTC): UTC 기준 시간 (계산에 사용)
         - KST: 참고용 (계산 로직에는 사용하지 않음)
     """
-    path = "/fapi/v1/klines"
-    all_rows: List[list] = []
-    seen = set()  # 이미 본 open_time 추적 (중복 방지)
-    remaining = total_count
-    current_end_time = fixed_end_time_ms  # 현재 페이징의 endTime (과거로 진행하면서 갱신됨)
-
-    while remaining > 0:
-        # 바이낸스 스팟 API: limit 최대 1000
-        limit = min(1000, remaining)
-        params = {"symbol": symbol, "interval": "5m", "limit": limit}
-        
-        # 페이징 방법 B: endTime 사용 (과거로 진행)
-        if current_end_time is not None:
-            params["endTime"] = current_end_time
-        # endTime이 None이면 가장 최근 캔들 반환 (바이낸스 API 기본 동작)
-
-        r = _binance_futures_get(path, params)
-        batch = r.json()
-        if not batch:
-            break
+    # 공용 수집기: 모든 페이지의 endTime을 미리 계산하여 병렬 수집 (open_time 기준 병합·중복 제거)
+    all_rows: List[list] = _collect_binance_klines(symbol, "1d", total_days, fixed_end_time_ms)
 
-        # 중복 방지: 이미 본 open_time은 제외
-        new_rows_count = 0
-        for row in batch:
-            ot = row[0]  # open_time (ms)
-            if ot in seen:
-                continue
-            seen.add(ot)
-            all_rows.append(row)
-            new_rows_count += 1
-        
-        # 페이징 방법 B: 가장 오래된 캔들의 openTime - 1ms로 endTime 갱신 (과거로 진행)
-        # batch는 시간순 정렬되어 있으므로 [0]이 가장 오래된 캔들
-        earliest_open = batch[0][0]  # 배치의 가장 오래된 봉 open_time
-        current_end_time = earliest_open - 1  # 다음 요청: 더 과거로
-        
-        # remaining 감소: 실제로 추가된 새 행 개수만큼만 감소
-        remaining -= new_rows_count
-        
-        # 더 이상 새 데이터가 없으면 종료
-        if new_rows_count == 0:
-            break
-        
-        time.sleep(0.05)  # API 호출 간 안전 여유 (최적화: 0.1 → 0.05)
+    if not all_rows:
+        return pd.DataFrame()
+
+    # 벡터화 디코딩: open_time 정렬·중복 제거, 숫자 변환, KST 문자열(일봉은 UTC 00:00 = KST 09:00)
+    out = klines_to_frame(all_rows, include_today, kst_time_fmt="09:00")
+    return out
+
+# (업비트 API 제거)
+
+
+
+def fetch_binance_minutes1(symbol: str, total_count: int, include_today: bool = False, fixed_end_time_ms: Optional[int] = None, stage_prefix: str = "") -> pd.DataFrame:
+    """
+    바이낸스 1m klines, UTC 기준으로 통일하여 반환.
+    페이징: 공용 수집기(_collect_binance_klines)로 모든 페이지 endTime을 미리 계산해 병렬 수집
+    
+    바이낸스 API 문서:
+    - 스팟: GET /api/v3/klines — limit 기본 500, 최대 1000
+    - 페이징 방법 B: endTime부터 시작, 가장 오래된 캔들의 openTime - 1ms로 갱신하여 과거로 진행
+    
+    Args:
+        symbol: 심볼 (예: "BTCUSDT")
+        total_count: 수집할 1분봉 개수
+        include_today: True면 오늘 진행중 캔들 포함 (UTC 기준으로 판단)
+        fixed_end_time_ms: 조회 기준 시간 (UTC milliseconds, None이면 현재 시간)
+    
+    Returns:
+        DataFrame: Date(UTC), KST, 종, 시, 고, 저, Vol. 컬럼 포함
+        - Date(UTC): UTC 기준 시간 (계산에 사용)
+        - KST: 참고용 (계산 로직에는 사용하지 않음)
+    """
+    # 공용 수집기: 모든 페이지의 endTime을 미리 계산하여 병렬 수집 (open_time 기준 병합·중복 제거)
+    all_rows: List[list] = _collect_binance_klines(symbol, "1m", total_count, fixed_end_time_ms)
 
     if not all_rows:
         return pd.DataFrame()
 
-    cols = ["open_time","open","high","low","close","volume","close_time",
-            "quote_asset_volume","trades","taker_buy_base","taker_buy_quote","ignore"]
-    df = pd.DataFrame(all_rows, columns=cols)
-
-    df['open_time'] = df['open_time'].astype('int64', copy=False)
-    df = df.sort_values('open_time', kind='mergesort', ascending=False, ignore_index=True)
-    df = df.loc[~df['open_time'].duplicated(keep='last')].reset_index(drop=True)
-
-    # [수정] Timestamp 객체로 반환 (문자열 변환 제거)
-    df["DateUTC"] = pd.to_datetime(df["open_time"], unit="ms", utc=True)
-    # [수정] strftime 제거: Timestamp 객체 그대로 사용 (나중에 엑셀 저장 시에만 문자열로 변환)
-    df["DateUTC_dt"] = df["DateUTC"].dt.tz_localize(None)  # timezone 제거하여 naive datetime으로 변환
-
-    # KST 시간 계산 (UTC+9) - 참고용으로만 사용 (계산 로직에는 사용하지 않음)
-    kst_dates = []
-    for utc_dt in df["DateUTC"]:
-        kst_dt = utc_dt.astimezone(KST)  # 참고용
-        kst_dates.append(kst_dt.strftime("%y/%m/%d,%H:%M"))
-
-    out = pd.DataFrame({
-        "Date(UTC)": df["DateUTC_dt"],  # UTC 기준 시간 (계산에 사용, Timestamp 객체)
-        "KST": kst_dates,  # KST 시간 (참고용, 계산 로직에는 사용하지 않음)
-        "종": pd.to_numeric(df["close"], errors="coerce"),
-        "시": pd.to_numeric(df["open"], errors="coerce"),
-        "고": pd.to_numeric(df["high"], errors="coerce"),
-        "저": pd.to_numeric(df["low"], errors="coerce"),
-        "Vol.": pd.to_numeric(df["volume"], errors="coerce"),
-    })
+    # 벡터화 디코딩: open_time 정렬·중복 제거, 숫자 변환, KST 문자열(YY/MM/DD,HH:MM)
+    out = klines_to_frame(all_rows, include_today, kst_time_fmt="%H:%M")
+    
+    # ⚠️중요: 1분봉 간격 검증 (페이징 누락 방지 확인)
+    if len(out) > 1 and 'Date(UTC)' in out.columns:
+        # Date(UTC) epoch ms로 간격 검증 (재파싱 없음)
+        times_ms = utc_time_ms(out['Date(UTC)'])
+        # 내림차순 정렬 확인 (최신→과거)
+        if (times_ms != NO_TIME_MS).all() and (np.diff(times_ms) <= 0).all():
+            # 각 행과 다음 행의 시간 차이 계산 (분 단위)
+            time_diffs = (times_ms[:-1] - times_ms[1:]) / 60_000
+            # 1분이 아닌 간격이 있는지 확인
+            non_1m_indices = np.flatnonzero(time_diffs != 1)
+            if len(non_1m_indices) > 0:
+                print(f"{get_timestamp()} [{stage_prefix}] ⚠️[1분봉 검증] {symbol}: 1분 간격이 아닌 구간 발견 ({len(non_1m_indices)}개)")
+                for idx in non_1m_indices[:5]:  # 최대 5개만 출력
+                    diff_minutes = time_diffs[idx]
+                    print(f"{get_timestamp()} [{stage_prefix}]    인덱스 {idx}→{idx+1}: {out.iloc[idx]['Date(UTC)']} → {out.iloc[idx+1]['Date(UTC)']} ({diff_minutes:.1f}분 차이)")
+                if len(non_1m_indices) > 5:
+                    print(f"{get_timestamp()} [{stage_prefix}]    ... 외 {len(non_1m_indices)-5}개 구간")
+            else:
+                print(f"{get_timestamp()} [{stage_prefix}] ✅[1분봉 검증] {symbol}: 모든 간격이 1분입니다 ({len(out)}개 캔들)")
+    
+    return out
 
-    if not include_today:
-        # UTC 기준으로 오늘 날짜 판단 (미완성 캔들 제거)
-        today_utc = dt.datetime.now(tz.UTC).date()
-        # Timestamp 객체에서 date만 추출하여 비교
-        out = out[out["Date(UTC)"].dt.date < today_utc]
+# -------------------- 바이낸스 15분봉 (선물) --------------------
+BINANCE_KLINES_15M = "https://fapi.binance.com/fapi/v1/klines"
+BINANCE_LIMIT = 1000
+
+# -------------------- 바이낸스 주봉 (선물) --------------------
+BINANCE_KLINES_WEEKLY = "https://fapi.binance.com/fapi/v1/klines"
+
+def fetch_binance_minutes15(symbol: str, total_count: int, include_today: bool = False, fixed_end_time_ms: Optional[int] = None) -> pd.DataFrame:
+    """
+    바이낸스 15m klines, UTC 기준으로 통일하여 반환.
+    페이징: 공용 수집기(_collect_binance_klines)로 모든 페이지 endTime을 미리 계산해 병렬 수집
+    
+    바이낸스 API 문서:
+    - 스팟: GET /api/v3/klines — limit 기본 500, 최대 1000
+    - 페이징 방법 B: endTime부터 시작, 가장 오래된 캔들의 openTime - 1ms로 갱신하여 과거로 진행
+    
+    Args:
+        symbol: 심볼 (예: "BTCUSDT")
+        total_count: 수집할 15분봉 개수
+        include_today: True면 오늘 진행중 캔들 포함 (UTC 기준으로 판단)
+        fixed_end_time_ms: 조회 기준 시간 (UTC milliseconds, None이면 현재 시간)
+    
+    Returns:
+        DataFrame: Date(UTC), KST, 종, 시, 고, 저, Vol. 컬럼 포함
+        - Date(UTC): UTC 기준 시간 (계산에 사용)
+        - KST: 참고용 (계산 로직에는 사용하지 않음)
+    """
+    # 공용 수집기: 모든 페이지의 endTime을 미리 계산하여 병렬 수집 (open_time 기준 병합·중복 제거)
+    all_rows: List[list] = _collect_binance_klines(symbol, "15m", total_count, fixed_end_time_ms)
+
+    if not all_rows:
+        return pd.DataFrame()
+
+    # 벡터화 디코딩: open_time 정렬·중복 제거, 숫자 변환, KST 문자열(YY/MM/DD,HH:MM)
+    out = klines_to_frame(all_rows, include_today, kst_time_fmt="%H:%M")
+
+    return out
+
+def fetch_binance_minutes5(symbol: str, total_count: int, include_today: bool = False, fixed_end_time_ms: Optional[int] = None) -> pd.DataFrame:
+    """
+    바이낸스 5m klines, UTC 기준으로 통일하여 반환.
+    페이징: 공용 수집기(_collect_binance_klines)로 모든 페이지 endTime을 미리 계산해 병렬 수집
+    
+    바이낸스 API 문서:
+    - 스팟: GET /api/v3/klines — limit 기본 500, 최대 1000
+    - 페이징 방법 B: endTime부터 시작, 가장 오래된 캔들의 openTime - 1ms로 갱신하여 과거로 진행
+    
+    Args:
+        symbol: 심볼 (예: "BTCUSDT")
+        total_count: 수집할 5분봉 개수
+        include_today: True면 오늘 진행중 캔들 포함 (UTC 기준으로 판단)
+        fixed_end_time_ms: 조회 기준 시간 (UTC milliseconds, None이면 현재 시간)
+    
+    Returns:
+        DataFrame: Date(UTC), KST, 종, 시, 고, 저, Vol. 컬럼 포함
+        - Date(UTC): UTC 기준 시간 (계산에 사용)
+        - KST: 참고용 (계산 로직에는 사용하지 않음)
+    """
+    # 공용 수집기: 모든 페이지의 endTime을 미리 계산하여 병렬 수집 (open_time 기준 병합·중복 제거)
+    all_rows: List[list] = _collect_binance_klines(symbol, "5m", total_count, fixed_end_time_ms)
+
+    if not all_rows:
+        return pd.DataFrame()
 
-    out = out.sort_values("Date(UTC)", ascending=False).reset_index(drop=True)
+    # 벡터화 디코딩: open_time 정렬·중복 제거, 숫자 변환, KST 문자열(YY/MM/DD,HH:MM)
+    out = klines_to_frame(all_rows, include_today, kst_time_fmt="%H:%M")
 
     return out
 
 def fetch_binance_hours1(symbol: str, total_count: int, include_today: bool = False, fixed_end_time_ms: Optional[int] = None) -> pd.DataFrame:
     """
     바이낸스 1h klines, UTC 기준으로 통일하여 반환.
-    페이징 방법 B (backward): endTime부터 과거로 진행
+    페이징: 공용 수집기(_collect_binance_klines)로 모든 페이지 endTime을 미리 계산해 병렬 수집
     
     바이낸스 API 문서:
     - 스팟: GET /api/v3/klines — limit 기본 500, 최대 1000
@@ -6266,99 +8074,21 @@ def fetch_binance_hours1(symbol: str, total_count: int, include_today: bool = Fa
         - Date(UTC): UTC 기준 시간 (계산에 사용, YY/MM/DD,00:00 형식)
         - KST: 참고용 (계산 로직에는 사용하지 않음, YY/MM/DD,09:00 형식)
     """
-    path = "/fapi/v1/klines"
-    all_rows: List[list] = []
-    seen = set()  # 이미 본 open_time 추적 (중복 방지)
-    remaining = total_count
-    current_end_time = fixed_end_time_ms  # 현재 페이징의 endTime (과거로 진행하면서 갱신됨)
-
-    while remaining > 0:
-        # 바이낸스 스팟 API: limit 최대 1000
-        limit = min(1000, remaining)
-        params = {"symbol": symbol, "interval": "1h", "limit": limit}
-        
-        # 페이징 방법 B: endTime 사용 (과거로 진행)
-        if current_end_time is not None:
-            params["endTime"] = current_end_time
-        # endTime이 None이면 가장 최근 캔들 반환 (바이낸스 API 기본 동작)
-
-        r = _binance_futures_get(path, params)
-        batch = r.json()
-        if not batch:
-            break
-
-        # 중복 방지: 이미 본 open_time은 제외
-        new_rows_count = 0
-        for row in batch:
-            ot = row[0]  # open_time (ms)
-            if ot in seen:
-                continue
-            seen.add(ot)
-            all_rows.append(row)
-            new_rows_count += 1
-        
-        # 페이징 방법 B: 가장 오래된 캔들의 openTime - 1ms로 endTime 갱신 (과거로 진행)
-        # batch는 시간순 정렬되어 있으므로 [0]이 가장 오래된 캔들
-        earliest_open = batch[0][0]  # 배치의 가장 오래된 봉 open_time
-        current_end_time = earliest_open - 1  # 다음 요청: 더 과거로
-        
-        # remaining 감소: 실제로 추가된 새 행 개수만큼만 감소
-        remaining -= new_rows_count
-        
-        # 더 이상 새 데이터가 없으면 종료
-        if new_rows_count == 0:
-            break
-        
-        time.sleep(0.05)  # API 호출 간 안전 여유 (최적화: 0.1 → 0.05)
+    # 공용 수집기: 모든 페이지의 endTime을 미리 계산하여 병렬 수집 (open_time 기준 병합·중복 제거)
+    all_rows: List[list] = _collect_binance_klines(symbol, "1h", total_count, fixed_end_time_ms)
 
     if not all_rows:
         return pd.DataFrame()
 
-    cols = ["open_time","open","high","low","close","volume","close_time",
-            "quote_asset_volume","trades","taker_buy_base","taker_buy_quote","ignore"]
-    df = pd.DataFrame(all_rows, columns=cols)
-
-    df['open_time'] = df['open_time'].astype('int64', copy=False)
-    df = df.sort_values('open_time', kind='mergesort', ascending=False, ignore_index=True)
-    df = df.loc[~df['open_time'].duplicated(keep='last')].reset_index(drop=True)
-
-    # [수정] Timestamp 객체로 반환 (문자열 변환 제거)
-    df["DateUTC"] = pd.to_datetime(df["open_time"], unit="ms", utc=True)
-    # 1시간봉은 각 캔들의 시작 시간 표시 (분, 초, 마이크로초 제거) - .dt.floor('h') 사용
-    df["DateUTC_dt"] = df["DateUTC"].dt.floor('h').dt.tz_localize(None)  # timezone 제거하여 naive datetime으로 변환
-
-    # KST 시간 계산 (UTC+9) - 참고용으로만 사용 (계산 로직에는 사용하지 않음)
-    kst_dates = []
-    for utc_dt in df["DateUTC"]:
-        # 분, 초, 마이크로초 제거
-        candle_start_time = utc_dt.replace(minute=0, second=0, microsecond=0)
-        kst_dt = candle_start_time.astimezone(KST)  # 참고용
-        kst_dates.append(kst_dt.strftime("%y/%m/%d,%H:00"))
-
-    out = pd.DataFrame({
-        "Date(UTC)": df["DateUTC_dt"],  # UTC 기준 시간 (계산에 사용, Timestamp 객체)
-        "KST": kst_dates,  # KST 시간 (참고용, 계산 로직에는 사용하지 않음)
-        "종": pd.to_numeric(df["close"], errors="coerce"),
-        "시": pd.to_numeric(df["open"], errors="coerce"),
-        "고": pd.to_numeric(df["high"], errors="coerce"),
-        "저": pd.to_numeric(df["low"], errors="coerce"),
-        "Vol.": pd.to_numeric(df["volume"], errors="coerce"),
-    })
-
-    if not include_today:
-        # UTC 기준으로 오늘 날짜 판단 (미완성 캔들 제거)
-        today_utc = dt.datetime.now(tz.UTC).date()
-        # Timestamp 객체에서 date만 추출하여 비교
-        out = out[out["Date(UTC)"].dt.date < today_utc]
-
-    out = out.sort_values("Date(UTC)", ascending=False).reset_index(drop=True)
+    # 벡터화 디코딩: open_time 정렬·중복 제거, 숫자 변환, KST 문자열(YY/MM/DD,HH:00)
+    out = klines_to_frame(all_rows, include_today, kst_time_fmt="%H:00")
 
     return out
 
 def fetch_binance_weekly(symbol: str, total_count: int, include_today: bool = False, fixed_end_time_ms: Optional[int] = None) -> pd.DataFrame:
     """
     바이낸스 주봉(1w) klines, UTC 기준으로 통일하여 반환.
-    페이징 방법 B (backward): endTime부터 과거로 진행
+    페이징: 공용 수집기(_collect_binance_klines)로 모든 페이지 endTime을 미리 계산해 병렬 수집
     
     바이낸스 API 문서:
     - 스팟: GET /api/v3/klines — limit 기본 500, 최대 1000
@@ -6375,114 +8105,41 @@ def fetch_binance_weekly(symbol: str, total_count: int, include_today: bool = Fa
         - Date(UTC): UTC 기준 시간 (계산에 사용)
         - KST: 참고용 (계산 로직에는 사용하지 않음)
     """
-    path = "/fapi/v1/klines"
-    all_rows: List[list] = []
-    seen = set()  # 이미 본 open_time 추적 (중복 방지)
-    remaining = total_count
-    current_end_time = fixed_end_time_ms  # 현재 페이징의 endTime (과거로 진행하면서 갱신됨)
-
-    while remaining > 0:
-        # 바이낸스 스팟 API: limit 최대 1000
-        limit = min(1000, remaining)
-        params = {"symbol": symbol, "interval": "1w", "limit": limit}
-        
-        # 페이징 방법 B: endTime 사용 (과거로 진행)
-        if current_end_time is not None:
-            params["endTime"] = current_end_time
-        # endTime이 None이면 가장 최근 캔들 반환 (바이낸스 API 기본 동작)
-
-        r = _binance_futures_get(path, params)
-        batch = r.json()
-        if not batch:
-            break
-
-        # 중복 방지: 이미 본 open_time은 제외
-        new_rows_count = 0
-        for row in batch:
-            ot = row[0]  # open_time (ms)
-            if ot in seen:
-                continue
-            seen.add(ot)
-            all_rows.append(row)
-            new_rows_count += 1
-        
-        # 페이징 방법 B: 가장 오래된 캔들의 openTime - 1ms로 endTime 갱신 (과거로 진행)
-        # batch는 시간순 정렬되어 있으므로 [0]이 가장 오래된 캔들
-        earliest_open = batch[0][0]  # 배치의 가장 오래된 봉 open_time
-        current_end_time = earliest_open - 1  # 다음 요청: 더 과거로
-        
-        # remaining 감소: 실제로 추가된 새 행 개수만큼만 감소
-        remaining -= new_rows_count
-        
-        # 더 이상 새 데이터가 없으면 종료
-        if new_rows_count == 0:
-            break
-        
-        time.sleep(0.05)  # API 호출 간 안전 여유 (최적화: 0.1 → 0.05)
+    # 공용 수집기: 모든 페이지의 endTime을 미리 계산하여 병렬 수집 (open_time 기준 병합·중복 제거)
+    all_rows: List[list] = _collect_binance_klines(symbol, "1w", total_count, fixed_end_time_ms)
 
     if not all_rows:
         return pd.DataFrame()
 
-    cols = ["open_time","open","high","low","close","volume","close_time",
-            "quote_asset_volume","trades","taker_buy_base","taker_buy_quote","ignore"]
-    df = pd.DataFrame(all_rows, columns=cols)
-
-    # 안정 정렬 + 중복제거(최종 안전벨트)
-    df["open_time"] = df["open_time"].astype("int64", copy=False)
-    df = df.sort_values("open_time", kind="mergesort", ignore_index=True)
-    df = df.loc[~df["open_time"].duplicated(keep="last")].reset_index(drop=True)
-
-    # UTC 기준 날짜 사용 (업비트와 동일한 기준)
-    df["DateUTC"] = pd.to_datetime(df["open_time"], unit="ms", utc=True)
-    # 주봉은 주의 시작 시간 표시 (시간, 분, 초, 마이크로초 제거)
-    date_list = []
-    for _, row in df.iterrows():
-        utc_time = pd.to_datetime(row["open_time"], unit="ms", utc=True)
-        # 주의 시작 시간 (보통 월요일 00:00 UTC)
-        candle_start_time = utc_time.replace(minute=0, second=0, microsecond=0)
-        date_list.append(candle_start_time.strftime("%y/%m/%d,%H:00"))
-    df["Date"] = date_list
-
-    # 심볼에 따른 식별자 설정
-    identifier = symbol.replace("USDT", "") + "USDW"
-
-    # KST 시간 계산 (UTC+9) - 참고용으로만 사용 (계산 로직에는 사용하지 않음)
-    kst_dates = []
-    for utc_date_str in df["Date"]:
-        # YY/MM/DD,HH:00 형식
-        date_part, time_part = utc_date_str.split(',')
-        utc_dt = dt.datetime.strptime(f"{date_part} {time_part}", "%y/%m/%d %H:%M")
-        utc_dt = utc_dt.replace(tzinfo=tz.UTC)
-        # KST로 변환 (참고용)
-        kst_dt = utc_dt.astimezone(KST)
-        kst_dates.append(kst_dt.strftime("%y/%m/%d,%H:00"))
-
-    out = pd.DataFrame({
-        "Date(UTC)": df["Date"],  # UTC 기준 시간 (계산에 사용)
-        "KST": kst_dates,  # KST 시간 (참고용, 계산 로직에는 사용하지 않음)
-        "종": pd.to_numeric(df["close"], errors="coerce"),
-        "시": pd.to_numeric(df["open"], errors="coerce"),
-        "고": pd.to_numeric(df["high"], errors="coerce"),
-        "저": pd.to_numeric(df["low"], errors="coerce"),
-        "Vol.": pd.to_numeric(df["volume"], errors="coerce"),
-    })
+    # 벡터화 디코딩: open_time 정렬·중복 제거, 숫자 변환, KST 문자열(YY/MM/DD,HH:00)
+    # Date(UTC)는 다른 타임프레임과 같이 datetime 유지 (문자열 렌더링은 엑셀 저장 직전 _force_date_text)
+    return klines_to_frame(all_rows, include_today, kst_time_fmt="%H:00")
 
-    if not include_today:
-        # UTC 기준으로 오늘 날짜 판단 (미완성 캔들 제거)
-        today_utc = dt.datetime.now(tz.UTC).date()
-        # 문자열 날짜를 date 객체로 변환하여 비교 (UTC 기준, YY/MM/DD,00:00 형식)
-        out["Date_only"] = out["Date(UTC)"].apply(lambda x: x.split(',')[0] if ',' in str(x) else str(x))
-        out = out[pd.to_datetime(out["Date_only"], format="%y/%m/%d").dt.date < today_utc]
-        out = out.drop("Date_only", axis=1)
-
-    out = out.sort_values("Date(UTC)", ascending=False).reset_index(drop=True)
-    return out
+# -------------------- 일봉 → 주봉 변환 --------------------
+WEEKLY_BASE_COLUMNS = ['종', '시', '고', '저', 'Vol.']
+
+def _week_start_ms(times_ms: np.ndarray) -> np.ndarray:
+    """epoch ms → 그 주 월요일 00:00 UTC epoch ms (바이낸스 주봉 시작, _BUCKET_ORIGIN_MINUTES["1w"] 기준)"""
+    step = TIMEFRAME_BUCKET_MINUTES["1w"] * 60_000
+    origin = _BUCKET_ORIGIN_MINUTES["1w"] * 60_000
+    return (np.asarray(times_ms, dtype=np.int64) - origin) // step * step + origin
+
+def _weekly_base_frame(week_ms: np.ndarray, ohlcv: np.ndarray) -> pd.DataFrame:
+    """주 시작 epoch ms + [종, 시, 고, 저, Vol.] 행 → 주봉 기본 열 DataFrame (Date(UTC) 는 datetime64[ms], KST 는 "YY/MM/DD,09:00" 문자열)"""
+    frame = pd.DataFrame({
+        'Date(UTC)': np.asarray(week_ms, dtype=np.int64).astype(UTC_TIME_DTYPE),
+        'KST': kline_time_labels(week_ms, "09:00"),  # UTC 00:00 = KST 09:00
+    })
+    for position, col in enumerate(WEEKLY_BASE_COLUMNS):
+        frame[col] = ohlcv[:, position]
+    return frame
 
 # 일봉을 주봉으로 변환하는 함수 (API 호출 최적화)
 def convert_daily_to_weekly(df_daily: pd.DataFrame) -> pd.DataFrame:
     """
     일봉 데이터를 주봉 데이터로 변환합니다.
     바이낸스 주봉은 월요일 00:00 UTC부터 시작합니다.
+    주마다 입력 행 순서로 첫 일봉 시가, 마지막 일봉 종가, 고가 최대, 저가 최소, 거래량 합계를 씁니다.
     
     Args:
         df_daily: 일봉 DataFrame (Date(UTC), 종, 시, 고, 저, Vol. 컬럼 포함)
@@ -6493,53 +8150,34 @@ def convert_daily_to_weekly(df_daily: pd.DataFrame) -> pd.DataFrame:
     if df_daily.empty:
         return pd.DataFrame()
     
-    df = df_daily.copy()
-    
-    # Date(UTC)를 datetime으로 변환
-    df['Date(UTC)_dt'] = pd.to_datetime(df['Date(UTC)'], format='%y/%m/%d,%H:%M', errors='coerce')
-    df = df[df['Date(UTC)_dt'].notna()].copy()
+    # Date(UTC) → epoch ms ("YY/MM/DD,HH:MM" 문자열 또는 datetime64, 그 밖의 형식은 제외)
+    times_ms = utc_time_ms(df_daily['Date(UTC)'], text_general=False)
+    valid = np.flatnonzero(times_ms != NO_TIME_MS)
     
-    if df.empty:
+    if len(valid) == 0:
         return pd.DataFrame()
     
-    # 주의 시작일 계산 (월요일 00:00 UTC)
-    # 월요일 = 0, 일요일 = 6
-    df['week_start'] = df['Date(UTC)_dt'] - pd.to_timedelta(df['Date(UTC)_dt'].dt.dayofweek, unit='D')
-    df['week_start'] = df['week_start'].dt.normalize()  # 시간을 00:00:00으로 설정
-    
-    # 주 단위로 그룹화하여 주봉 생성
-    weekly_data = []
-    for week_start, group in df.groupby('week_start', sort=True):
-        # 주의 첫 일봉 시가, 마지막 일봉 종가
-        시가 = float(group.iloc[0]['시'])
-        종가 = float(group.iloc[-1]['종'])
-        고가 = float(group['고'].max())
-        저가 = float(group['저'].min())
-        거래량 = float(group['Vol.'].sum())
-        
-        # 주의 시작일을 Date(UTC) 형식으로 변환
-        week_start_str = week_start.strftime('%y/%m/%d,00:00')
-        
-        # KST 계산 (UTC 00:00 = KST 09:00)
-        kst_dt = week_start.astimezone(KST) if week_start.tz else week_start.replace(tzinfo=tz.UTC).astimezone(KST)
-        kst_str = kst_dt.strftime('%y/%m/%d,09:00')
-        
-        weekly_data.append({
-            'Date(UTC)': week_start_str,
-            'KST': kst_str,
-            '종': 종가,
-            '시': 시가,
-            '고': 고가,
-            '저': 저가,
-            'Vol.': 거래량
-        })
-    
-    df_weekly = pd.DataFrame(weekly_data)
+    # 주의 시작(월요일 00:00 UTC) 오름차순으로 놓고 주가 바뀌는 지점으로 구간 나누기 (주 안에서는 입력 행 순서 유지)
+    week_of_row = _week_start_ms(times_ms[valid])
+    order = valid[np.argsort(week_of_row, kind='stable')]
+    week_ms = _week_start_ms(times_ms[order])
+    new_week = np.r_[True, week_ms[1:] != week_ms[:-1]]
+    starts = np.flatnonzero(new_week)
+    ends = np.r_[starts[1:], len(order)] - 1
+    values = {col: pd.to_numeric(df_daily[col], errors='coerce').to_numpy(dtype=np.float64)[order] for col in WEEKLY_BASE_COLUMNS}
+    
+    # 구간별 집계: 주의 첫 일봉 시가, 마지막 일봉 종가 (입력 행 순서 기준)
+    # 고가/저가는 NaN 무시, 거래량은 NaN을 0으로 행 순서대로 누적 (pandas 합계·증분 집계와 같은 합)
+    ohlcv = np.column_stack([
+        values['종'][ends],
+        values['시'][starts],
+        np.fmax.reduceat(values['고'], starts),
+        np.fmin.reduceat(values['저'], starts),
+        np.bincount(np.cumsum(new_week) - 1, weights=np.nan_to_num(values['Vol.'])),
+    ])
     
     # 최신 주봉이 위로 오도록 정렬 (최신 → 과거)
-    df_weekly = df_weekly.sort_values('Date(UTC)', ascending=False).reset_index(drop=True)
-    
-    return df_weekly
+    return _weekly_base_frame(week_ms[starts][::-1], ohlcv[::-1])
 
 # (업비트 주봉 생성 제거)
 def calculate_buy(fore_or_one, sellside):
@@ -6884,10 +8522,127 @@ def calculate_superfast(sma3, sma5, sma7):
     # 반올림 처리 제거 - 원본 값 그대로 반환
     return final_value
 
-def calculate_4or1(하단, 상단):
+# ---------- SFast/Fast/Base 배열 버전 (df.apply 대체) ----------
+# calculate_superfast / calculate_fast / calculate_base 는 (빠른선 a, 중간선 b, 느린선 c) 세 값에 대해
+# 같은 규칙(6가지 정렬 phase → beta 보간 → add6 → equal phase)을 적용합니다.
+# 아래 함수는 같은 규칙을 NumPy 배열 전체에 한 번에 적용하며, 비교(eps)·나눗셈·덧셈 순서를
+# 스칼라 버전과 동일하게 유지해 결과가 비트 단위로 같습니다. (NaN 입력 행은 NaN)
+def phase_classifier_array(a, b, c, eps: float = 0.0) -> np.ndarray:
     """
-    4or1 지표를 계산합니다.
-    하단/(하단+상단) >= 0.666인 경우: 4 + 비율
+    스칼라 phase 분류기(calculate_base 등)의 벡터화 버전.
+
+    Args:
+        a, b, c: 빠른선/중간선/느린선 SMA 배열 (Series 가능, 길이 동일)
+        eps: 비교 허용오차 (스칼라 버전과 동일하게 0.0)
+
+    Returns:
+        np.ndarray: phase 값 (float64)
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    c = np.asarray(c, dtype=np.float64)
+
+    def gt(x, y):
+        return x > y + eps
+
+    def eq(x, y):
+        return np.abs(x - y) <= eps
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # 1) Strict phase + 2) Beta (조건 순서 = 스칼라 if/elif 순서)
+        orders = [
+            gt(a, b) & gt(b, c),
+            gt(b, a) & gt(a, c),
+            gt(b, c) & gt(c, a),
+            gt(c, b) & gt(b, a),
+            gt(c, a) & gt(a, b),
+            gt(a, c) & gt(c, b),
+        ]
+        phase_strict = np.select(orders, [1, 2, 3, 4, 5, 6], default=0)
+        betas = [
+            np.where(eq(a, c), 0.0, (b - c) / (a - c)),
+            np.where(eq(b, c), 0.0, 1.0 - (a - c) / (b - c)),
+            np.where(eq(b, a), 0.0, (c - a) / (b - a)),
+            np.where(eq(c, a), 0.0, 1.0 - (b - a) / (c - a)),
+            np.where(eq(c, b), 0.0, (a - b) / (c - b)),
+            np.where(eq(a, b), 0.0, 1.0 - (c - b) / (a - b)),
+        ]
+        beta = np.select(orders, betas, default=0.0)
+
+        # 3) add6 조건
+        phase_plus_beta = phase_strict + beta
+        add6 = np.where((phase_plus_beta > 0) & (phase_plus_beta < 1.5), 6, 0)
+
+        # 4) Equal phase
+        equal_phase = np.select(
+            [
+                eq(a, b) & gt(a, c),
+                eq(a, c) & gt(b, a),
+                eq(b, c) & gt(b, a),
+                eq(b, a) & gt(c, b),
+                eq(c, a) & gt(c, b),
+                eq(c, b) & gt(a, c),
+            ],
+            [2, 3, 4, 5, 6, 7],
+            default=0,
+        )
+
+        # 5) 최종값 (NaN 입력 행은 NaN)
+        final_value = phase_plus_beta + add6 + equal_phase
+    return np.where(np.isnan(a) | np.isnan(b) | np.isnan(c), np.nan, final_value)
+
+def calculate_base_array(sma5, sma10, sma20) -> np.ndarray:
+    """Base 지표 배열 버전 (calculate_base 와 동일 규칙)."""
+    return phase_classifier_array(sma5, sma10, sma20)
+
+def calculate_fast_array(sma5, sma7, sma10) -> np.ndarray:
+    """Fast 지표 배열 버전 (calculate_fast 와 동일 규칙)."""
+    return phase_classifier_array(sma5, sma7, sma10)
+
+def calculate_superfast_array(sma3, sma5, sma7) -> np.ndarray:
+    """SuperFast 지표 배열 버전 (calculate_superfast 와 동일 규칙)."""
+    return phase_classifier_array(sma3, sma5, sma7)
+
+def check_phase_classifier_parity(n_samples: int = 20_000, seed: int = 0) -> bool:
+    """
+    배열 버전 ↔ 스칼라 원본(calculate_superfast/fast/base) 무작위 비교.
+    동일값(동률)·NaN·±inf·아주 가까운 값이 섞인 입력을 생성해 모든 분기를 통과시킵니다.
+    Returns: 모두 비트 일치하면 True
+    """
+    rng = np.random.default_rng(seed)
+    base = rng.normal(100.0, 5.0, size=(n_samples, 3))
+    pool = np.array([100.0, 100.0 + 1e-12, 99.5, np.nan, np.inf, -np.inf, 0.0])
+    # 일부 칸을 같은 행의 다른 칸으로 복사 → 동률(equal phase) 분기
+    for col in range(3):
+        tie_rows = rng.random(n_samples) < 0.15
+        base[tie_rows, col] = base[tie_rows, (col + 1) % 3]
+    # 일부 칸을 특수값으로 치환 → NaN/inf/근접값 분기
+    special = rng.random((n_samples, 3)) < 0.05
+    base[special] = rng.choice(pool, size=int(special.sum()))
+    a, b, c = base[:, 0], base[:, 1], base[:, 2]
+    ok = True
+    for name, scalar_fn, array_fn in (
+        ("SFast", calculate_superfast, calculate_superfast_array),
+        ("Fast", calculate_fast, calculate_fast_array),
+        ("Base", calculate_base, calculate_base_array),
+    ):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            expected = np.array([scalar_fn(x, y, z) for x, y, z in zip(a, b, c)], dtype=np.float64)
+        got = array_fn(a, b, c)
+        mismatch = ~((expected == got) | (np.isnan(expected) & np.isnan(got)))
+        if mismatch.any():
+            ok = False
+            first = int(np.flatnonzero(mismatch)[0])
+            print(f"{get_timestamp()} ❌[phase 검증] {name}: {int(mismatch.sum())}건 불일치 "
+                  f"(예: {a[first]}, {b[first]}, {c[first]} → 스칼라 {expected[first]} / 배열 {got[first]})")
+    if ok:
+        print(f"{get_timestamp()} ✅[phase 검증] SFast/Fast/Base {n_samples:,}개 무작위 입력: 스칼라 원본과 비트 일치")
+    return ok
+
+def calculate_4or1(하단, 상단):
+    """
+    4or1 지표를 계산합니다.
+    하단/(하단+상단) >= 0.666인 경우: 4 + 비율
     하단/(하단+상단) < 0.666인 경우: 1 + 비율
     """
     # NaN 체크
@@ -6910,6 +8665,179 @@ def calculate_4or1(하단, 상단):
     else:
         return 1.0 + ratio  # 1.000 ~ 1.665
 
+# ---------- 시그널 레이어 배열 버전 (df.apply 대체) ----------
+# 하단/상단, 4or1, buyside/sellside, Buy/Sell, 1HMSFast, SPRD, 1HCLASS 계열, Samount/Bamount 를
+# 컬럼 단위로 계산합니다. 각 함수는 같은 이름의 스칼라 함수(또는 기존 lambda)와 비교·연산 순서가
+# 같아 결과가 동일합니다. Buy/Sell 은 기존처럼 "buy"/"sell"/"" 문자열을 돌려줍니다.
+def _float_array(values) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64)
+
+def band_distance_array(close, level) -> np.ndarray:
+    """하단/상단: abs((종 - 기준) / 기준), 기준이 NaN이면 NaN."""
+    close = _float_array(close)
+    level = _float_array(level)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.abs((close - level) / level)
+
+def calculate_4or1_array(하단, 상단) -> np.ndarray:
+    """calculate_4or1 배열 버전."""
+    lower = _float_array(하단)
+    upper = _float_array(상단)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        denominator = upper + lower
+        ratio = lower / denominator
+        out = np.where(ratio >= 0.666, 4.0 + ratio, 1.0 + ratio)
+    # 상단·하단이 모두 0이거나 분모가 0이면 1.0
+    out = np.where((lower == 0) & (upper == 0) | (denominator == 0), 1.0, out)
+    return np.where(np.isnan(lower) | np.isnan(upper), np.nan, out)
+
+def _pow2_like_python(values: np.ndarray) -> np.ndarray:
+    """value ** 2 를 파이썬 float 거듭제곱(libm pow)과 같게 계산.
+    NumPy의 x ** 2 는 x * x 로 계산되어 pow 결과와 마지막 자리가 다를 수 있습니다 (약 0.07%)."""
+    return np.array([value ** 2 for value in values.tolist()], dtype=np.float64)
+
+def _sellside_component(value: np.ndarray) -> np.ndarray:
+    abs_value = np.abs(value)
+    inside = (1.5 <= abs_value) & (abs_value <= 7.5)
+    return np.where(inside, (1/9) * _pow2_like_python(abs_value) - abs_value + (9/4), 0)
+
+def _buyside_component(value: np.ndarray) -> np.ndarray:
+    abs_value = np.abs(value)
+    squared = _pow2_like_python(abs_value)
+    return np.select(
+        [(1.5 <= abs_value) & (abs_value <= 4.5), (4.5 <= abs_value) & (abs_value <= 7.5)],
+        [(-1/9) * squared + (1/3) * abs_value + (3/4), (-1/9) * squared + (5/3) * abs_value - (21/4)],
+        default=0,
+    )
+
+def calculate_sellside_array(sfast, fast, base) -> np.ndarray:
+    """calculate_sellside 배열 버전 (SFast만 0.5 시프트 전처리)."""
+    sfast, fast, base = _float_array(sfast), _float_array(fast), _float_array(base)
+    adjusted = sfast - 0.5
+    sellside_sfast = np.where(adjusted < 1.5, adjusted + 6, adjusted)
+    result = (2/4.45 * _sellside_component(sellside_sfast)) + (1.15/4.45 * _sellside_component(fast)) + (1.3/4.45 * _sellside_component(base))
+    return np.where(np.isnan(sfast) | np.isnan(fast) | np.isnan(base), np.nan, result)
+
+def calculate_buyside_array(sfast, fast, base) -> np.ndarray:
+    """calculate_buyside 배열 버전."""
+    sfast, fast, base = _float_array(sfast), _float_array(fast), _float_array(base)
+    result = 1 - (2/4.45 * _buyside_component(sfast) + 1.15/4.45 * _buyside_component(fast) + 1.3/4.45 * _buyside_component(base))
+    return np.where(np.isnan(sfast) | np.isnan(fast) | np.isnan(base), np.nan, result)
+
+def calculate_buy_array(fore_or_one, sellside, threshold: float = 0.05) -> np.ndarray:
+    """calculate_buy 배열 버전: 4or1 < 4 이고 sellside <= threshold 이면 "buy" (1H4x는 threshold=0.1)."""
+    fore_or_one, sellside = _float_array(fore_or_one), _float_array(sellside)
+    return np.where((fore_or_one < 4) & (sellside <= threshold), "buy", "")
+
+def calculate_sell_array(fore_or_one, buyside, threshold: float = 0.05) -> np.ndarray:
+    """calculate_sell 배열 버전 (일봉용): 4or1 >= 4 이고 buyside <= threshold 이면 "sell"."""
+    fore_or_one, buyside = _float_array(fore_or_one), _float_array(buyside)
+    return np.where((fore_or_one >= 4) & (buyside <= threshold), "sell", "")
+
+def calculate_sell_short_array(buyside, threshold: float = 0.05) -> np.ndarray:
+    """calculate_sell_short 배열 버전: buyside <= threshold 이면 "sell" (1H4x는 threshold=0.1150)."""
+    return np.where(_float_array(buyside) <= threshold, "sell", "")
+
+def calculate_1hmsfast_array(fast_line, mid_line, slow_line) -> np.ndarray:
+    """calculate_1hmsfast / _15m / _1h4x 배열 버전 (세 함수 모두 같은 phase 규칙)."""
+    return phase_classifier_array(fast_line, mid_line, slow_line)
+
+def spread_ratio_array(a, b, c) -> np.ndarray:
+    """SPRD/SPRD2: (max - min) / min, 하나라도 NaN이거나 min <= 0 이면 NaN."""
+    a, b, c = _float_array(a), _float_array(b), _float_array(c)
+    high = np.maximum(np.maximum(a, b), c)
+    low = np.minimum(np.minimum(a, b), c)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = (high - low) / low
+    return np.where(low > 0, ratio, np.nan)
+
+def phase_band_count_array(columns, lower: float, upper: float, outside: bool = False, score: int = 1) -> np.ndarray:
+    """
+    1HCLASS/-1HCLASS/p1H: 각 컬럼 값이 [lower, upper) 안이면(outside=True면 밖이면) score, 총합 (NaN은 0).
+    """
+    total = np.zeros(len(columns[0]), dtype=np.int64)
+    for column in columns:
+        values = _float_array(column)
+        hit = (values < lower) | (values >= upper) if outside else (lower <= values) & (values < upper)
+        total += np.where(hit, score, 0)
+    return total
+
+def round_to_precision(values, precision: int) -> np.ndarray:
+    """파이썬 round(value, precision)와 같은 값을 내는 벡터 반올림 (NaN은 NaN).
+    np.round(배율 반올림)는 value*10^precision 곱셈 오차로 .5 경계 근처에서만 round(정확한 십진 반올림)와 갈리므로,
+    경계에서 1e-6 이내인 원소만 round로 다시 계산."""
+    values = _float_array(values)
+    out = np.round(values, precision)
+    with np.errstate(invalid="ignore", over="ignore"):
+        scaled = values * 10.0 ** precision
+        near_half = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_half):
+        out[i] = round(float(values[i]), precision)
+    return out
+
+def side_amount_array(side, trading_unit, precision: int) -> np.ndarray:
+    """Samount/Bamount: round((1 - side) * TRADING_UNIT, precision), side가 NaN이면 NaN."""
+    return round_to_precision((1 - _float_array(side)) * trading_unit, precision)
+
+def check_signal_layer_parity(n_samples: int = 20_000, seed: int = 0) -> bool:
+    """
+    시그널 레이어 배열 버전 ↔ 스칼라 원본 무작위 비교 (NaN·경계값 포함).
+    Returns: 모두 일치하면 True
+    """
+    rng = np.random.default_rng(seed)
+
+    def sample(low, high, edges):
+        values = rng.uniform(low, high, n_samples)
+        pick = rng.random(n_samples) < 0.2
+        values[pick] = rng.choice(np.array(edges, dtype=np.float64), size=int(pick.sum()))
+        return values
+
+    phase_edges = [np.nan, 0.0, 1.5, 2.0, 4.5, 5.0, 6.5, 7.0, 7.5, 8.0, -1.5]
+    sfast, fast, base = (sample(0, 9, phase_edges) for _ in range(3))
+    lower, upper = sample(0, 0.2, [np.nan, 0.0]), sample(0, 0.2, [np.nan, 0.0])
+    fore_or_one = sample(1, 5, [np.nan, 4.0])
+    side = sample(-0.2, 1.2, [np.nan, 0.05, 0.1, 0.115, 0.125, 0.375])
+    close, level = sample(90, 110, [np.nan]), sample(90, 110, [np.nan])
+
+    def scalar(fn, *cols):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.array([fn(*vals) for vals in zip(*cols)], dtype=object)
+
+    cases = [
+        ("하단/상단", scalar(lambda c, m: abs((c - m) / m) if not pd.isna(m) else np.nan, close, level), band_distance_array(close, level)),
+        ("4or1", scalar(calculate_4or1, lower, upper), calculate_4or1_array(lower, upper)),
+        ("buyside", scalar(calculate_buyside, sfast, fast, base), calculate_buyside_array(sfast, fast, base)),
+        ("sellside", scalar(calculate_sellside, sfast, fast, base), calculate_sellside_array(sfast, fast, base)),
+        ("Buy", scalar(calculate_buy, fore_or_one, side), calculate_buy_array(fore_or_one, side)),
+        ("Buy(1H4x)", scalar(calculate_buy_1h4x, fore_or_one, side), calculate_buy_array(fore_or_one, side, threshold=0.1)),
+        ("Sell", scalar(calculate_sell, fore_or_one, side), calculate_sell_array(fore_or_one, side)),
+        ("Sell(short)", scalar(calculate_sell_short, side), calculate_sell_short_array(side)),
+        ("Sell(1H4x)", scalar(calculate_sell_short_1h4x, side), calculate_sell_short_array(side, threshold=0.1150)),
+        ("1HMSFast", scalar(calculate_1hmsfast, close, level, sfast + 95), calculate_1hmsfast_array(close, level, sfast + 95)),
+        ("SPRD", scalar(lambda a, b, c: (max(a, b, c) - min(a, b, c)) / min(a, b, c)
+                        if not pd.isna(a) and not pd.isna(b) and not pd.isna(c) and min(a, b, c) > 0 else np.nan, close, level, side),
+         spread_ratio_array(close, level, side)),
+        ("1HCLASS", scalar(lambda *v: sum(1 if pd.notna(x) and 2 <= x < 5 else 0 for x in v), sfast, fast, base),
+         phase_band_count_array([sfast, fast, base], 2, 5)),
+        ("-1HCLASS", scalar(lambda *v: sum(-1 if pd.notna(x) and (x < 2 or x >= 7) else 0 for x in v), sfast, fast, base),
+         phase_band_count_array([sfast, fast, base], 2, 7, outside=True, score=-1)),
+        ("Samount", scalar(lambda b: round((1 - b) * TRADING_UNIT, 3) if not pd.isna(b) else np.nan, side), side_amount_array(side, TRADING_UNIT, 3)),
+    ]
+    ok = True
+    for name, expected, got in cases:
+        expected = pd.Series(expected).infer_objects()
+        got = pd.Series(got)
+        if expected.dtype.kind in "fi":
+            same = np.array_equal(expected.to_numpy(dtype=np.float64), got.to_numpy(dtype=np.float64), equal_nan=True)
+        else:
+            same = expected.astype(str).tolist() == got.astype(str).tolist()
+        if not same:
+            ok = False
+            print(f"{get_timestamp()} ❌[시그널 검증] {name}: 스칼라 원본과 불일치")
+    if ok:
+        print(f"{get_timestamp()} ✅[시그널 검증] {len(cases)}개 시그널 {n_samples:,}개 무작위 입력: 스칼라 원본과 일치")
+    return ok
+
 def calculate_all_indicators(df, market_type):
     """
     모든 지표를 한 번에 계산합니다.
@@ -6921,51 +8849,48 @@ def calculate_all_indicators(df, market_type):
     df = df.sort_values("Date(UTC)").reset_index(drop=True)
     
     # SMA 계산 (3, 5, 7, 10, 20일)
-    df["SMA3"] = df["종"].rolling(window=3, min_periods=3).mean()
-    df["SMA5"] = df["종"].rolling(window=5, min_periods=5).mean()
-    df["SMA7"] = df["종"].rolling(window=7, min_periods=7).mean()
-    df["SMA10"] = df["종"].rolling(window=10, min_periods=10).mean()
-    df["SMA20"] = df["종"].rolling(window=20, min_periods=20).mean()
+    closes = df["종"].to_numpy(dtype=np.float64)
+    for window in (3, 5, 7, 10, 20):
+        df[f"SMA{window}"] = reverse_window_sma(closes, window, newest_first=False)
     
     # Max15, Min15 계산 (15일 동안의 시고저종에서 최고가와 최저가)
-    df["Max15"] = df[["시", "고", "저", "종"]].rolling(window=15, min_periods=15).max().max(axis=1)
-    df["Min15"] = df[["시", "고", "저", "종"]].rolling(window=15, min_periods=15).min().min(axis=1)
+    df["Max15"], df["Min15"] = ohlc_window_extrema(df, 15, newest_first=False)
     
     # 하단, 상단 계산 (Max15/Min15이 NaN이면 NaN)
-    df["하단"] = df.apply(lambda row: abs((row["종"] - row["Min15"]) / row["Min15"]) if not pd.isna(row["Min15"]) else np.nan, axis=1)
-    df["상단"] = df.apply(lambda row: abs((row["종"] - row["Max15"]) / row["Max15"]) if not pd.isna(row["Max15"]) else np.nan, axis=1)
+    df["하단"] = band_distance_array(df["종"], df["Min15"])
+    df["상단"] = band_distance_array(df["종"], df["Max15"])
     
     # SFast 계산
-    df["SFast"] = df.apply(lambda row: calculate_superfast(row["SMA3"], row["SMA5"], row["SMA7"]), axis=1)
+    df["SFast"] = calculate_superfast_array(df["SMA3"], df["SMA5"], df["SMA7"])
     
     # Fast 계산
-    df["Fast"] = df.apply(lambda row: calculate_fast(row["SMA5"], row["SMA7"], row["SMA10"]), axis=1)
+    df["Fast"] = calculate_fast_array(df["SMA5"], df["SMA7"], df["SMA10"])
     
     # Base 계산
-    df["Base"] = df.apply(lambda row: calculate_base(row["SMA5"], row["SMA10"], row["SMA20"]), axis=1)
+    df["Base"] = calculate_base_array(df["SMA5"], df["SMA10"], df["SMA20"])
     
     # 4or1 계산
-    df["4or1"] = df.apply(lambda row: calculate_4or1(row["하단"], row["상단"]), axis=1)
+    df["4or1"] = calculate_4or1_array(df["하단"], df["상단"])
     
     # buyside 계산
-    df["buyside"] = df.apply(lambda row: calculate_buyside(row["SFast"], row["Fast"], row["Base"]), axis=1)
+    df["buyside"] = calculate_buyside_array(df["SFast"], df["Fast"], df["Base"])
     
     # sellside 계산
-    df["sellside"] = df.apply(lambda row: calculate_sellside(row["SFast"], row["Fast"], row["Base"]), axis=1)
+    df["sellside"] = calculate_sellside_array(df["SFast"], df["Fast"], df["Base"])
     
     # Buy 계산
-    df["Buy"] = df.apply(lambda row: calculate_buy(row["4or1"], row["sellside"]), axis=1)
+    df["Buy"] = calculate_buy_array(df["4or1"], df["sellside"])
     
     # Sell 계산
-    df["Sell"] = df.apply(lambda row: calculate_sell(row["4or1"], row["buyside"]), axis=1)
+    df["Sell"] = calculate_sell_array(df["4or1"], df["buyside"])
     
     # Samount1D 계산: (1-buyside) * 1unit (티커별 USDT 정밀도 적용)
     symbol = f"{TICKER}USDT"
     usdt_precision = SYMBOL_USDT_PRECISION.get(symbol, 5)
-    df["Samount1D"] = df.apply(lambda row: round((1 - row["buyside"]) * TRADING_UNIT, usdt_precision) if not pd.isna(row["buyside"]) else np.nan, axis=1)
+    df["Samount1D"] = side_amount_array(df["buyside"], TRADING_UNIT, usdt_precision)
     
     # Bamount1D 계산: (1-sellside) * 1unit (티커별 USDT 정밀도 적용)
-    df["Bamount1D"] = df.apply(lambda row: round((1 - row["sellside"]) * TRADING_UNIT, usdt_precision) if not pd.isna(row["sellside"]) else np.nan, axis=1)
+    df["Bamount1D"] = side_amount_array(df["sellside"], TRADING_UNIT, usdt_precision)
     
     # 최신→과거로 재정렬
     df = df.sort_values("Date(UTC)", ascending=False).reset_index(drop=True)
@@ -6987,43 +8912,40 @@ def calculate_all_indicators_5m(df, market_type):
     df = df.sort_values("Date(UTC)").reset_index(drop=True)
     
     # SMA 계산 (3, 5, 7, 10, 20일)
-    df["SMA3"] = df["종"].rolling(window=3, min_periods=3).mean()
-    df["SMA5"] = df["종"].rolling(window=5, min_periods=5).mean()
-    df["SMA7"] = df["종"].rolling(window=7, min_periods=7).mean()
-    df["SMA10"] = df["종"].rolling(window=10, min_periods=10).mean()
-    df["SMA20"] = df["종"].rolling(window=20, min_periods=20).mean()
+    closes = df["종"].to_numpy(dtype=np.float64)
+    for window in (3, 5, 7, 10, 20):
+        df[f"SMA{window}"] = reverse_window_sma(closes, window, newest_first=False)
     
     # Max200, Min200 계산 (200일 동안의 시고저종에서 최고가와 최저가)
-    df["Max200"] = df[["시", "고", "저", "종"]].rolling(window=200, min_periods=200).max().max(axis=1)
-    df["Min200"] = df[["시", "고", "저", "종"]].rolling(window=200, min_periods=200).min().min(axis=1)
+    df["Max200"], df["Min200"] = ohlc_window_extrema(df, 200, newest_first=False)
     
     # 하단, 상단 계산 (Max200/Min200이 NaN이면 NaN)
-    df["하단"] = df.apply(lambda row: abs((row["종"] - row["Min200"]) / row["Min200"]) if not pd.isna(row["Min200"]) else np.nan, axis=1)
-    df["상단"] = df.apply(lambda row: abs((row["종"] - row["Max200"]) / row["Max200"]) if not pd.isna(row["Max200"]) else np.nan, axis=1)
+    df["하단"] = band_distance_array(df["종"], df["Min200"])
+    df["상단"] = band_distance_array(df["종"], df["Max200"])
     
     # SFast 계산
-    df["SFast"] = df.apply(lambda row: calculate_superfast(row["SMA3"], row["SMA5"], row["SMA7"]), axis=1)
+    df["SFast"] = calculate_superfast_array(df["SMA3"], df["SMA5"], df["SMA7"])
     
     # Fast 계산
-    df["Fast"] = df.apply(lambda row: calculate_fast(row["SMA5"], row["SMA7"], row["SMA10"]), axis=1)
+    df["Fast"] = calculate_fast_array(df["SMA5"], df["SMA7"], df["SMA10"])
     
     # Base 계산
-    df["Base"] = df.apply(lambda row: calculate_base(row["SMA5"], row["SMA10"], row["SMA20"]), axis=1)
+    df["Base"] = calculate_base_array(df["SMA5"], df["SMA10"], df["SMA20"])
     
     # 4or1 계산
-    df["4or1"] = df.apply(lambda row: calculate_4or1(row["하단"], row["상단"]), axis=1)
+    df["4or1"] = calculate_4or1_array(df["하단"], df["상단"])
     
     # buyside 계산
-    df["buyside"] = df.apply(lambda row: calculate_buyside(row["SFast"], row["Fast"], row["Base"]), axis=1)
+    df["buyside"] = calculate_buyside_array(df["SFast"], df["Fast"], df["Base"])
     
     # sellside 계산
-    df["sellside"] = df.apply(lambda row: calculate_sellside(row["SFast"], row["Fast"], row["Base"]), axis=1)
+    df["sellside"] = calculate_sellside_array(df["SFast"], df["Fast"], df["Base"])
     
     # Buy 계산
-    df["Buy"] = df.apply(lambda row: calculate_buy(row["4or1"], row["sellside"]), axis=1)
+    df["Buy"] = calculate_buy_array(df["4or1"], df["sellside"])
     
     # Sell 계산 (15분봉용 - 4or1 없이 buyside만 사용)
-    df["Sell"] = df.apply(lambda row: calculate_sell_short(row["buyside"]), axis=1)
+    df["Sell"] = calculate_sell_short_array(df["buyside"])
     
     # 최신→과거 순서로 다시 정렬
     df = df.sort_values("Date(UTC)", ascending=False).reset_index(drop=True)
@@ -7069,60 +8991,44 @@ def calculate_all_indicators_15m(df, market_type):
     #   PREVIOUS: for idx in range(len(df)): df.loc[idx, "SMA200"] = df.iloc[idx:idx+200]["종"].mean()
     #   AFTER:    df.loc[0, "SMA200"] = df.iloc[0:200]["종"].mean()
     #   → 두 방식 모두 동일한 결과: 각 행(idx)을 포함한 최근 200개 캔들의 종가 평균
-    for idx in range(len(df)):
-        df.loc[idx, "SMA3"] = df.iloc[idx:idx+3]["종"].mean() if idx + 3 <= len(df) else np.nan
-        df.loc[idx, "SMA5"] = df.iloc[idx:idx+5]["종"].mean() if idx + 5 <= len(df) else np.nan
-        df.loc[idx, "SMA7"] = df.iloc[idx:idx+7]["종"].mean() if idx + 7 <= len(df) else np.nan
-        df.loc[idx, "SMA10"] = df.iloc[idx:idx+10]["종"].mean() if idx + 10 <= len(df) else np.nan
-        df.loc[idx, "SMA12"] = df.iloc[idx:idx+12]["종"].mean() if idx + 12 <= len(df) else np.nan
-        df.loc[idx, "SMA20"] = df.iloc[idx:idx+20]["종"].mean() if idx + 20 <= len(df) else np.nan
-        df.loc[idx, "SMA25"] = df.iloc[idx:idx+25]["종"].mean() if idx + 25 <= len(df) else np.nan
-        df.loc[idx, "SMA50"] = df.iloc[idx:idx+50]["종"].mean() if idx + 50 <= len(df) else np.nan
-        df.loc[idx, "SMA100"] = df.iloc[idx:idx+100]["종"].mean() if idx + 100 <= len(df) else np.nan
-        df.loc[idx, "SMA200"] = df.iloc[idx:idx+200]["종"].mean() if idx + 200 <= len(df) else np.nan
-        df.loc[idx, "SMA400"] = df.iloc[idx:idx+400]["종"].mean() if idx + 400 <= len(df) else np.nan
-        df.loc[idx, "SMA800"] = df.iloc[idx:idx+800]["종"].mean() if idx + 800 <= len(df) else np.nan
+    #   → 공용 커널 reverse_window_sma 가 같은 창·같은 합산 순서로 전체 행을 한 번에 계산
+    closes = df["종"].to_numpy(dtype=np.float64)
+    for window in (3, 5, 7, 10, 12, 20, 25, 50, 100, 200, 400, 800):
+        df[f"SMA{window}"] = reverse_window_sma(closes, window)
     
     # SMAF: SMA3·SMA12 66:34 가중평균
     df["SMAF"] = df["SMA3"] * 0.66 + df["SMA12"] * 0.34
     
     # Max70, Min70 계산: 각 행(idx)에서 그 행부터 앞으로(과거로) 70개까지의 최고가/최저가
-    for idx in range(len(df)):
-        if idx + 70 <= len(df):
-            window_data = df.iloc[idx:idx+70][["시", "고", "저", "종"]]
-            df.loc[idx, "Max70"] = window_data.values.max()
-            df.loc[idx, "Min70"] = window_data.values.min()
-        else:
-            df.loc[idx, "Max70"] = np.nan
-            df.loc[idx, "Min70"] = np.nan
+    df["Max70"], df["Min70"] = ohlc_window_extrema(df, 70)
     
     # 하단, 상단 계산 (Max70/Min70이 NaN이면 NaN)
-    df["하단"] = df.apply(lambda row: abs((row["종"] - row["Min70"]) / row["Min70"]) if not pd.isna(row["Min70"]) else np.nan, axis=1)
-    df["상단"] = df.apply(lambda row: abs((row["종"] - row["Max70"]) / row["Max70"]) if not pd.isna(row["Max70"]) else np.nan, axis=1)
+    df["하단"] = band_distance_array(df["종"], df["Min70"])
+    df["상단"] = band_distance_array(df["종"], df["Max70"])
     
     # SFast 계산
-    df["SFast"] = df.apply(lambda row: calculate_superfast(row["SMA3"], row["SMA5"], row["SMA7"]), axis=1)
+    df["SFast"] = calculate_superfast_array(df["SMA3"], df["SMA5"], df["SMA7"])
     
     # Fast 계산
-    df["Fast"] = df.apply(lambda row: calculate_fast(row["SMA5"], row["SMA7"], row["SMA10"]), axis=1)
+    df["Fast"] = calculate_fast_array(df["SMA5"], df["SMA7"], df["SMA10"])
     
     # Base 계산
-    df["Base"] = df.apply(lambda row: calculate_base(row["SMA5"], row["SMA10"], row["SMA20"]), axis=1)
+    df["Base"] = calculate_base_array(df["SMA5"], df["SMA10"], df["SMA20"])
     
     # 4or1 계산
-    df["4or1"] = df.apply(lambda row: calculate_4or1(row["하단"], row["상단"]), axis=1)
+    df["4or1"] = calculate_4or1_array(df["하단"], df["상단"])
     
     # buyside 계산
-    df["buyside"] = df.apply(lambda row: calculate_buyside(row["SFast"], row["Fast"], row["Base"]), axis=1)
+    df["buyside"] = calculate_buyside_array(df["SFast"], df["Fast"], df["Base"])
     
     # sellside 계산
-    df["sellside"] = df.apply(lambda row: calculate_sellside(row["SFast"], row["Fast"], row["Base"]), axis=1)
+    df["sellside"] = calculate_sellside_array(df["SFast"], df["Fast"], df["Base"])
     
     # Buy 계산
-    df["Buy"] = df.apply(lambda row: calculate_buy(row["4or1"], row["sellside"]), axis=1)
+    df["Buy"] = calculate_buy_array(df["4or1"], df["sellside"])
     
     # Sell 계산 (15분봉용: buyside만 사용)
-    df["Sell"] = df.apply(lambda row: calculate_sell_short(row["buyside"]), axis=1)
+    df["Sell"] = calculate_sell_short_array(df["buyside"])
     
     # SamountW, BamountW 열 초기화 (주봉에서 복사될 예정)
     df["SamountW"] = np.nan
@@ -7133,18 +9039,10 @@ def calculate_all_indicators_15m(df, market_type):
     df["Bamount1D"] = np.nan
     
     # SPRD 계산: (max(sma25,sma100,sma200)-min(sma25,sma100,sma200))/min(sma25,sma100,sma200)
-    df["SPRD"] = df.apply(lambda row: (
-        (max(row["SMA25"], row["SMA100"], row["SMA200"]) - min(row["SMA25"], row["SMA100"], row["SMA200"])) / min(row["SMA25"], row["SMA100"], row["SMA200"])
-        if not pd.isna(row["SMA25"]) and not pd.isna(row["SMA100"]) and not pd.isna(row["SMA200"]) and min(row["SMA25"], row["SMA100"], row["SMA200"]) > 0
-        else np.nan
-    ), axis=1)
+    df["SPRD"] = spread_ratio_array(df["SMA25"], df["SMA100"], df["SMA200"])
     
     # SPRD2 계산: (max(저가,sma100,sma200)-min(저가,sma100,sma200))/min(저가,sma100,sma200)
-    df["SPRD2"] = df.apply(lambda row: (
-        (max(row["저"], row["SMA100"], row["SMA200"]) - min(row["저"], row["SMA100"], row["SMA200"])) / min(row["저"], row["SMA100"], row["SMA200"])
-        if not pd.isna(row["저"]) and not pd.isna(row["SMA100"]) and not pd.isna(row["SMA200"]) and min(row["저"], row["SMA100"], row["SMA200"]) > 0
-        else np.nan
-    ), axis=1)
+    df["SPRD2"] = spread_ratio_array(df["저"], df["SMA100"], df["SMA200"])
     
     # KSC 열 초기화 (숫자만 저장)
     df["KSC"] = 0
@@ -7160,7 +9058,7 @@ def calculate_all_indicators_15m(df, market_type):
     
     # 1HMSFast 계산 (15M 시트: SMAF, SMA100, SMA200 사용, 종가 없음)
     # 각 행은 자신의 SMAF, SMA100, SMA200으로 계산 (shift 없음)
-    df["1HMSFast"] = df.apply(lambda row: calculate_1hmsfast_15m(row["SMAF"], row["SMA100"], row["SMA200"]), axis=1)
+    df["1HMSFast"] = calculate_1hmsfast_array(df["SMAF"], df["SMA100"], df["SMA200"])
     
     # LS 열: -1/1 기존 + 0.5(롱약)/-0.5(숏약) 5가지씩 추가
     # 각 행(idx) = 현재행, 다음 행(idx+1) = 직전행. 최신→과거 순서.
@@ -7202,23 +9100,8 @@ def calculate_all_indicators_1h(df, market_type):
     if df.empty:
         return df
     
-    # Date(UTC) 컬럼 정규화 (Timestamp와 문자열 혼합 방지)
-    if 'Date(UTC)' in df.columns:
-        if df['Date(UTC)'].dtype == 'object':
-            # format 명시하여 파싱 시도 (연도/일 혼동 방지)
-            try:
-                df['Date(UTC)'] = pd.to_datetime(df['Date(UTC)'], format='%y/%m/%d,%H:%M', errors='coerce')
-            except:
-                # 쉼표 제거 후 형식 시도
-                try:
-                    df['Date(UTC)'] = df['Date(UTC)'].astype(str).str.replace(',', ' ', regex=False).str.strip()
-                    df['Date(UTC)'] = pd.to_datetime(df['Date(UTC)'], format='%y/%m/%d %H:%M', errors='coerce')
-                except:
-                    # fallback: format 없이 파싱
-                    df['Date(UTC)'] = pd.to_datetime(df['Date(UTC)'], errors='coerce')
-        else:
-            # 이미 datetime 타입이면 그대로 사용
-            pass
+    # Date(UTC) 정규화: datetime64가 아니면 한 번만 변환 (Timestamp와 문자열 혼합 방지)
+    ensure_utc_time(df)
     
     # ⚠️중요: 입력 데이터를 확실하게 현재→과거 순서로 정렬 (SMA 계산 일관성 보장)
     # 데이터 수집 과정에서 정렬이 여러 번 섞일 수 있으므로, 계산 직전에 확실하게 정렬
@@ -7240,82 +9123,54 @@ def calculate_all_indicators_1h(df, market_type):
         if col not in df.columns:
             df[col] = np.nan
     
-    # SMA 계산: 각 행(idx)에서 그 행부터 앞으로(과거로) window개까지의 평균
-    for idx in range(len(df)):
-        df.loc[idx, "SMA25"] = df.iloc[idx:idx+25]["종"].mean() if idx + 25 <= len(df) else np.nan
-        df.loc[idx, "SMA100"] = df.iloc[idx:idx+100]["종"].mean() if idx + 100 <= len(df) else np.nan
-        df.loc[idx, "SMA200"] = df.iloc[idx:idx+200]["종"].mean() if idx + 200 <= len(df) else np.nan
-        df.loc[idx, "SMA400"] = df.iloc[idx:idx+400]["종"].mean() if idx + 400 <= len(df) else np.nan
-        df.loc[idx, "SMA800"] = df.iloc[idx:idx+800]["종"].mean() if idx + 800 <= len(df) else np.nan
+    # SMA 계산: 각 행(idx)에서 그 행부터 앞으로(과거로) window개까지의 평균 (공용 커널)
+    closes = df["종"].to_numpy(dtype=np.float64)
+    for window in (25, 100, 200, 400, 800):
+        df[f"SMA{window}"] = reverse_window_sma(closes, window)
     
     # Max200, Min200 계산: 각 행(idx)에서 그 행부터 앞으로(과거로) 200개까지의 최고가/최저가
-    for idx in range(len(df)):
-        if idx + 200 <= len(df):
-            window_data = df.iloc[idx:idx+200][["시", "고", "저", "종"]]
-            df.loc[idx, "Max200"] = window_data.values.max()
-            df.loc[idx, "Min200"] = window_data.values.min()
-        else:
-            df.loc[idx, "Max200"] = np.nan
-            df.loc[idx, "Min200"] = np.nan
+    df["Max200"], df["Min200"] = ohlc_window_extrema(df, 200)
     
     # 하단, 상단 계산 (Max200/Min200이 NaN이면 NaN)
-    df["하단"] = df.apply(lambda row: abs((row["종"] - row["Min200"]) / row["Min200"]) if not pd.isna(row["Min200"]) else np.nan, axis=1)
-    df["상단"] = df.apply(lambda row: abs((row["종"] - row["Max200"]) / row["Max200"]) if not pd.isna(row["Max200"]) else np.nan, axis=1)
+    df["하단"] = band_distance_array(df["종"], df["Min200"])
+    df["상단"] = band_distance_array(df["종"], df["Max200"])
     
     # SFast 계산 (SMA25, SMA100, SMA200 사용)
-    df["SFast"] = df.apply(lambda row: calculate_superfast(row["SMA25"], row["SMA100"], row["SMA200"]), axis=1)
+    df["SFast"] = calculate_superfast_array(df["SMA25"], df["SMA100"], df["SMA200"])
     
     # Fast 계산 (SMA25, SMA200, SMA400 사용)
-    df["Fast"] = df.apply(lambda row: calculate_fast(row["SMA25"], row["SMA200"], row["SMA400"]), axis=1)
+    df["Fast"] = calculate_fast_array(df["SMA25"], df["SMA200"], df["SMA400"])
     
     # Base 계산 (SMA25, SMA400, SMA800 사용)
-    df["Base"] = df.apply(lambda row: calculate_base(row["SMA25"], row["SMA400"], row["SMA800"]), axis=1)
+    df["Base"] = calculate_base_array(df["SMA25"], df["SMA400"], df["SMA800"])
     
     # 1HMSFast 계산 (종가, SMA25, SMA100 사용)
     # 각 행은 자신의 종가, SMA25, SMA100으로 계산 (shift 없음)
-    df["1HMSFast"] = df.apply(lambda row: calculate_1hmsfast(row["종"], row["SMA25"], row["SMA100"]), axis=1)
+    df["1HMSFast"] = calculate_1hmsfast_array(df["종"], df["SMA25"], df["SMA100"])
     
     # 4or1 계산
-    df["4or1"] = df.apply(lambda row: calculate_4or1(row["하단"], row["상단"]), axis=1)
+    df["4or1"] = calculate_4or1_array(df["하단"], df["상단"])
     
     # buyside 계산
-    df["buyside"] = df.apply(lambda row: calculate_buyside(row["SFast"], row["Fast"], row["Base"]), axis=1)
+    df["buyside"] = calculate_buyside_array(df["SFast"], df["Fast"], df["Base"])
     
     # sellside 계산
-    df["sellside"] = df.apply(lambda row: calculate_sellside(row["SFast"], row["Fast"], row["Base"]), axis=1)
+    df["sellside"] = calculate_sellside_array(df["SFast"], df["Fast"], df["Base"])
     
     # Buy 계산
-    df["Buy"] = df.apply(lambda row: calculate_buy(row["4or1"], row["sellside"]), axis=1)
+    df["Buy"] = calculate_buy_array(df["4or1"], df["sellside"])
     
     # Sell 계산 (1시간봉용: buyside만 사용)
-    df["Sell"] = df.apply(lambda row: calculate_sell_short(row["buyside"]), axis=1)
+    df["Sell"] = calculate_sell_short_array(df["buyside"])
     
     # 1HCLASS 계산: 1H 캔들에서 SFast/Fast/Base가 and(2 <= 값 < 5)이면 각각 +1, 총합(0~3)
-    df["1HCLASS"] = df.apply(
-        lambda row:
-        (1 if pd.notna(row["SFast"]) and 2 <= row["SFast"] < 5 else 0) +
-        (1 if pd.notna(row["Fast"]) and 2 <= row["Fast"] < 5 else 0) +
-        (1 if pd.notna(row["Base"]) and 2 <= row["Base"] < 5 else 0),
-        axis=1
-    )
+    df["1HCLASS"] = phase_band_count_array([df["SFast"], df["Fast"], df["Base"]], 2, 5)
     
     # -1HCLASS 계산: 1H 캔들에서 SFast/Fast/Base가 or(값 < 2, 값 >= 7)이면 각각 -1, 총합(0~-3)
-    df["-1HCLASS"] = df.apply(
-        lambda row:
-        (-1 if pd.notna(row["SFast"]) and (row["SFast"] < 2 or row["SFast"] >= 7) else 0) +
-        (-1 if pd.notna(row["Fast"]) and (row["Fast"] < 2 or row["Fast"] >= 7) else 0) +
-        (-1 if pd.notna(row["Base"]) and (row["Base"] < 2 or row["Base"] >= 7) else 0),
-        axis=1
-    )
+    df["-1HCLASS"] = phase_band_count_array([df["SFast"], df["Fast"], df["Base"]], 2, 7, outside=True, score=-1)
     
     # p1H 계산: 1H 시트 SFast/Fast/Base 각각 4 <= 값 < 5 인 경우 1로 카운트, 총합(0,1,2,3)
-    df["p1H"] = df.apply(
-        lambda row:
-        (1 if pd.notna(row["SFast"]) and 4 <= row["SFast"] < 5 else 0) +
-        (1 if pd.notna(row["Fast"]) and 4 <= row["Fast"] < 5 else 0) +
-        (1 if pd.notna(row["Base"]) and 4 <= row["Base"] < 5 else 0),
-        axis=1
-    )
+    df["p1H"] = phase_band_count_array([df["SFast"], df["Fast"], df["Base"]], 4, 5)
     
     # 이미 최신→과거 순서이므로 재정렬 불필요 (정렬은 위에서 이미 완료)
     
@@ -7326,73 +9181,354 @@ def calculate_all_indicators_1h(df, market_type):
             df[col] = pd.to_numeric(df[col], errors="coerce")
     
     return df
-def calculate_all_indicators_weekly(df, market_type):
-    """
-    주봉용 모든 지표를 한 번에 계산합니다.
-    Max25, Min25를 사용합니다 (25개 기준).
-    """
-    if df.empty:
-        return df
-    
-    # 과거→현재 순서로 정렬 (계산을 위해)
-    df = df.sort_values("Date(UTC)").reset_index(drop=True)
-    
-    # SMA 계산 (3, 5, 7, 10, 20일)
-    df["SMA3"] = df["종"].rolling(window=3, min_periods=3).mean()
-    df["SMA5"] = df["종"].rolling(window=5, min_periods=5).mean()
-    df["SMA7"] = df["종"].rolling(window=7, min_periods=7).mean()
-    df["SMA10"] = df["종"].rolling(window=10, min_periods=10).mean()
-    df["SMA20"] = df["종"].rolling(window=20, min_periods=20).mean()
-    
-    # Max25, Min25 계산 (25개 캔들 동안의 시고저종에서 최고가와 최저가)
-    df["Max25"] = df[["시", "고", "저", "종"]].rolling(window=25, min_periods=25).max().max(axis=1)
-    df["Min25"] = df[["시", "고", "저", "종"]].rolling(window=25, min_periods=25).min().min(axis=1)
-    
+
+WEEKLY_SMA_WINDOWS = (3, 5, 7, 10, 20)
+WEEKLY_EXTREMA_WINDOW = 25
+WEEKLY_NUMERIC_COLUMNS = ["종", "시", "고", "저", "Vol.", "SMA3", "SMA5", "SMA7", "SMA10", "SMA20", "Max25", "Min25", "하단", "상단", "SFast", "Fast", "Base", "4or1", "buyside", "sellside", "SamountW", "BamountW"]
+
+def _weekly_signal_columns(df):
+    """주봉 SMA/Max25/Min25 에서 하단·상단 ~ SamountW/BamountW 까지 계산 (행별 계산이라 행 순서 무관).
+    df 는 DataFrame 또는 {열 이름: 배열} dict (증분 1행 계산은 dict 로 넘겨 DataFrame 열 대입 비용을 피함)"""
     # 하단, 상단 계산 (Max25/Min25이 NaN이면 NaN)
-    df["하단"] = df.apply(lambda row: abs((row["종"] - row["Min25"]) / row["Min25"]) if not pd.isna(row["Min25"]) else np.nan, axis=1)
-    df["상단"] = df.apply(lambda row: abs((row["종"] - row["Max25"]) / row["Max25"]) if not pd.isna(row["Max25"]) else np.nan, axis=1)
+    df["하단"] = band_distance_array(df["종"], df["Min25"])
+    df["상단"] = band_distance_array(df["종"], df["Max25"])
     
     # SFast 계산
-    df["SFast"] = df.apply(lambda row: calculate_superfast(row["SMA3"], row["SMA5"], row["SMA7"]), axis=1)
+    df["SFast"] = calculate_superfast_array(df["SMA3"], df["SMA5"], df["SMA7"])
     
     # Fast 계산
-    df["Fast"] = df.apply(lambda row: calculate_fast(row["SMA5"], row["SMA7"], row["SMA10"]), axis=1)
+    df["Fast"] = calculate_fast_array(df["SMA5"], df["SMA7"], df["SMA10"])
     
     # Base 계산
-    df["Base"] = df.apply(lambda row: calculate_base(row["SMA5"], row["SMA10"], row["SMA20"]), axis=1)
+    df["Base"] = calculate_base_array(df["SMA5"], df["SMA10"], df["SMA20"])
     
     # 4or1 계산
-    df["4or1"] = df.apply(lambda row: calculate_4or1(row["하단"], row["상단"]), axis=1)
+    df["4or1"] = calculate_4or1_array(df["하단"], df["상단"])
     
     # buyside 계산
-    df["buyside"] = df.apply(lambda row: calculate_buyside(row["SFast"], row["Fast"], row["Base"]), axis=1)
+    df["buyside"] = calculate_buyside_array(df["SFast"], df["Fast"], df["Base"])
     
     # sellside 계산
-    df["sellside"] = df.apply(lambda row: calculate_sellside(row["SFast"], row["Fast"], row["Base"]), axis=1)
+    df["sellside"] = calculate_sellside_array(df["SFast"], df["Fast"], df["Base"])
     
     # Buy 계산
-    df["Buy"] = df.apply(lambda row: calculate_buy(row["4or1"], row["sellside"]), axis=1)
+    df["Buy"] = calculate_buy_array(df["4or1"], df["sellside"])
     
     # Sell 계산 (주봉용: buyside만 사용)
-    df["Sell"] = df.apply(lambda row: calculate_sell_short(row["buyside"]), axis=1)
+    df["Sell"] = calculate_sell_short_array(df["buyside"])
     
     # SamountW 계산: (1-buyside) * 1unit (티커별 USDT 정밀도 적용)
     symbol = f"{TICKER}USDT"
     usdt_precision = SYMBOL_USDT_PRECISION.get(symbol, 5)
-    df["SamountW"] = df.apply(lambda row: round((1 - row["buyside"]) * TRADING_UNIT, usdt_precision) if not pd.isna(row["buyside"]) else np.nan, axis=1)
+    df["SamountW"] = side_amount_array(df["buyside"], TRADING_UNIT, usdt_precision)
     
     # BamountW 계산: (1-sellside) * 1unit (티커별 USDT 정밀도 적용)
-    df["BamountW"] = df.apply(lambda row: round((1 - row["sellside"]) * TRADING_UNIT, usdt_precision) if not pd.isna(row["sellside"]) else np.nan, axis=1)
+    df["BamountW"] = side_amount_array(df["sellside"], TRADING_UNIT, usdt_precision)
+    return df
+
+def calculate_all_indicators_weekly(df, market_type):
+    """
+    주봉용 모든 지표를 한 번에 계산합니다.
+    Max25, Min25를 사용합니다 (25개 기준).
+    """
+    if df.empty:
+        return df
+    
+    # 과거→현재 순서로 정렬 (계산을 위해)
+    df = df.sort_values("Date(UTC)").reset_index(drop=True)
+    
+    # SMA 계산 (3, 5, 7, 10, 20일)
+    closes = df["종"].to_numpy(dtype=np.float64)
+    for window in WEEKLY_SMA_WINDOWS:
+        df[f"SMA{window}"] = reverse_window_sma(closes, window, newest_first=False)
+    
+    # Max25, Min25 계산 (25개 캔들 동안의 시고저종에서 최고가와 최저가)
+    df["Max25"], df["Min25"] = ohlc_window_extrema(df, WEEKLY_EXTREMA_WINDOW, newest_first=False)
+    
+    # 하단·상단 ~ SamountW/BamountW
+    df = _weekly_signal_columns(df)
     
     # 최신→과거로 재정렬
     df = df.sort_values("Date(UTC)", ascending=False).reset_index(drop=True)
     
     # 숫자 컬럼 정리
-    num_cols = ["종", "시", "고", "저", "Vol.", "SMA3", "SMA5", "SMA7", "SMA10", "SMA20", "Max25", "Min25", "하단", "상단", "SFast", "Fast", "Base", "4or1", "buyside", "sellside", "SamountW", "BamountW"]
-    df[num_cols] = df[num_cols].apply(pd.to_numeric, errors="coerce")
+    df[WEEKLY_NUMERIC_COLUMNS] = df[WEEKLY_NUMERIC_COLUMNS].apply(pd.to_numeric, errors="coerce")
+    
+    return df
+
+# ---------- AFTER 단계 주봉 증분 집계 (티커별) ----------
+# 한 주 동안 바뀌는 주봉은 진행 중인 주(idx=0) 하나뿐이므로 AFTER 단계는 일봉 전체로 주봉을 다시 만들지 않습니다.
+# - 지난 주 행(지표 포함)은 상태에 고정, 진행 중인 주는 '그 주 확정 일봉(최대 6개) + 최신 일봉(idx=0)'으로 O(1) 갱신
+# - 새로 확정된 일봉(idx=1~)만 목록에 더하고, 주 경계(월요일 00:00 UTC)를 넘으면 목록 요약을 지난 주 행으로 확정
+#   (IncrementalIndicatorState 로 SMA/Max25/Min25 계산 후 push)
+# - 동기화: 상태의 마지막 확정 일봉(Date·종시고저·거래량)이 이번 일봉 앞쪽 WEEKLY_STATE_LOOKBACK 행 안에 없으면
+#   (첫 실행, 재시작, previous 교체 등) None → 호출부가 전체 변환·지표 계산 후 seed_weekly_state 로 상태를 다시 만듭니다.
+# - 일봉 창(daily_count)이 밀리면 창 끝에 걸린 주(일부 일봉만 남은 주)를 다시 집계하고, 창이 그 주에 닿는 마지막
+#   WEEKLY_EXTREMA_WINDOW 개 행의 지표만 다시 계산 → 모든 행이 전체 변환·지표 계산과 비트 단위로 같습니다.
+ENABLE_WEEKLY_STATE = True          # False면 AFTER 단계도 매번 일봉 전체로 주봉 변환·지표 계산
+WEEKLY_STATE_VERIFY = False         # True면 증분 결과(idx=0)를 전체 변환·계산과 비교해 로그로 출력
+WEEKLY_STATE_REBUILD_EVERY = 96     # N회 증분 갱신마다 전체 변환으로 상태 재구성
+WEEKLY_STATE_LOOKBACK = 8           # 마지막 확정 일봉을 찾을 일봉 앞쪽 행 수 (한 주 이상 실행이 끊기면 재구성)
+
+def _daily_head(df_daily: pd.DataFrame, rows: int):
+    """일봉 앞쪽 rows 행의 (epoch ms, [종, 시, 고, 저, Vol.]) (최신→과거 정렬이 아니거나 시간 결측이 있으면 None)"""
+    head = df_daily.iloc[:rows]
+    times = utc_time_ms(head['Date(UTC)'], text_general=False)
+    if len(times) == 0 or (times == NO_TIME_MS).any() or (np.diff(times) >= 0).any():
+        return None
+    values = np.column_stack([pd.to_numeric(head[col], errors='coerce').to_numpy(dtype=np.float64) for col in WEEKLY_BASE_COLUMNS])
+    return times, values
+
+def _daily_key(time_ms, values) -> tuple:
+    """확정 일봉 식별값: (epoch ms, 종, 시, 고, 저, Vol.)"""
+    return (int(time_ms),) + tuple(float(value) for value in values)
+
+def _week_summary(days) -> np.ndarray:
+    """그 주 일봉 [종, 시, 고, 저, Vol.] 목록(최신→과거) → 주 요약 (convert_daily_to_weekly 의 구간 집계와 같은 규칙·합산 순서)"""
+    block = np.array(days, dtype=np.float64)
+    return np.array([block[-1, 0], block[0, 1], np.fmax.reduce(block[:, 2]), np.fmin.reduce(block[:, 3]),
+                     np.nan_to_num(block[:, 4]).sum()])
+
+def _weekly_indicator_values(ohlc: np.ndarray, indicators: IncrementalIndicatorState) -> Optional[dict]:
+    """주봉 1행(시고저종)의 SMA3~20, Max25/Min25 ~ SamountW/BamountW 를 지난 주 요약으로 계산 ({열: 길이 1 배열}, NaN 있으면 None)"""
+    if np.isnan(ohlc).any():
+        return None
+    close = float(ohlc[OHLC_COLUMNS.index("종")])
+    _, high, low = indicators.latest(close, float(ohlc.max()), float(ohlc.min()))
+    values = {"종": np.array([close])}
+    # SMA 는 창이 최대 20주라 최근 종가로 공용 커널을 그대로 호출 (전체 계산과 비트 단위로 같음)
+    recent_closes = np.r_[close, np.array(indicators.closes, dtype=np.float64)[::-1]]
+    for window in WEEKLY_SMA_WINDOWS:
+        values[f"SMA{window}"] = reverse_window_sma(recent_closes, window, rows=[0])
+    values["Max25"], values["Min25"] = np.array([high], dtype=np.float64), np.array([low], dtype=np.float64)
+    values = _weekly_signal_columns(values)
+    del values["종"]
+    return values
+
+class WeeklyCandleState:
+    """주봉 증분 상태: 지난 주 행은 고정, 진행 중인 주는 확정 일봉 요약 + 최신 일봉으로 갱신."""
+
+    def __init__(self):
+        self.closed = pd.DataFrame()                          # 지난 주 행 (최신→과거, 지표 포함)
+        self.closed_week_ms = np.empty(0, dtype=np.int64)
+        self.indicators = IncrementalIndicatorState(WEEKLY_SMA_WINDOWS, WEEKLY_EXTREMA_WINDOW)
+        self.week_ms = None                                   # 진행 중인 주 시작 (epoch ms)
+        self.days = []                                        # 진행 중인 주의 확정 일봉 [종, 시, 고, 저, Vol.] (최신→과거, 최대 6개)
+        self.last_daily_key = None                            # 요약에 마지막으로 넣은 확정 일봉
+        self.oldest_daily_ms = None                           # 일봉 창의 가장 오래된 일봉 (바뀌면 꼬리 재계산)
+        self.updates = 0
+
+    def seed(self, df_daily: pd.DataFrame, df_weekly: pd.DataFrame) -> bool:
+        """전체 변환·지표 결과(df_weekly)와 일봉으로 상태 재구성. 맞지 않으면 False."""
+        self.__init__()
+        if df_weekly is None or df_weekly.empty or len(df_daily) < 2:
+            return False
+        head = _daily_head(df_daily, WEEKLY_STATE_LOOKBACK)
+        weekly_ms = utc_time_ms(df_weekly['Date(UTC)'], text_general=False)
+        if head is None or weekly_ms[0] == NO_TIME_MS:
+            return False
+        times, values = head
+        weeks = _week_start_ms(times)
+        # 지난 주 요약
+        history = df_weekly[['Date(UTC)'] + OHLC_COLUMNS]
+        if weekly_ms[0] != weeks[0] or not self.indicators.rebuild(history, total=len(df_weekly) - 1):
+            return False
+        # 진행 중인 주의 확정 일봉(idx=1~, 최대 6개)
+        self.days = [values[row] for row in np.flatnonzero(weeks[1:] == weeks[0]) + 1]
+        self.closed = df_weekly.iloc[1:].reset_index(drop=True)
+        self.closed_week_ms = weekly_ms[1:].copy()
+        self.week_ms = int(weeks[0])
+        self.last_daily_key = _daily_key(times[1], values[1])
+        self.oldest_daily_ms = int(utc_time_ms(df_daily['Date(UTC)'].iloc[-1:], text_general=False)[0])
+        return True
+
+    def _roll(self, week_ms: int) -> bool:
+        """주 경계: 진행 중인 주 요약을 지난 주 행으로 확정하고 새 주 시작"""
+        if week_ms < self.week_ms:
+            return False
+        if week_ms > self.week_ms and self.days:
+            summary = _week_summary(self.days)
+            ohlc = summary[[WEEKLY_BASE_COLUMNS.index(col) for col in OHLC_COLUMNS]]
+            values = _weekly_indicator_values(ohlc, self.indicators)
+            if values is None:
+                return False
+            row = _weekly_base_frame(np.array([self.week_ms]), summary[None, :]).assign(**values)
+            self.indicators.push((self.week_ms,), float(summary[0]), float(ohlc.max()), float(ohlc.min()))
+            self.closed = pd.concat([row, self.closed], ignore_index=True)
+            self.closed_week_ms = np.r_[self.week_ms, self.closed_week_ms]
+            self.days = []
+        self.week_ms = week_ms
+        return True
+
+    def _refresh_tail(self, df_daily: pd.DataFrame) -> bool:
+        """
+        창 끝 주(일봉이 일부만 남은 주)를 남은 일봉으로 다시 집계하고, 창이 그 주에 닿는 마지막 WEEKLY_EXTREMA_WINDOW 개
+        지난 주 행의 지표를 다시 계산합니다 (창이 모자라 NaN 이 되는 행 포함, 전체 변환·지표 계산과 같은 값).
+        지난 주 행이 그보다 적으면 진행 중인 주의 창도 창 끝에 닿으므로 False (전체 계산으로 재구성).
+        """
+        if len(self.closed) < WEEKLY_EXTREMA_WINDOW:
+            return False
+        tail_days = df_daily.iloc[-7:]
+        times = utc_time_ms(tail_days['Date(UTC)'], text_general=False)
+        in_week = _week_start_ms(times) == self.closed_week_ms[-1]
+        if (times == NO_TIME_MS).any() or not in_week.any():
+            return False
+        days = np.column_stack([pd.to_numeric(tail_days[col], errors='coerce').to_numpy(dtype=np.float64) for col in WEEKLY_BASE_COLUMNS])
+        summary = _week_summary(days[in_week])
+        last = len(self.closed) - 1
+        for position, col in enumerate(WEEKLY_BASE_COLUMNS):
+            self.closed.at[last, col] = summary[position]
+        start = len(self.closed) - WEEKLY_EXTREMA_WINDOW
+        tail = self.closed.iloc[start:]
+        closes = tail["종"].to_numpy(dtype=np.float64)
+        values = {"종": closes}
+        for window in WEEKLY_SMA_WINDOWS:
+            values[f"SMA{window}"] = reverse_window_sma(closes, window)
+        values["Max25"], values["Min25"] = ohlc_window_extrema(tail, WEEKLY_EXTREMA_WINDOW)
+        values = _weekly_signal_columns(values)
+        del values["종"]
+        for col, column_values in values.items():
+            self.closed.loc[start:, col] = column_values
+        return True
+
+    def advance(self, df_daily: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """최신 일봉으로 진행 중인 주 갱신 → [진행 중인 주(기본 열), 지난 주 행...] 주봉. 동기화 실패 시 None."""
+        head = _daily_head(df_daily, WEEKLY_STATE_LOOKBACK)
+        if head is None or len(head[0]) < 2:
+            return None
+        times, values = head
+        keys = [_daily_key(time_ms, row) for time_ms, row in zip(times[1:], values[1:])]
+        if self.last_daily_key not in keys:
+            return None
+        weeks = _week_start_ms(times)
+        # 지난 실행 이후 새로 확정된 일봉만 과거→최신 순서로 반영 (주가 바뀌면 먼저 확정)
+        for row in range(keys.index(self.last_daily_key), 0, -1):
+            if not self._roll(int(weeks[row])):
+                return None
+            self.days.insert(0, values[row])
+        if not self._roll(int(weeks[0])):
+            return None
+        self.last_daily_key = keys[0]
+        # 일봉 창이 밀렸으면 창 밖 주를 지우고, 창 끝에 걸린 주와 그 주에 닿는 지표를 전체 변환과 같게 다시 계산
+        oldest_ms = int(utc_time_ms(df_daily['Date(UTC)'].iloc[-1:], text_general=False)[0])
+        if oldest_ms == NO_TIME_MS:
+            return None
+        if oldest_ms != self.oldest_daily_ms:
+            keep = self.closed_week_ms >= _week_start_ms(oldest_ms)
+            if not keep.all():
+                self.closed = self.closed[keep].reset_index(drop=True)
+                self.closed_week_ms = self.closed_week_ms[keep]
+            if not self._refresh_tail(df_daily):
+                return None
+            self.oldest_daily_ms = oldest_ms
+        self.updates += 1
+        current = _weekly_base_frame(np.array([self.week_ms]), _week_summary([values[0]] + self.days)[None, :])
+        return pd.concat([current, self.closed], ignore_index=True)
+
+_weekly_states = {}
+_weekly_states_lock = threading.Lock()
+
+def seed_weekly_state(df_daily: pd.DataFrame, df_weekly: pd.DataFrame) -> bool:
+    """전체 변환·지표 계산한 주봉으로 현재 티커의 주봉 증분 상태를 (재)구성"""
+    if not ENABLE_WEEKLY_STATE:
+        return False
+    state = WeeklyCandleState()
+    try:
+        ok = state.seed(df_daily, df_weekly)
+    except Exception as e:
+        print(f"{get_timestamp()} ⚠️[주봉 증분] {TICKER} 상태 구성 실패: {e}")
+        ok = False
+    with _weekly_states_lock:
+        if ok:
+            _weekly_states[TICKER] = state
+        else:
+            _weekly_states.pop(TICKER, None)
+    return ok
+
+def convert_daily_to_weekly_incremental(df_daily: pd.DataFrame) -> Optional[pd.DataFrame]:
+    """
+    AFTER 단계 주봉: 상태의 지난 주 행 + 최신 일봉으로 갱신한 진행 중인 주 (convert_daily_to_weekly 대체).
+
+    Returns:
+        [진행 중인 주(지표 NaN), 지난 주(지표 포함)...] 최신→과거 DataFrame,
+        또는 None (상태 없음/동기화 실패 → 호출부가 convert_daily_to_weekly 로 전체 변환)
+    """
+    if not ENABLE_WEEKLY_STATE or df_daily is None or df_daily.empty or 'Date(UTC)' not in df_daily.columns:
+        return None
+    try:
+        with _weekly_states_lock:
+            state = _weekly_states.get(TICKER)
+            if state is None or state.updates >= WEEKLY_STATE_REBUILD_EVERY:
+                return None
+            df_weekly = state.advance(df_daily)
+            if df_weekly is None:
+                _weekly_states.pop(TICKER, None)
+                return None
+    except Exception as e:
+        print(f"{get_timestamp()} ⚠️[주봉 증분] {TICKER} 상태 갱신 실패, 전체 변환으로 대체: {e}")
+        with _weekly_states_lock:
+            _weekly_states.pop(TICKER, None)
+        return None
+    if WEEKLY_STATE_VERIFY:
+        _verify_weekly_row("주봉 변환", convert_daily_to_weekly(df_daily), df_weekly)
+    return df_weekly
+
+def calculate_latest_row_only_weekly(df, market_type):
+    """
+    주봉 After 단계 최적화: 진행 중인 주(idx=0)만 지표 계산 (지난 주 행 지표 유지)
+    
+    입력: convert_daily_to_weekly_incremental 결과 [진행 중인 주(지표 NaN), 지난 주(지표 포함)...] (최신→과거 순서)
+    출력: [진행 중인 주(지표 계산됨), 지난 주(그대로)] (최신→과거 순서 유지)
     
+    SMA3~20, Max25/Min25 는 상태의 지난 주 요약으로 O(1) 계산합니다.
+    상태가 이 df 의 지난 주 행과 맞지 않으면 calculate_all_indicators_weekly 로 전체 계산합니다.
+    """
+    if df.empty:
+        return df
+    
+    values = None
+    with _weekly_states_lock:
+        state = _weekly_states.get(TICKER)
+        if state is not None and len(df) - 1 == len(state.closed) and (len(df) == 1 or df.at[1, "Date(UTC)"] == state.closed.at[0, "Date(UTC)"]):
+            ohlc = np.array([df.at[0, col] for col in OHLC_COLUMNS], dtype=np.float64)
+            values = _weekly_indicator_values(ohlc, state.indicators)
+    if values is None:
+        return calculate_all_indicators_weekly(df, market_type)
+    
+    expected = calculate_all_indicators_weekly(df.copy(), market_type) if WEEKLY_STATE_VERIFY else None
+    # idx=0만 계산
+    for col, value in values.items():
+        df.at[0, col] = value[0]
+    if expected is not None:
+        _verify_weekly_row("주봉 지표", expected, df)
     return df
 
+def _verify_weekly_row(what: str, expected: pd.DataFrame, actual: pd.DataFrame) -> None:
+    """증분 주봉 idx=0 ↔ 전체 계산 idx=0 비교 로그 (숫자 열은 상대오차, 나머지는 값 일치)."""
+    worst, mismatched = 0.0, []
+    for col in expected.columns:
+        want = expected.at[0, col]
+        got = actual.at[0, col] if col in actual.columns else np.nan
+        if col in WEEKLY_NUMERIC_COLUMNS:
+            want, got = float(want), float(got)
+            if np.isnan(want) != np.isnan(got):
+                mismatched.append(col)
+            elif not np.isnan(want):
+                worst = max(worst, abs(want - got) / max(abs(want), 1e-300))
+        elif want != got:
+            mismatched.append(col)
+    rows_ok = len(expected) == len(actual)
+    mark = "✅" if worst <= 1e-12 and not mismatched and rows_ok else "❌"
+    print(f"{get_timestamp()} {mark}[주봉 증분 검증] {TICKER} {what}: 숫자 최대 상대오차 {worst:.1e}"
+          + (f", 불일치 열 {mismatched}" if mismatched else "") + ("" if rows_ok else f", 행 수 {len(actual)} (전체 {len(expected)})"))
+
+def _amount_broadcast(df_source: pd.DataFrame, column: str, rows: np.ndarray):
+    """상위(주봉/일봉) 금액 열을 15분봉 행 순서로 가져옴 (매칭 없음 = NaN, 숫자 열은 float64)"""
+    values = df_source[column] if column in df_source.columns else None
+    if values is not None and pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+        values = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    return gather_parent_values(values, rows)
+
 def copy_weekly_amounts_to_15m(df_15m: pd.DataFrame, df_weekly: pd.DataFrame) -> pd.DataFrame:
     """
     15분봉 시트에 주봉 시트의 SamountW, BamountW 값을 복사합니다.
@@ -7411,39 +9547,15 @@ def copy_weekly_amounts_to_15m(df_15m: pd.DataFrame, df_weekly: pd.DataFrame) ->
         - 인덱스나 순서가 아닌 UTC 시간 자체로 매칭
     """
     df_15m = df_15m.copy()
-    df_weekly = df_weekly.copy()
-    
-    # SamountW, BamountW 열 초기화
-    df_15m["SamountW"] = np.nan
-    df_15m["BamountW"] = np.nan
     
-    # 15분봉 날짜를 datetime으로 변환 (UTC 기준)
-    df_15m["Date(UTC)_dt"] = pd.to_datetime(df_15m["Date(UTC)"], format="%y/%m/%d,%H:%M", errors='coerce')
-    
-    # 주봉 날짜를 datetime으로 변환 (UTC 기준, YY/MM/DD,HH:00 형식)
-    df_weekly["Date(UTC)_dt"] = pd.to_datetime(df_weekly["Date(UTC)"], format="%y/%m/%d,%H:%M", errors='coerce')
-    
-    # 15분봉 날짜만 추출 (시간 제거, UTC 기준 날짜)
-    df_15m["Date_only"] = df_15m["Date(UTC)_dt"].dt.date
-    
-    # 주봉 데이터를 날짜순으로 정렬 (과거→최신, UTC 기준)
-    df_weekly = df_weekly.sort_values("Date(UTC)_dt", ascending=True).reset_index(drop=True)
-    
-    for _, weekly_row in df_weekly.iterrows():
-        if pd.isna(weekly_row["Date(UTC)_dt"]):
-            continue
-        weekly_start_date = weekly_row["Date(UTC)_dt"].date()  # UTC 기준 날짜
-        weekly_end_date = (weekly_row["Date(UTC)_dt"] + pd.Timedelta(days=7)).date()  # UTC 기준 날짜
-        
-        # 해당 주에 속하는 15분봉 찾기 (UTC 기준 날짜만 비교)
-        mask = (df_15m["Date_only"] >= weekly_start_date) & (df_15m["Date_only"] < weekly_end_date)
-        
-        if mask.any():
-            df_15m.loc[mask, "SamountW"] = weekly_row["SamountW"]
-            df_15m.loc[mask, "BamountW"] = weekly_row["BamountW"]
+    # 15분봉/주봉 UTC 날짜(epoch 일 시작 분)를 한 번만 계산 (datetime 열은 파싱 없이 정수 연산, 문자열은 "YY/MM/DD,HH:MM" 형식만 인정)
+    day_15m = timeframe_bucket_keys(df_15m["Date(UTC)"], "1d", text_general=False)
+    week_start = timeframe_bucket_keys(df_weekly["Date(UTC)"], "1d", text_general=False)
     
-    # 임시 컬럼 제거
-    df_15m = df_15m.drop(["Date_only", "Date(UTC)_dt"], axis=1)
+    # 주봉 시작일 ≤ 날짜 < 시작일+7일 (겹치면 최신 주봉 우선) → 행 번호로 일괄 복사
+    rows = window_parent_rows(day_15m, week_start, 7 * TIMEFRAME_BUCKET_MINUTES["1d"])
+    df_15m["SamountW"] = _amount_broadcast(df_weekly, "SamountW", rows)
+    df_15m["BamountW"] = _amount_broadcast(df_weekly, "BamountW", rows)
     
     return df_15m
 
@@ -7465,38 +9577,12 @@ def copy_daily_amounts_to_15m(df_15m: pd.DataFrame, df_daily: pd.DataFrame) -> p
         - 인덱스나 순서가 아닌 UTC 시간 자체로 매칭
     """
     df_15m = df_15m.copy()
-    df_daily = df_daily.copy()
     
-    # Samount1D, Bamount1D 열 초기화
-    df_15m["Samount1D"] = np.nan
-    df_15m["Bamount1D"] = np.nan
-    
-    # 15분봉 날짜를 datetime으로 변환 (UTC 기준) - format 지정 안 함 (자동 인식)
-    df_15m["Date(UTC)_dt"] = pd.to_datetime(df_15m["Date(UTC)"], errors='coerce')
-    
-    # 일봉 날짜를 datetime으로 변환 (UTC 기준) - format 지정 안 함 (자동 인식)
-    df_daily["Date(UTC)_dt"] = pd.to_datetime(df_daily["Date(UTC)"], errors='coerce')
-    
-    # 15분봉 날짜만 추출 (시간 제거, UTC 기준 날짜)
-    df_15m["Date_only"] = df_15m["Date(UTC)_dt"].dt.date
-    
-    # 일봉 데이터를 날짜순으로 정렬 (과거→최신, UTC 기준)
-    df_daily = df_daily.sort_values("Date(UTC)_dt", ascending=True).reset_index(drop=True)
-    
-    for _, daily_row in df_daily.iterrows():
-        if pd.isna(daily_row["Date(UTC)_dt"]):
-            continue
-        daily_date = daily_row["Date(UTC)_dt"].date()  # UTC 기준 날짜
-        
-        # 해당 일에 속하는 15분봉 찾기 (UTC 기준 날짜만 비교)
-        mask = (df_15m["Date_only"] == daily_date)
-        
-        if mask.any():
-            df_15m.loc[mask, "Samount1D"] = daily_row["Samount1D"]
-            df_15m.loc[mask, "Bamount1D"] = daily_row["Bamount1D"]
-    
-    # 임시 컬럼 제거
-    df_15m = df_15m.drop(["Date_only", "Date(UTC)_dt"], axis=1)
+    # 15분봉/일봉을 UTC 날짜 버킷으로 내려 같은 날짜의 일봉 행 매칭 (중복 날짜는 마지막 행 우선)
+    rows = timeframe_parent_rows(df_15m["Date(UTC)"], df_daily["Date(UTC)"], "1d",
+                                 child_text_general=True, parent_text_general=True)
+    df_15m["Samount1D"] = _amount_broadcast(df_daily, "Samount1D", rows)
+    df_15m["Bamount1D"] = _amount_broadcast(df_daily, "Bamount1D", rows)
     
     return df_15m
 
@@ -7513,19 +9599,9 @@ def calculate_final_amounts(df_15m: pd.DataFrame) -> pd.DataFrame:
     symbol = f"{TICKER}USDT"
     usdt_precision = SYMBOL_USDT_PRECISION.get(symbol, 5)  # 기본값 5자리
     
-    # 최종 Samount 계산: 0.7 * SamountW + 0.3 * Samount1D (티커별 정밀도)
-    df_15m["Samount"] = df_15m.apply(
-        lambda row: round(0.7 * row["SamountW"] + 0.3 * row["Samount1D"], usdt_precision) 
-        if not pd.isna(row["SamountW"]) and not pd.isna(row["Samount1D"]) 
-        else np.nan, axis=1
-    )
-    
-    # 최종 Bamount 계산: 0.7 * BamountW + 0.3 * Bamount1D (티커별 정밀도)
-    df_15m["Bamount"] = df_15m.apply(
-        lambda row: round(0.7 * row["BamountW"] + 0.3 * row["Bamount1D"], usdt_precision) 
-        if not pd.isna(row["BamountW"]) and not pd.isna(row["Bamount1D"]) 
-        else np.nan, axis=1
-    )
+    # 최종 Samount/Bamount: 0.7 * 주봉 + 0.3 * 일봉 (둘 중 하나라도 NaN이면 NaN, 티커별 정밀도)
+    for final, weekly, daily in (("Samount", "SamountW", "Samount1D"), ("Bamount", "BamountW", "Bamount1D")):
+        df_15m[final] = round_to_precision(0.7 * _float_array(df_15m[weekly]) + 0.3 * _float_array(df_15m[daily]), usdt_precision)
     
     return df_15m
 
@@ -7598,43 +9674,25 @@ def calculate_sb1h_for_15m(df_15m: pd.DataFrame, df_1h4x: pd.DataFrame) -> pd.Da
     
     # ⚠️중요: SB1H 계산은 Date(UTC) 기준으로만 수행 (KST는 기록용일 뿐, 계산에는 사용하지 않음)
     # Date(UTC) 컬럼이 있으면 우선 사용, 없으면 KST 사용 (하위 호환성)
-    time_col_15m = 'Date(UTC)' if 'Date(UTC)' in df_15m_copy.columns else ('KST' if 'KST' in df_15m_copy.columns else None)
-    time_col_1h4x = 'Date(UTC)' if 'Date(UTC)' in df_1h4x.columns else ('KST' if 'KST' in df_1h4x.columns else None)
+    time_col_15m = _time_column(df_15m_copy)
+    time_col_1h4x = _time_column(df_1h4x)
     
     if time_col_15m is None or time_col_1h4x is None:
         return df_15m_copy
     
-    # 1H4x 시트 데이터를 딕셔너리로 변환 (정확한 시간으로 매칭)
-    hourly_dict = {}
-    
-    for _, row in df_1h4x.iterrows():
-        time_val = row.get(time_col_1h4x)
-        # 문자열 여부와 상관없이 pd.to_datetime으로 안전하게 변환
-        hour_dt = pd.to_datetime(time_val, errors='coerce')
-        if pd.notna(hour_dt):
-            # 정확한 시간을 키로 사용
-            time_key = hour_dt.strftime("%y/%m/%d,%H:%M")
-            hourly_dict[time_key] = {
-                'Sell': str(row.get('Sell', '')).strip().lower(),
-                'Buy': str(row.get('Buy', '')).strip().lower()
-            }
+    # 1H4x 행별 신호 (우선순위: Sell > Buy > 빈값(np.nan))
+    def normalized(col):
+        if col not in df_1h4x.columns:
+            return np.full(len(df_1h4x), '', dtype=object)
+        return df_1h4x[col].astype(str).str.strip().str.lower().to_numpy(dtype=object)
+    signal = np.full(len(df_1h4x), np.nan, dtype=object)
+    signal[normalized('Buy') == 'buy'] = 'buy'
+    signal[normalized('Sell') == 'sell'] = 'sell'
     
-    def get_sb1h_signal(time_val):
-        # 문자열 여부와 상관없이 pd.to_datetime으로 안전하게 변환
-        dt_obj = pd.to_datetime(time_val, errors='coerce')
-        if pd.notna(dt_obj):
-            time_key = dt_obj.strftime("%y/%m/%d,%H:%M")
-            if time_key in hourly_dict:
-                data = hourly_dict[time_key]
-                # 우선순위: Sell > Buy > 빈값
-                if data['Sell'] == 'sell':
-                    return 'sell'
-                elif data['Buy'] == 'buy':
-                    return 'buy'
-        return np.nan  # 빈 문자열 대신 np.nan 사용
-    
-    # SB1H 열 추가
-    df_15m_copy['SB1H'] = df_15m_copy[time_col_15m].apply(get_sb1h_signal)
+    # 정확한 시간(분 단위)으로 행마다 매칭 → SB1H 열 추가
+    rows = timeframe_parent_rows(df_15m_copy[time_col_15m], df_1h4x[time_col_1h4x], "1m",
+                                 child_text_general=True)
+    df_15m_copy['SB1H'] = gather_parent_values(signal, rows)
     
     return df_15m_copy
 
@@ -7657,159 +9715,27 @@ def calculate_daysb_15m(df_15m, df_daily, market_type):
         return df_15m
     
     df_15m_copy = df_15m.copy()
-    df_daily_copy = df_daily.copy()
     
     # ⚠️중요: SB1D 계산은 Date(UTC) 기준으로만 수행 (KST는 기록용일 뿐, 계산에는 사용하지 않음)
-    # Date(UTC) 컬럼이 있으면 우선 사용, 없으면 KST를 UTC로 변환
-    time_col_15m = 'Date(UTC)' if 'Date(UTC)' in df_15m_copy.columns else ('KST' if 'KST' in df_15m_copy.columns else None)
-    time_col_daily = 'Date(UTC)'  # 일봉은 항상 UTC 기준
+    # Date(UTC) 컬럼이 있으면 우선 사용, 없으면 KST 사용 (하위 호환성)
+    time_col_15m = _time_column(df_15m_copy)
     
     if time_col_15m is None:
         print(f"{get_timestamp()} [SB1D] ⚠️ 15분봉에 Date(UTC)/KST 컬럼 없음, SB1D 계산 건너뜀")
         return df_15m_copy
     
-    try:
-        # 1. 15분봉 날짜를 안전하게 date 객체로 변환 (UTC 기준)
-        # format을 지정하지 않아야 이미 Timestamp 객체인 경우나 다른 날짜 형식에도 대응 가능합니다.
-        df_15m_copy['Date_only'] = pd.to_datetime(df_15m_copy[time_col_15m], errors='coerce').dt.date
-        
-        # 2. 일봉 날짜를 안전하게 date 객체로 변환
-        # split(',') 같은 문자열 처리를 제거하고 바로 datetime으로 변환합니다.
-        df_daily_copy['Date_only'] = pd.to_datetime(df_daily_copy[time_col_daily], errors='coerce').dt.date
-    except Exception as e:
-        print(f"{get_timestamp()} [SB1D] ⚠️ 날짜 변환 중 예외 발생: {e}")
-        return df_15m_copy
-    
-    # 3. 일봉 데이터를 딕셔너리로 변환 (빠른 조회를 위해)
-    daily_dict = {}
-    for _, row in df_daily_copy.iterrows():
-        date_key = row['Date_only']
-        if pd.notna(date_key):
-            daily_dict[date_key] = {
-                'Sell': str(row.get('Sell', '')).strip().lower(),
-                'Buy': str(row.get('Buy', '')).strip().lower()
-            }
-    
-    # 4. 매칭 로직
-    def get_sb1d_signal(date_only):
-        if pd.notna(date_only) and date_only in daily_dict:
-            daily_data = daily_dict[date_only]
-            # 우선순위: Sell > Buy
-            if daily_data['Sell'] == 'sell':
-                return 'sell'
-            elif daily_data['Buy'] == 'buy':
-                return 'buy'
-        return np.nan  # 빈 문자열 대신 np.nan 사용
+    # 일봉 행별 신호 (우선순위: Sell > Buy, 없으면 NaN)
+    daily_signal = np.full(len(df_daily), np.nan, dtype=object)
+    daily_signal[_text_equals(df_daily['Buy'], 'buy')] = 'buy'
+    daily_signal[_text_equals(df_daily['Sell'], 'sell')] = 'sell'
     
-    # 5. SB1D 열 업데이트
-    df_15m_copy['SB1D'] = df_15m_copy['Date_only'].apply(get_sb1d_signal)
-    
-    # 임시 컬럼 제거
-    df_15m_copy = df_15m_copy.drop('Date_only', axis=1)
+    # 15분봉/일봉을 UTC 날짜 버킷으로 내려 같은 날짜의 일봉 행 매칭 (중복 날짜는 마지막 행 우선)
+    rows = timeframe_parent_rows(df_15m_copy[time_col_15m], df_daily['Date(UTC)'], "1d",
+                                 child_text_general=True, parent_text_general=True)
+    df_15m_copy['SB1D'] = gather_parent_values(daily_signal, rows)
     
     return df_15m_copy
 
-def calculate_sb5m_for_15m(df_15m, df_5m):
-    """
-    5분봉 데이터를 기반으로 15분봉에 SB5M 신호를 추가합니다.
-    5분봉 3개씩 그룹화해서 Buy/Sell 개수를 세어 판정합니다.
-    날짜 기준은 Date(UTC)로 처리합니다.
-    """
-    if df_5m.empty or df_15m.empty:
-        return df_15m
-    
-    # 원본 보존
-    df_5m = df_5m.copy()
-    df_15m = df_15m.copy()
-    
-    # ⚠️중요: 모든 그룹화와 정렬은 Date(UTC) 기준으로만 수행 (KST는 기록용일 뿐, 정렬/그룹화에는 사용하지 않음)
-    # Date(UTC) 기준 그룹화
-    if 'Date(UTC)' not in df_5m.columns or 'Date(UTC)' not in df_15m.columns:
-        if 'SB5M' not in df_15m.columns:
-            df_15m['SB5M'] = ''
-        return df_15m
-    
-    df_5m['Date(UTC)_dt'] = pd.to_datetime(df_5m['Date(UTC)'], format='%y/%m/%d,%H:%M', errors='coerce')
-    df_5m = df_5m[df_5m['Date(UTC)_dt'].notna()].copy()
-    
-    if df_5m.empty:
-        if 'SB5M' not in df_15m.columns:
-            df_15m['SB5M'] = ''
-        if 'Date(UTC)_dt' in df_5m.columns:
-            df_5m = df_5m.drop('Date(UTC)_dt', axis=1)
-        return df_15m
-    
-    # 시간 정렬 (과거 → 현재)
-    df_5m = df_5m.sort_values('Date(UTC)_dt', ascending=True).reset_index(drop=True)
-    
-    # 5분봉: 15분 그룹 생성
-    df_5m['15min_group'] = df_5m['Date(UTC)_dt'].dt.floor('15min')
-    
-    # 15분봉: 15min_group 생성
-    if df_15m['Date(UTC)'].dtype == 'object':
-        df_15m['Date(UTC)_dt'] = pd.to_datetime(df_15m['Date(UTC)'], format='%y/%m/%d,%H:%M', errors='coerce')
-    else:
-        df_15m['Date(UTC)_dt'] = pd.to_datetime(df_15m['Date(UTC)'], errors='coerce')
-    
-    if '15min_group' not in df_15m.columns:
-        df_15m['15min_group'] = df_15m['Date(UTC)_dt'].dt.floor('15min')
-    else:
-        mask_na = df_15m['15min_group'].isna()
-        if mask_na.any():
-            df_15m.loc[mask_na, '15min_group'] = df_15m.loc[mask_na, 'Date(UTC)_dt'].dt.floor('15min')
-    
-    # --- 15분 그룹별 SB5M 신호 계산 ---
-    sb5m_data = []
-    for group_time, group_df in df_5m.groupby('15min_group', sort=True):
-        buy_count = 0
-        sell_count = 0
-        
-        for _, row in group_df.iterrows():
-            buy_val = row.get('Buy', '')
-            sell_val = row.get('Sell', '')
-            
-            if pd.notna(buy_val) and isinstance(buy_val, str) and buy_val.strip().lower() == 'buy':
-                buy_count += 1
-            elif pd.notna(sell_val) and isinstance(sell_val, str) and sell_val.strip().lower() == 'sell':
-                sell_count += 1
-        
-        if buy_count == 3:
-            sb5m_signal = 'buy3'
-        elif buy_count == 2:
-            sb5m_signal = 'buy2'
-        elif buy_count == 1:
-            sb5m_signal = 'buy1'
-        elif sell_count == 3:
-            sb5m_signal = 'sell3'
-        elif sell_count == 2:
-            sb5m_signal = 'sell2'
-        elif sell_count == 1:
-            sb5m_signal = 'sell1'
-        else:
-            sb5m_signal = ''
-        
-        sb5m_data.append({
-            '15min_group': group_time,
-            'SB5M': sb5m_signal
-        })
-    
-    # --- 15분봉에 SB5M 매칭 ---
-    if sb5m_data:
-        df_sb5m = pd.DataFrame(sb5m_data)
-        df_15m = df_15m.merge(df_sb5m, on='15min_group', how='left')
-        df_15m['SB5M'] = df_15m['SB5M'].fillna('')
-    else:
-        if 'SB5M' not in df_15m.columns:
-            df_15m['SB5M'] = ''
-    
-    # 임시 컬럼 제거
-    if 'Date(UTC)_dt' in df_15m.columns:
-        df_15m = df_15m.drop('Date(UTC)_dt', axis=1)
-    if '15min_group' in df_15m.columns:
-        df_15m = df_15m.drop('15min_group', axis=1)
-    
-    return df_15m
-
 def copy_1hmsfast_to_5m(df_5m: pd.DataFrame, df_15m: pd.DataFrame) -> pd.DataFrame:
     """
     5분봉 시트에 15분봉 시트의 1HMSFast 값을 시간 매칭하여 복사합니다 (1HMSF로 저장).
@@ -7834,63 +9760,10 @@ def copy_1hmsfast_to_5m(df_5m: pd.DataFrame, df_15m: pd.DataFrame) -> pd.DataFra
     
     df_5m_copy = df_5m.copy()
     
-    # 15분봉 데이터를 딕셔너리로 변환 (UTC 기준)
-    fifteen_min_dict = {}
-    for _, row in df_15m.iterrows():
-        date_val = row.get('Date(UTC)', '')
-        # Timestamp 객체인 경우 직접 처리
-        if isinstance(date_val, pd.Timestamp) or hasattr(date_val, 'strftime'):
-            dt_val = pd.to_datetime(date_val, errors='coerce')
-            if pd.notna(dt_val):
-                if isinstance(dt_val, pd.Timestamp):
-                    dt_val = dt_val.to_pydatetime()
-                if dt_val.tzinfo is None:
-                    dt_val = dt_val.replace(tzinfo=tz.UTC)
-                # 15분 구간의 시작 시간 계산 (0분, 15분, 30분, 45분으로 정렬)
-                minute = dt_val.minute
-                minute_aligned = (minute // 15) * 15
-                fifteen_min_start = dt_val.replace(minute=minute_aligned, second=0, microsecond=0)
-                key = fifteen_min_start.strftime("%y/%m/%d,%H:%M")
-                fifteen_min_dict[key] = row.get('1HMSFast', np.nan)
-        else:
-            date_str = str(date_val)
-            if ',' in date_str:
-                date_part, time_part = date_str.split(',')
-                try:
-                    dt_val = dt.datetime.strptime(f"{date_part} {time_part}", "%y/%m/%d %H:%M")
-                    dt_val = dt_val.replace(tzinfo=tz.UTC)  # UTC 기준
-                    # 15분 구간의 시작 시간 계산 (0분, 15분, 30분, 45분으로 정렬)
-                    minute = dt_val.minute
-                    minute_aligned = (minute // 15) * 15
-                    fifteen_min_start = dt_val.replace(minute=minute_aligned, second=0, microsecond=0)
-                    key = fifteen_min_start.strftime("%y/%m/%d,%H:%M")
-                    fifteen_min_dict[key] = row.get('1HMSFast', np.nan)
-                except:
-                    pass
-    
-    def get_1hmsf_value(utc_time_str):
-        # Timestamp 객체인 경우 문자열로 변환
-        if hasattr(utc_time_str, 'strftime'):
-            utc_time_str = utc_time_str.strftime("%y/%m/%d,%H:%M")
-        
-        if ',' in str(utc_time_str):
-            date_part, time_part = str(utc_time_str).split(',')
-            utc_dt = dt.datetime.strptime(f"{date_part} {time_part}", "%y/%m/%d %H:%M")
-            utc_dt = utc_dt.replace(tzinfo=tz.UTC)  # UTC 기준
-            
-            # 해당 15분 구간의 시작 시간 계산 (UTC 기준, 0분, 15분, 30분, 45분으로 정렬)
-            minute = utc_dt.minute
-            minute_aligned = (minute // 15) * 15
-            fifteen_min_start = utc_dt.replace(minute=minute_aligned, second=0, microsecond=0)
-            key = fifteen_min_start.strftime("%y/%m/%d,%H:%M")
-            
-            if key in fifteen_min_dict:
-                return fifteen_min_dict[key]
-        return np.nan
-    
-    # 1HMSF 열 추가/업데이트 (숫자로 유지, 엑셀 저장 시 포맷팅 적용)
-    df_5m_copy['1HMSF'] = df_5m_copy['Date(UTC)'].apply(get_1hmsf_value)
-    # 숫자 타입으로 유지 (문자열 변환 제거 - 엑셀에서 숫자로 인식되도록)
+    # 15분 구간 시작(0/15/30/45분, epoch 분)으로 15분봉 행 매칭 → 1HMSF 열 추가/업데이트
+    # (숫자로 유지, 엑셀 저장 시 포맷팅 적용)
+    rows = timeframe_parent_rows(_date_utc_times(df_5m_copy), _date_utc_times(df_15m), "15m", parent_text_general=False)
+    df_5m_copy['1HMSF'] = gather_parent_values(df_15m.get('1HMSFast'), rows)
     
     return df_5m_copy
 
@@ -7997,54 +9870,9 @@ def copy_1hmsfast_from_1h_to_15m(df_15m: pd.DataFrame, df_1h: pd.DataFrame) -> p
     
     df_15m_copy = df_15m.copy()
     
-    # 1시간봉 데이터를 딕셔너리로 변환 (UTC 기준)
-    hourly_dict = {}
-    for _, row in df_1h.iterrows():
-        date_val = row.get('Date(UTC)', '')
-        # Timestamp 객체인 경우 직접 처리
-        if isinstance(date_val, pd.Timestamp) or hasattr(date_val, 'strftime'):
-            hour_dt = pd.to_datetime(date_val, errors='coerce')
-            if pd.notna(hour_dt):
-                if isinstance(hour_dt, pd.Timestamp):
-                    hour_dt = hour_dt.to_pydatetime()
-                if hour_dt.tzinfo is None:
-                    hour_dt = hour_dt.replace(tzinfo=tz.UTC)
-                hour_start = hour_dt.replace(minute=0, second=0, microsecond=0)
-                hour_key = hour_start.strftime("%y/%m/%d,%H:%M")
-                hourly_dict[hour_key] = row.get('1HMSFast', np.nan)
-        else:
-            date_str = str(date_val)
-            if ',' in date_str:
-                date_part, time_part = date_str.split(',')
-                try:
-                    hour_dt = dt.datetime.strptime(f"{date_part} {time_part}", "%y/%m/%d %H:%M")
-                    hour_dt = hour_dt.replace(tzinfo=tz.UTC)  # UTC 기준
-                    # 1시간 구간의 시작 시간을 키로 사용 (UTC 기준)
-                    hour_key = hour_dt.strftime("%y/%m/%d,%H:%M")
-                    hourly_dict[hour_key] = row.get('1HMSFast', np.nan)
-                except:
-                    pass
-    
-    def get_1hmsfast_value(utc_time_str):
-        # Timestamp 객체인 경우 문자열로 변환
-        if hasattr(utc_time_str, 'strftime'):
-            utc_time_str = utc_time_str.strftime("%y/%m/%d,%H:%M")
-        
-        if ',' in str(utc_time_str):
-            date_part, time_part = str(utc_time_str).split(',')
-            utc_dt = dt.datetime.strptime(f"{date_part} {time_part}", "%y/%m/%d %H:%M")
-            utc_dt = utc_dt.replace(tzinfo=tz.UTC)  # UTC 기준
-            
-            # 해당 1시간 구간의 시작 시간 계산 (UTC 기준, 0분으로 정렬)
-            hour_start = utc_dt.replace(minute=0, second=0, microsecond=0)
-            hour_key = hour_start.strftime("%y/%m/%d,%H:%M")
-            
-            if hour_key in hourly_dict:
-                return hourly_dict[hour_key]
-        return np.nan
-    
-    # 1HMSFast 열 업데이트
-    df_15m_copy['1HMSFast'] = df_15m_copy['Date(UTC)'].apply(get_1hmsfast_value)
+    # 1시간 구간 시작(0분, epoch 분)으로 1시간봉 행 매칭 → 1HMSFast 열 업데이트
+    rows = timeframe_parent_rows(_date_utc_times(df_15m_copy), _date_utc_times(df_1h), "1h", parent_text_general=False)
+    df_15m_copy['1HMSFast'] = gather_parent_values(df_1h.get('1HMSFast'), rows)
     
     return df_15m_copy
 
@@ -8453,31 +10281,34 @@ def calculate_latest_row_only_15m(df, market_type):
     #   PREVIOUS: df["SMA200"] = df["종"].rolling(window=200, min_periods=200).mean()
     #   AFTER:    df.loc[0, "SMA200"] = df.iloc[0:200]["종"].mean()
     #   → 두 방식 모두 동일한 결과: 최신 행(idx=0)을 포함한 최근 200개 캔들의 종가 평균
-    df.loc[idx, "SMA3"] = df.iloc[idx:idx+3]["종"].mean()
-    df.loc[idx, "SMA5"] = df.iloc[idx:idx+5]["종"].mean()
-    df.loc[idx, "SMA7"] = df.iloc[idx:idx+7]["종"].mean()
-    df.loc[idx, "SMA10"] = df.iloc[idx:idx+10]["종"].mean()
-    df.loc[idx, "SMA12"] = df.iloc[idx:idx+12]["종"].mean()
+    # 증분 상태가 있으면 O(1), 없으면(첫 실행 등) 창 전체 계산
+    state_values = latest_row_indicators_from_state(
+        "15m", df, (3, 5, 7, 10, 12, 20, 25, 50, 100, 200, 400, 800), 70,
+        partial_windows=(3, 5, 7, 10, 12, 20, 25, 50, 100, 200),
+    )
+    if state_values is not None:
+        sma_values, max70_state, min70_state = state_values
+        for window, value in sma_values.items():
+            df.loc[idx, f"SMA{window}"] = value
+    else:
+        closes = df["종"].to_numpy(dtype=np.float64)
+        for window in (3, 5, 7, 10, 12, 20, 25, 50, 100, 200):
+            df.loc[idx, f"SMA{window}"] = reverse_window_sma(closes, window, rows=[idx], partial=True)[0]
+        for window in (400, 800):
+            df.loc[idx, f"SMA{window}"] = reverse_window_sma(closes, window, rows=[idx])[0]
     sma3_v = df.loc[idx, "SMA3"]
     sma12_v = df.loc[idx, "SMA12"]
     # SMAF: SMA3·SMA12 66:34 가중평균
     df.loc[idx, "SMAF"] = (float(sma3_v) * 0.66 + float(sma12_v) * 0.34) if pd.notna(sma3_v) and pd.notna(sma12_v) else np.nan
-    df.loc[idx, "SMA20"] = df.iloc[idx:idx+20]["종"].mean()
-    df.loc[idx, "SMA25"] = df.iloc[idx:idx+25]["종"].mean()
-    df.loc[idx, "SMA50"] = df.iloc[idx:idx+50]["종"].mean()
-    df.loc[idx, "SMA100"] = df.iloc[idx:idx+100]["종"].mean()
-    df.loc[idx, "SMA200"] = df.iloc[idx:idx+200]["종"].mean()
-    df.loc[idx, "SMA400"] = df.iloc[idx:idx+400]["종"].mean() if idx + 400 <= len(df) else np.nan
-    df.loc[idx, "SMA800"] = df.iloc[idx:idx+800]["종"].mean() if idx + 800 <= len(df) else np.nan
     
     # Max70, Min70 계산: 2행 포함 70개 캔들 (idx 0~69) - Source 기준
-    if idx + 70 <= len(df):
-        window_data = df.iloc[idx:idx+70][["시", "고", "저", "종"]]
-        df.loc[idx, "Max70"] = window_data.values.max()
-        df.loc[idx, "Min70"] = window_data.values.min()
+    if state_values is not None:
+        df.loc[idx, "Max70"] = max70_state
+        df.loc[idx, "Min70"] = min70_state
     else:
-        df.loc[idx, "Max70"] = np.nan
-        df.loc[idx, "Min70"] = np.nan
+        max_vals, min_vals = ohlc_window_extrema(df, 70, rows=[idx])
+        df.loc[idx, "Max70"] = max_vals[0]
+        df.loc[idx, "Min70"] = min_vals[0]
     
     # 하단, 상단 계산 (Max70, Min70 사용)
     current_price = df.loc[idx, "종"]
@@ -8610,17 +10441,15 @@ def calculate_latest_row_only_5m(df, market_type):
     
     # idx=0 계산 가능 여부 확인 (Max200을 위해 최소 200개 필요)
     if len(df) >= 200:
-        # SMA 계산 (idx 1~20 사용하여 idx 0 계산)
-        df.loc[latest_idx, "SMA3"] = df.iloc[latest_idx+1:latest_idx+4]["종"].mean()
-        df.loc[latest_idx, "SMA5"] = df.iloc[latest_idx+1:latest_idx+6]["종"].mean()
-        df.loc[latest_idx, "SMA7"] = df.iloc[latest_idx+1:latest_idx+8]["종"].mean()
-        df.loc[latest_idx, "SMA10"] = df.iloc[latest_idx+1:latest_idx+11]["종"].mean()
-        df.loc[latest_idx, "SMA20"] = df.iloc[latest_idx+1:latest_idx+21]["종"].mean()
+        # SMA 계산 (idx 1~20 사용하여 idx 0 계산, 공용 커널)
+        closes = df["종"].to_numpy(dtype=np.float64)
+        for window in (3, 5, 7, 10, 20):
+            df.loc[latest_idx, f"SMA{window}"] = reverse_window_sma(closes, window, rows=[latest_idx + 1], partial=True)[0]
         
         # Max200, Min200 계산 (200개 캔들 동안의 시고저종에서 최고가와 최저가)
-        window_data = df.iloc[latest_idx+1:latest_idx+201][["시", "고", "저", "종"]]
-        df.loc[latest_idx, "Max200"] = window_data.values.max()
-        df.loc[latest_idx, "Min200"] = window_data.values.min()
+        max_vals, min_vals = ohlc_window_extrema(df, 200, rows=[latest_idx + 1], partial=True)
+        df.loc[latest_idx, "Max200"] = max_vals[0]
+        df.loc[latest_idx, "Min200"] = min_vals[0]
         
         # 하단, 상단 계산 (5분봉은 Max200/Min200)
         current_price = df.loc[latest_idx, "종"]
@@ -8720,21 +10549,14 @@ def calculate_latest_3rows_only_5m(df, market_type):
         # idx=2: idx 2, 3, 4... 사용 (4행 + 5~203행)
         if len(df) >= latest_idx + 200:  # 해당 인덱스 포함하여 최소 200개 있어야 함
             # SMA 계산: 각 인덱스 포함하여 계산 (해당 행 + previous)
-            df.loc[latest_idx, "SMA3"] = df.iloc[latest_idx:latest_idx+3]["종"].mean() if len(df) >= latest_idx+3 else np.nan
-            df.loc[latest_idx, "SMA5"] = df.iloc[latest_idx:latest_idx+5]["종"].mean() if len(df) >= latest_idx+5 else np.nan
-            df.loc[latest_idx, "SMA7"] = df.iloc[latest_idx:latest_idx+7]["종"].mean() if len(df) >= latest_idx+7 else np.nan
-            df.loc[latest_idx, "SMA10"] = df.iloc[latest_idx:latest_idx+10]["종"].mean() if len(df) >= latest_idx+10 else np.nan
-            df.loc[latest_idx, "SMA20"] = df.iloc[latest_idx:latest_idx+20]["종"].mean() if len(df) >= latest_idx+20 else np.nan
+            closes = df["종"].to_numpy(dtype=np.float64)
+            for window in (3, 5, 7, 10, 20):
+                df.loc[latest_idx, f"SMA{window}"] = reverse_window_sma(closes, window, rows=[latest_idx])[0]
             
             # Max200, Min200 계산 (200개 캔들: 해당 행 포함 + previous)
-            window_end = min(latest_idx + 200, len(df))
-            if window_end > latest_idx:
-                window_data = df.iloc[latest_idx:window_end][["시", "고", "저", "종"]]
-                df.loc[latest_idx, "Max200"] = window_data.values.max()
-                df.loc[latest_idx, "Min200"] = window_data.values.min()
-            else:
-                df.loc[latest_idx, "Max200"] = np.nan
-                df.loc[latest_idx, "Min200"] = np.nan
+            max_vals, min_vals = ohlc_window_extrema(df, 200, rows=[latest_idx], partial=True)
+            df.loc[latest_idx, "Max200"] = max_vals[0]
+            df.loc[latest_idx, "Min200"] = min_vals[0]
             
             # 하단, 상단 계산 (5분봉은 Max200/Min200)
             current_price = df.loc[latest_idx, "종"]
@@ -8809,23 +10631,8 @@ def calculate_latest_row_only_1h(df, market_type):
     # 이 과정이 없으면 데이터가 제대로 읽히지 않아 len(df)가 줄어들고 fallback으로 튕김
     df = clean_df_display_format(df)
     
-    # Date(UTC) 컬럼 정규화 (Timestamp와 문자열 혼합 방지)
-    if 'Date(UTC)' in df.columns:
-        if df['Date(UTC)'].dtype == 'object':
-            # format 명시하여 파싱 시도 (연도/일 혼동 방지)
-            try:
-                df['Date(UTC)'] = pd.to_datetime(df['Date(UTC)'], format='%y/%m/%d,%H:%M', errors='coerce')
-            except:
-                # 쉼표 제거 후 형식 시도
-                try:
-                    df['Date(UTC)'] = df['Date(UTC)'].astype(str).str.replace(',', ' ', regex=False).str.strip()
-                    df['Date(UTC)'] = pd.to_datetime(df['Date(UTC)'], format='%y/%m/%d %H:%M', errors='coerce')
-                except:
-                    # fallback: format 없이 파싱
-                    df['Date(UTC)'] = pd.to_datetime(df['Date(UTC)'], errors='coerce')
-        else:
-            # 이미 datetime 타입이면 그대로 사용
-            pass
+    # Date(UTC) 정규화: datetime64가 아니면 한 번만 변환 (Timestamp와 문자열 혼합 방지)
+    ensure_utc_time(df)
     
     # ⚠️중요: 입력 데이터를 확실하게 현재→과거 순서로 정렬 (SMA 계산 일관성 보장)
     # 데이터 수집 과정에서 정렬이 여러 번 섞일 수 있으므로, 계산 직전에 확실하게 정렬
@@ -8887,23 +10694,29 @@ def calculate_latest_row_only_1h(df, market_type):
     if not new_data_indices:
         return df
     
-    # 새 데이터의 각 행에 대해 지표 계산
-    for idx in new_data_indices:
-        # SMA 계산: idx 포함하여 계산
-        df.loc[idx, "SMA25"] = df.iloc[idx:idx+25]["종"].mean() if idx + 25 <= len(df) else np.nan
-        df.loc[idx, "SMA100"] = df.iloc[idx:idx+100]["종"].mean() if idx + 100 <= len(df) else np.nan
-        df.loc[idx, "SMA200"] = df.iloc[idx:idx+200]["종"].mean() if idx + 200 <= len(df) else np.nan
-        df.loc[idx, "SMA400"] = df.iloc[idx:idx+400]["종"].mean() if idx + 400 <= len(df) else np.nan
-        df.loc[idx, "SMA800"] = df.iloc[idx:idx+800]["종"].mean() if idx + 800 <= len(df) else np.nan
-    
-        # Max200, Min200 계산: idx 포함 200개 캔들
-        if idx + 200 <= len(df):
-            window_data = df.iloc[idx:idx+200][["시", "고", "저", "종"]]
-            df.loc[idx, "Max200"] = window_data.values.max()
-            df.loc[idx, "Min200"] = window_data.values.min()
-        else:
-            df.loc[idx, "Max200"] = np.nan
-            df.loc[idx, "Min200"] = np.nan
+    # 새 행이 idx=0 하나뿐이면 증분 상태로 O(1) 계산. 새 행이 여러 개면(1분봉은 실행마다 약 15개) 어차피
+    # 공용 커널이 나머지 행을 계산하므로 idx=0 까지 한 번에 커널로 계산 (상태는 다음 단일 행 호출 때 따라잡음)
+    state_values = latest_row_indicators_from_state("1h", df, (25, 100, 200, 400, 800), 200) if new_data_indices == [0] else None
+    kernel_rows = new_data_indices[1:] if state_values is not None else new_data_indices
+    if state_values is not None:
+        sma_values, max_state, min_state = state_values
+        for window, value in sma_values.items():
+            df.loc[0, f"SMA{window}"] = value
+        df.loc[0, "Max200"] = max_state
+        df.loc[0, "Min200"] = min_state
+    if kernel_rows:
+        # SMA 계산: 새 데이터 행만, idx 포함하여 계산 (공용 커널)
+        closes = df["종"].to_numpy(dtype=np.float64)
+        for window in (25, 100, 200, 400, 800):
+            df.loc[kernel_rows, f"SMA{window}"] = reverse_window_sma(closes, window, rows=kernel_rows)
+        
+        # Max200, Min200 계산: idx 포함 200개 캔들 (공용 커널)
+        max_vals, min_vals = ohlc_window_extrema(df, 200, rows=kernel_rows)
+        df.loc[kernel_rows, "Max200"] = max_vals
+        df.loc[kernel_rows, "Min200"] = min_vals
+    
+    # 이하 지표는 마지막 새 행 기준 (기존 Max/Min 루프가 끝난 뒤의 idx와 동일)
+    idx = new_data_indices[-1]
     
     # 하단, 상단 계산
     current_price = df.loc[idx, "종"]
@@ -9007,12 +10820,10 @@ def calculate_latest_row_only_1d(df, market_type):
     # idx=0만 계산
     idx = 0
     
-    # SMA 계산: 2행(idx=0) 포함하여 계산
-    df.loc[idx, "SMA3"] = df.iloc[idx:idx+3]["종"].mean()
-    df.loc[idx, "SMA5"] = df.iloc[idx:idx+5]["종"].mean()
-    df.loc[idx, "SMA7"] = df.iloc[idx:idx+7]["종"].mean()
-    df.loc[idx, "SMA10"] = df.iloc[idx:idx+10]["종"].mean()
-    df.loc[idx, "SMA20"] = df.iloc[idx:idx+20]["종"].mean()
+    # SMA 계산: 2행(idx=0) 포함하여 계산 (공용 커널, 남은 행이 부족하면 있는 만큼 평균)
+    closes = df["종"].to_numpy(dtype=np.float64)
+    for window in (3, 5, 7, 10, 20):
+        df.loc[idx, f"SMA{window}"] = reverse_window_sma(closes, window, rows=[idx], partial=True)[0]
     
     # Max15, Min15 계산: 2행 포함 15개 캔들 (idx 0~14)
     window_data = df.iloc[idx:idx+15][["시", "고", "저", "종"]]
@@ -9429,122 +11240,29 @@ def calculate_latest_row_only_prft(df_15m: pd.DataFrame) -> pd.DataFrame:
 def calculate_sb5m_for_15m(df_15m, df_5m):
     """
     5분봉 데이터를 기반으로 15분봉에 SB5M 신호를 추가합니다.
-    5분봉 3개씩 그룹화해서 Buy/Sell 개수를 세어 판정합니다.
+    5분봉 3개씩 그룹화해서 Buy/Sell 개수를 세어 판정합니다 (buy1~buy3, sell1~sell3).
     날짜 기준은 UTC로 처리합니다 (바이낸스 기준).
     """
     if df_5m.empty or df_15m.empty:
         return df_15m
     
-    # 원본 보존
-    df_5m = df_5m.copy()
     df_15m = df_15m.copy()
     
-    # --- Date(UTC) 기준 그룹화 (바이낸스는 UTC 기준) ---
-    # 5분봉: 이미 datetime64면 그대로 사용, 문자열만 파싱
-    if pd.api.types.is_datetime64_any_dtype(df_5m['Date(UTC)']):
-        df_5m['Date(UTC)_dt'] = df_5m['Date(UTC)']
-    else:
-        # 문자열인 경우에만 파싱 (UserWarning 억제)
-        s = df_5m['Date(UTC)'].astype(str).str.strip().str.replace(',', ' ', regex=False)
-        import warnings
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore", UserWarning)
-            df_5m['Date(UTC)_dt'] = pd.to_datetime(s, errors='coerce')
-    df_5m = df_5m[df_5m['Date(UTC)_dt'].notna()].copy()
-    
-    if df_5m.empty:
+    if 'Date(UTC)' not in df_5m.columns or 'Date(UTC)' not in df_15m.columns:
         if 'SB5M' not in df_15m.columns:
             df_15m['SB5M'] = ''
         return df_15m
     
-    # 시간 정렬 (과거 → 현재)
-    df_5m = df_5m.sort_values('Date(UTC)_dt', ascending=True).reset_index(drop=True)
-    
-    # 5분봉: 15분 그룹 생성
-    df_5m['15min_group'] = df_5m['Date(UTC)_dt'].dt.floor('15min')
+    # 15분 버킷별 5분봉 Buy/Sell 개수 → SB5M 라벨 (그룹 리듀스)
+    labels, _, n_groups = reduce_child_signals(df_5m, df_15m['Date(UTC)'], "15m", 3)
+    if n_groups == 0:
+        # 유효한 5분봉 시간이 하나도 없을 때
+        if 'SB5M' not in df_15m.columns:
+            df_15m['SB5M'] = ''
+        return df_15m
     
-    # 15분봉: Date(UTC) 파싱 (이미 datetime64면 그대로 사용, 문자열만 파싱)
-    if pd.api.types.is_datetime64_any_dtype(df_15m['Date(UTC)']):
-        df_15m['Date(UTC)_dt'] = df_15m['Date(UTC)']
-    else:
-        # 문자열인 경우에만 파싱 (UserWarning 억제)
-        s = df_15m['Date(UTC)'].astype(str).str.strip().str.replace(',', ' ', regex=False)
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore", UserWarning)
-            df_15m['Date(UTC)_dt'] = pd.to_datetime(s, errors='coerce')
-    
-    # 15분봉: 15min_group 없으면 생성, 있으면 NaN만 채움
-    if '15min_group' not in df_15m.columns:
-        df_15m['15min_group'] = df_15m['Date(UTC)_dt'].dt.floor('15min')
-    else:
-        mask_na = df_15m['15min_group'].isna()
-        if mask_na.any():
-            df_15m.loc[mask_na, '15min_group'] = df_15m.loc[mask_na, 'Date(UTC)_dt'].dt.floor('15min')
-    
-    # --- 15분 그룹별 SB5M 신호 계산 ---
-    sb5m_data = []
-    for group_time, group_df in df_5m.groupby('15min_group', sort=True):
-        buy_count = 0
-        sell_count = 0
-        
-        for _, row in group_df.iterrows():
-            buy_val = row.get('Buy', '')
-            sell_val = row.get('Sell', '')
-            
-            if pd.notna(buy_val) and isinstance(buy_val, str) and buy_val.strip().lower() == 'buy':
-                buy_count += 1
-            elif pd.notna(sell_val) and isinstance(sell_val, str) and sell_val.strip().lower() == 'sell':
-                sell_count += 1
-        
-        if buy_count == 3:
-            sb5m_signal = 'buy3'
-        elif buy_count == 2:
-            sb5m_signal = 'buy2'
-        elif buy_count == 1:
-            sb5m_signal = 'buy1'
-        elif sell_count == 3:
-            sb5m_signal = 'sell3'
-        elif sell_count == 2:
-            sb5m_signal = 'sell2'
-        elif sell_count == 1:
-            sb5m_signal = 'sell1'
-        else:
-            sb5m_signal = ''
-        
-        sb5m_data.append({
-            '15min_group': group_time,
-            'SB5M': sb5m_signal
-        })
-    
-    # --- 여기부터가 핵심 변경: merge 제거, map 사용 ---
-    if sb5m_data:
-        sb5m_df = pd.DataFrame(sb5m_data)
-        
-        # 타입 통일 (datetime64[ns])
-        try:
-            if sb5m_df['15min_group'].dtype != 'datetime64[ns]':
-                sb5m_df['15min_group'] = pd.to_datetime(sb5m_df['15min_group'], errors='coerce')
-            if df_15m['15min_group'].dtype != 'datetime64[ns]':
-                df_15m['15min_group'] = pd.to_datetime(df_15m['15min_group'], errors='coerce')
-        except Exception:
-            pass
-        
-        # 15min_group → SB5M 매핑 딕셔너리
-        sb5m_map = dict(zip(sb5m_df['15min_group'], sb5m_df['SB5M']))
-        
-        # 기존 SB5M은 무시하고 새로 덮어씀
-        df_15m['SB5M'] = df_15m['15min_group'].map(sb5m_map)
-    else:
-        # SB5M 데이터가 하나도 없을 때
-        if 'SB5M' not in df_15m.columns:
-            df_15m['SB5M'] = ''
-    
-    # 최종: 빈 값은 ''로 통일
-    df_15m['SB5M'] = df_15m['SB5M'].fillna('')
-    
-    # 임시 컬럼 제거
-    if '15min_group' in df_15m.columns:
-        df_15m = df_15m.drop('15min_group', axis=1)
+    # 기존 SB5M은 무시하고 새로 덮어씀 (매칭 없는 행은 '')
+    df_15m['SB5M'] = _label_column(labels, df_15m.index)
     
     return df_15m
 
@@ -9941,14 +11659,16 @@ def _force_date_text(df):
         - KST 컬럼은 참고용으로만 표시 (계산 로직에는 사용하지 않음)
         - 엑셀에서 날짜형으로 자동 변환되지 않도록 문자열로 변환
     """
-    import numpy as np
     import re
     
     FMT_OUT = "%y/%m/%d,%H:%M"  # UTC 기준 시간 포맷
     
     def normalize_col(s: pd.Series) -> pd.Series:
-        # 1) 이미 datetime이면 바로 포맷 (UTC 기준)
-        if np.issubdtype(s.dtype, np.datetime64):
+        # 1) 이미 datetime이면 바로 포맷 (UTC 기준, int64 epoch-ms로 한 번에 변환 / NaT 있으면 strftime)
+        if pd.api.types.is_datetime64_any_dtype(s.dtype):
+            labels = datetime_text_labels(s)
+            if labels is not None:
+                return pd.Series(labels, index=s.index)
             return pd.to_datetime(s, utc=True).dt.strftime(FMT_OUT)  # UTC 기준으로 명시
 
         # 2) 문자열이면 케이스별 명시 포맷 적용
@@ -9988,6 +11708,1071 @@ def _force_date_text(df):
 # (김프 복사 제거)
 
 
+# -------------------- 15분봉 열 의존 그래프 (주문 경로 우선 계산) --------------------
+# 15분봉 후처리 열(SB1M~PRFT)을 노드(입력 열, 출력 열, 생산 함수)로 선언합니다.
+# - 입력 열은 그 노드보다 앞에 선언된 "마지막" 생산 노드로 해석 (StoSP처럼 두 번 계산되는 열 대응)
+# - 직전 행 값만 읽는 입력(ORDER의 TP, 1차 StoSP의 PRFT)은 순환이 되므로 의존으로 선언하지 않음
+# - 주문 경로는 TRADE_COLUMNS_15M의 전이 의존만 즉시 계산하고, 나머지(dateM, 3행 이후 복원)는
+#   엑셀 저장 직전에 require_all()로 지연 계산
+# 노드 선언 순서 = 기존 main() 실행 순서이므로, 선언 순서대로 실행하면 위상 정렬이 보장됩니다.
+
+# 주문 판단/주문량에 쓰이는 15분봉 열 (main()의 ORDER 신호 확인부와 주문 실행부가 읽는 열)
+TRADE_COLUMNS_15M = (
+    "ORDER", "LS", "KSC", "KSC stack", "Bomb", "BombCount", "PRFT", "TP", "TPC", "TPCS", "StoSU", "NBS",
+    "p", "1HCL", "-1HCL", "Samount", "Bamount", "buyside", "1HMSFast", "종",
+)
+
+
+def _produce_15m_sb1m(df_15m: pd.DataFrame, context: dict) -> pd.DataFrame:
+    """SB1M 열 (1분봉 데이터 기반, 15분봉 시트에만)"""
+    skip_first_row = context["skip_first_row"]
+    df_1m = context["df_1m"]
+    if not df_1m.empty:
+        if skip_first_row:
+            # 1단계: 전체 계산
+            df_15m = calculate_sb1m_for_15m(df_15m, df_1m)
+        else:
+            # 2단계: 최신 1개 행만 계산 (해당 15분 버킷의 1분봉만 읽음)
+            if len(df_15m) > 0 and 'Date(UTC)' in df_15m.columns and 'Date(UTC)' in df_1m.columns:
+                try:
+                    labels, child_counts, _ = reduce_child_signals(df_1m, df_15m['Date(UTC)'], "15m", 15, width=2, newest=1)
+                    # 1개라도 있으면 반영
+                    if child_counts[0] > 0:
+                        if 'SB1M' not in df_15m.columns:
+                            df_15m['SB1M'] = ''
+                        df_15m['SB1M'] = df_15m['SB1M'].astype('object')
+                        df_15m.loc[df_15m.index[0], 'SB1M'] = labels[0]
+                except Exception as e:
+                    print(f"{get_timestamp()} ⚠️SB1M 15분봉 2단계 계산 중 오류: {e}")
+                    import traceback
+                    traceback.print_exc()
+    return df_15m
+
+
+def _produce_15m_sb1h_sb1d(df_15m: pd.DataFrame, context: dict) -> pd.DataFrame:
+    """SB1H(1H4x 시트 매칭), SB1D(일봉) 열"""
+    skip_first_row = context["skip_first_row"]
+    df_1h4x = context["df_1h4x"]
+    df_1d = context["df_1d"]
+    if skip_first_row:
+        # 1단계: 전체 계산
+        df_15m = calculate_sb1h_for_15m(df_15m, df_1h4x)
+        
+        # SB1D 계산 (일봉에서 15분봉으로)
+        if not df_1d.empty:
+            df_15m = calculate_daysb_15m(df_15m, df_1d, "USD")
+
+    else:
+        # ⚠️중요: 2단계 계산은 Date(UTC) 기준으로만 수행 (KST는 기록용일 뿐, 필터링/매칭에는 사용하지 않음)
+        if len(df_15m) > 0:
+            # Date(UTC) 정규화: datetime64가 아니면 한 번만 변환 (Timestamp와 문자열 혼합 방지)
+            ensure_utc_time(df_15m)
+            
+            # SB1H 컬럼이 없으면 생성 (object 타입으로 명시)
+            if 'SB1H' not in df_15m.columns:
+                df_15m['SB1H'] = ''
+                df_15m['SB1H'] = df_15m['SB1H'].astype('object')
+            
+            # 최신 Date(UTC) 시간으로 필터링 (VLOOKUP 방식)
+            if 'Date(UTC)' in df_15m.columns:
+                # 최신 Date(UTC) 시간 사용 (이미 정렬되어 있으므로 iloc[0] 사용)
+                df_15m_temp = df_15m.iloc[0:1].copy()
+            else:
+                df_15m_temp = df_15m.iloc[0:1].copy()
+            
+            df_15m_temp = calculate_sb1h_for_15m(df_15m_temp, df_1h4x)
+            
+            # SB1D 계산
+            if not df_1d.empty:
+                df_15m_temp = calculate_daysb_15m(df_15m_temp, df_1d, "USD")
+
+            
+            # Date(UTC) 시간으로 매칭하여 업데이트
+            if len(df_15m_temp) > 0 and 'Date(UTC)' in df_15m_temp.columns:
+                target_date_utc = df_15m_temp.iloc[0]['Date(UTC)']
+                mask = df_15m['Date(UTC)'] == target_date_utc
+                if mask.any():
+                    # SB1H 업데이트
+                    val = df_15m_temp.iloc[0].get('SB1H', np.nan)
+                    df_15m['SB1H'] = df_15m['SB1H'].astype('object')
+                    df_15m.loc[mask, 'SB1H'] = np.nan if (pd.isna(val) or val == '') else val
+                    
+                    # SB1D 업데이트
+                    if 'SB1D' in df_15m_temp.columns:
+                        val_sb1d = df_15m_temp.iloc[0].get('SB1D', np.nan)
+                        if 'SB1D' not in df_15m.columns:
+                            df_15m['SB1D'] = ''
+                        df_15m['SB1D'] = df_15m['SB1D'].astype('object')
+                        df_15m.loc[mask, 'SB1D'] = np.nan if (pd.isna(val_sb1d) or val_sb1d == '') else val_sb1d
+            else:
+                # SB1H 업데이트
+                val = df_15m_temp.iloc[0].get('SB1H', np.nan) if len(df_15m_temp) > 0 else np.nan
+                df_15m['SB1H'] = df_15m['SB1H'].astype('object')
+                df_15m.loc[0, 'SB1H'] = np.nan if (pd.isna(val) or val == '') else val
+    
+                # SB1D 업데이트
+                if 'SB1D' in df_15m_temp.columns:
+                    val_sb1d = df_15m_temp.iloc[0].get('SB1D', np.nan) if len(df_15m_temp) > 0 else np.nan
+            if 'SB1D' not in df_15m.columns:
+                df_15m['SB1D'] = ''
+                df_15m['SB1D'] = df_15m['SB1D'].astype('object')
+                df_15m.loc[0, 'SB1D'] = np.nan if (pd.isna(val_sb1d) or val_sb1d == '') else val_sb1d
+    return df_15m
+
+
+def _produce_15m_amounts(df_15m: pd.DataFrame, context: dict) -> pd.DataFrame:
+    """SamountW/BamountW(주봉), Samount1D/Bamount1D(일봉), 최종 Samount/Bamount 열 (UTC 시간 기준 매칭)"""
+    skip_first_row = context["skip_first_row"]
+    df_weekly = context["df_weekly"]
+    df_1d = context["df_1d"]
+    if skip_first_row:
+        # 1단계: 전체 계산 (UTC 시간 기준으로 매칭)
+    # 15분봉에 주봉 SamountW, BamountW 추가 (바이낸스 주봉 기준, UTC 시간 기준으로 매칭)
+        df_15m = copy_weekly_amounts_to_15m(df_15m, df_weekly)
+    
+    # 15분봉에 일봉 Samount1D, Bamount1D 추가 (바이낸스 일봉 기준, UTC 시간 기준으로 매칭)
+        df_15m = copy_daily_amounts_to_15m(df_15m, df_1d)
+    
+    # 15분봉에 최종 Samount, Bamount 계산
+        df_15m = calculate_final_amounts(df_15m)
+    else:
+        # 2단계: 최신 1개만 계산 (previous에서 SamountW/BamountW/Samount1D/Bamount1D 유지)
+        # Previous에서 가져온 SamountW/BamountW/Samount1D/Bamount1D가 이미 있음
+        # 최신 1개(인덱스 0)만 계산
+        if len(df_15m) > 0:
+            row_0 = df_15m.iloc[0]
+            samountW = row_0.get("SamountW", np.nan)
+            bamountW = row_0.get("BamountW", np.nan)
+            samount1D = row_0.get("Samount1D", np.nan)
+            bamount1D = row_0.get("Bamount1D", np.nan)
+            
+            # SamountW/BamountW가 없으면 일봉/주봉에서 가져오기
+            # ⚠️중요: 주봉의 SamountW, BamountW는 buyside/sellside가 실시간으로 변하므로
+            # 매번 최신 값을 가져와야 함 (pd.isna 조건 제거)
+            if len(df_weekly) > 0:
+                samountW = df_weekly.iloc[0].get("SamountW", np.nan)
+                bamountW = df_weekly.iloc[0].get("BamountW", np.nan)
+                df_15m.loc[0, "SamountW"] = samountW
+                df_15m.loc[0, "BamountW"] = bamountW
+            
+            # ⚠️중요: 일봉의 Samount1D, Bamount1D는 buyside/sellside가 실시간으로 변하므로
+            # 매번 최신 값을 가져와야 함 (pd.isna 조건 제거)
+            if len(df_1d) > 0:
+                samount1D = df_1d.iloc[0].get("Samount1D", np.nan)
+                bamount1D = df_1d.iloc[0].get("Bamount1D", np.nan)
+                df_15m.loc[0, "Samount1D"] = samount1D
+                df_15m.loc[0, "Bamount1D"] = bamount1D
+            
+            # 최종 Samount, Bamount 계산 (2행만)
+            if not pd.isna(samountW) and not pd.isna(samount1D):
+                df_15m.loc[0, "Samount"] = 0.7 * samountW + 0.3 * samount1D
+            else:
+                df_15m.loc[0, "Samount"] = np.nan
+            
+            if not pd.isna(bamountW) and not pd.isna(bamount1D):
+                df_15m.loc[0, "Bamount"] = 0.7 * bamountW + 0.3 * bamount1D
+            else:
+                df_15m.loc[0, "Bamount"] = np.nan
+    return df_15m
+
+
+def _produce_15m_dateM(df_15m: pd.DataFrame, context: dict) -> pd.DataFrame:
+    """dateM 열 (엑셀 표시용, LD는 내부에서 dateM을 직접 계산)"""
+    if context["skip_first_row"]:
+        # 1단계: 전체 계산
+        return calculate_dateM(df_15m)
+    # 2단계: 2행(인덱스 0)만 계산
+    return calculate_latest_row_only_dateM(df_15m)
+
+
+def _produce_15m_LD(df_15m: pd.DataFrame, context: dict) -> pd.DataFrame:
+    """LD 열 (ORDER의 LD 게이트 입력)"""
+    if context["skip_first_row"]:
+        # 1단계: 전체 계산
+        return calculate_LD(df_15m)
+    # 2단계: 2행(인덱스 0)만 계산
+    return calculate_latest_row_only_LD(df_15m)
+
+
+def _produce_15m_sb5m(df_15m: pd.DataFrame, context: dict) -> pd.DataFrame:
+    """SB5M 열 (5분봉 데이터 기반, UTC 시간 기준으로 매칭, VLOOKUP 방식)"""
+    skip_first_row = context["skip_first_row"]
+    stage_prefix = context["stage_prefix"]
+    df_5m = context["df_5m"]
+    if skip_first_row:
+        # 1단계: 전체 계산 (UTC 시간 기준으로 매칭)
+        df_15m = calculate_sb5m_for_15m(df_15m, df_5m)
+    else:
+        # 2단계: 최신 행(인덱스 0, UTC 기준으로 정렬된 상태에서 최신)만 계산
+        if len(df_15m) > 0:
+            # SB5M 컬럼이 없으면 생성 (object 타입으로 명시)
+            if 'SB5M' not in df_15m.columns:
+                df_15m['SB5M'] = ''
+                df_15m['SB5M'] = df_15m['SB5M'].astype('object')
+            
+            # 최신 15분 버킷(인덱스 0)에 속하는 5분봉만 읽어 계산 (UTC 시간 기준)
+            sb5m_value = df_15m['SB5M'].iloc[0]
+            if 'Date(UTC)' in df_15m.columns and 'Date(UTC)' in df_5m.columns:
+                try:
+                    labels, child_counts, _ = reduce_child_signals(df_5m, df_15m['Date(UTC)'], "15m", 3, newest=1)
+                    
+                    # 검증: 해당 15분 그룹에 속하는 5분봉이 3개인지 확인
+                    if child_counts[0] != 3:
+                        print(f"{get_timestamp()} [{stage_prefix}] ⚠️ SB5M 시간 매칭 경고: 15분봉 {df_15m['Date(UTC)'].iloc[0]}에 해당하는 5분봉이 {max(child_counts[0], 0)}개 (예상: 3개)")
+                    if child_counts[0] > 0:
+                        sb5m_value = labels[0]
+                except Exception as e:
+                    print(f"{get_timestamp()} [{stage_prefix}] ⚠️ SB5M 시간 매칭 실패: {e}")
+            
+            # dtype 호환성을 위해 object 타입으로 변환
+            if df_15m['SB5M'].dtype != 'object':
+                df_15m['SB5M'] = df_15m['SB5M'].astype('object')
+            # 빈 문자열은 np.nan으로 변환
+            if pd.isna(sb5m_value) or sb5m_value == '':
+                sb5m_value = np.nan
+            df_15m.loc[0, 'SB5M'] = sb5m_value
+    return df_15m
+
+
+def _produce_15m_order(df_15m: pd.DataFrame, context: dict) -> pd.DataFrame:
+    """ORDER 열 (LD, SB1M/SB5M/SB1H/SB1D 계산 후)"""
+    skip_first_row = context["skip_first_row"]
+    if skip_first_row:
+        # 1단계: 전체 계산
+        df_15m = calculate_order_column(df_15m, f"{TICKER}USDT15M")
+    else:
+        # 2단계: 2행(인덱스 0)만 계산
+        if len(df_15m) > 0:
+            # ORDER 컬럼이 없으면 생성 (object 타입으로 명시)
+            if 'ORDER' not in df_15m.columns:
+                df_15m['ORDER'] = ''
+                df_15m['ORDER'] = df_15m['ORDER'].astype('object')
+            
+            df_15m_temp = df_15m.iloc[0:1].copy()
+            df_15m_temp = calculate_order_column(df_15m_temp, f"{TICKER}USDT15M")
+            order_value = df_15m_temp.iloc[0].get('ORDER', '')
+            # dtype 호환성을 위해 object 타입으로 변환
+            if df_15m['ORDER'].dtype != 'object':
+                df_15m['ORDER'] = df_15m['ORDER'].astype('object')
+            df_15m.loc[0, 'ORDER'] = order_value
+    return df_15m
+
+
+def _produce_15m_ksc(df_15m: pd.DataFrame, context: dict) -> pd.DataFrame:
+    """KSC, KSC stack, Bomb, BombCount 열 (ORDER 계산 후)"""
+    skip_first_row = context["skip_first_row"]
+    if skip_first_row:
+        # 1단계: 전체 계산
+        df_15m = calculate_ksc_for_15m(df_15m)
+    else:
+        # 2단계: 2행(인덱스 0)만 계산
+        df_15m = calculate_latest_row_only_ksc(df_15m)
+    return df_15m
+
+
+def _produce_15m_1hcl(df_15m: pd.DataFrame, context: dict) -> pd.DataFrame:
+    """1HCL, -1HCL, p 열 (1시간봉에서 복사)"""
+    df_1h = context["df_1h"]
+    if not df_1h.empty:
+        df_15m = copy_1hclass_to_15m(df_15m, df_1h)
+        df_15m = copy_minus_1hclass_to_15m(df_15m, df_1h)
+        df_15m = copy_p1h_to_15m_and_set_p(df_15m, df_1h)
+    return df_15m
+
+
+def _produce_15m_stosp(df_15m: pd.DataFrame, context: dict) -> pd.DataFrame:
+    """StoSP, TP, StoSU, TPC, TPCS, NBS 열 (StoSP는 누적 계산이므로 1/2단계 모두 전체 재계산)"""
+    return calculate_stosp_stosu(df_15m)
+
+
+def _produce_15m_prft(df_15m: pd.DataFrame, context: dict) -> pd.DataFrame:
+    """PRFT 열 (TP 계산 후)"""
+    if context["skip_first_row"]:
+        # 1단계: 전체 계산
+        return calculate_prft_for_15m(df_15m)
+    # 2단계: 2행(인덱스 0)만 계산
+    return calculate_latest_row_only_prft(df_15m)
+
+
+def _restore_15m_previous_dateM_LD(df_15m: pd.DataFrame, context: dict) -> pd.DataFrame:
+    """2단계일 때 3행 이후(인덱스 1부터)의 dateM, LD를 previous 값으로 복원 (엑셀 전용)"""
+    skip_first_row = context["skip_first_row"]
+    df_prev_15m = context["df_prev_15m"]
+    df_prev_15m_backup = context["df_prev_15m_backup"]
+    if not skip_first_row and not df_prev_15m.empty and len(df_15m) > 1:
+        # 2행(인덱스 0)은 새로 계산된 값 유지, 3행부터(인덱스 1부터)는 previous 값으로 복원
+        # dateM, LD 컬럼만 복원 (전체 계산 함수로 인해 변동됨)
+        restore_len = min(len(df_15m) - 1, len(df_prev_15m_backup))
+        if restore_len > 0:
+            # dateM, LD 컬럼만 복원
+            for col in ['dateM', 'LD']:
+                if col in df_prev_15m_backup.columns and col in df_15m.columns:
+                    source_values = df_prev_15m_backup[col].values[:restore_len]
+                    target_dtype = df_15m[col].dtype
+                    
+                    try:
+                        if target_dtype == 'object':
+                            df_15m.loc[df_15m.index[1:1+restore_len], col] = pd.Series(source_values, dtype=object).values
+                        elif pd.api.types.is_datetime64_any_dtype(target_dtype):
+                            converted = pd.to_datetime(source_values, errors='coerce')
+                            df_15m.loc[df_15m.index[1:1+restore_len], col] = converted.values
+                        elif pd.api.types.is_integer_dtype(target_dtype) or pd.api.types.is_float_dtype(target_dtype):
+                            converted_values = pd.to_numeric(source_values, errors='coerce')
+                            if converted_values.isna().any() and not pd.api.types.is_float_dtype(target_dtype):
+                                df_15m[col] = df_15m[col].astype('float64')
+                            df_15m.loc[df_15m.index[1:1+restore_len], col] = converted_values.values
+                        else:
+                            df_15m.loc[df_15m.index[1:1+restore_len], col] = source_values
+                    except Exception as e:
+                        df_15m[col] = df_15m[col].astype(object)
+                        df_15m.loc[df_15m.index[1:1+restore_len], col] = pd.Series(source_values, dtype=object).values
+    return df_15m
+
+
+_STOSP_INPUTS_15M = ("ORDER", "KSC", "Bomb", "BombCount", "1HCL", "-1HCL", "p", "Bamount", "1HMSFast")
+
+COLUMN_GRAPH_15M = [
+    {"name": "SB1M", "inputs": ("Date(UTC)",), "outputs": ("SB1M",), "producer": _produce_15m_sb1m},
+    {"name": "SB1H/SB1D", "inputs": ("Date(UTC)",), "outputs": ("SB1H", "SB1D"), "producer": _produce_15m_sb1h_sb1d},
+    {"name": "Samount/Bamount", "inputs": ("Date(UTC)",), "outputs": ("SamountW", "BamountW", "Samount1D", "Bamount1D", "Samount", "Bamount"), "producer": _produce_15m_amounts},
+    {"name": "dateM", "inputs": ("고", "Date(UTC)"), "outputs": ("dateM",), "producer": _produce_15m_dateM},
+    {"name": "LD", "inputs": ("종", "시", "고", "저", "SMA3", "SMA5", "SMA7", "SMA10", "SMA20"), "outputs": ("LD",), "producer": _produce_15m_LD},
+    {"name": "SB5M", "inputs": ("Date(UTC)",), "outputs": ("SB5M",), "producer": _produce_15m_sb5m},
+    {"name": "ORDER", "inputs": ("Buy", "Sell", "sellside", "1HMSFast", "SB1M", "SB5M", "SB1H", "SB1D", "LD"), "outputs": ("ORDER",), "producer": _produce_15m_order},
+    {"name": "KSC", "inputs": ("ORDER", "1HMSFast", "SMA25", "SMA100", "SMA200", "SPRD2"), "outputs": ("KSC", "KSC stack", "Bomb", "BombCount"), "producer": _produce_15m_ksc},
+    {"name": "1HCL", "inputs": ("Date(UTC)",), "outputs": ("1HCL", "-1HCL", "p"), "producer": _produce_15m_1hcl},
+    {"name": "StoSP", "inputs": _STOSP_INPUTS_15M, "outputs": ("StoSP", "TP", "StoSU", "TPC", "TPCS", "NBS"), "producer": _produce_15m_stosp},
+    {"name": "PRFT", "inputs": ("ORDER", "StoSP", "TP", "StoSU"), "outputs": ("PRFT",), "producer": _produce_15m_prft},
+    # PRFT 반영 후 StoSP/TP/NBS 재계산 (TPOVER로 인한 초기화 반영)
+    {"name": "StoSP(PRFT 반영)", "inputs": _STOSP_INPUTS_15M + ("PRFT",), "outputs": ("StoSP", "TP", "StoSU", "TPC", "TPCS", "NBS"), "producer": _produce_15m_stosp},
+    # 3행 이후 복원은 어떤 열 요청으로도 끌려오지 않음 (require_all 전용)
+    {"name": "dateM/LD 복원", "inputs": ("dateM", "LD"), "outputs": (), "producer": _restore_15m_previous_dateM_LD},
+]
+
+
+class ColumnGraph15m:
+    """
+    15분봉 후처리 열 의존 그래프 실행기.
+    require(columns)는 요청 열의 전이 의존 노드만 선언 순서대로 실행하고, 각 노드는 한 번만 실행됩니다.
+    """
+
+    def __init__(self, df_15m: pd.DataFrame, context: dict, nodes=None):
+        self.df = df_15m
+        self.context = context
+        self.nodes = list(COLUMN_GRAPH_15M if nodes is None else nodes)
+        self.done = set()
+        self.timings = {}
+
+    def _producer_of(self, column: str, before: int) -> Optional[int]:
+        for pos in range(before - 1, -1, -1):
+            if column in self.nodes[pos]["outputs"]:
+                return pos
+        return None  # 생산 노드 없음 = 지표 단계에서 이미 있는 기본 열
+
+    def resolve(self, columns) -> List[str]:
+        needed = set()
+        stack = [self._producer_of(column, len(self.nodes)) for column in columns]
+        while stack:
+            pos = stack.pop()
+            if pos is None or pos in needed:
+                continue
+            needed.add(pos)
+            stack.extend(self._producer_of(column, pos) for column in self.nodes[pos]["inputs"])
+        return [self.nodes[pos]["name"] for pos in sorted(needed)]
+
+    def _run(self, names) -> pd.DataFrame:
+        for node in self.nodes:
+            if node["name"] in names and node["name"] not in self.done:
+                started = time.perf_counter()
+                self.df = node["producer"](self.df, self.context)
+                self.timings[node["name"]] = time.perf_counter() - started
+                self.done.add(node["name"])
+        return self.df
+
+    def require(self, columns) -> pd.DataFrame:
+        return self._run(set(self.resolve(columns)))
+
+    def require_all(self) -> pd.DataFrame:
+        return self._run({node["name"] for node in self.nodes})
+
+    def pending(self) -> List[str]:
+        return [node["name"] for node in self.nodes if node["name"] not in self.done]
+
+
+def finalize_15m_sheet_columns(df_15m: pd.DataFrame) -> pd.DataFrame:
+    """
+    15분봉 시트 컬럼 순서 맞춤 (Max70, Min70 사용, SMA12 추가, SamountW/BamountW, Samount1D/Bamount1D,
+    최종 Samount/Bamount 추가, dateM, LD, SPRD, SPRD2 추가, SB1M 추가) - Source와 동일한 순서 (김프 제외)
+    주문 실행부도 이 결과를 읽으므로 엑셀 저장 전에 주문할 때도 같은 열 구성을 사용합니다.
+    """
+    df = df_15m.copy()
+    columns = ["Date(UTC)", "KST", "종", "시", "고", "저", "Vol.", "SMA3", "SMA5", "SMA7", "SMA10", "SMA12", "SMAF", "SMA20", "SMA25", "SMA100", "SMA200", "SMA400", "SMA800", "Max70", "Min70", "하단", "상단", "SFast", "Fast", "Base", "4or1", "buyside", "sellside", "Sell", "Buy", "SB1M", "SB5M", "SB1H", "SB1D", "ORDER", "1HMSFast", "1HCL", "-1HCL", "p", "KSC", "Bomb", "PRFT", "StoSP", "TP", "StoSU", "TPC", "TPCS", "NBS", "LS", "SamountW", "BamountW", "Samount1D", "Bamount1D", "Samount", "Bamount", "dateM", "LD", "SPRD", "SPRD2"]
+    
+    # 누락된 열들을 기본값으로 추가 (Source와 동일한 구조 유지, SMA400/SMA800 추가)
+    if 'SMA400' not in df.columns:
+        df['SMA400'] = np.nan
+    if 'SMA800' not in df.columns:
+        df['SMA800'] = np.nan
+    if '1HCL' not in df.columns:
+        df['1HCL'] = np.nan
+    if '-1HCL' not in df.columns:
+        df['-1HCL'] = np.nan
+    if 'p' not in df.columns:
+        df['p'] = np.nan
+    if 'StoSP' not in df.columns:
+        df['StoSP'] = np.nan
+    if 'TP' not in df.columns:
+        df['TP'] = np.nan
+    if 'StoSU' not in df.columns:
+        df['StoSU'] = np.nan
+    if 'TPC' not in df.columns:
+        df['TPC'] = 0
+    if 'TPCS' not in df.columns:
+        df['TPCS'] = 0
+    if 'NBS' not in df.columns:
+        df['NBS'] = 0
+    if 'LS' not in df.columns:
+        df['LS'] = ''  # 헤더만, 내용 채우지 않음
+    if 'SPRD' not in df.columns:
+        df['SPRD'] = np.nan
+    # bomb → Bomb로 변경 (대소문자 통일)
+    if 'bomb' in df.columns and 'Bomb' not in df.columns:
+        df['Bomb'] = df['bomb']
+        df = df.drop(columns=['bomb'], errors='ignore')
+    elif 'Bomb' not in df.columns:
+        df['Bomb'] = ''
+    
+    # 존재하는 컬럼만 선택 (Source 순서 유지)
+    columns = [col for col in columns if col in df.columns]
+    df = df[columns]
+    return df
+
+
+def execute_15m_order_signal(df_15m: pd.DataFrame, stage_prefix: str) -> None:
+    """
+    15분봉 최신행 ORDER/LS 신호로 주문을 실행합니다 (2단계 폴링 전용).
+    주문 경로 열(TRADE_COLUMNS_15M)만 계산된 직후, 엑셀 저장을 기다리지 않고 호출됩니다.
+    """
+    try:
+        if len(df_15m) == 0:
+            print(f"{get_timestamp()} [{stage_prefix}] ⚠️ 주문 실행 스킵: 15분봉 데이터가 비어있습니다.")
+        else:
+            latest_order = df_15m.iloc[0].get("ORDER", "")
+            latest_ksc = df_15m.iloc[0].get("KSC", 0)
+
+            # LS 시그널(1, -1, 0.5, -0.5) 시 선물 전략 실행. 0.5/-0.5는 진입량 절반. TP/SL/BE 동일.
+            if ENABLE_FUTURES_LS_STRATEGY:
+                latest_ls_raw = df_15m.iloc[0].get("LS", "")
+                latest_ls = None
+                try:
+                    if latest_ls_raw not in ("", None) and pd.notna(latest_ls_raw):
+                        v = float(latest_ls_raw)
+                        if v in (1.0, -1.0, 0.5, -0.5):
+                            latest_ls = v
+                except (TypeError, ValueError):
+                    pass
+                if latest_ls is not None and latest_ls in (1.0, -1.0, 0.5, -0.5) and TICKER in ROTATION_TICKERS:
+                    row0 = df_15m.iloc[0]
+                    K_close = row0.get("종", None)
+                    try:
+                        K_val = float(K_close) if K_close is not None and pd.notna(K_close) else None
+                    except (TypeError, ValueError):
+                        K_val = None
+                    execute_futures_strategy(latest_ls, f"{TICKER}USDT", stage_prefix=stage_prefix, K=K_val)
+
+        if latest_order:
+            print(f"{get_timestamp()} [{stage_prefix}] 🚨 ORDER 신호 감지: {TICKER} {latest_order}")
+            # Samount, Bamount 값 추출
+            latest_samount = df_15m.iloc[0].get("Samount", 0)
+            latest_bamount = df_15m.iloc[0].get("Bamount", 0)
+
+            # NaN 체크
+            if pd.isna(latest_samount):
+                latest_samount = 0
+            if pd.isna(latest_bamount):
+                latest_bamount = 0
+
+            # ============================================================
+            # KSC 주문량 적용 로직 (Buy 신호에만 적용)
+            # 다른 시트(업비트 등)에도 동일하게 적용 가능
+            # ============================================================
+            # 
+            # [1단계] Multiplier 계산 (수열 규칙)
+            #   - KSC가 3의 배수일 때만 3, 나머지는 0
+            #   - 패턴: 0, 0, 3, 0, 0, 3, 0, 0, 3, ...
+            #   - 함수: calculate_ksc_multiplier(ksc_value, ksc_stack)
+            # 
+            # [2단계] B값 계산 (Bomb 발생 시에만)
+            #   - multiplier == 0: B = ((ksc_stack - 1) % 3) + 1 (1,2,3 반복)
+            #   - multiplier != 0: B = 0
+            #   - 함수: calculate_bomb_b_value(multiplier, ksc_stack)
+            # 
+            # [3단계] Z값 계산
+            #   - Z = multiplier + if(bomb발생, B값, 0)
+            #   - Bomb 미발생: Z = multiplier
+            #   - Bomb 발생: Z = multiplier + B값
+            # 
+            # [4단계] 주문량 계산
+            #   - base_amount = TRADING_UNIT + bamount
+            #   - 주문량 = base_amount × Z
+            #   - 예시: TRADING_UNIT=7, bamount=0, Z=3
+            #     → 주문량 = (7 + 0) × 3 = 21 USDT
+            # ============================================================
+
+            Z = 1  # 기본값 (multiplier가 없을 때)
+            ksc_numeric = 0  # KSC 값을 숫자로 변환 (조건문 밖에서 초기화)
+            if latest_order in ['Buy5', 'Buy10']:
+                # KSC 값을 숫자로 변환
+                if isinstance(latest_ksc, (int, float)):
+                    ksc_numeric = int(latest_ksc)
+                elif isinstance(latest_ksc, str):
+                    try:
+                        ksc_numeric = int(float(latest_ksc))
+                    except:
+                        ksc_numeric = 0
+
+                # KSC stack 값 확인 (숫자만)
+                latest_ksc_stack = df_15m.iloc[0].get("KSC stack", 0)
+                if pd.isna(latest_ksc_stack):
+                    latest_ksc_stack = 0
+                latest_ksc_stack = int(latest_ksc_stack)
+
+                # Bomb 열 확인
+                latest_bomb = df_15m.iloc[0].get("Bomb", "")
+                is_bomb = (isinstance(latest_bomb, str) and latest_bomb.strip() == "Bomb")
+
+                # KSC 스택이 쌓이는 상황인지 확인
+                # - KSC 스택이 쌓이는 상황: KSC > 0 또는 Bomb 발생
+                # - KSC 스택이 쌓이는 상황이 아님: KSC = 0이고 Bomb 아님
+                is_ksc_stack_building = (ksc_numeric > 0 or latest_ksc_stack > 0 or is_bomb)
+
+                if is_ksc_stack_building:
+                    # KSC 스택이 쌓이는 상황: Z값으로 주문 전송 컨트롤 필요
+                    # p값: 15M 열 p(= 3+p1H) 우선, 없으면 3 + 1HCL
+                    latest_p = df_15m.iloc[0].get("p", np.nan)
+                    if pd.notna(latest_p):
+                        try:
+                            p_value = int(float(latest_p))
+                        except (TypeError, ValueError):
+                            latest_1hcl = df_15m.iloc[0].get("1HCL", np.nan)
+                            p_value = 3 + (int(float(latest_1hcl)) if pd.notna(latest_1hcl) else 0)
+                    else:
+                        latest_1hcl = df_15m.iloc[0].get("1HCL", np.nan)
+                        p_value = 3 + (int(float(latest_1hcl)) if pd.notna(latest_1hcl) else 0)
+
+                    # bomb 발생 시 KSC stack이 0이면 KSC 값을 사용
+                    if is_bomb and latest_ksc_stack == 0 and ksc_numeric > 0:
+                        latest_ksc_stack = ksc_numeric
+                        print(f"{get_timestamp()} [{stage_prefix}] ⚠️ Bomb 발생 시 KSC stack이 0, KSC 값({ksc_numeric})을 사용하여 재계산...")
+
+                    # 1. multiplier 계산 (수열 규칙)
+                    # Bomb 발생 시: KSC stack 값을 사용하여 multiplier 계산
+                    # 일반 경우: KSC 값을 사용하여 multiplier 계산
+                    if is_bomb:
+                        # Bomb 발생 시 KSC stack 값을 사용
+                        multiplier = calculate_ksc_multiplier(latest_ksc_stack, latest_ksc_stack, p_value)
+                    else:
+                        # 일반 경우 KSC 값을 사용
+                        multiplier = calculate_ksc_multiplier(ksc_numeric, latest_ksc_stack, p_value)
+
+                    # 2. B 값 계산 (Bomb 발생 시)
+                    B_value = 0
+                    if is_bomb:
+                        B_value = calculate_bomb_b_value(multiplier, latest_ksc_stack, p_value)
+                        bomb_msg = f"{get_timestamp()} [{stage_prefix}] 💣 Bomb 감지: KSC={latest_ksc}, bomb={latest_bomb}, KSC stack={latest_ksc_stack}, multiplier={multiplier}, B={B_value}, p={p_value}"
+                        print(bomb_msg)
+                        send_discord_message(bomb_msg)
+
+                    # 3. Z = multiplier(수열) + if(bomb발생, B값, 0)
+                    # Z값 계산식: Z = multiplier + if(Bomb 발생, B값, 0)
+                    # - Bomb 미발생: Z = multiplier
+                    # - Bomb 발생: Z = multiplier + B값
+                    # - multiplier와 B값은 독립적으로 계산됨
+                    # - Bomb 발생 시 multiplier가 0이어도 B값으로 Z > 0이 되면 주문 가능
+                    Z = multiplier + B_value
+
+                    # KSC = 1인 경우: p의 배수가 아니어도 주문 전송 (Z = 0이면 Z = 1로 강제 설정)
+                    if ksc_numeric == 1 and Z == 0:
+                        Z = 1
+                        print(f"{get_timestamp()} [{stage_prefix}] ℹ️ KSC=1: p의 배수가 아니어도 주문 전송 (Z=1로 설정)")
+
+                    if Z > 1:
+                        print(f"{get_timestamp()} [{stage_prefix}] 📊 KSC multiplier: {multiplier}, B값: {B_value}, 최종 Z: {Z}")
+
+                    # 선물 스크립트: KSC/p 배수 차단 없음 — Z=0이면 Z=1로 두고 주문 진행
+                    if ksc_numeric > 1 and Z == 0 and not is_bomb:
+                        Z = 1
+                else:
+                    # KSC 스택이 쌓이는 상황이 아님: Z값으로 컨트롤 필요 없음
+                    # Z = 1로 유지하여 base_amount (1unit + bamount)로 주문 전송
+                    print(f"{get_timestamp()} [{stage_prefix}] ℹ️ KSC=0 : Z=1 base_amount(1unit+bamount)로 주문")
+
+            # ORDER 신호가 Sell5/Sell10이면 KSC 초기화 (이미 KSC 계산 로직에서 처리됨)
+            elif latest_order in ['Sell5', 'Sell10']:
+                # KSC는 이미 계산 로직에서 0으로 초기화됨
+                Z = 1  # Sell 신호는 multiplier 적용 안 함
+
+            # PRFT가 되는 타이밍의 ORDER 신호에 multiplier 계산 (Sell 신호에만 적용)
+            # prft multiplier = 1 + (1 - buyside) = 2 - buyside
+            latest_prft = df_15m.iloc[0].get("PRFT", 0)
+            latest_buyside = df_15m.iloc[0].get("buyside", np.nan)
+
+            # buyside_val 초기화 (조건문 밖에서 먼저 정의)
+            buyside_val = float(latest_buyside) if not pd.isna(latest_buyside) else None
+
+            prft_multiplier = 1
+            if latest_order in ['Sell5', 'Sell10'] and latest_prft == 'PRFT':
+                # PRFT multiplier = 1 + (1 - buyside) = 2 - buyside
+                if buyside_val is not None:
+                    prft_multiplier = 1 + (1 - buyside_val)  # = 2 - buyside
+                    print(f"{get_timestamp()} [{stage_prefix}] 💰 PRFT 감지: buyside={buyside_val:.4f}, multiplier={prft_multiplier:.4f} (1 + (1 - {buyside_val:.4f}))")
+
+            # 직전행 TP 가져오기 (수수료 조건 체크용)
+            prev_tp_for_trade = None
+            if len(df_15m) > 1:
+                prev_row_for_trade = df_15m.iloc[1]
+                prev_tp_raw = prev_row_for_trade.get("TP", np.nan)
+                if pd.notna(prev_tp_raw):
+                    try:
+                        prev_tp_for_trade = float(prev_tp_raw)
+                        if prev_tp_for_trade <= 0:
+                            prev_tp_for_trade = None
+                    except (TypeError, ValueError):
+                        prev_tp_for_trade = None
+
+            # 기타 필요한 값들 가져오기
+            latest_hmsfast = df_15m.iloc[0].get("1HMSFast", np.nan)
+            hmsfast_val = float(latest_hmsfast) if pd.notna(latest_hmsfast) else None
+
+            latest_decision_price = df_15m.iloc[0].get("종", np.nan)
+            decision_price_val = float(latest_decision_price) if pd.notna(latest_decision_price) else None
+
+            # TPC 값 가져오기 (TPOVER 매도 시 사용)
+            latest_tpc = df_15m.iloc[0].get("TPC", 0)
+            tpc_value_for_trade = 0.0
+            try:
+                tpc_value_for_trade = float(latest_tpc) if pd.notna(latest_tpc) else 0.0
+            except (TypeError, ValueError):
+                tpc_value_for_trade = 0.0
+
+            # StoSU 값 가져오기 (TPOVER 매도 시 사용)
+            latest_stosu = df_15m.iloc[0].get("StoSU", 0.0)
+            stosu_value_for_trade = 0.0
+            try:
+                stosu_value_for_trade = float(latest_stosu) if pd.notna(latest_stosu) else 0.0
+            except (TypeError, ValueError):
+                stosu_value_for_trade = 0.0
+
+            # 4. 주문량 = (1유닛 + bamount) × Z
+            # p값: 15M 열 p(= 3+p1H) 우선, 없으면 1HCL로 3+1HCL 계산
+            latest_p_for_trade = df_15m.iloc[0].get("p", np.nan)
+            p_value_for_trade = int(float(latest_p_for_trade)) if pd.notna(latest_p_for_trade) else None
+            latest_1hcl_for_trade = df_15m.iloc[0].get("1HCL", np.nan)
+            h1cl_for_trade = int(float(latest_1hcl_for_trade)) if pd.notna(latest_1hcl_for_trade) else None
+            if ENABLE_SPOT_TRADING:
+                trade_on_order_signal(latest_order, symbol=f"{TICKER}USDT", samount=float(latest_samount), bamount=float(latest_bamount), bomb_multiplier=Z, prft_value=latest_prft, ksc_numeric=ksc_numeric, prft_multiplier=prft_multiplier, hmsfast=hmsfast_val, buyside=buyside_val, tpc_value=tpc_value_for_trade, stosu=stosu_value_for_trade, decision_price=decision_price_val, prev_tp=prev_tp_for_trade, h1cl=h1cl_for_trade, p_value=p_value_for_trade, stage_prefix=stage_prefix)
+            else:
+                print(f"{get_timestamp()} [{stage_prefix}] ℹ️ 스팟 주문 비활성화 - ORDER 신호만 감지 ({TICKER} {latest_order})")
+        else:
+            print(f"{get_timestamp()} [{stage_prefix}] ℹ️ ORDER 신호: {TICKER} 없음")
+    except Exception as e:
+        print(f"{get_timestamp()} [{stage_prefix}] ❌ 주문 실행 중 오류: {e}")
+
+
+# -------------------- 단계별 프로파일러 (main 실행 구간 계측) --------------------
+# 로테이션 1회(사이클)마다 티커별 main() 단계 구간의 벽시계/CPU 시간, RSS, (선택) tracemalloc을 기록하고
+# logs/profile_{PREVIOUS|AFTER}_{UTC 시각}.json으로 저장합니다. 사이클 간 JSON을 비교하면
+# 티커 수가 늘 때 15분 예산을 어느 단계가 먹는지 바로 보입니다.
+# - stage(name): 현재 구간을 닫고 새 구간을 엶 (main() 본문을 들여쓰기 없이 구간으로 나눔)
+# - 티커 진행 중이면 티커 구간, 아니면 사이클 구간(선수집, 4day 분석 등)으로 기록
+# - RSS는 psutil이 있으면 현재 RSS, 없으면 resource(유닉스)의 프로세스 최대 RSS만 기록
+try:
+    import psutil  # 선택 패키지 (RSS 측정)
+except ImportError:
+    psutil = None
+import tracemalloc
+
+ENABLE_STAGE_PROFILER = True
+STAGE_PROFILER_TRACEMALLOC = False     # True면 단계별 파이썬 할당량(현재/최대)과 티커별 상위 할당 위치 기록 (느려짐)
+STAGE_PROFILER_TOP_ALLOCATIONS = 5     # 티커별로 기록할 tracemalloc 상위 할당 위치 수
+STAGE_PROFILER_SUMMARY_TOP = 5         # 사이클 종료 시 터미널에 출력할 단계 수 (티커 합계 기준)
+CYCLE_BUDGET_SEC = 15 * 60             # 로테이션 1회 시간 예산 (15분봉 주기)
+
+
+def _current_rss_mb() -> Optional[float]:
+    if psutil is None:
+        return None
+    try:
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except Exception:
+        return None
+
+
+def _process_peak_rss_mb() -> Optional[float]:
+    """프로세스 최대 RSS (윈도우 psutil: peak_wset, 유닉스: ru_maxrss)"""
+    if psutil is not None:
+        try:
+            peak = getattr(psutil.Process().memory_info(), "peak_wset", None)
+            if peak is not None:
+                return peak / (1024 * 1024)
+        except Exception:
+            pass
+    try:
+        import resource
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024   # macOS: bytes, 리눅스: KB
+    except Exception:
+        return None
+
+
+def _round_or_none(value, digits: int = 3):
+    return None if value is None else round(value, digits)
+
+
+class StageProfiler:
+    """로테이션 사이클 → 티커 → 단계 구간 계측기 (전역 인스턴스 _stage_profiler 사용)"""
+
+    def __init__(self, enabled: bool = True, trace_allocations: bool = False):
+        self.enabled = enabled
+        self.trace_allocations = trace_allocations
+        self.cycle = None
+        self.ticker = None
+        self._open = None       # (구간 이름, 벽시계 시작, CPU 시작, 기록 대상 리스트)
+        self._started_tracemalloc = False
+
+    def begin_cycle(self, stage_prefix: str, tickers: List[str]) -> None:
+        if not self.enabled:
+            return
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self.cycle = {
+            "stage_prefix": stage_prefix,
+            "started_utc": dt.datetime.now(tz.UTC).strftime("%Y-%m-%d %H:%M:%S"),
+            "tickers_requested": list(tickers),
+            "budget_s": CYCLE_BUDGET_SEC,
+            "stages": [],
+            "tickers": [],
+            "_wall0": time.perf_counter(),
+            "_cpu0": time.process_time(),
+        }
+        self.ticker = None
+        self._open = None
+
+    def stage(self, name: str) -> None:
+        """현재 구간을 닫고 name 구간 시작"""
+        if self.cycle is None:
+            return
+        self._close_open()
+        target = self.ticker["stages"] if self.ticker is not None else self.cycle["stages"]
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self._open = (name, time.perf_counter(), time.process_time(), target)
+
+    def _close_open(self) -> None:
+        if self._open is None:
+            return
+        name, wall0, cpu0, target = self._open
+        record = {
+            "name": name,
+            "wall_s": round(time.perf_counter() - wall0, 4),
+            "cpu_s": round(time.process_time() - cpu0, 4),
+            "rss_mb": _round_or_none(_current_rss_mb(), 1),
+        }
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            record["py_alloc_mb"] = round(current / (1024 * 1024), 2)
+            record["py_alloc_peak_mb"] = round(peak / (1024 * 1024), 2)
+        target.append(record)
+        if self.ticker is not None and record["rss_mb"] is not None:
+            self.ticker["peak_rss_mb"] = max(self.ticker["peak_rss_mb"] or 0.0, record["rss_mb"])
+        self._open = None
+
+    def begin_ticker(self, ticker: str) -> None:
+        if self.cycle is None:
+            return
+        self._close_open()
+        self.ticker = {
+            "ticker": ticker,
+            "stages": [],
+            "peak_rss_mb": _round_or_none(_current_rss_mb(), 1),
+            "_wall0": time.perf_counter(),
+            "_cpu0": time.process_time(),
+        }
+        self.stage("시작")
+
+    def end_ticker(self, status: str = "ok") -> None:
+        if self.cycle is None or self.ticker is None:
+            return
+        self._close_open()
+        ticker = self.ticker
+        ticker["status"] = status
+        ticker["wall_s"] = round(time.perf_counter() - ticker.pop("_wall0"), 4)
+        ticker["cpu_s"] = round(time.process_time() - ticker.pop("_cpu0"), 4)
+        if tracemalloc.is_tracing() and STAGE_PROFILER_TOP_ALLOCATIONS > 0:
+            stats = tracemalloc.take_snapshot().statistics("lineno")[:STAGE_PROFILER_TOP_ALLOCATIONS]
+            ticker["top_allocations"] = [
+                {"where": f"{os.path.basename(s.traceback[0].filename)}:{s.traceback[0].lineno}",
+                 "size_mb": round(s.size / (1024 * 1024), 2), "count": s.count}
+                for s in stats
+            ]
+        self.cycle["tickers"].append(ticker)
+        self.ticker = None
+
+    def end_cycle(self) -> Optional[str]:
+        """사이클 종료: JSON 보고서 저장 후 경로 반환 (단계 합계 상위 항목 터미널 출력)"""
+        if self.cycle is None:
+            return None
+        if self.ticker is not None:
+            self.end_ticker(status="interrupted")
+        self._close_open()
+        cycle = self.cycle
+        self.cycle = None
+        cycle["wall_s"] = round(time.perf_counter() - cycle.pop("_wall0"), 4)
+        cycle["cpu_s"] = round(time.process_time() - cycle.pop("_cpu0"), 4)
+        cycle["budget_used_pct"] = round(cycle["wall_s"] / cycle["budget_s"] * 100, 2) if cycle["budget_s"] else None
+        cycle["process_peak_rss_mb"] = _round_or_none(_process_peak_rss_mb(), 1)
+        accounted = sum(s["wall_s"] for s in cycle["stages"]) + sum(t["wall_s"] for t in cycle["tickers"])
+        cycle["unaccounted_s"] = round(max(cycle["wall_s"] - accounted, 0.0), 4)   # 티커 간 대기·gc 등
+
+        totals = {}
+        for ticker in cycle["tickers"]:
+            for s in ticker["stages"]:
+                totals[s["name"]] = totals.get(s["name"], 0.0) + s["wall_s"]
+        cycle["stage_totals_s"] = {name: round(sec, 4) for name, sec in sorted(totals.items(), key=lambda kv: -kv[1])}
+
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+        stamp = dt.datetime.now(tz.UTC).strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(LOG_DIR_ABS, f"profile_{cycle['stage_prefix']}_{stamp}.json")
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(cycle, f, ensure_ascii=False, indent=1)
+        except Exception as e:
+            print(f"{get_timestamp()} [{cycle['stage_prefix']}] ⚠️ 프로파일 저장 실패: {e}")
+            path = None
+
+        top = list(cycle["stage_totals_s"].items())[:STAGE_PROFILER_SUMMARY_TOP]
+        top_text = ", ".join(f"{name} {sec:.2f}초" for name, sec in top)
+        print(f"{get_timestamp()} [{cycle['stage_prefix']}] ⏱️[프로파일] 사이클 {cycle['wall_s']:.2f}초 "
+              f"(예산 {cycle['budget_used_pct']}%, 티커 {len(cycle['tickers'])}개) | 단계 합계 상위: {top_text}")
+        if path:
+            print(f"{get_timestamp()} [{cycle['stage_prefix']}] 📝 프로파일 저장: {os.path.basename(path)}")
+        return path
+
+
+_stage_profiler = StageProfiler(enabled=ENABLE_STAGE_PROFILER, trace_allocations=STAGE_PROFILER_TRACEMALLOC)
+
+
+# -------------------- 지표·신호 벤치마크 모음 (기준선 대비 회귀 감지) --------------------
+# 합성 OHLCV로 1단계(previous) main()과 같은 순서의 전체 계산 파이프라인을 돌리며 함수별 소요 시간을 잽니다.
+# - 합성 데이터: 분 단위 랜덤워크 하나를 바이낸스 구간 경계로 집계 → 1m/5m/15m/1h/1d 가격이 서로 일치
+#   (타임프레임 간 copy_*/SB* 매칭이 실제처럼 동작), 시드·기준 시각 고정으로 재현 가능
+# - 각 케이스는 입력 복사본으로 BENCHMARK_REPEAT회 실행해 최솟값 기록 (복사 시간 제외, 첫 실행이
+#   BENCHMARK_SLOW_CASE_SEC를 넘으면 반복 생략), 마지막 결과가 다음 케이스의 입력
+# - 기준선: logs/benchmark_baseline.json (크기 세트별). 기준선 대비 BENCHMARK_REGRESSION_PCT% 이상
+#   느려지고 차이가 BENCHMARK_MIN_DELTA_SEC 이상이면 회귀로 표시
+# - 커널 검증: 시간 측정 전에 BENCHMARK_PARITY_CHECKS(벡터화 커널 ↔ 기존 루프/스칼라 원본 비교)를 실행, 불일치도 회귀로 집계
+# - 실행: 환경변수 BINANCE_BENCHMARK=production|stress (기준선 갱신: BINANCE_BENCHMARK_UPDATE=1), 회귀가 있으면 종료 코드 1
+BENCHMARK_SIZES = {
+    "production": {"1m": 12_000, "5m": 2_400, "15m": 1_600, "1h": 2_400, "1d": 200},
+    "stress": {"1m": 48_000, "5m": 9_600, "15m": 6_400, "1h": 9_600, "1d": 800},
+}
+BENCHMARK_END_MS = 1_735_689_600_000          # 2025-01-01 00:00 UTC (합성 캔들 마지막 구간의 끝, 일봉 경계)
+BENCHMARK_SEED = 0
+BENCHMARK_REPEAT = 3
+BENCHMARK_SLOW_CASE_SEC = 5.0
+BENCHMARK_REGRESSION_PCT = 25.0
+BENCHMARK_MIN_DELTA_SEC = 0.02       # 수십 ms 케이스의 실행 간 잡음(첫 실행 캐시 등)은 회귀로 보지 않음
+BENCHMARK_BASELINE_PATH = os.path.join(LOG_DIR_ABS, "benchmark_baseline.json")
+_BENCHMARK_KST_FORMATS = {"1m": "%H:%M", "5m": "%H:%M", "15m": "%H:%M", "1h": "%H:00", "1d": "09:00"}
+
+
+def synthetic_ohlcv_frames(sizes: dict, seed: int = BENCHMARK_SEED, end_ms: int = BENCHMARK_END_MS) -> dict:
+    """
+    분 단위 랜덤워크 → 인터벌별 합성 캔들 DataFrame (klines_to_frame과 같은 열·dtype, 최신→과거 순).
+    Returns: {"1m": df, "5m": df, ...} (sizes의 키만)
+    """
+    rng = np.random.default_rng(seed)
+    span_min = max(n * BINANCE_INTERVAL_MS[iv] // 60_000 for iv, n in sizes.items())
+    close = 30_000.0 * np.exp(np.cumsum(rng.normal(0.0, 0.0008, span_min)))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0.0, 0.0004, span_min)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0.0, 0.0004, span_min)))
+    volume = rng.gamma(2.0, 5.0, span_min)
+    frames = {}
+    for iv, n in sizes.items():
+        step = BINANCE_INTERVAL_MS[iv] // 60_000
+        sl = slice(span_min - n * step, span_min)
+        shape = (n, step)
+        open_time = end_ms - (n - np.arange(n, dtype=np.int64)) * BINANCE_INTERVAL_MS[iv]
+        rev = slice(None, None, -1)
+        frames[iv] = pd.DataFrame({
+            "Date(UTC)": pd.to_datetime(open_time[rev], unit="ms"),
+            "KST": kline_time_labels(open_time[rev], _BENCHMARK_KST_FORMATS.get(iv, "%H:%M")),
+            "종": np.round(close[sl].reshape(shape)[:, -1], 2)[rev],
+            "시": np.round(open_[sl].reshape(shape)[:, 0], 2)[rev],
+            "고": np.round(high[sl].reshape(shape).max(axis=1), 2)[rev],
+            "저": np.round(low[sl].reshape(shape).min(axis=1), 2)[rev],
+            "Vol.": np.round(volume[sl].reshape(shape).sum(axis=1), 3)[rev],
+        })
+    return frames
+
+
+def _benchmark_1h4x_base(f: dict) -> pd.DataFrame:
+    """1단계 main()의 1H4x 시트 원본 (15분봉 기본 열 복사)"""
+    return f["15m"][['Date(UTC)', 'KST', '종', '시', '고', '저', 'Vol.']].copy()
+
+
+# (케이스 이름, 결과를 저장할 프레임 키 또는 None(측정만), 실행 함수) - 1단계 main() 실행 순서
+BENCHMARK_CASES = [
+    ("calculate_all_indicators_1m", "1m", lambda f: calculate_all_indicators_1m(f["1m"], "USD")),
+    ("calculate_all_indicators (1d)", "1d", lambda f: calculate_all_indicators(f["1d"], "USD")),
+    ("calculate_all_indicators_5m", "5m", lambda f: calculate_all_indicators_5m(f["5m"], "USD")),
+    ("calculate_sb1m_for_5m", "5m", lambda f: calculate_sb1m_for_5m(f["5m"], f["1m"])),
+    ("calculate_all_indicators_15m", "15m", lambda f: calculate_all_indicators_15m(f["15m"], "USD")),
+    ("copy_1hmsfast_to_5m", "5m", lambda f: copy_1hmsfast_to_5m(f["5m"], f["15m"])),
+    ("recalculate_buy_for_5m", "5m", lambda f: recalculate_buy_for_5m(f["5m"])),
+    ("calculate_all_indicators_1h", "1h", lambda f: calculate_all_indicators_1h(f["1h"], "USD")),
+    ("calculate_all_indicators_weekly (주봉 변환 포함)", "1w", lambda f: calculate_all_indicators_weekly(convert_daily_to_weekly(f["1d"]), "USD")),
+    ("calculate_all_indicators_1h4x", "1h4x", lambda f: calculate_all_indicators_1h4x(_benchmark_1h4x_base(f), "USD").iloc[:400].reset_index(drop=True)),
+    ("calculate_sb1m_for_15m", "15m", lambda f: calculate_sb1m_for_15m(f["15m"], f["1m"])),
+    ("calculate_sb1h_for_15m", "15m", lambda f: calculate_sb1h_for_15m(f["15m"], f["1h4x"])),
+    ("calculate_daysb_15m", "15m", lambda f: calculate_daysb_15m(f["15m"], f["1d"], "USD")),
+    ("copy_weekly_amounts_to_15m", "15m", lambda f: copy_weekly_amounts_to_15m(f["15m"], f["1w"])),
+    ("copy_daily_amounts_to_15m", "15m", lambda f: copy_daily_amounts_to_15m(f["15m"], f["1d"])),
+    ("calculate_final_amounts", "15m", lambda f: calculate_final_amounts(f["15m"])),
+    ("calculate_LD", "15m", lambda f: calculate_LD(f["15m"])),
+    ("calculate_sb5m_for_15m", "15m", lambda f: calculate_sb5m_for_15m(f["15m"], f["5m"])),
+    ("calculate_order_column", "15m", lambda f: calculate_order_column(f["15m"], f"{TICKER}USDT15M")),
+    ("calculate_ksc_for_15m", "15m", lambda f: calculate_ksc_for_15m(f["15m"])),
+    ("copy_1hclass_to_15m", "15m", lambda f: copy_1hclass_to_15m(f["15m"], f["1h"])),
+    ("copy_minus_1hclass_to_15m", "15m", lambda f: copy_minus_1hclass_to_15m(f["15m"], f["1h"])),
+    ("copy_p1h_to_15m_and_set_p", "15m", lambda f: copy_p1h_to_15m_and_set_p(f["15m"], f["1h"])),
+    ("calculate_stosp_stosu", "15m", lambda f: calculate_stosp_stosu(f["15m"])),
+    ("calculate_prft_for_15m", "15m", lambda f: calculate_prft_for_15m(f["15m"])),
+    ("calculate_stosp_stosu (PRFT 반영)", "15m", lambda f: calculate_stosp_stosu(f["15m"])),
+    ("calculate_dateM", "15m", lambda f: calculate_dateM(f["15m"])),
+    ("copy_1hmsfast_from_1h_to_15m", None, lambda f: copy_1hmsfast_from_1h_to_15m(f["15m"], f["1h"])),
+]
+
+# (이름, 검사 함수) - 검사 함수는 결과를 직접 로그하고 모두 일치하면 True
+BENCHMARK_PARITY_CHECKS = [
+    ("SMA 커널 검증", check_sma_kernel_parity),
+    ("OHLC 최고/최저 검증", check_ohlc_extrema_parity),
+    ("1H4x 격자 검증", lambda: benchmark_1h4x_grid()["match"]),
+    ("phase 분류 검증", check_phase_classifier_parity),
+    ("시그널 계층 검증", check_signal_layer_parity),
+]
+
+
+def _load_benchmark_baseline(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return {}
+
+
+def run_benchmark_suite(sizes="production", repeat: int = BENCHMARK_REPEAT, baseline_path: str = BENCHMARK_BASELINE_PATH,
+                        regression_pct: float = BENCHMARK_REGRESSION_PCT, update_baseline: bool = False,
+                        seed: int = BENCHMARK_SEED) -> dict:
+    """
+    지표·신호 함수 벤치마크 실행 후 기준선과 비교.
+
+    Args:
+        sizes: "production" / "stress" 또는 {"1m": n, "5m": n, "15m": n, "1h": n, "1d": n}
+        update_baseline: True면 이번 결과로 기준선 덮어쓰기 (해당 크기 세트의 기준선이 없으면 항상 저장)
+    Returns:
+        {"label", "sizes", "results": {케이스: 초}, "regressions": [케이스 또는 실패한 커널 검증, ...], "baseline_saved": bool}
+    """
+    label = sizes if isinstance(sizes, str) else "custom_" + "_".join(f"{iv}{n}" for iv, n in sizes.items())
+    size_map = BENCHMARK_SIZES[sizes] if isinstance(sizes, str) else dict(sizes)
+    print(f"{get_timestamp()} [BENCH] 🧪 벤치마크 시작 ({label}): " + ", ".join(f"{iv} {n:,}행" for iv, n in size_map.items()))
+
+    frames = synthetic_ohlcv_frames(size_map, seed=seed)
+    baseline_all = _load_benchmark_baseline(baseline_path)
+    baseline = baseline_all.get(label, {}).get("results", {})
+    if baseline and baseline_all[label].get("repeat") != repeat:
+        print(f"{get_timestamp()} [BENCH] ⚠️ 기준선 반복 횟수({baseline_all[label].get('repeat')})와 이번 반복 횟수({repeat})가 달라 비교 오차가 큽니다")
+    results, regressions = {}, []
+    for name, check in BENCHMARK_PARITY_CHECKS:
+        try:
+            ok = check()
+        except Exception as e:
+            print(f"{get_timestamp()} [BENCH] ❌ {name} 실행 실패: {e}")
+            ok = False
+        if not ok:
+            regressions.append(name)
+    for name, key, run in BENCHMARK_CASES:
+        best = None
+        for attempt in range(max(repeat, 1)):
+            inputs = {k: df.copy() for k, df in frames.items()}
+            started = time.perf_counter()
+            out = run(inputs)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+            if attempt == 0 and elapsed > BENCHMARK_SLOW_CASE_SEC:
+                break
+        if key is not None:
+            frames[key] = out
+        results[name] = round(best, 6)
+
+        base = baseline.get(name)
+        if base is None:
+            print(f"{get_timestamp()} [BENCH] ⏱️ {name}: {best * 1000:.1f}ms")
+            continue
+        change_pct = (best - base) / base * 100 if base > 0 else 0.0
+        regressed = change_pct > regression_pct and best - base > BENCHMARK_MIN_DELTA_SEC
+        if regressed:
+            regressions.append(name)
+        print(f"{get_timestamp()} [BENCH] {'⚠️' if regressed else '⏱️'} {name}: {best * 1000:.1f}ms "
+              f"(기준 {base * 1000:.1f}ms, {change_pct:+.1f}%)" + (" 회귀" if regressed else ""))
+
+    total = sum(results.values())
+    baseline_saved = False
+    if update_baseline or not baseline:
+        baseline_all[label] = {
+            "saved_utc": dt.datetime.now(tz.UTC).strftime("%Y-%m-%d %H:%M:%S"),
+            "sizes": size_map, "repeat": repeat, "seed": seed,
+            "python": sys.version.split()[0], "pandas": pd.__version__, "numpy": np.__version__,
+            "results": results,
+        }
+        try:
+            with open(baseline_path, "w", encoding="utf-8") as fh:
+                json.dump(baseline_all, fh, ensure_ascii=False, indent=1)
+            baseline_saved = True
+        except OSError as e:
+            print(f"{get_timestamp()} [BENCH] ⚠️ 기준선 저장 실패: {e}")
+
+    summary = f"합계 {total:.2f}초, 케이스 {len(results)}개"
+    if regressions:
+        print(f"{get_timestamp()} [BENCH] ❌ 회귀 {len(regressions)}건 (>{regression_pct:.0f}% 또는 커널 불일치): {', '.join(regressions)} | {summary}")
+    else:
+        print(f"{get_timestamp()} [BENCH] ✅ 회귀 없음 | {summary}" + (" | 기준선 저장" if baseline_saved else ""))
+    return {"label": label, "sizes": size_map, "results": results, "regressions": regressions, "baseline_saved": baseline_saved}
+
+
+def run_benchmark_suite_from_env() -> Optional[int]:
+    """
+    환경변수 BINANCE_BENCHMARK(production/stress)가 있으면 벤치마크 실행.
+
+    Returns:
+        실행하지 않았으면 None, 실행했으면 프로세스 종료 코드 (0: 회귀 없음, 1: 회귀 있음, 2: 알 수 없는 크기 세트)
+    """
+    target = os.environ.get("BINANCE_BENCHMARK", "").strip().lower()
+    if not target:
+        return None
+    if target not in BENCHMARK_SIZES:
+        print(f"{get_timestamp()} [BENCH] ⚠️ 알 수 없는 크기 세트: {target} (가능: {', '.join(BENCHMARK_SIZES)})")
+        return 2
+    update = os.environ.get("BINANCE_BENCHMARK_UPDATE", "").strip() in ("1", "true", "yes")
+    report = run_benchmark_suite(target, update_baseline=update)
+    return 1 if report["regressions"] else 0
+
+
 # -------------------- 메인 --------------------
 def main(polling_start_time=None, skip_first_row=False, pre_fetched_data=None):
     """
@@ -10015,6 +12800,7 @@ def main(polling_start_time=None, skip_first_row=False, pre_fetched_data=None):
     # 메모리 누수 방지를 위한 가비지 컬렉션
     gc.collect()
     
+    _stage_profiler.stage("설정·경로")
     # 설정
     binance_symbol_ticker = f"{TICKER}USDT"
     
@@ -10061,9 +12847,8 @@ def main(polling_start_time=None, skip_first_row=False, pre_fetched_data=None):
     
     include_today = True  # 오늘 진행중 캔들 포함 (현재 시점 시고저종 필요)
 
-    # 저장 경로: 스크립트 폴더의 cryptodaily15min 하위폴더
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    base_save_dir = os.path.join(script_dir, "cryptodaily15min")
+    # 저장 경로: 스크립트 폴더의 cryptodaily15min 하위폴더 (대역 서버 실행 시 임시 폴더)
+    base_save_dir = OUTPUT_BASE_DIR
     
     # 티커별 폴더 매핑 (바이낸스)
     ticker_folder_mapping = {
@@ -10115,6 +12900,7 @@ def main(polling_start_time=None, skip_first_row=False, pre_fetched_data=None):
     filename = f"{prefix}F_{TICKER}_BINANCE_DAILY{daily_count_formatted}_5MIN{minute5_count_formatted}_15MIN{minute15_count_formatted}_1H{hour1_count_formatted}_WEEKLY{weekly_count_formatted}_{timestamp}.xlsx"
     save_path = os.path.join(save_dir, filename)
 
+    _stage_profiler.stage("이전 파일 로드")
     # 2단계 실행 시 previous 파일과 합치기
     df_prev_1m = pd.DataFrame()
     df_prev_5m = pd.DataFrame()
@@ -10361,6 +13147,7 @@ def main(polling_start_time=None, skip_first_row=False, pre_fetched_data=None):
             print(f"{get_timestamp()} [{stage_prefix}] 💡 팁: 최초 1회는 반드시 1단계(Previous 생성)가 실행되어야 합니다.")
             return None
 
+    _stage_profiler.stage("수집·병합")
     # endTime 계산: 실행 시점에 맞는 endTime 설정
     fixed_end_time_ms = None
     fixed_end_time_ms_1h = None  # 1시간봉 전용 endTime (15분 단위로 내림)
@@ -10505,35 +13292,13 @@ def main(polling_start_time=None, skip_first_row=False, pre_fetched_data=None):
             # 컬럼 순서 맞추기
             df_new_1m_basic = df_new_1m_basic[df_prev_1m_all_cols.columns]
             
-            # [중요] 병합 직전 타입 강제 통일 (Timestamp와 str 혼합 방지)
-            if 'Date(UTC)' in df_new_1m_basic.columns:
-                df_new_1m_basic['Date(UTC)'] = pd.to_datetime(df_new_1m_basic['Date(UTC)'], errors='coerce')
-            if 'Date(UTC)' in df_prev_1m_all_cols.columns:
-                df_prev_1m_all_cols['Date(UTC)'] = pd.to_datetime(df_prev_1m_all_cols['Date(UTC)'], errors='coerce')
+            # [중요] 병합 직전 타입 강제 통일 (datetime64[ms], 이미 같은 타입이면 변환 없음)
+            ensure_utc_time(df_new_1m_basic)
+            ensure_utc_time(df_prev_1m_all_cols)
             
             # ⚠️중요: 중복 제거는 Date(UTC) 기준으로만 수행 (KST는 기록용일 뿐, 중복 제거에는 사용하지 않음)
-            # 타입 통일 후 Timestamp 객체로 직접 비교
-            if 'Date(UTC)' in df_new_1m_basic.columns and 'Date(UTC)' in df_prev_1m_all_cols.columns:
-                # 새 데이터의 Date(UTC) 값들을 Timestamp 객체로 변환하여 set 생성
-                new_date_utc_set = set()
-                for idx in range(len(df_new_1m_basic)):
-                    new_date_utc = df_new_1m_basic.iloc[idx]['Date(UTC)']
-                    if pd.notna(new_date_utc):
-                        # Timestamp 객체를 직접 사용 (floor로 정규화하여 비교)
-                        if isinstance(new_date_utc, pd.Timestamp):
-                            new_date_utc_set.add(new_date_utc.floor('1min'))
-                        else:
-                            dt_obj = pd.to_datetime(new_date_utc, errors='coerce')
-                            if pd.notna(dt_obj):
-                                new_date_utc_set.add(dt_obj.floor('1min'))
-                
-                if new_date_utc_set:
-                    # previous 데이터에서 새 데이터의 Date(UTC) 시간과 중복되는 행 제거 (Timestamp 객체로 직접 비교)
-                    df_prev_1m_all_cols['Date(UTC)_floor'] = pd.to_datetime(df_prev_1m_all_cols['Date(UTC)'], errors='coerce').dt.floor('1min')
-                    df_prev_1m_all_cols = df_prev_1m_all_cols[
-                        ~df_prev_1m_all_cols['Date(UTC)_floor'].isin(new_date_utc_set)
-                    ].copy()
-                    df_prev_1m_all_cols = df_prev_1m_all_cols.drop('Date(UTC)_floor', axis=1)
+            # previous 데이터에서 새 데이터와 같은 1분 구간의 행 제거 (epoch ms 정수 비교)
+            df_prev_1m_all_cols = drop_overlapping_candles(df_prev_1m_all_cols, df_new_1m_basic, floor_minutes=1)
             
             # 합치기: 새 데이터 15개(2-16행) + previous 데이터(17행부터)
             # 1행 헤더는 나중에 엑셀 저장 시 자동 생성됨
@@ -10550,8 +13315,6 @@ def main(polling_start_time=None, skip_first_row=False, pre_fetched_data=None):
             
             # ⚠️중요: 시간 기준 정렬은 Date(UTC) 기준으로만 수행 (KST는 기록용일 뿐, 정렬에는 사용하지 않음)
             if 'Date(UTC)' in df_binance_ticker_1m.columns:
-                # 정렬 직전 타입 일치 여부 최종 확인
-                df_binance_ticker_1m = clean_df_display_format(df_binance_ticker_1m)
                 # 정렬 실행
                 df_binance_ticker_1m = df_binance_ticker_1m.sort_values('Date(UTC)', ascending=False, na_position='last').reset_index(drop=True)
         else:
@@ -10563,9 +13326,13 @@ def main(polling_start_time=None, skip_first_row=False, pre_fetched_data=None):
             print(f"{get_timestamp()} [{stage_prefix}] 🚀 캔들 병렬 수집 시작")
             
             # ThreadPoolExecutor를 사용해 5개의 API 호출을 동시에 실행
+            # 1분봉 파생 사용 시: 1분봉을 먼저 받아 5분/15분/1시간/일봉의 겹치는 구간은 로컬 집계로 채움
+            df_binance_ticker_1m_first = None
+            if KLINE_DERIVE_FROM_1M:
+                df_binance_ticker_1m_first = fetch_binance_minutes1(binance_symbol_ticker, minute1_count, include_today, fixed_fixed_end_time_ms, stage_prefix)
             with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
                 # 동시에 작업 요청: fetch 함수들과 필요한 매개변수를 executor에 제출
-                future_1m = executor.submit(fetch_binance_minutes1, binance_symbol_ticker, minute1_count, include_today, fixed_fixed_end_time_ms, stage_prefix)
+                future_1m = None if df_binance_ticker_1m_first is not None else executor.submit(fetch_binance_minutes1, binance_symbol_ticker, minute1_count, include_today, fixed_fixed_end_time_ms, stage_prefix)
                 future_5m = executor.submit(fetch_binance_minutes5, binance_symbol_ticker, minute5_count, include_today, fixed_fixed_end_time_ms)
                 future_15m = executor.submit(fetch_binance_minutes15, binance_symbol_ticker, minute15_count, include_today, fixed_fixed_end_time_ms)
                 future_1h = executor.submit(fetch_binance_hours1, binance_symbol_ticker, hour1_count, include_today, fixed_fixed_end_time_ms)
@@ -10573,7 +13340,7 @@ def main(polling_start_time=None, skip_first_row=False, pre_fetched_data=None):
                 future_1d = executor.submit(fetch_binance_daily, binance_symbol_ticker, daily_count, include_today, fixed_fixed_end_time_ms)
                 
                 # 결과 수집 (모든 future가 완료될 때까지 대기)
-                df_binance_ticker_1m = future_1m.result()
+                df_binance_ticker_1m = future_1m.result() if future_1m is not None else df_binance_ticker_1m_first
                 df_binance_ticker_5m = future_5m.result()
                 df_binance_ticker_15m = future_15m.result()
                 df_binance_ticker_1h = future_1h.result()
@@ -10625,35 +13392,13 @@ def main(polling_start_time=None, skip_first_row=False, pre_fetched_data=None):
             # 컬럼 순서 맞추기
             df_new_5m_basic = df_new_5m_basic[df_prev_5m_all_cols.columns]
             
-            # [중요] 병합 직전 타입 강제 통일 (Timestamp와 str 혼합 방지)
-            if 'Date(UTC)' in df_new_5m_basic.columns:
-                df_new_5m_basic['Date(UTC)'] = pd.to_datetime(df_new_5m_basic['Date(UTC)'], errors='coerce')
-            if 'Date(UTC)' in df_prev_5m_all_cols.columns:
-                df_prev_5m_all_cols['Date(UTC)'] = pd.to_datetime(df_prev_5m_all_cols['Date(UTC)'], errors='coerce')
+            # [중요] 병합 직전 타입 강제 통일 (datetime64[ms], 이미 같은 타입이면 변환 없음)
+            ensure_utc_time(df_new_5m_basic)
+            ensure_utc_time(df_prev_5m_all_cols)
             
             # ⚠️중요: 중복 제거는 Date(UTC) 기준으로만 수행 (KST는 기록용일 뿐, 중복 제거에는 사용하지 않음)
-            # 타입 통일 후 Timestamp 객체로 직접 비교
-            if 'Date(UTC)' in df_new_5m_basic.columns and 'Date(UTC)' in df_prev_5m_all_cols.columns:
-                # 새 데이터의 Date(UTC) 값들을 Timestamp 객체로 변환하여 set 생성
-                new_date_utc_set = set()
-                for idx in range(len(df_new_5m_basic)):
-                    new_date_utc = df_new_5m_basic.iloc[idx]['Date(UTC)']
-                    if pd.notna(new_date_utc):
-                        # Timestamp 객체를 직접 사용 (floor로 정규화하여 비교)
-                        if isinstance(new_date_utc, pd.Timestamp):
-                            new_date_utc_set.add(new_date_utc.floor('5min'))
-                        else:
-                            dt_obj = pd.to_datetime(new_date_utc, errors='coerce')
-                            if pd.notna(dt_obj):
-                                new_date_utc_set.add(dt_obj.floor('5min'))
-                
-                if new_date_utc_set:
-                    # previous 데이터에서 새 데이터의 Date(UTC) 시간과 중복되는 행 제거 (Timestamp 객체로 직접 비교)
-                    df_prev_5m_all_cols['Date(UTC)_floor'] = pd.to_datetime(df_prev_5m_all_cols['Date(UTC)'], errors='coerce').dt.floor('5min')
-                    df_prev_5m_all_cols = df_prev_5m_all_cols[
-                        ~df_prev_5m_all_cols['Date(UTC)_floor'].isin(new_date_utc_set)
-                    ].copy()
-                    df_prev_5m_all_cols = df_prev_5m_all_cols.drop('Date(UTC)_floor', axis=1)
+            # previous 데이터에서 새 데이터와 같은 5분 구간의 행 제거 (epoch ms 정수 비교)
+            df_prev_5m_all_cols = drop_overlapping_candles(df_prev_5m_all_cols, df_new_5m_basic, floor_minutes=5)
             
             # 합치기: 새 데이터 3개(2-4행) + previous 데이터(5행부터)
             # 1행 헤더는 나중에 엑셀 저장 시 자동 생성됨
@@ -10670,8 +13415,6 @@ def main(polling_start_time=None, skip_first_row=False, pre_fetched_data=None):
             
             # ⚠️중요: 시간 기준 정렬은 Date(UTC) 기준으로만 수행 (KST는 기록용일 뿐, 정렬에는 사용하지 않음)
             if 'Date(UTC)' in df_binance_ticker_5m.columns:
-                # 정렬 직전 타입 일치 여부 최종 확인
-                df_binance_ticker_5m = clean_df_display_format(df_binance_ticker_5m)
                 # 정렬 실행
                 df_binance_ticker_5m = df_binance_ticker_5m.sort_values('Date(UTC)', ascending=False, na_position='last').reset_index(drop=True)
         else:
@@ -10712,30 +13455,13 @@ def main(polling_start_time=None, skip_first_row=False, pre_fetched_data=None):
             # 컬럼 순서 맞추기
             df_new_15m_basic = df_new_15m_basic[df_prev_15m_all_cols.columns]
             
-            # [중요] 병합 직전 타입 강제 통일 (Timestamp와 str 혼합 방지)
-            if 'Date(UTC)' in df_new_15m_basic.columns:
-                df_new_15m_basic['Date(UTC)'] = pd.to_datetime(df_new_15m_basic['Date(UTC)'], errors='coerce')
-            if 'Date(UTC)' in df_prev_15m_all_cols.columns:
-                df_prev_15m_all_cols['Date(UTC)'] = pd.to_datetime(df_prev_15m_all_cols['Date(UTC)'], errors='coerce')
+            # [중요] 병합 직전 타입 강제 통일 (datetime64[ms], 이미 같은 타입이면 변환 없음)
+            ensure_utc_time(df_new_15m_basic)
+            ensure_utc_time(df_prev_15m_all_cols)
             
             # ⚠️중요: 중복 제거는 Date(UTC) 기준으로만 수행 (KST는 기록용일 뿐, 중복 제거에는 사용하지 않음)
-            # 타입 통일 후 Timestamp 객체로 직접 비교
-            if 'Date(UTC)' in df_new_15m_basic.columns and 'Date(UTC)' in df_prev_15m_all_cols.columns:
-                new_date_utc = df_new_15m_basic.iloc[0]['Date(UTC)'] if len(df_new_15m_basic) > 0 and pd.notna(df_new_15m_basic.iloc[0]['Date(UTC)']) else None
-                if pd.notna(new_date_utc):
-                    # Timestamp 객체로 직접 비교 (floor로 정규화)
-                    if isinstance(new_date_utc, pd.Timestamp):
-                        new_date_utc_floor = new_date_utc.floor('15min')
-                    else:
-                        dt_obj = pd.to_datetime(new_date_utc, errors='coerce')
-                        new_date_utc_floor = dt_obj.floor('15min') if pd.notna(dt_obj) else None
-                    
-                    if pd.notna(new_date_utc_floor):
-                        df_prev_15m_all_cols['Date(UTC)_floor'] = pd.to_datetime(df_prev_15m_all_cols['Date(UTC)'], errors='coerce').dt.floor('15min')
-                        df_prev_15m_all_cols = df_prev_15m_all_cols[
-                            df_prev_15m_all_cols['Date(UTC)_floor'] != new_date_utc_floor
-                        ].copy()
-                        df_prev_15m_all_cols = df_prev_15m_all_cols.drop('Date(UTC)_floor', axis=1)
+            # previous 데이터에서 새 데이터 최신 행과 같은 15분 구간의 행 제거 (epoch ms 정수 비교)
+            df_prev_15m_all_cols = drop_overlapping_candles(df_prev_15m_all_cols, df_new_15m_basic, floor_minutes=15, newest_only=True)
             
             # 합치기: 새 데이터(2행) + previous 데이터(3행부터)
             # 1행 헤더는 나중에 엑셀 저장 시 자동 생성됨
@@ -10752,8 +13478,6 @@ def main(polling_start_time=None, skip_first_row=False, pre_fetched_data=None):
             
             # ⚠️중요: 시간 기준 정렬은 Date(UTC) 기준으로만 수행 (KST는 기록용일 뿐, 정렬에는 사용하지 않음)
             if 'Date(UTC)' in df_binance_ticker_15m.columns:
-                # 정렬 직전 타입 일치 여부 최종 확인
-                df_binance_ticker_15m = clean_df_display_format(df_binance_ticker_15m)
                 # 정렬 실행
                 df_binance_ticker_15m = df_binance_ticker_15m.sort_values('Date(UTC)', ascending=False, na_position='last').reset_index(drop=True)
         else:
@@ -10815,30 +13539,13 @@ def main(polling_start_time=None, skip_first_row=False, pre_fetched_data=None):
             # 컬럼 순서 맞추기
             df_new_1d_basic = df_new_1d_basic[df_prev_1d_all_cols.columns]
             
-            # [중요] 병합 직전 타입 강제 통일 (Timestamp와 str 혼합 방지)
-            if 'Date(UTC)' in df_new_1d_basic.columns:
-                df_new_1d_basic['Date(UTC)'] = pd.to_datetime(df_new_1d_basic['Date(UTC)'], errors='coerce')
-            if 'Date(UTC)' in df_prev_1d_all_cols.columns:
-                df_prev_1d_all_cols['Date(UTC)'] = pd.to_datetime(df_prev_1d_all_cols['Date(UTC)'], errors='coerce')
+            # [중요] 병합 직전 타입 강제 통일 (datetime64[ms], 이미 같은 타입이면 변환 없음)
+            ensure_utc_time(df_new_1d_basic)
+            ensure_utc_time(df_prev_1d_all_cols)
             
             # ⚠️중요: 중복 제거는 Date(UTC) 기준으로만 수행 (KST는 기록용일 뿐, 중복 제거에는 사용하지 않음)
-            # 타입 통일 후 Timestamp 객체로 직접 비교
-            if 'Date(UTC)' in df_new_1d_basic.columns and 'Date(UTC)' in df_prev_1d_all_cols.columns:
-                new_date_utc = df_new_1d_basic.iloc[0]['Date(UTC)'] if len(df_new_1d_basic) > 0 and pd.notna(df_new_1d_basic.iloc[0]['Date(UTC)']) else None
-                if pd.notna(new_date_utc):
-                    # Timestamp 객체로 직접 비교 (floor로 정규화)
-                    if isinstance(new_date_utc, pd.Timestamp):
-                        new_date_utc_floor = new_date_utc.floor('1D')
-                    else:
-                        dt_obj = pd.to_datetime(new_date_utc, errors='coerce')
-                        new_date_utc_floor = dt_obj.floor('1D') if pd.notna(dt_obj) else None
-                    
-                    if pd.notna(new_date_utc_floor):
-                        df_prev_1d_all_cols['Date(UTC)_floor'] = pd.to_datetime(df_prev_1d_all_cols['Date(UTC)'], errors='coerce').dt.floor('1D')
-                        df_prev_1d_all_cols = df_prev_1d_all_cols[
-                            df_prev_1d_all_cols['Date(UTC)_floor'] != new_date_utc_floor
-                        ].copy()
-                        df_prev_1d_all_cols = df_prev_1d_all_cols.drop('Date(UTC)_floor', axis=1)
+            # previous 데이터에서 새 데이터 최신 행과 같은 1일 구간의 행 제거 (epoch ms 정수 비교)
+            df_prev_1d_all_cols = drop_overlapping_candles(df_prev_1d_all_cols, df_new_1d_basic, floor_minutes=1440, newest_only=True)
             
             # 합치기: 새 데이터(2행) + previous 데이터(3행부터)
             # 1행 헤더는 나중에 엑셀 저장 시 자동 생성됨
@@ -10855,8 +13562,6 @@ def main(polling_start_time=None, skip_first_row=False, pre_fetched_data=None):
             
             # ⚠️중요: 시간 기준 정렬은 Date(UTC) 기준으로만 수행 (KST는 기록용일 뿐, 정렬에는 사용하지 않음)
             if 'Date(UTC)' in df_binance_ticker_1d.columns:
-                # 정렬 직전 타입 일치 여부 최종 확인
-                df_binance_ticker_1d = clean_df_display_format(df_binance_ticker_1d)
                 # 정렬 실행
                 df_binance_ticker_1d = df_binance_ticker_1d.sort_values('Date(UTC)', ascending=False, na_position='last').reset_index(drop=True)
             
@@ -10914,11 +13619,9 @@ def main(polling_start_time=None, skip_first_row=False, pre_fetched_data=None):
             # 컬럼 순서 맞추기
             df_new_1h_basic = df_new_1h_basic[df_prev_1h_all_cols.columns]
             
-            # [중요] 병합 직전 타입 강제 통일 (Timestamp와 str 혼합 방지)
-            if 'Date(UTC)' in df_new_1h_basic.columns:
-                df_new_1h_basic['Date(UTC)'] = pd.to_datetime(df_new_1h_basic['Date(UTC)'], errors='coerce')
-            if 'Date(UTC)' in df_prev_1h_all_cols.columns:
-                df_prev_1h_all_cols['Date(UTC)'] = pd.to_datetime(df_prev_1h_all_cols['Date(UTC)'], errors='coerce')
+            # [중요] 병합 직전 타입 강제 통일 (datetime64[ms], 이미 같은 타입이면 변환 없음)
+            ensure_utc_time(df_new_1h_basic)
+            ensure_utc_time(df_prev_1h_all_cols)
             
             # 합치기: 새 데이터(2행) + previous 데이터(3행부터) (UTC 기준으로 매칭)
             df_binance_ticker_1h = pd.concat([
@@ -10929,23 +13632,15 @@ def main(polling_start_time=None, skip_first_row=False, pre_fetched_data=None):
             # [중요] 병합 직후 타입 통일 (Timestamp와 str 혼합 방지)
             df_binance_ticker_1h = clean_df_display_format(df_binance_ticker_1h)
             
-            # UTC 시간 기준으로 정렬 (VLOOKUP처럼 UTC 시간으로 매칭)
+            # UTC 시간 기준으로 정렬 (VLOOKUP처럼 UTC 시간으로 매칭, Date(UTC)는 이미 datetime64[ms])
             if 'Date(UTC)' in df_binance_ticker_1h.columns:
-                # 정렬 직전 타입 일치 여부 최종 확인
-                df_binance_ticker_1h = clean_df_display_format(df_binance_ticker_1h)
-                # Date(UTC)를 datetime으로 변환하여 정렬 (UTC 기준)
-                df_binance_ticker_1h['Date(UTC)_dt'] = pd.to_datetime(df_binance_ticker_1h['Date(UTC)'], format='%y/%m/%d,%H:%M', errors='coerce')
                 # UTC 기준으로 정렬 (최신→과거)
-                df_binance_ticker_1h = df_binance_ticker_1h.sort_values('Date(UTC)_dt', ascending=False, na_position='last').reset_index(drop=True)
+                df_binance_ticker_1h = df_binance_ticker_1h.sort_values('Date(UTC)', ascending=False, na_position='last').reset_index(drop=True)
                 # Date(UTC) 기준 중복 제거 (keep='first' - 새 데이터 우선, UTC 시간으로 매칭)
                 # 겹침 발생 시 2단계 캔들로 최신화 (새 데이터가 먼저 concat되므로 keep='first'로 새 데이터 유지)
                 df_binance_ticker_1h = df_binance_ticker_1h.drop_duplicates(subset=['Date(UTC)'], keep='first').reset_index(drop=True)
-                # 임시 컬럼 제거
-                df_binance_ticker_1h = df_binance_ticker_1h.drop('Date(UTC)_dt', axis=1)
                 # 최종 정렬 (UTC 기준, 최신→과거)
-                df_binance_ticker_1h['Date(UTC)_dt'] = pd.to_datetime(df_binance_ticker_1h['Date(UTC)'], format='%y/%m/%d,%H:%M', errors='coerce')
-                df_binance_ticker_1h = df_binance_ticker_1h.sort_values('Date(UTC)_dt', ascending=False, na_position='last').reset_index(drop=True)
-                df_binance_ticker_1h = df_binance_ticker_1h.drop('Date(UTC)_dt', axis=1)
+                df_binance_ticker_1h = df_binance_ticker_1h.sort_values('Date(UTC)', ascending=False, na_position='last').reset_index(drop=True)
         else:
             df_binance_ticker_1h = df_binance_ticker_1h_new
     else:
@@ -10956,9 +13651,14 @@ def main(polling_start_time=None, skip_first_row=False, pre_fetched_data=None):
             # 1시간봉: fixed_end_time_ms_1h 사용 (15분 단위로 내림 처리)
             df_binance_ticker_1h = fetch_binance_hours1(binance_symbol_ticker, hour1_count, include_today=include_today, fixed_end_time_ms=fixed_end_time_ms_1h if fixed_end_time_ms_1h is not None else fixed_end_time_ms)
 
+    _stage_profiler.stage("주봉 변환·최신 종가 주입")
     # 주봉 데이터 생성 (일봉에서 변환 - API 호출 최적화)
     # 일봉 200개면 주봉 약 28개 생성 가능 (200일 ÷ 7일 ≈ 28주)
-    df_binance_ticker_weekly = convert_daily_to_weekly(df_binance_ticker_1d)
+    # 2단계: 진행 중인 주만 최신 일봉으로 갱신 (지난 주 행은 증분 상태 재사용), 상태를 쓸 수 없으면 전체 변환
+    df_binance_ticker_weekly = None if skip_first_row else convert_daily_to_weekly_incremental(df_binance_ticker_1d)
+    weekly_incremental = df_binance_ticker_weekly is not None
+    if not weekly_incremental:
+        df_binance_ticker_weekly = convert_daily_to_weekly(df_binance_ticker_1d)
     
     # 주봉은 일봉에서 변환하므로 별도 API 호출 불필요
     # 일봉 200개면 충분히 주봉 28개를 만들 수 있음
@@ -10976,6 +13676,7 @@ def main(polling_start_time=None, skip_first_row=False, pre_fetched_data=None):
     # 1단계(previous): API 수집 시 미완성 캔들 1개 제거됨
     # 2단계(after): API 수집 시 미완성 캔들 1개 제거됨
 
+    _stage_profiler.stage("1분봉 지표")
     # 1분봉 지표 계산
     if not df_binance_ticker_1m.empty:
         if skip_first_row:
@@ -10986,6 +13687,7 @@ def main(polling_start_time=None, skip_first_row=False, pre_fetched_data=None):
             # 2단계: 최신 행만 계산 (previous 지표 유지) - calculate_latest_row_only_1m 사용
             df_binance_ticker_1m = calculate_latest_row_only_1m(df_binance_ticker_1m, "USD")
 
+    _stage_profiler.stage("일봉 지표")
     # 일봉 지표 계산
     if skip_first_row:
         # 1단계: 전체 계산
@@ -10994,6 +13696,7 @@ def main(polling_start_time=None, skip_first_row=False, pre_fetched_data=None):
         # 2단계: 2행(인덱스 0)만 계산
         df_binance_ticker_1d = calculate_latest_row_only_1d(df_binance_ticker_1d, "USD")
     
+    _stage_profiler.stage("5분봉 지표·SB1M")
     # 5분봉 지표 계산
     if skip_first_row:
         # 1단계: 전체 계산
@@ -11008,603 +13711,172 @@ def main(polling_start_time=None, skip_first_row=False, pre_fetched_data=None):
             # 1단계: 전체 계산
             df_binance_ticker_5m = calculate_sb1m_for_5m(df_binance_ticker_5m, df_binance_ticker_1m)
         else:
-            # 2단계: 2-4행(인덱스 0-2) 3개 계산
-            if len(df_binance_ticker_5m) > 0:
-                # 최신 3개 행 사용
-                df_5m_temp = df_binance_ticker_5m.iloc[0:3].copy()
-                
+            # 2단계: 2-4행(인덱스 0-2) 3개 계산 (해당 5분 버킷의 1분봉만 읽음)
+            if len(df_binance_ticker_5m) > 0 and 'Date(UTC)' in df_binance_ticker_5m.columns and 'Date(UTC)' in df_binance_ticker_1m.columns:
                 try:
-                    if 'Date(UTC)' in df_5m_temp.columns and 'Date(UTC)' in df_binance_ticker_1m.columns:
-                        # 5분봉 날짜 파싱 (이미 datetime64면 그대로 사용, 문자열만 파싱)
-                        if pd.api.types.is_datetime64_any_dtype(df_5m_temp['Date(UTC)']):
-                            df_5m_temp['Date(UTC)_dt'] = df_5m_temp['Date(UTC)']
-                        else:
-                            # 문자열인 경우에만 파싱 (UserWarning 억제)
-                            s = df_5m_temp['Date(UTC)'].astype(str).str.strip().str.replace(',', ' ', regex=False)
-                            import warnings
-                            with warnings.catch_warnings():
-                                warnings.simplefilter("ignore", UserWarning)
-                                df_5m_temp['Date(UTC)_dt'] = pd.to_datetime(s, errors='coerce')
-                        
-                        df_1m_copy = df_binance_ticker_1m.copy()
-                        # 1분봉 날짜 파싱 (이미 datetime64면 그대로 사용, 문자열만 파싱)
-                        if pd.api.types.is_datetime64_any_dtype(df_1m_copy['Date(UTC)']):
-                            df_1m_copy['Date(UTC)_dt'] = df_1m_copy['Date(UTC)']
-                        else:
-                            # 문자열인 경우에만 파싱 (UserWarning 억제)
-                            s = df_1m_copy['Date(UTC)'].astype(str).str.strip().str.replace(',', ' ', regex=False)
-                            with warnings.catch_warnings():
-                                warnings.simplefilter("ignore", UserWarning)
-                                df_1m_copy['Date(UTC)_dt'] = pd.to_datetime(s, errors='coerce')
-                        
-                        # 5분 그룹핑
-                        df_1m_copy['5min_group'] = df_1m_copy['Date(UTC)_dt'].dt.floor('5min')
-                        
-                        # 각 5분봉 행에 대해 계산
-                        for idx in range(len(df_5m_temp)):
-                            row = df_5m_temp.iloc[idx]
-                            if pd.notna(row['Date(UTC)_dt']):
-                                target_5min_group = row['Date(UTC)_dt'].floor('5min')
-                                
-                                # 해당 그룹의 1분봉 필터링
-                                df_1m_group = df_1m_copy[df_1m_copy['5min_group'] == target_5min_group].copy()
-                                
-                                # 개수 검증 및 경고
-                                if len(df_1m_group) < 5:
-                                    print(f"{get_timestamp()} ⚠️SB1M 시간 매칭 경고: 5분봉 {target_5min_group}에 해당하는 1분봉이 {len(df_1m_group)}개 (예상: 5개)")
-                                
-                                # 1개라도 있으면 계산 시도
-                                if not df_1m_group.empty:
-                                    # 단일 행 계산을 위해 함수 호출
-                                    res_df = calculate_sb1m_for_5m(df_5m_temp.iloc[[idx]], df_1m_group)
-                                    sb1m_val = res_df.iloc[0].get('SB1M', '')
-                                    
-                                    # 원본에 반영
-                                    original_idx = df_5m_temp.index[idx]
-                                    if 'SB1M' not in df_binance_ticker_5m.columns:
-                                        df_binance_ticker_5m['SB1M'] = ''
-                                    df_binance_ticker_5m['SB1M'] = df_binance_ticker_5m['SB1M'].astype('object')
-                                    df_binance_ticker_5m.loc[original_idx, 'SB1M'] = sb1m_val
-
+                    labels, child_counts, _ = reduce_child_signals(df_binance_ticker_1m, df_binance_ticker_5m['Date(UTC)'], "5m", 5, newest=3)
+                    for idx in range(len(labels)):
+                        if child_counts[idx] < 0:
+                            continue
+                        # 개수 검증 및 경고
+                        if child_counts[idx] < 5:
+                            print(f"{get_timestamp()} ⚠️SB1M 시간 매칭 경고: 5분봉 {df_binance_ticker_5m['Date(UTC)'].iloc[idx]}에 해당하는 1분봉이 {child_counts[idx]}개 (예상: 5개)")
+                        # 1개라도 있으면 반영
+                        if child_counts[idx] > 0:
+                            if 'SB1M' not in df_binance_ticker_5m.columns:
+                                df_binance_ticker_5m['SB1M'] = ''
+                            df_binance_ticker_5m['SB1M'] = df_binance_ticker_5m['SB1M'].astype('object')
+                            df_binance_ticker_5m.loc[df_binance_ticker_5m.index[idx], 'SB1M'] = labels[idx]
                 except Exception as e:
                     print(f"{get_timestamp()} ⚠️SB1M 2단계 계산 중 오류: {e}")
                     import traceback
                     traceback.print_exc()
     
-    # 15분봉 지표 계산
-    if skip_first_row:
-        # 1단계: 전체 계산
-        df_binance_ticker_15m = calculate_all_indicators_15m(df_binance_ticker_15m, "USD")
-    else:
-        # 2단계: 최신 1개만 계산 (previous 지표 유지)
-        print(f"{get_timestamp()} [{stage_prefix}]    → 2행(최신)만 계산, 3행 이후는 previous 유지")
-        # 2단계일 때 previous 데이터 백업 (3행 이후 복원용)
-        if not df_prev_15m.empty and len(df_binance_ticker_15m) > 1:
-            df_prev_15m_backup = df_prev_15m.copy()  # previous 데이터 백업 (3행~)
-        df_binance_ticker_15m = calculate_latest_row_only_15m(df_binance_ticker_15m, "USD")
-    
-    # SB1M 열 계산 (15분봉 시트에만) - 1분봉 데이터 기반
-    if not df_binance_ticker_1m.empty:
-        if skip_first_row:
-            # 1단계: 전체 계산
-            df_binance_ticker_15m = calculate_sb1m_for_15m(df_binance_ticker_15m, df_binance_ticker_1m)
-        else:
-            # 2단계: 최신 1개 행만 계산
-            if len(df_binance_ticker_15m) > 0 and len(df_binance_ticker_1m) > 0:
-                try:
-                    if 'Date(UTC)' in df_binance_ticker_15m.columns and 'Date(UTC)' in df_binance_ticker_1m.columns:
-                        # 최신 1개 행 사용
-                        df_15m_temp = df_binance_ticker_15m.iloc[0:1].copy()
-                        
-                        # 날짜 파싱 (이미 datetime64면 그대로 사용, 문자열만 파싱)
-                        if pd.api.types.is_datetime64_any_dtype(df_15m_temp['Date(UTC)']):
-                            df_15m_temp['Date(UTC)_dt'] = df_15m_temp['Date(UTC)']
-                        else:
-                            # 문자열인 경우에만 파싱 (UserWarning 억제)
-                            s = df_15m_temp['Date(UTC)'].astype(str).str.strip().str.replace(',', ' ', regex=False)
-                            import warnings
-                            with warnings.catch_warnings():
-                                warnings.simplefilter("ignore", UserWarning)
-                                df_15m_temp['Date(UTC)_dt'] = pd.to_datetime(s, errors='coerce')
-                        
-                        df_1m_copy = df_binance_ticker_1m.copy()
-                        # 1분봉 날짜 파싱 (이미 datetime64면 그대로 사용, 문자열만 파싱)
-                        if pd.api.types.is_datetime64_any_dtype(df_1m_copy['Date(UTC)']):
-                            df_1m_copy['Date(UTC)_dt'] = df_1m_copy['Date(UTC)']
-                        else:
-                            # 문자열인 경우에만 파싱 (UserWarning 억제)
-                            s = df_1m_copy['Date(UTC)'].astype(str).str.strip().str.replace(',', ' ', regex=False)
-                            with warnings.catch_warnings():
-                                warnings.simplefilter("ignore", UserWarning)
-                                df_1m_copy['Date(UTC)_dt'] = pd.to_datetime(s, errors='coerce')
-                        
-                        # 15분 그룹핑
-                        df_1m_copy['15min_group'] = df_1m_copy['Date(UTC)_dt'].dt.floor('15min')
-                        
-                        # 각 15분봉 행에 대해 계산
-                        for idx in range(len(df_15m_temp)):
-                            row = df_15m_temp.iloc[idx]
-                            if pd.notna(row['Date(UTC)_dt']):
-                                target_15min_group = row['Date(UTC)_dt'].floor('15min')
-                                
-                                # 해당 그룹의 1분봉 필터링
-                                df_1m_group = df_1m_copy[df_1m_copy['15min_group'] == target_15min_group].copy()
-                                
-                                # 1개라도 있으면 계산 시도
-                                if not df_1m_group.empty:
-                                    # 단일 행 계산을 위해 함수 호출
-                                    res_df = calculate_sb1m_for_15m(df_15m_temp.iloc[[idx]], df_1m_group)
-                                    sb1m_val = res_df.iloc[0].get('SB1M', '')
-                                    
-                                    # 원본에 반영
-                                    original_idx = df_15m_temp.index[idx]
-                                    if 'SB1M' not in df_binance_ticker_15m.columns:
-                                        df_binance_ticker_15m['SB1M'] = ''
-                                    df_binance_ticker_15m['SB1M'] = df_binance_ticker_15m['SB1M'].astype('object')
-                                    df_binance_ticker_15m.loc[original_idx, 'SB1M'] = sb1m_val
-                except Exception as e:
-                    print(f"{get_timestamp()} ⚠️SB1M 15분봉 2단계 계산 중 오류: {e}")
-                    import traceback
-                    traceback.print_exc()
-    
-    # 5분봉에 15분봉의 1HMSFast 값을 시간 매칭하여 복사 (1HMSF 열 추가)
-    if not df_binance_ticker_5m.empty and not df_binance_ticker_15m.empty:
-        df_binance_ticker_5m = copy_1hmsfast_to_5m(df_binance_ticker_5m, df_binance_ticker_15m)
-    
-    # 5분봉 Buy 재계산 (1HMSF 복사 후, gear1/gear2 조건 적용)
-    if not df_binance_ticker_5m.empty:
-        df_binance_ticker_5m = recalculate_buy_for_5m(df_binance_ticker_5m)
-    
-    # 1시간봉 지표 계산
-    if skip_first_row:
-        # 1단계: 전체 계산
-        df_binance_ticker_1h = calculate_all_indicators_1h(df_binance_ticker_1h, "USD")
-    else:
-        # 2단계: 2행(인덱스 0)만 계산
-        df_binance_ticker_1h = calculate_latest_row_only_1h(df_binance_ticker_1h, "USD")
-    
-    # 주봉 지표 계산 (주봉은 28개로 고정이므로 항상 전체 계산)
-    df_binance_ticker_weekly = calculate_all_indicators_weekly(df_binance_ticker_weekly, "USD")
-    
-    # 1H4x 시트 생성 (15분봉 데이터에서 기본 컬럼만 추출)
-    base_cols_1h4x = ['Date(UTC)', 'KST', '종', '시', '고', '저', 'Vol.']
-    if not skip_first_row and not df_prev_15m.empty:
-        # 2단계: previous 파일에서 1H4x 시트 읽기 (이미 위에서 읽었으므로 df_prev_1h4x 사용)
-        # df_prev_1h4x는 이미 위에서 읽었음 (7627-7637번 줄)
-        
-        # 2단계: 15분봉 데이터에서 기본 컬럼만 가져와서 previous와 병합
-        cols_1h4x_new = [col for col in base_cols_1h4x if col in df_binance_ticker_15m.columns]
-        
-        if cols_1h4x_new and 'Date(UTC)' in cols_1h4x_new and len(df_binance_ticker_15m) > 0:
-            # previous 데이터의 모든 컬럼 유지 (지표 포함)
-            df_prev_1h4x_all_cols = df_prev_1h4x.copy() if not df_prev_1h4x.empty else pd.DataFrame()
-            
-            # 새 데이터는 최신 1개만 사용 (2행에 배치할 데이터)
-            df_new_1h4x_basic = df_binance_ticker_15m.iloc[0:1][cols_1h4x_new].copy()
-            
-            # 새 데이터에 previous와 동일한 컬럼 구조 만들기 (지표는 NaN으로)
-            if not df_prev_1h4x_all_cols.empty:
-                for col in df_prev_1h4x_all_cols.columns:
-                    if col not in df_new_1h4x_basic.columns:
-                        df_new_1h4x_basic[col] = np.nan
-                
-                # 컬럼 순서 맞추기
-                df_new_1h4x_basic = df_new_1h4x_basic[df_prev_1h4x_all_cols.columns]
-            
-            # ⚠️중요: 중복 제거는 Date(UTC) 기준으로만 수행
-            if 'Date(UTC)' in df_new_1h4x_basic.columns and 'Date(UTC)' in df_prev_1h4x_all_cols.columns:
-                new_date_utc = df_new_1h4x_basic.iloc[0]['Date(UTC)'] if len(df_new_1h4x_basic) > 0 and pd.notna(df_new_1h4x_basic.iloc[0]['Date(UTC)']) else None
-                if new_date_utc and str(new_date_utc).strip() != '':
-                    df_prev_1h4x_all_cols = df_prev_1h4x_all_cols[
-                        df_prev_1h4x_all_cols['Date(UTC)'].astype(str).str.strip() != str(new_date_utc).strip()
-                    ].copy()
-            
-            # [중요] 병합 직전 타입 강제 통일 (Timestamp와 str 혼합 방지)
-            if 'Date(UTC)' in df_new_1h4x_basic.columns:
-                df_new_1h4x_basic['Date(UTC)'] = pd.to_datetime(df_new_1h4x_basic['Date(UTC)'], errors='coerce')
-            if 'Date(UTC)' in df_prev_1h4x_all_cols.columns:
-                df_prev_1h4x_all_cols['Date(UTC)'] = pd.to_datetime(df_prev_1h4x_all_cols['Date(UTC)'], errors='coerce')
-            
-            # 합치기: 새 데이터(2행) + previous 데이터(3행부터)
-            df_binance_ticker_1h4x = pd.concat([
-                df_new_1h4x_basic,      # 새 데이터
-                df_prev_1h4x_all_cols   # previous 데이터
-            ], ignore_index=True)
-            
-            # [중요] 병합 직후 타입 통일 (Timestamp와 str 혼합 방지)
-            df_binance_ticker_1h4x = clean_df_display_format(df_binance_ticker_1h4x)
-            
-            # 메모리 정리
-            del df_new_1h4x_basic, df_prev_1h4x_all_cols
-            
-            # ⚠️중요: 시간 기준 정렬은 Date(UTC) 기준으로만 수행 (KST는 기록용일 뿐, 정렬에는 사용하지 않음)
-            if not df_binance_ticker_1h4x.empty:
-                # 정렬 전 타입 일치 여부 최종 확인
-                df_binance_ticker_1h4x = clean_df_display_format(df_binance_ticker_1h4x)
-                # 정렬 실행
-                df_binance_ticker_1h4x = df_binance_ticker_1h4x.sort_values('Date(UTC)', ascending=False, na_position='last').reset_index(drop=True)
-            
-            # 최대 개수 제한 (previous 데이터 포함)
-            df_binance_ticker_1h4x = df_binance_ticker_1h4x.iloc[:400].reset_index(drop=True)  # 최종 400개
-        else:
-            # previous 파일이 없는 경우: 15분봉 데이터만 사용
-            df_binance_ticker_1h4x = df_new_1h4x_basic if 'df_new_1h4x_basic' in locals() else pd.DataFrame()
-    else:
-        # 1단계 또는 previous 파일이 없는 경우: 15분봉 데이터에서 기본 컬럼만 복사
-        if skip_first_row:
-            # 1단계: 15분봉 데이터에서 1601개 가져오기 (COLLECTION_COUNT['15m'])
-            if len(df_binance_ticker_15m) >= COLLECTION_COUNT['15m']:
-                df_binance_ticker_1h4x = df_binance_ticker_15m[base_cols_1h4x].iloc[:COLLECTION_COUNT['15m']].copy()
-            else:
-                df_binance_ticker_1h4x = df_binance_ticker_15m[base_cols_1h4x].copy()
-        else:
-            # previous 파일이 없는 경우: 15분봉 데이터에서 최대 400개
-            if len(df_binance_ticker_15m) > 0:
-                df_binance_ticker_1h4x = df_binance_ticker_15m[base_cols_1h4x].iloc[:400].copy()
-            else:
-                df_binance_ticker_1h4x = pd.DataFrame()
-    
-    # 1H4x 시트용 지표 계산
-    if not df_binance_ticker_1h4x.empty:
-        if skip_first_row:
-            # 1단계: 전체 계산 후 최종 400개로 제한
-            df_binance_ticker_1h4x = calculate_all_indicators_1h4x(df_binance_ticker_1h4x, "USD")
-            # 지표 계산 후 최종 400개로 제한
-            df_binance_ticker_1h4x = df_binance_ticker_1h4x.iloc[:400].reset_index(drop=True)
-        else:
-            # 2단계: 최신 1개만 계산 (previous 지표 유지)
-            if len(df_binance_ticker_1h4x) > 0:
-                df_binance_ticker_1h4x = calculate_latest_row_only_1h4x(df_binance_ticker_1h4x, "USD")
-    
-    # 15분봉에 새로운 열들 추가 (1H4x 시트에서 SB1H 값 매칭)
-    if skip_first_row:
-        # 1단계: 전체 계산
-        df_binance_ticker_15m = calculate_sb1h_for_15m(df_binance_ticker_15m, df_binance_ticker_1h4x)
-        
-        # SB1D 계산 (일봉에서 15분봉으로)
-        if not df_binance_ticker_1d.empty:
-            df_binance_ticker_15m = calculate_daysb_15m(df_binance_ticker_15m, df_binance_ticker_1d, "USD")
-        
-        # SB5M 계산 (5분봉에서 15분봉으로, 개수 카운팅)
-        if not df_binance_ticker_5m.empty:
-            df_binance_ticker_15m = calculate_sb5m_for_15m(df_binance_ticker_15m, df_binance_ticker_5m)
-        
-        # 1HCL, -1HCL 복사 (1시간봉에서 15분봉으로)
-        if not df_binance_ticker_1h.empty:
-            df_binance_ticker_15m = copy_1hclass_to_15m(df_binance_ticker_15m, df_binance_ticker_1h)
-            df_binance_ticker_15m = copy_minus_1hclass_to_15m(df_binance_ticker_15m, df_binance_ticker_1h)
-            df_binance_ticker_15m = copy_p1h_to_15m_and_set_p(df_binance_ticker_15m, df_binance_ticker_1h)
-    else:
-        # ⚠️중요: 2단계 계산은 Date(UTC) 기준으로만 수행 (KST는 기록용일 뿐, 필터링/매칭에는 사용하지 않음)
-        if len(df_binance_ticker_15m) > 0:
-            # Date(UTC) 컬럼 정규화 (Timestamp와 문자열 혼합 방지)
-            if 'Date(UTC)' in df_binance_ticker_15m.columns:
-                # 이미 datetime 타입이면 그대로 유지, 문자열인 경우만 변환
-                if not pd.api.types.is_datetime64_any_dtype(df_binance_ticker_15m['Date(UTC)']):
-                    # format 명시하지 않고 자동 인식 (4자리 연도도 파싱 가능)
-                    df_binance_ticker_15m['Date(UTC)'] = pd.to_datetime(df_binance_ticker_15m['Date(UTC)'], errors='coerce')
-            
-            # SB1H 컬럼이 없으면 생성 (object 타입으로 명시)
-            if 'SB1H' not in df_binance_ticker_15m.columns:
-                df_binance_ticker_15m['SB1H'] = ''
-                df_binance_ticker_15m['SB1H'] = df_binance_ticker_15m['SB1H'].astype('object')
-            
-            # 최신 Date(UTC) 시간으로 필터링 (VLOOKUP 방식)
-            if 'Date(UTC)' in df_binance_ticker_15m.columns:
-                # 최신 Date(UTC) 시간 사용 (이미 정렬되어 있으므로 iloc[0] 사용)
-                df_15m_temp = df_binance_ticker_15m.iloc[0:1].copy()
-            else:
-                df_15m_temp = df_binance_ticker_15m.iloc[0:1].copy()
-            
-            df_15m_temp = calculate_sb1h_for_15m(df_15m_temp, df_binance_ticker_1h4x)
-            
-            # SB1D 계산
-            if not df_binance_ticker_1d.empty:
-                df_15m_temp = calculate_daysb_15m(df_15m_temp, df_binance_ticker_1d, "USD")
-            
-            # SB5M 계산 (5분봉 전체 사용)
-            if not df_binance_ticker_5m.empty:
-                df_15m_temp = calculate_sb5m_for_15m(df_15m_temp, df_binance_ticker_5m)
-            
-            # Date(UTC) 시간으로 매칭하여 업데이트
-            if len(df_15m_temp) > 0 and 'Date(UTC)' in df_15m_temp.columns:
-                target_date_utc = df_15m_temp.iloc[0]['Date(UTC)']
-                mask = df_binance_ticker_15m['Date(UTC)'] == target_date_utc
-                if mask.any():
-                    # SB1H 업데이트
-                    val = df_15m_temp.iloc[0].get('SB1H', np.nan)
-                    df_binance_ticker_15m['SB1H'] = df_binance_ticker_15m['SB1H'].astype('object')
-                    df_binance_ticker_15m.loc[mask, 'SB1H'] = np.nan if (pd.isna(val) or val == '') else val
-                    
-                    # SB1D 업데이트
-                    if 'SB1D' in df_15m_temp.columns:
-                        val_sb1d = df_15m_temp.iloc[0].get('SB1D', np.nan)
-                        if 'SB1D' not in df_binance_ticker_15m.columns:
-                            df_binance_ticker_15m['SB1D'] = ''
-                        df_binance_ticker_15m['SB1D'] = df_binance_ticker_15m['SB1D'].astype('object')
-                        df_binance_ticker_15m.loc[mask, 'SB1D'] = np.nan if (pd.isna(val_sb1d) or val_sb1d == '') else val_sb1d
-                    
-                    # SB5M 업데이트
-                    if 'SB5M' in df_15m_temp.columns:
-                        val_sb5m = df_15m_temp.iloc[0].get('SB5M', '')
-                        if 'SB5M' not in df_binance_ticker_15m.columns:
-                            df_binance_ticker_15m['SB5M'] = ''
-                        df_binance_ticker_15m['SB5M'] = df_binance_ticker_15m['SB5M'].astype('object')
-                        df_binance_ticker_15m.loc[mask, 'SB5M'] = '' if (pd.isna(val_sb5m) or val_sb5m == '') else val_sb5m
-            else:
-                # SB1H 업데이트
-                val = df_15m_temp.iloc[0].get('SB1H', np.nan) if len(df_15m_temp) > 0 else np.nan
-                df_binance_ticker_15m['SB1H'] = df_binance_ticker_15m['SB1H'].astype('object')
-                df_binance_ticker_15m.loc[0, 'SB1H'] = np.nan if (pd.isna(val) or val == '') else val
-    
-                # SB1D 업데이트
-                if 'SB1D' in df_15m_temp.columns:
-                    val_sb1d = df_15m_temp.iloc[0].get('SB1D', np.nan) if len(df_15m_temp) > 0 else np.nan
-            if 'SB1D' not in df_binance_ticker_15m.columns:
-                df_binance_ticker_15m['SB1D'] = ''
-                df_binance_ticker_15m['SB1D'] = df_binance_ticker_15m['SB1D'].astype('object')
-                df_binance_ticker_15m.loc[0, 'SB1D'] = np.nan if (pd.isna(val_sb1d) or val_sb1d == '') else val_sb1d
-                
-                # SB5M 업데이트
-                if 'SB5M' in df_15m_temp.columns:
-                    val_sb5m = df_15m_temp.iloc[0].get('SB5M', '') if len(df_15m_temp) > 0 else ''
-                    if 'SB5M' not in df_binance_ticker_15m.columns:
-                        df_binance_ticker_15m['SB5M'] = ''
-                    df_binance_ticker_15m['SB5M'] = df_binance_ticker_15m['SB5M'].astype('object')
-                    df_binance_ticker_15m.loc[0, 'SB5M'] = '' if (pd.isna(val_sb5m) or val_sb5m == '') else val_sb5m
-    
-    # 15분봉의 1HMSFast는 calculate_all_indicators_15m 또는 calculate_latest_row_only_15m에서 직접 계산됨
-    
-    # Samount, Bamount 계산 (1단계 vs 2단계 분기, UTC 시간 기준으로 매칭, VLOOKUP 방식)
-    if skip_first_row:
-        # 1단계: 전체 계산 (UTC 시간 기준으로 매칭)
-    # 15분봉에 주봉 SamountW, BamountW 추가 (바이낸스 주봉 기준, UTC 시간 기준으로 매칭)
-        df_binance_ticker_15m = copy_weekly_amounts_to_15m(df_binance_ticker_15m, df_binance_ticker_weekly)
-    
-    # 15분봉에 일봉 Samount1D, Bamount1D 추가 (바이낸스 일봉 기준, UTC 시간 기준으로 매칭)
-        df_binance_ticker_15m = copy_daily_amounts_to_15m(df_binance_ticker_15m, df_binance_ticker_1d)
-    
-    # 15분봉에 최종 Samount, Bamount 계산
-        df_binance_ticker_15m = calculate_final_amounts(df_binance_ticker_15m)
-    else:
-        # 2단계: 최신 1개만 계산 (previous에서 SamountW/BamountW/Samount1D/Bamount1D 유지)
-        # Previous에서 가져온 SamountW/BamountW/Samount1D/Bamount1D가 이미 있음
-        # 최신 1개(인덱스 0)만 계산
-        if len(df_binance_ticker_15m) > 0:
-            row_0 = df_binance_ticker_15m.iloc[0]
-            samountW = row_0.get("SamountW", np.nan)
-            bamountW = row_0.get("BamountW", np.nan)
-            samount1D = row_0.get("Samount1D", np.nan)
-            bamount1D = row_0.get("Bamount1D", np.nan)
-            
-            # SamountW/BamountW가 없으면 일봉/주봉에서 가져오기
-            # ⚠️중요: 주봉의 SamountW, BamountW는 buyside/sellside가 실시간으로 변하므로
-            # 매번 최신 값을 가져와야 함 (pd.isna 조건 제거)
-            if len(df_binance_ticker_weekly) > 0:
-                samountW = df_binance_ticker_weekly.iloc[0].get("SamountW", np.nan)
-                bamountW = df_binance_ticker_weekly.iloc[0].get("BamountW", np.nan)
-                df_binance_ticker_15m.loc[0, "SamountW"] = samountW
-                df_binance_ticker_15m.loc[0, "BamountW"] = bamountW
-            
-            # ⚠️중요: 일봉의 Samount1D, Bamount1D는 buyside/sellside가 실시간으로 변하므로
-            # 매번 최신 값을 가져와야 함 (pd.isna 조건 제거)
-            if len(df_binance_ticker_1d) > 0:
-                samount1D = df_binance_ticker_1d.iloc[0].get("Samount1D", np.nan)
-                bamount1D = df_binance_ticker_1d.iloc[0].get("Bamount1D", np.nan)
-                df_binance_ticker_15m.loc[0, "Samount1D"] = samount1D
-                df_binance_ticker_15m.loc[0, "Bamount1D"] = bamount1D
-            
-            # 최종 Samount, Bamount 계산 (2행만)
-            if not pd.isna(samountW) and not pd.isna(samount1D):
-                df_binance_ticker_15m.loc[0, "Samount"] = 0.7 * samountW + 0.3 * samount1D
-            else:
-                df_binance_ticker_15m.loc[0, "Samount"] = np.nan
-            
-            if not pd.isna(bamountW) and not pd.isna(bamount1D):
-                df_binance_ticker_15m.loc[0, "Bamount"] = 0.7 * bamountW + 0.3 * bamount1D
-            else:
-                df_binance_ticker_15m.loc[0, "Bamount"] = np.nan
-    
-    # dateM, LD 계산 (1단계 vs 2단계 분기)
-    # 2단계일 때 previous 데이터 백업 (3행 이후 복원용)
-    if not skip_first_row and not df_prev_15m.empty:
-        df_prev_15m_backup = df_prev_15m.copy()  # previous 데이터 백업 (3행~)
-    
-    # dateM 열 계산 (15분봉 시트에만) - ORDER 계산 전에 먼저 실행
-    if skip_first_row:
-        # 1단계: 전체 계산
-        df_binance_ticker_15m = calculate_dateM(df_binance_ticker_15m)
-    else:
-        # 2단계: 2행(인덱스 0)만 계산
-        df_binance_ticker_15m = calculate_latest_row_only_dateM(df_binance_ticker_15m)
-    
-    # LD 열 계산 (15분봉 시트에만) - ORDER 계산 전에 먼저 실행
-    if skip_first_row:
-        # 1단계: 전체 계산
-        df_binance_ticker_15m = calculate_LD(df_binance_ticker_15m)
-    else:
-        # 2단계: 2행(인덱스 0)만 계산
-        df_binance_ticker_15m = calculate_latest_row_only_LD(df_binance_ticker_15m)
-    
-    # SB5M 열 계산 (15분봉 시트에만) - 5분봉 데이터 기반 (UTC 시간 기준으로 매칭, VLOOKUP 방식)
-    if skip_first_row:
-        # 1단계: 전체 계산 (UTC 시간 기준으로 매칭)
-        df_binance_ticker_15m = calculate_sb5m_for_15m(df_binance_ticker_15m, df_binance_ticker_5m)
-    else:
-        # 2단계: 최신 행(인덱스 0, UTC 기준으로 정렬된 상태에서 최신)만 계산
-        if len(df_binance_ticker_15m) > 0:
-            # SB5M 컬럼이 없으면 생성 (object 타입으로 명시)
-            if 'SB5M' not in df_binance_ticker_15m.columns:
-                df_binance_ticker_15m['SB5M'] = ''
-                df_binance_ticker_15m['SB5M'] = df_binance_ticker_15m['SB5M'].astype('object')
-            
-            # UTC 기준으로 정렬된 상태에서 최신 데이터 가져오기 (인덱스 0 = UTC 기준 최신)
-            df_15m_temp = df_binance_ticker_15m.iloc[0:1].copy()
-            
-            try:
-                # Date(UTC) 기준으로 그룹화 (바이낸스는 UTC 기준)
-                if 'Date(UTC)' in df_15m_temp.columns:
-                    if df_15m_temp['Date(UTC)'].dtype == 'object':
-                        df_15m_temp['Date(UTC)'] = pd.to_datetime(df_15m_temp['Date(UTC)'], format='%y/%m/%d,%H:%M', errors='coerce')
-                    else:
-                        # 이미 datetime 타입이면 format 명시하여 재변환 (일관성 보장)
-                        try:
-                            df_15m_temp['Date(UTC)'] = pd.to_datetime(df_15m_temp['Date(UTC)'], format='%y/%m/%d,%H:%M', errors='coerce')
-                        except:
-                            import warnings
-                            with warnings.catch_warnings():
-                                warnings.simplefilter("ignore", UserWarning)
-                        df_15m_temp['Date(UTC)'] = pd.to_datetime(df_15m_temp['Date(UTC)'], errors='coerce')
-                    
-                    df_15m_temp['15min_group'] = df_15m_temp['Date(UTC)'].dt.floor('15min')
-                    target_15min_group = df_15m_temp.iloc[0]['15min_group']
-                    
-                    # 전체 5분봉 데이터에서 해당 15분 그룹에 속하는 5분봉만 필터링
-                    df_5m_copy = df_binance_ticker_5m.copy()
-                    if 'Date(UTC)' in df_5m_copy.columns:
-                        # 이미 datetime64면 그대로 사용, 문자열만 파싱
-                        if pd.api.types.is_datetime64_any_dtype(df_5m_copy['Date(UTC)']):
-                            pass  # 이미 Timestamp 객체이면 그대로 사용
-                        else:
-                            # 문자열인 경우에만 파싱 (UserWarning 억제)
-                            s = df_5m_copy['Date(UTC)'].astype(str).str.strip().str.replace(',', ' ', regex=False)
-                            import warnings
-                            with warnings.catch_warnings():
-                                warnings.simplefilter("ignore", UserWarning)
-                                df_5m_copy['Date(UTC)'] = pd.to_datetime(s, errors='coerce')
-                        
-                        df_5m_copy['15min_group'] = df_5m_copy['Date(UTC)'].dt.floor('15min')
-                        
-                        # 해당 15분 그룹에 속하는 5분봉만 필터링
-                        df_5m_temp = df_5m_copy[df_5m_copy['15min_group'] == target_15min_group].copy()
-                        
-                        # 시간 순서대로 정렬 (과거→현재)
-                        df_5m_temp = df_5m_temp.sort_values('Date(UTC)', ascending=True).reset_index(drop=True)
-                        
-                        # df_15m_temp의 15min_group을 유지 (함수 내부에서 재계산 방지)
-                        # 함수 내부에서 df_15m_temp의 15min_group을 사용하도록 보장
-                        # 임시 컬럼 제거 (df_5m_temp만)
-                        if '15min_group' in df_5m_temp.columns:
-                            df_5m_temp = df_5m_temp.drop('15min_group', axis=1)
-                    else:
-                        df_5m_temp = df_binance_ticker_5m.iloc[0:3].copy() if len(df_binance_ticker_5m) >= 3 else df_binance_ticker_5m.copy()
-                else:
-                    df_5m_temp = df_binance_ticker_5m.iloc[0:3].copy() if len(df_binance_ticker_5m) >= 3 else df_binance_ticker_5m.copy()
-                
-                # 검증: 해당 15분 그룹에 속하는 5분봉이 3개인지 확인
-                if len(df_5m_temp) != 3:
-                    print(f"{get_timestamp()} [{stage_prefix}] ⚠️ SB5M 시간 매칭 경고: 15분봉 {target_15min_group}에 해당하는 5분봉이 {len(df_5m_temp)}개 (예상: 3개)")
-            except Exception as e:
-                # 오류 발생 시 기존 방식 사용 (최신 3개)
-                print(f"{get_timestamp()} [{stage_prefix}] ⚠️ SB5M 시간 매칭 실패, 최신 3개 사용: {e}")
-                df_5m_temp = df_binance_ticker_5m.iloc[0:3].copy() if len(df_binance_ticker_5m) >= 3 else df_binance_ticker_5m.copy()
-            
-            # df_15m_temp의 15min_group은 유지 (함수에서 사용)
-            df_15m_temp = calculate_sb5m_for_15m(df_15m_temp, df_5m_temp)
-            
-            # 함수 호출 후 임시 컬럼 제거
-            for col in ['15min_group']:
-                if col in df_15m_temp.columns:
-                    df_15m_temp = df_15m_temp.drop(col, axis=1)
-            
-            sb5m_value = df_15m_temp.iloc[0].get('SB5M', np.nan)
-            # dtype 호환성을 위해 object 타입으로 변환
-            if df_binance_ticker_15m['SB5M'].dtype != 'object':
-                df_binance_ticker_15m['SB5M'] = df_binance_ticker_15m['SB5M'].astype('object')
-            # 빈 문자열은 np.nan으로 변환
-            if pd.isna(sb5m_value) or sb5m_value == '':
-                sb5m_value = np.nan
-            df_binance_ticker_15m.loc[0, 'SB5M'] = sb5m_value
-    
-    # ORDER 열 계산 (15분봉 시트에만) - LD 계산 후 실행
+    _stage_profiler.stage("15분봉 지표")
+    # 15분봉 지표 계산
     if skip_first_row:
         # 1단계: 전체 계산
-        df_binance_ticker_15m = calculate_order_column(df_binance_ticker_15m, f"{TICKER}USDT15M")
+        df_binance_ticker_15m = calculate_all_indicators_15m(df_binance_ticker_15m, "USD")
     else:
-        # 2단계: 2행(인덱스 0)만 계산
-        if len(df_binance_ticker_15m) > 0:
-            # ORDER 컬럼이 없으면 생성 (object 타입으로 명시)
-            if 'ORDER' not in df_binance_ticker_15m.columns:
-                df_binance_ticker_15m['ORDER'] = ''
-                df_binance_ticker_15m['ORDER'] = df_binance_ticker_15m['ORDER'].astype('object')
-            
-            df_15m_temp = df_binance_ticker_15m.iloc[0:1].copy()
-            df_15m_temp = calculate_order_column(df_15m_temp, f"{TICKER}USDT15M")
-            order_value = df_15m_temp.iloc[0].get('ORDER', '')
-            # dtype 호환성을 위해 object 타입으로 변환
-            if df_binance_ticker_15m['ORDER'].dtype != 'object':
-                df_binance_ticker_15m['ORDER'] = df_binance_ticker_15m['ORDER'].astype('object')
-            df_binance_ticker_15m.loc[0, 'ORDER'] = order_value
+        # 2단계: 최신 1개만 계산 (previous 지표 유지)
+        print(f"{get_timestamp()} [{stage_prefix}]    → 2행(최신)만 계산, 3행 이후는 previous 유지")
+        df_binance_ticker_15m = calculate_latest_row_only_15m(df_binance_ticker_15m, "USD")
     
-    # KSC 열 계산 (15분봉 시트에만) - ORDER 계산 후 실행
-    if skip_first_row:
-        # 1단계: 전체 계산
-        df_binance_ticker_15m = calculate_ksc_for_15m(df_binance_ticker_15m)
-    else:
-        # 2단계: 2행(인덱스 0)만 계산
-        df_binance_ticker_15m = calculate_latest_row_only_ksc(df_binance_ticker_15m)
+    _stage_profiler.stage("5분봉 1HMSF 복사·Buy 재계산")
+    # 5분봉에 15분봉의 1HMSFast 값을 시간 매칭하여 복사 (1HMSF 열 추가)
+    if not df_binance_ticker_5m.empty and not df_binance_ticker_15m.empty:
+        df_binance_ticker_5m = copy_1hmsfast_to_5m(df_binance_ticker_5m, df_binance_ticker_15m)
     
-    # 1HCLASS, -1HCLASS를 먼저 15분봉으로 복사 (모든 지표가 최신 1H 기준으로 계산되도록 선행)
-    if not df_binance_ticker_1h.empty:
-        df_binance_ticker_15m = copy_1hclass_to_15m(df_binance_ticker_15m, df_binance_ticker_1h)
-        df_binance_ticker_15m = copy_minus_1hclass_to_15m(df_binance_ticker_15m, df_binance_ticker_1h)
-        df_binance_ticker_15m = copy_p1h_to_15m_and_set_p(df_binance_ticker_15m, df_binance_ticker_1h)
+    # 5분봉 Buy 재계산 (1HMSF 복사 후, gear1/gear2 조건 적용)
+    if not df_binance_ticker_5m.empty:
+        df_binance_ticker_5m = recalculate_buy_for_5m(df_binance_ticker_5m)
     
-    # StoSP, TP, StoSU, TPC, TPCS, NBS 계산 (PRFT보다 먼저 실행: TP가 있어야 TPOVER 판단 가능)
+    _stage_profiler.stage("1시간봉 지표")
+    # 1시간봉 지표 계산
     if skip_first_row:
         # 1단계: 전체 계산
-        df_binance_ticker_15m = calculate_stosp_stosu(df_binance_ticker_15m)
+        df_binance_ticker_1h = calculate_all_indicators_1h(df_binance_ticker_1h, "USD")
     else:
-        # 2단계: 전체 재계산 (StoSP는 누적 계산이므로 전체 재계산 필요)
-        df_binance_ticker_15m = calculate_stosp_stosu(df_binance_ticker_15m)
+        # 2단계: 2행(인덱스 0)만 계산
+        df_binance_ticker_1h = calculate_latest_row_only_1h(df_binance_ticker_1h, "USD")
     
-    # PRFT 열 계산 (15분봉 시트에만) - TP 계산 후 실행
-    if skip_first_row:
-        # 1단계: 전체 계산
-        df_binance_ticker_15m = calculate_prft_for_15m(df_binance_ticker_15m)
+    _stage_profiler.stage("주봉 지표")
+    # 주봉 지표 계산
+    if weekly_incremental:
+        # 2단계: 진행 중인 주(2행)만 계산
+        df_binance_ticker_weekly = calculate_latest_row_only_weekly(df_binance_ticker_weekly, "USD")
     else:
-        # 2단계: 2행(인덱스 0)만 계산
-        df_binance_ticker_15m = calculate_latest_row_only_prft(df_binance_ticker_15m)
+        # 1단계(또는 증분 상태 없음): 전체 계산 후 다음 실행용 증분 상태 구성
+        df_binance_ticker_weekly = calculate_all_indicators_weekly(df_binance_ticker_weekly, "USD")
+        seed_weekly_state(df_binance_ticker_1d, df_binance_ticker_weekly)
     
-    # PRFT 반영 후 StoSP/TP/NBS 재계산 (TPOVER로 인한 초기화 반영, NBS를 PRFT 이후로 위치)
-    if skip_first_row:
-        df_binance_ticker_15m = calculate_stosp_stosu(df_binance_ticker_15m)
+    _stage_profiler.stage("1H4x 시트·지표")
+    # 1H4x 시트 생성 (15분봉 데이터에서 기본 컬럼만 추출)
+    base_cols_1h4x = ['Date(UTC)', 'KST', '종', '시', '고', '저', 'Vol.']
+    if not skip_first_row and not df_prev_15m.empty:
+        # 2단계: previous 파일에서 1H4x 시트 읽기 (이미 위에서 읽었으므로 df_prev_1h4x 사용)
+        # df_prev_1h4x는 이미 위에서 읽었음 (7627-7637번 줄)
+        
+        # 2단계: 15분봉 데이터에서 기본 컬럼만 가져와서 previous와 병합
+        cols_1h4x_new = [col for col in base_cols_1h4x if col in df_binance_ticker_15m.columns]
+        
+        if cols_1h4x_new and 'Date(UTC)' in cols_1h4x_new and len(df_binance_ticker_15m) > 0:
+            # previous 데이터의 모든 컬럼 유지 (지표 포함)
+            df_prev_1h4x_all_cols = df_prev_1h4x.copy() if not df_prev_1h4x.empty else pd.DataFrame()
+            
+            # 새 데이터는 최신 1개만 사용 (2행에 배치할 데이터)
+            df_new_1h4x_basic = df_binance_ticker_15m.iloc[0:1][cols_1h4x_new].copy()
+            
+            # 새 데이터에 previous와 동일한 컬럼 구조 만들기 (지표는 NaN으로)
+            if not df_prev_1h4x_all_cols.empty:
+                for col in df_prev_1h4x_all_cols.columns:
+                    if col not in df_new_1h4x_basic.columns:
+                        df_new_1h4x_basic[col] = np.nan
+                
+                # 컬럼 순서 맞추기
+                df_new_1h4x_basic = df_new_1h4x_basic[df_prev_1h4x_all_cols.columns]
+            
+            # [중요] 병합 직전 타입 강제 통일 (datetime64[ms], 이미 같은 타입이면 변환 없음)
+            ensure_utc_time(df_new_1h4x_basic)
+            ensure_utc_time(df_prev_1h4x_all_cols)
+            
+            # ⚠️중요: 중복 제거는 Date(UTC) 기준으로만 수행 (새 데이터 최신 행과 같은 시간의 previous 행 제거)
+            df_prev_1h4x_all_cols = drop_overlapping_candles(df_prev_1h4x_all_cols, df_new_1h4x_basic, newest_only=True)
+            
+            # 합치기: 새 데이터(2행) + previous 데이터(3행부터)
+            df_binance_ticker_1h4x = pd.concat([
+                df_new_1h4x_basic,      # 새 데이터
+                df_prev_1h4x_all_cols   # previous 데이터
+            ], ignore_index=True)
+            
+            # [중요] 병합 직후 타입 통일 (Timestamp와 str 혼합 방지)
+            df_binance_ticker_1h4x = clean_df_display_format(df_binance_ticker_1h4x)
+            
+            # 메모리 정리
+            del df_new_1h4x_basic, df_prev_1h4x_all_cols
+            
+            # ⚠️중요: 시간 기준 정렬은 Date(UTC) 기준으로만 수행 (KST는 기록용일 뿐, 정렬에는 사용하지 않음)
+            if not df_binance_ticker_1h4x.empty:
+                # 정렬 실행
+                df_binance_ticker_1h4x = df_binance_ticker_1h4x.sort_values('Date(UTC)', ascending=False, na_position='last').reset_index(drop=True)
+            
+            # 최대 개수 제한 (previous 데이터 포함)
+            df_binance_ticker_1h4x = df_binance_ticker_1h4x.iloc[:400].reset_index(drop=True)  # 최종 400개
+        else:
+            # previous 파일이 없는 경우: 15분봉 데이터만 사용
+            df_binance_ticker_1h4x = df_new_1h4x_basic if 'df_new_1h4x_basic' in locals() else pd.DataFrame()
     else:
-        df_binance_ticker_15m = calculate_stosp_stosu(df_binance_ticker_15m)
+        # 1단계 또는 previous 파일이 없는 경우: 15분봉 데이터에서 기본 컬럼만 복사
+        if skip_first_row:
+            # 1단계: 15분봉 데이터에서 1601개 가져오기 (COLLECTION_COUNT['15m'])
+            if len(df_binance_ticker_15m) >= COLLECTION_COUNT['15m']:
+                df_binance_ticker_1h4x = df_binance_ticker_15m[base_cols_1h4x].iloc[:COLLECTION_COUNT['15m']].copy()
+            else:
+                df_binance_ticker_1h4x = df_binance_ticker_15m[base_cols_1h4x].copy()
+        else:
+            # previous 파일이 없는 경우: 15분봉 데이터에서 최대 400개
+            if len(df_binance_ticker_15m) > 0:
+                df_binance_ticker_1h4x = df_binance_ticker_15m[base_cols_1h4x].iloc[:400].copy()
+            else:
+                df_binance_ticker_1h4x = pd.DataFrame()
+    
+    # 1H4x 시트용 지표 계산
+    if not df_binance_ticker_1h4x.empty:
+        if skip_first_row:
+            # 1단계: 전체 계산 후 최종 400개로 제한
+            df_binance_ticker_1h4x = calculate_all_indicators_1h4x(df_binance_ticker_1h4x, "USD")
+            # 지표 계산 후 최종 400개로 제한
+            df_binance_ticker_1h4x = df_binance_ticker_1h4x.iloc[:400].reset_index(drop=True)
+        else:
+            # 2단계: 최신 1개만 계산 (previous 지표 유지)
+            if len(df_binance_ticker_1h4x) > 0:
+                df_binance_ticker_1h4x = calculate_latest_row_only_1h4x(df_binance_ticker_1h4x, "USD")
+    
+    _stage_profiler.stage("15분봉 주문 경로 열")
+    # 15분봉 후처리 열 (SB1M~PRFT): 열 의존 그래프로 주문 경로 열의 전이 의존만 먼저 계산
+    # (dateM, 3행 이후 dateM/LD 복원 등 엑셀 전용 노드는 주문 실행 후 require_all()에서 계산)
+    column_graph_15m = ColumnGraph15m(df_binance_ticker_15m, {
+        "skip_first_row": skip_first_row,
+        "stage_prefix": stage_prefix,
+        "df_1m": df_binance_ticker_1m,
+        "df_5m": df_binance_ticker_5m,
+        "df_1h": df_binance_ticker_1h,
+        "df_1h4x": df_binance_ticker_1h4x,
+        "df_1d": df_binance_ticker_1d,
+        "df_weekly": df_binance_ticker_weekly,
+        "df_prev_15m": df_prev_15m,
+        # 2단계일 때 previous 데이터 백업 (3행 이후 복원용)
+        "df_prev_15m_backup": df_prev_15m.copy() if not skip_first_row and not df_prev_15m.empty else pd.DataFrame(),
+    })
+    graph_started = time.perf_counter()
+    df_binance_ticker_15m = column_graph_15m.require(TRADE_COLUMNS_15M)
+    print(f"{get_timestamp()} [{stage_prefix}] 🧭 15분봉 주문 경로 열 계산 완료 ({len(column_graph_15m.done)}단계, {time.perf_counter() - graph_started:.2f}초) | 지연: {', '.join(column_graph_15m.pending()) or '-'}")
     
     # 모든 지표 계산 완료 (1단계일 때만 표시)
     if skip_first_row:
         print(f"{get_timestamp()} [{stage_prefix}] ✅ 모든 지표 계산 완료")
     
-    # 2단계일 때: 3행 이후(인덱스 1부터)를 previous 값으로 복원 (dateM, LD만 복원)
-    if not skip_first_row and not df_prev_15m.empty and len(df_binance_ticker_15m) > 1:
-        # 2행(인덱스 0)은 새로 계산된 값 유지, 3행부터(인덱스 1부터)는 previous 값으로 복원
-        # dateM, LD 컬럼만 복원 (전체 계산 함수로 인해 변동됨)
-        restore_len = min(len(df_binance_ticker_15m) - 1, len(df_prev_15m_backup))
-        if restore_len > 0:
-            # dateM, LD 컬럼만 복원
-            for col in ['dateM', 'LD']:
-                if col in df_prev_15m_backup.columns and col in df_binance_ticker_15m.columns:
-                    source_values = df_prev_15m_backup[col].values[:restore_len]
-                    target_dtype = df_binance_ticker_15m[col].dtype
-                    
-                    try:
-                        if target_dtype == 'object':
-                            df_binance_ticker_15m.loc[df_binance_ticker_15m.index[1:1+restore_len], col] = pd.Series(source_values, dtype=object).values
-                        elif pd.api.types.is_datetime64_any_dtype(target_dtype):
-                            converted = pd.to_datetime(source_values, errors='coerce')
-                            df_binance_ticker_15m.loc[df_binance_ticker_15m.index[1:1+restore_len], col] = converted.values
-                        elif pd.api.types.is_integer_dtype(target_dtype) or pd.api.types.is_float_dtype(target_dtype):
-                            converted_values = pd.to_numeric(source_values, errors='coerce')
-                            if converted_values.isna().any() and not pd.api.types.is_float_dtype(target_dtype):
-                                df_binance_ticker_15m[col] = df_binance_ticker_15m[col].astype('float64')
-                            df_binance_ticker_15m.loc[df_binance_ticker_15m.index[1:1+restore_len], col] = converted_values.values
-                        else:
-                            df_binance_ticker_15m.loc[df_binance_ticker_15m.index[1:1+restore_len], col] = source_values
-                    except Exception as e:
-                        df_binance_ticker_15m[col] = df_binance_ticker_15m[col].astype(object)
-                        df_binance_ticker_15m.loc[df_binance_ticker_15m.index[1:1+restore_len], col] = pd.Series(source_values, dtype=object).values
-    
+    _stage_profiler.stage("ORDER 신호 확인")
     # ---- {TICKER}USDT15M 최신행 ORDER 신호 확인 ----
     try:
         if len(df_binance_ticker_15m) == 0:
@@ -11779,10 +14051,18 @@ def main(polling_start_time=None, skip_first_row=False, pre_fetched_data=None):
         import traceback
         traceback.print_exc()
     
-    # 모든 지표 계산 완료 (1단계일 때만 표시)
-    if skip_first_row:
-        print(f"{get_timestamp()} [{stage_prefix}] ✅ 모든 지표 계산 완료")
+    _stage_profiler.stage("주문 실행")
+    # 폴링 주문 실행 (2단계에서만 실행) - 엑셀 저장을 기다리지 않고 주문 경로 열 계산 직후 실행
+    if not skip_first_row and polling_start_time and ENABLE_TRADING:
+        execute_15m_order_signal(finalize_15m_sheet_columns(df_binance_ticker_15m), stage_prefix)
+    elif polling_start_time and not ENABLE_TRADING:
+        print(f"{get_timestamp()} [{stage_prefix}] ℹ️ 주문전송 비활성화 - 엑셀만 생성")
+    
+    _stage_profiler.stage("15분봉 지연 열")
+    # 엑셀 전용 15분봉 열 지연 계산 (주문 경로에 없는 노드)
+    df_binance_ticker_15m = column_graph_15m.require_all()
 
+    _stage_profiler.stage("시트 열 정리")
     # 일봉 컬럼 순서 맞춤
     binance_cols_1d = ["Date(UTC)", "KST", "종", "시", "고", "저", "Vol.", "SMA3", "SMA5", "SMA7", "SMA10", "SMA20", "Max15", "Min15", "하단", "상단", "SFast", "Fast", "Base", "4or1", "buyside", "sellside", "Sell", "Buy", "Samount1D", "Bamount1D"]
     
@@ -11805,46 +14085,8 @@ def main(polling_start_time=None, skip_first_row=False, pre_fetched_data=None):
     binance_cols_5m = [col for col in binance_cols_5m if col in df_binance_ticker_5m.columns]
     df_binance_ticker_5m = df_binance_ticker_5m[binance_cols_5m]
     
-    # 15분봉 컬럼 순서 맞춤 (Max70, Min70 사용, SMA12 추가, SamountW/BamountW, Samount1D/Bamount1D, 최종 Samount/Bamount 추가, dateM, LD, SPRD, SPRD2 추가, SB1M 추가) - Source와 동일한 순서 (김프 제외)
-    binance_cols_15m = ["Date(UTC)", "KST", "종", "시", "고", "저", "Vol.", "SMA3", "SMA5", "SMA7", "SMA10", "SMA12", "SMAF", "SMA20", "SMA25", "SMA100", "SMA200", "SMA400", "SMA800", "Max70", "Min70", "하단", "상단", "SFast", "Fast", "Base", "4or1", "buyside", "sellside", "Sell", "Buy", "SB1M", "SB5M", "SB1H", "SB1D", "ORDER", "1HMSFast", "1HCL", "-1HCL", "p", "KSC", "Bomb", "PRFT", "StoSP", "TP", "StoSU", "TPC", "TPCS", "NBS", "LS", "SamountW", "BamountW", "Samount1D", "Bamount1D", "Samount", "Bamount", "dateM", "LD", "SPRD", "SPRD2"]
-    
-    # 누락된 열들을 기본값으로 추가 (Source와 동일한 구조 유지, SMA400/SMA800 추가)
-    if 'SMA400' not in df_binance_ticker_15m.columns:
-        df_binance_ticker_15m['SMA400'] = np.nan
-    if 'SMA800' not in df_binance_ticker_15m.columns:
-        df_binance_ticker_15m['SMA800'] = np.nan
-    if '1HCL' not in df_binance_ticker_15m.columns:
-        df_binance_ticker_15m['1HCL'] = np.nan
-    if '-1HCL' not in df_binance_ticker_15m.columns:
-        df_binance_ticker_15m['-1HCL'] = np.nan
-    if 'p' not in df_binance_ticker_15m.columns:
-        df_binance_ticker_15m['p'] = np.nan
-    if 'StoSP' not in df_binance_ticker_15m.columns:
-        df_binance_ticker_15m['StoSP'] = np.nan
-    if 'TP' not in df_binance_ticker_15m.columns:
-        df_binance_ticker_15m['TP'] = np.nan
-    if 'StoSU' not in df_binance_ticker_15m.columns:
-        df_binance_ticker_15m['StoSU'] = np.nan
-    if 'TPC' not in df_binance_ticker_15m.columns:
-        df_binance_ticker_15m['TPC'] = 0
-    if 'TPCS' not in df_binance_ticker_15m.columns:
-        df_binance_ticker_15m['TPCS'] = 0
-    if 'NBS' not in df_binance_ticker_15m.columns:
-        df_binance_ticker_15m['NBS'] = 0
-    if 'LS' not in df_binance_ticker_15m.columns:
-        df_binance_ticker_15m['LS'] = ''  # 헤더만, 내용 채우지 않음
-    if 'SPRD' not in df_binance_ticker_15m.columns:
-        df_binance_ticker_15m['SPRD'] = np.nan
-    # bomb → Bomb로 변경 (대소문자 통일)
-    if 'bomb' in df_binance_ticker_15m.columns and 'Bomb' not in df_binance_ticker_15m.columns:
-        df_binance_ticker_15m['Bomb'] = df_binance_ticker_15m['bomb']
-        df_binance_ticker_15m = df_binance_ticker_15m.drop(columns=['bomb'], errors='ignore')
-    elif 'Bomb' not in df_binance_ticker_15m.columns:
-        df_binance_ticker_15m['Bomb'] = ''
-    
-    # 존재하는 컬럼만 선택 (Source 순서 유지)
-    binance_cols_15m = [col for col in binance_cols_15m if col in df_binance_ticker_15m.columns]
-    df_binance_ticker_15m = df_binance_ticker_15m[binance_cols_15m]
+    # 15분봉 컬럼 순서 맞춤 (Source와 동일한 순서, 누락 열 기본값 추가)
+    df_binance_ticker_15m = finalize_15m_sheet_columns(df_binance_ticker_15m)
     
     
     # 1시간봉 컬럼 순서 맞춤 (Source 기준: SMA25, SMA100, SMA200, SMA400, SMA800, Max200, Min200, 1HCLASS, -1HCLASS)
@@ -12000,6 +14242,7 @@ def main(polling_start_time=None, skip_first_row=False, pre_fetched_data=None):
             print(f"{get_timestamp()} [{stage_prefix}] 상세 오류:\n{traceback_str}")
             send_discord_message(f"{error_msg}\n상세 오류:\n{traceback_str}")
     
+    _stage_profiler.stage("엑셀 저장·서식")
     # 저장 및 열 너비 자동 조정 (UTC 기준)
     print(f"{get_timestamp()} [{stage_prefix}] 💾 엑셀 파일 저장 중...")
     
@@ -13192,235 +15435,6 @@ def main(polling_start_time=None, skip_first_row=False, pre_fetched_data=None):
         print(f"{get_timestamp()} [{stage_prefix}] 🎉 모든 작업이 완료되었습니다!")
         
         # 엑셀 파일 저장 완료 후 메모리 정리
-        # 폴링 주문 실행 (2단계에서만 실행)
-        if not skip_first_row and polling_start_time and ENABLE_TRADING:
-            try:
-                if len(df_binance_ticker_15m) == 0:
-                    print(f"{get_timestamp()} [{stage_prefix}] ⚠️ 주문 실행 스킵: 15분봉 데이터가 비어있습니다.")
-                else:
-                    latest_order = df_binance_ticker_15m.iloc[0].get("ORDER", "")
-                    latest_ksc = df_binance_ticker_15m.iloc[0].get("KSC", 0)
-                
-                    # LS 시그널(1, -1, 0.5, -0.5) 시 선물 전략 실행. 0.5/-0.5는 진입량 절반. TP/SL/BE 동일.
-                    if ENABLE_FUTURES_LS_STRATEGY:
-                        latest_ls_raw = df_binance_ticker_15m.iloc[0].get("LS", "")
-                        latest_ls = None
-                        try:
-                            if latest_ls_raw not in ("", None) and pd.notna(latest_ls_raw):
-                                v = float(latest_ls_raw)
-                                if v in (1.0, -1.0, 0.5, -0.5):
-                                    latest_ls = v
-                        except (TypeError, ValueError):
-                            pass
-                        if latest_ls is not None and latest_ls in (1.0, -1.0, 0.5, -0.5) and TICKER in ROTATION_TICKERS:
-                            row0 = df_binance_ticker_15m.iloc[0]
-                            K_close = row0.get("종", None)
-                            try:
-                                K_val = float(K_close) if K_close is not None and pd.notna(K_close) else None
-                            except (TypeError, ValueError):
-                                K_val = None
-                            execute_futures_strategy(latest_ls, f"{TICKER}USDT", stage_prefix=stage_prefix, K=K_val)
-                
-                if latest_order:
-                    print(f"{get_timestamp()} [{stage_prefix}] 🚨 ORDER 신호 감지: {TICKER} {latest_order}")
-                    # Samount, Bamount 값 추출
-                    latest_samount = df_binance_ticker_15m.iloc[0].get("Samount", 0)
-                    latest_bamount = df_binance_ticker_15m.iloc[0].get("Bamount", 0)
-                    
-                    # NaN 체크
-                    if pd.isna(latest_samount):
-                        latest_samount = 0
-                    if pd.isna(latest_bamount):
-                        latest_bamount = 0
-                    
-                    # ============================================================
-                    # KSC 주문량 적용 로직 (Buy 신호에만 적용)
-                    # 다른 시트(업비트 등)에도 동일하게 적용 가능
-                    # ============================================================
-                    # 
-                    # [1단계] Multiplier 계산 (수열 규칙)
-                    #   - KSC가 3의 배수일 때만 3, 나머지는 0
-                    #   - 패턴: 0, 0, 3, 0, 0, 3, 0, 0, 3, ...
-                    #   - 함수: calculate_ksc_multiplier(ksc_value, ksc_stack)
-                    # 
-                    # [2단계] B값 계산 (Bomb 발생 시에만)
-                    #   - multiplier == 0: B = ((ksc_stack - 1) % 3) + 1 (1,2,3 반복)
-                    #   - multiplier != 0: B = 0
-                    #   - 함수: calculate_bomb_b_value(multiplier, ksc_stack)
-                    # 
-                    # [3단계] Z값 계산
-                    #   - Z = multiplier + if(bomb발생, B값, 0)
-                    #   - Bomb 미발생: Z = multiplier
-                    #   - Bomb 발생: Z = multiplier + B값
-                    # 
-                    # [4단계] 주문량 계산
-                    #   - base_amount = TRADING_UNIT + bamount
-                    #   - 주문량 = base_amount × Z
-                    #   - 예시: TRADING_UNIT=7, bamount=0, Z=3
-                    #     → 주문량 = (7 + 0) × 3 = 21 USDT
-                    # ============================================================
-                    
-                    Z = 1  # 기본값 (multiplier가 없을 때)
-                    ksc_numeric = 0  # KSC 값을 숫자로 변환 (조건문 밖에서 초기화)
-                    if latest_order in ['Buy5', 'Buy10']:
-                        # KSC 값을 숫자로 변환
-                        if isinstance(latest_ksc, (int, float)):
-                            ksc_numeric = int(latest_ksc)
-                        elif isinstance(latest_ksc, str):
-                            try:
-                                ksc_numeric = int(float(latest_ksc))
-                            except:
-                                ksc_numeric = 0
-                        
-                        # KSC stack 값 확인 (숫자만)
-                        latest_ksc_stack = df_binance_ticker_15m.iloc[0].get("KSC stack", 0)
-                        if pd.isna(latest_ksc_stack):
-                            latest_ksc_stack = 0
-                        latest_ksc_stack = int(latest_ksc_stack)
-                        
-                        # Bomb 열 확인
-                        latest_bomb = df_binance_ticker_15m.iloc[0].get("Bomb", "")
-                        is_bomb = (isinstance(latest_bomb, str) and latest_bomb.strip() == "Bomb")
-                        
-                        # KSC 스택이 쌓이는 상황인지 확인
-                        # - KSC 스택이 쌓이는 상황: KSC > 0 또는 Bomb 발생
-                        # - KSC 스택이 쌓이는 상황이 아님: KSC = 0이고 Bomb 아님
-                        is_ksc_stack_building = (ksc_numeric > 0 or latest_ksc_stack > 0 or is_bomb)
-                        
-                        if is_ksc_stack_building:
-                            # KSC 스택이 쌓이는 상황: Z값으로 주문 전송 컨트롤 필요
-                            # p값: 15M 열 p(= 3+p1H) 우선, 없으면 3 + 1HCL
-                            latest_p = df_binance_ticker_15m.iloc[0].get("p", np.nan)
-                            if pd.notna(latest_p):
-                                try:
-                                    p_value = int(float(latest_p))
-                                except (TypeError, ValueError):
-                                    latest_1hcl = df_binance_ticker_15m.iloc[0].get("1HCL", np.nan)
-                                    p_value = 3 + (int(float(latest_1hcl)) if pd.notna(latest_1hcl) else 0)
-                            else:
-                                latest_1hcl = df_binance_ticker_15m.iloc[0].get("1HCL", np.nan)
-                                p_value = 3 + (int(float(latest_1hcl)) if pd.notna(latest_1hcl) else 0)
-                            
-                            # bomb 발생 시 KSC stack이 0이면 KSC 값을 사용
-                            if is_bomb and latest_ksc_stack == 0 and ksc_numeric > 0:
-                                latest_ksc_stack = ksc_numeric
-                                print(f"{get_timestamp()} [{stage_prefix}] ⚠️ Bomb 발생 시 KSC stack이 0, KSC 값({ksc_numeric})을 사용하여 재계산...")
-                            
-                            # 1. multiplier 계산 (수열 규칙)
-                            # Bomb 발생 시: KSC stack 값을 사용하여 multiplier 계산
-                            # 일반 경우: KSC 값을 사용하여 multiplier 계산
-                            if is_bomb:
-                                # Bomb 발생 시 KSC stack 값을 사용
-                                multiplier = calculate_ksc_multiplier(latest_ksc_stack, latest_ksc_stack, p_value)
-                            else:
-                                # 일반 경우 KSC 값을 사용
-                                multiplier = calculate_ksc_multiplier(ksc_numeric, latest_ksc_stack, p_value)
-                            
-                            # 2. B 값 계산 (Bomb 발생 시)
-                            B_value = 0
-                            if is_bomb:
-                                B_value = calculate_bomb_b_value(multiplier, latest_ksc_stack, p_value)
-                                bomb_msg = f"{get_timestamp()} [{stage_prefix}] 💣 Bomb 감지: KSC={latest_ksc}, bomb={latest_bomb}, KSC stack={latest_ksc_stack}, multiplier={multiplier}, B={B_value}, p={p_value}"
-                                print(bomb_msg)
-                                send_discord_message(bomb_msg)
-                            
-                            # 3. Z = multiplier(수열) + if(bomb발생, B값, 0)
-                            # Z값 계산식: Z = multiplier + if(Bomb 발생, B값, 0)
-                            # - Bomb 미발생: Z = multiplier
-                            # - Bomb 발생: Z = multiplier + B값
-                            # - multiplier와 B값은 독립적으로 계산됨
-                            # - Bomb 발생 시 multiplier가 0이어도 B값으로 Z > 0이 되면 주문 가능
-                            Z = multiplier + B_value
-                            
-                            # KSC = 1인 경우: p의 배수가 아니어도 주문 전송 (Z = 0이면 Z = 1로 강제 설정)
-                            if ksc_numeric == 1 and Z == 0:
-                                Z = 1
-                                print(f"{get_timestamp()} [{stage_prefix}] ℹ️ KSC=1: p의 배수가 아니어도 주문 전송 (Z=1로 설정)")
-                            
-                            if Z > 1:
-                                print(f"{get_timestamp()} [{stage_prefix}] 📊 KSC multiplier: {multiplier}, B값: {B_value}, 최종 Z: {Z}")
-                            
-                            # 선물 스크립트: KSC/p 배수 차단 없음 — Z=0이면 Z=1로 두고 주문 진행
-                            if ksc_numeric > 1 and Z == 0 and not is_bomb:
-                                Z = 1
-                        else:
-                            # KSC 스택이 쌓이는 상황이 아님: Z값으로 컨트롤 필요 없음
-                            # Z = 1로 유지하여 base_amount (1unit + bamount)로 주문 전송
-                            print(f"{get_timestamp()} [{stage_prefix}] ℹ️ KSC=0 : Z=1 base_amount(1unit+bamount)로 주문")
-                    
-                    # ORDER 신호가 Sell5/Sell10이면 KSC 초기화 (이미 KSC 계산 로직에서 처리됨)
-                    elif latest_order in ['Sell5', 'Sell10']:
-                        # KSC는 이미 계산 로직에서 0으로 초기화됨
-                        Z = 1  # Sell 신호는 multiplier 적용 안 함
-                    
-                    # PRFT가 되는 타이밍의 ORDER 신호에 multiplier 계산 (Sell 신호에만 적용)
-                    # prft multiplier = 1 + (1 - buyside) = 2 - buyside
-                    latest_prft = df_binance_ticker_15m.iloc[0].get("PRFT", 0)
-                    latest_buyside = df_binance_ticker_15m.iloc[0].get("buyside", np.nan)
-                    
-                    # buyside_val 초기화 (조건문 밖에서 먼저 정의)
-                    buyside_val = float(latest_buyside) if not pd.isna(latest_buyside) else None
-                    
-                    prft_multiplier = 1
-                    if latest_order in ['Sell5', 'Sell10'] and latest_prft == 'PRFT':
-                        # PRFT multiplier = 1 + (1 - buyside) = 2 - buyside
-                        if buyside_val is not None:
-                            prft_multiplier = 1 + (1 - buyside_val)  # = 2 - buyside
-                            print(f"{get_timestamp()} [{stage_prefix}] 💰 PRFT 감지: buyside={buyside_val:.4f}, multiplier={prft_multiplier:.4f} (1 + (1 - {buyside_val:.4f}))")
-                    
-                    # 직전행 TP 가져오기 (수수료 조건 체크용)
-                    prev_tp_for_trade = None
-                    if len(df_binance_ticker_15m) > 1:
-                        prev_row_for_trade = df_binance_ticker_15m.iloc[1]
-                        prev_tp_raw = prev_row_for_trade.get("TP", np.nan)
-                        if pd.notna(prev_tp_raw):
-                            try:
-                                prev_tp_for_trade = float(prev_tp_raw)
-                                if prev_tp_for_trade <= 0:
-                                    prev_tp_for_trade = None
-                            except (TypeError, ValueError):
-                                prev_tp_for_trade = None
-                    
-                    # 기타 필요한 값들 가져오기
-                    latest_hmsfast = df_binance_ticker_15m.iloc[0].get("1HMSFast", np.nan)
-                    hmsfast_val = float(latest_hmsfast) if pd.notna(latest_hmsfast) else None
-                    
-                    latest_decision_price = df_binance_ticker_15m.iloc[0].get("종", np.nan)
-                    decision_price_val = float(latest_decision_price) if pd.notna(latest_decision_price) else None
-                    
-                    # TPC 값 가져오기 (TPOVER 매도 시 사용)
-                    latest_tpc = df_binance_ticker_15m.iloc[0].get("TPC", 0)
-                    tpc_value_for_trade = 0.0
-                    try:
-                        tpc_value_for_trade = float(latest_tpc) if pd.notna(latest_tpc) else 0.0
-                    except (TypeError, ValueError):
-                        tpc_value_for_trade = 0.0
-                    
-                    # StoSU 값 가져오기 (TPOVER 매도 시 사용)
-                    latest_stosu = df_binance_ticker_15m.iloc[0].get("StoSU", 0.0)
-                    stosu_value_for_trade = 0.0
-                    try:
-                        stosu_value_for_trade = float(latest_stosu) if pd.notna(latest_stosu) else 0.0
-                    except (TypeError, ValueError):
-                        stosu_value_for_trade = 0.0
-                    
-                    # 4. 주문량 = (1유닛 + bamount) × Z
-                    # p값: 15M 열 p(= 3+p1H) 우선, 없으면 1HCL로 3+1HCL 계산
-                    latest_p_for_trade = df_binance_ticker_15m.iloc[0].get("p", np.nan)
-                    p_value_for_trade = int(float(latest_p_for_trade)) if pd.notna(latest_p_for_trade) else None
-                    latest_1hcl_for_trade = df_binance_ticker_15m.iloc[0].get("1HCL", np.nan)
-                    h1cl_for_trade = int(float(latest_1hcl_for_trade)) if pd.notna(latest_1hcl_for_trade) else None
-                    if ENABLE_SPOT_TRADING:
-                        trade_on_order_signal(latest_order, symbol=f"{TICKER}USDT", samount=float(latest_samount), bamount=float(latest_bamount), bomb_multiplier=Z, prft_value=latest_prft, ksc_numeric=ksc_numeric, prft_multiplier=prft_multiplier, hmsfast=hmsfast_val, buyside=buyside_val, tpc_value=tpc_value_for_trade, stosu=stosu_value_for_trade, decision_price=decision_price_val, prev_tp=prev_tp_for_trade, h1cl=h1cl_for_trade, p_value=p_value_for_trade, stage_prefix=stage_prefix)
-                    else:
-                        print(f"{get_timestamp()} [{stage_prefix}] ℹ️ 스팟 주문 비활성화 - ORDER 신호만 감지 ({TICKER} {latest_order})")
-                else:
-                    print(f"{get_timestamp()} [{stage_prefix}] ℹ️ ORDER 신호: {TICKER} 없음")
-            except Exception as e:
-                print(f"{get_timestamp()} [{stage_prefix}] ❌ 주문 실행 중 오류: {e}")
-        elif polling_start_time and not ENABLE_TRADING:
-            print(f"{get_timestamp()} [{stage_prefix}] ℹ️ 주문전송 비활성화 - 엑셀만 생성")
-        
         # df_15m을 반환하여 폴링에서 사용 가능하게 함 (메모리 정리 전에 반환)
         # result_df 초기화 (예외 발생 시에도 안전하게 처리)
         try:
@@ -14096,6 +16110,104 @@ def analyze_15m_trading_performance_simple(df_15m, ticker, unit_amount=7500):
             'buy_count': 0
         }
 
+# -------------------- AFTER 선수집 비동기 엔진 --------------------
+# 티커 × 인터벌(1m/5m/15m/1h/1d) 수집을 asyncio로 한 번에 띄워, 티커 수와 상관없이 선수집 시간이 왕복 1~2회에 수렴하도록 합니다.
+# 실제 HTTP는 기존 fetch_binance_* (공유 세션 + 레이트리미터 + 엔드포인트 순위)를 스레드 풀에서 실행합니다.
+# 1분봉 파생(KLINE_DERIVE_FROM_1M) 사용 시: 티커마다 상위 인터벌이 그 티커의 1분봉만 기다린 뒤 대부분 로컬 집계로 채워집니다
+# (모든 티커의 1분봉을 기다리는 단계 구분이 없으므로 느린 티커 하나가 다른 티커의 상위 인터벌을 늦추지 않음).
+import asyncio
+
+AFTER_PREFETCH_MAX_WORKERS = 32   # 선수집 동시 요청 스레드 수 (레이트리미터가 weight 한도를 별도로 지킴)
+
+def _empty_prefetch_frames() -> dict:
+    return {'1m': pd.DataFrame(), '5m': pd.DataFrame(), '15m': pd.DataFrame(), '1d': pd.DataFrame(), '1h': pd.DataFrame()}
+
+def _trim_prefetched_frames(ticker: str, frames: dict, now_utc: dt.datetime, stage_prefix: str) -> dict:
+    """
+    미완성(진행 중) 캔들 제거: 모든 인터벌 공통 규칙 (Date(UTC) + 인터벌 > 현재 시각)
+    ⚠️중요: 30분 1초 실행 시 → 1분봉 03:30, 5분봉 03:30, 15분봉 03:30, 1시간봉 03:00 이 진행 중 → 제거
+    일봉은 기존과 동일하게 진행 중 캔들을 유지 (현재 시점 시고저종 필요)
+    """
+    trimmed = dict(frames)
+    for iv_label, iv_key in (("1분봉", "1m"), ("5분봉", "5m"), ("15분봉", "15m"), ("1시간봉", "1h")):
+        try:
+            iv_df, removed = drop_incomplete_candles(frames[iv_key], iv_key, now_utc)
+            for removed_date in removed:
+                print(f"{get_timestamp()} [{stage_prefix}] ✅ {ticker} {iv_label} 미완성 캔들 제거: {removed_date.strftime('%y/%m/%d,%H:%M')}")
+            trimmed[iv_key] = iv_df
+        except Exception as e:
+            print(f"{get_timestamp()} [{stage_prefix}] ⚠️ {ticker} {iv_label} 미완성 캔들 제거 실패: {e}")
+    return trimmed
+
+async def _collect_after_prefetch_async(tickers: List[str], fixed_end_time_ms: int, hour1_count: int, daily_count: int,
+                                        include_today: bool, stage_prefix: str) -> dict:
+    loop = asyncio.get_running_loop()
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=AFTER_PREFETCH_MAX_WORKERS, thread_name_prefix="after-prefetch")
+    try:
+        def submit(fn, *args, **kwargs):
+            return loop.run_in_executor(executor, lambda: fn(*args, **kwargs))
+
+        def submit_1m(symbol):
+            # 파생 사용 시 1시간봉 구간까지 덮도록 더 받고 최신 16개만 사용
+            count = AFTER_1M_FETCH_COUNT if KLINE_DERIVE_FROM_1M else 16
+            return submit(fetch_binance_minutes1, symbol, count, include_today=include_today,
+                          fixed_end_time_ms=fixed_end_time_ms, stage_prefix=stage_prefix)
+
+        def submit_rest(symbol):
+            return [
+                submit(fetch_binance_minutes5, symbol, 4, include_today=include_today, fixed_end_time_ms=fixed_end_time_ms),
+                submit(fetch_binance_minutes15, symbol, 2, include_today=include_today, fixed_end_time_ms=fixed_end_time_ms),
+                submit(fetch_binance_daily, symbol, daily_count, include_today=include_today, fixed_end_time_ms=fixed_end_time_ms),
+                submit(fetch_binance_hours1, symbol, hour1_count, include_today=include_today, fixed_end_time_ms=fixed_end_time_ms),
+            ]
+
+        async def collect_symbol(symbol):
+            future_1m = submit_1m(symbol)
+            if KLINE_DERIVE_FROM_1M:
+                # 상위 인터벌은 이 티커의 1분봉 수집이 끝난 뒤 (대부분 1분봉 파생으로 REST 생략)
+                res_1m = (await asyncio.gather(future_1m, return_exceptions=True))[0]
+                return [res_1m] + await asyncio.gather(*submit_rest(symbol), return_exceptions=True)
+            # 모든 인터벌 동시 수집
+            return await asyncio.gather(future_1m, *submit_rest(symbol), return_exceptions=True)
+
+        results_by_ticker = await asyncio.gather(*[collect_symbol(f"{ticker}USDT") for ticker in tickers])
+    finally:
+        executor.shutdown(wait=False)
+
+    collected = {}
+    for ticker, results in zip(tickers, results_by_ticker):
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            print(f"{get_timestamp()} ⚠️ {ticker} 수집 실패: {errors[0]}")
+            collected[ticker] = _empty_prefetch_frames()
+            continue
+        df_1m, df_5m, df_15m, df_1d, df_1h = results
+        collected[ticker] = {'1m': df_1m.iloc[:16].reset_index(drop=True), '5m': df_5m, '15m': df_15m, '1d': df_1d, '1h': df_1h}
+    return collected
+
+def collect_after_prefetch(tickers: List[str], fixed_end_time_ms: int, hour1_count: int, daily_count: int,
+                           include_today: bool = True, stage_prefix: str = "AFTER") -> dict:
+    """
+    AFTER 단계 선수집: 모든 티커 × 인터벌을 동시에 수집한 뒤 미완성 캔들을 공통 규칙으로 제거합니다.
+
+    Returns:
+        dict: {ticker: {'1m', '5m', '15m', '1d', '1h': DataFrame}} (수집 실패 티커는 빈 DataFrame)
+    """
+    started = time.perf_counter()
+    collected = asyncio.run(_collect_after_prefetch_async(tickers, fixed_end_time_ms, hour1_count, daily_count,
+                                                          include_today, stage_prefix))
+    now_utc = dt.datetime.now(tz.UTC)
+    pre_fetched_data = {}
+    for ticker in tickers:
+        frames = collected[ticker]
+        if all(frame.empty for frame in frames.values()):
+            pre_fetched_data[ticker] = frames
+            continue
+        print(f"{get_timestamp()} [{stage_prefix}] 📥 {ticker} 캔들 수집 완료 (1M:{len(frames['1m'])}개, 5M:{len(frames['5m'])}개, 15M:{len(frames['15m'])}개, 1H:{len(frames['1h'])}개, 1D:{len(frames['1d'])}개)")
+        pre_fetched_data[ticker] = _trim_prefetched_frames(ticker, frames, now_utc, stage_prefix)
+    print(f"{get_timestamp()} [{stage_prefix}] ⚡ 선수집 완료: {len(tickers)}개 티커 × 5개 인터벌, {time.perf_counter() - started:.2f}초")
+    return pre_fetched_data
+
 def run_rotation_sequence(polling_start_time=None, skip_first_row=False, target_tickers=None):
     """로테이션 시퀀스 실행: BTC → ETH → XRP → SOL → BNB 순서로 실행
     
@@ -14116,6 +16228,8 @@ def run_rotation_sequence(polling_start_time=None, skip_first_row=False, target_
     # 처리할 티커 결정
     tickers_to_process = target_tickers if target_tickers is not None else ROTATION_TICKERS
     print(f"{get_timestamp()} [{stage_prefix}] 🔄 로테이션 시퀀스 시작 [{stage_label}]: {tickers_to_process}")
+    _stage_profiler.begin_cycle(stage_prefix, tickers_to_process)
+    _stage_profiler.stage("거래소 정보·선수집")
     
     # 1·2단계 공통: 시행 시작 시 5개 티커 선물 exchangeInfo 조회 후 터미널·디스코드 출력
     print_futures_exchange_info_summary()
@@ -14159,233 +16273,13 @@ def run_rotation_sequence(polling_start_time=None, skip_first_row=False, target_
         # include_today 설정 (기본값 True)
         include_today_rotation = True
         
-        for ticker in tickers_to_process:
-            binance_symbol_ticker = f"{ticker}USDT"
-            try:
-                # 1분봉 수집 (2단계: 16개)
-                df_1m = fetch_binance_minutes1(binance_symbol_ticker, 16, include_today=include_today_rotation, fixed_end_time_ms=fixed_end_time_ms, stage_prefix=stage_prefix)
-                df_5m = fetch_binance_minutes5(binance_symbol_ticker, 4, include_today=include_today_rotation, fixed_end_time_ms=fixed_end_time_ms)
-                df_15m = fetch_binance_minutes15(binance_symbol_ticker, 2, include_today=include_today_rotation, fixed_end_time_ms=fixed_end_time_ms)
-                
-                # 일봉 수집 (00시 00분 1초에만 2개, 나머지는 1개)
-                if is_00hour_00min_01sec:
-                    df_1d = fetch_binance_daily(binance_symbol_ticker, 2, include_today=include_today_rotation, fixed_end_time_ms=fixed_end_time_ms)
-                else:
-                    df_1d = fetch_binance_daily(binance_symbol_ticker, 1, include_today=include_today_rotation, fixed_end_time_ms=fixed_end_time_ms)
-                
-                # 1시간봉 수집 (XX시 00분 1초에만 2개, 나머지는 1개)
-                if is_00min_01sec:
-                    df_1h = fetch_binance_hours1(binance_symbol_ticker, 2, include_today=include_today_rotation, fixed_end_time_ms=fixed_end_time_ms)
-                else:
-                    df_1h = fetch_binance_hours1(binance_symbol_ticker, 1, include_today=include_today_rotation, fixed_end_time_ms=fixed_end_time_ms)
-                
-                # 수집 직후 개수 저장 (미완성 캔들 제거 전)
-                count_1m_before = len(df_1m)
-                count_5m_before = len(df_5m)
-                count_15m_before = len(df_15m)
-                
-                print(f"{get_timestamp()} [{stage_prefix}] 📥 {ticker} 캔들 수집 완료 (1M:{count_1m_before}개, 5M:{count_5m_before}개, 15M:{count_15m_before}개, 1H:{len(df_1h)}개, 1D:{len(df_1d)}개)")
-                
-                # UTC 시간 파싱 함수 (모든 티커에서 공통 사용)
-                def extract_datetime_from_utc(utc_str):
-                    try:
-                        if isinstance(utc_str, str):
-                            if ',' in utc_str:
-                                date_part, time_part = utc_str.split(',', 1)
-                                utc_str = date_part.strip() + ' ' + time_part.strip()
-                            if '/' in utc_str:
-                                parts = utc_str.split()
-                                if len(parts) >= 2:
-                                    time_str = parts[1]
-                                    if time_str.count(':') == 2:
-                                        dt_obj = dt.datetime.strptime(parts[0] + ' ' + time_str, "%y/%m/%d %H:%M:%S")
-                                    elif time_str.count(':') == 1:
-                                        dt_obj = dt.datetime.strptime(parts[0] + ' ' + time_str, "%y/%m/%d %H:%M")
-                                    else:
-                                        return None
-                                else:
-                                    return None
-                            else:
-                                parts = utc_str.split()
-                                if len(parts) >= 2:
-                                    time_str = parts[1]
-                                    if time_str.count(':') == 2:
-                                        dt_obj = dt.datetime.strptime(parts[0] + ' ' + time_str, "%Y-%m-%d %H:%M:%S")
-                                    elif time_str.count(':') == 1:
-                                        dt_obj = dt.datetime.strptime(parts[0] + ' ' + time_str, "%Y-%m-%d %H:%M")
-                                    else:
-                                        return None
-                                else:
-                                    return None
-                            return dt_obj
-                    except:
-                        return None
-                    return None
-                
-                # 5분봉 미완성 캔들 제거 (UTC 기준)
-                # ⚠️중요: 30분 1초 실행 시 → 5분봉 03:25~03:30, 03:20~03:25, 03:15~03:20, 03:10~03:15, 03:05~03:10, 03:00~03:05
-                # 미완성 03:25~03:30 제거 → 나머지만 남음
-                if len(df_5m) > 0 and 'Date(UTC)' in df_5m.columns:
-                    try:
-                        # 첫 번째 행(최신 캔들)의 시간 확인
-                        first_date_val = df_5m.iloc[0]['Date(UTC)']
-                        # Timestamp 객체인 경우 그대로 사용, 문자열인 경우 파싱
-                        if isinstance(first_date_val, pd.Timestamp):
-                            first_date = first_date_val
-                        elif pd.api.types.is_datetime64_any_dtype(pd.Series([first_date_val])):
-                            first_date = pd.to_datetime(first_date_val)
-                        else:
-                            first_date = pd.to_datetime(first_date_val, errors='coerce')
-                        
-                        if pd.notna(first_date):
-                            # 현재 실행 시간 확인
-                            current_time_utc = dt.datetime.now(tz.UTC)
-                            current_minute = current_time_utc.minute
-                            current_hour = current_time_utc.hour
-                            current_date = current_time_utc.date()
-                            
-                            # ⚠️중요: 30분 1초 실행 시
-                            # API 반환 (최신순): 
-                            #   - 첫 번째 행: 03:30 (03:30~03:35 구간, 1초짜리 미완성)
-                            #   - 두 번째 행: 03:25 (03:25~03:30 구간, 5분짜리 완성)
-                            # → 03:30 미완성 제거 → 03:25만 남음
-                            
-                            # 5분봉의 시작 시간 계산 (5분 단위로 내림)
-                            first_start_minute = (first_date.minute // 5) * 5
-                            current_5min_start = (current_minute // 5) * 5
-                            
-                            # 첫 번째 행(최신)이 현재 5분 구간이면 미완성 → 제거
-                            if (first_date.hour == current_hour and 
-                                first_start_minute == current_5min_start and
-                                first_date.date() == current_date):
-                                df_5m = df_5m.iloc[1:].reset_index(drop=True)
-                                first_date_str = str(first_date_val) if not isinstance(first_date_val, pd.Timestamp) else first_date_val.strftime('%y/%m/%d,%H:%M')
-                                print(f"{get_timestamp()} [{stage_prefix}] ✅ {ticker} 5분봉 미완성 캔들 제거: {first_date_str}")
-                    except Exception as e:
-                        print(f"{get_timestamp()} [{stage_prefix}] ⚠️ {ticker} 5분봉 미완성 캔들 제거 실패: {e}")
-                
-                # 1분봉 미완성 캔들 제거 (UTC 기준, main 함수와 동일한 로직)
-                # ⚠️중요: 30분 1초 실행 시 → 1분봉 03:29, 03:28, ..., 03:00
-                # 미완성 03:30 제거 → 03:29, 03:28, ..., 03:00만 남음
-                if len(df_1m) > 0 and 'Date(UTC)' in df_1m.columns:
-                    try:
-                        latest_date_val = df_1m.iloc[0]['Date(UTC)']
-                        # Timestamp 객체인 경우 그대로 사용, 문자열인 경우 파싱
-                        if isinstance(latest_date_val, pd.Timestamp):
-                            latest_date = latest_date_val
-                        elif pd.api.types.is_datetime64_any_dtype(pd.Series([latest_date_val])):
-                            latest_date = pd.to_datetime(latest_date_val)
-                        else:
-                            latest_date = pd.to_datetime(latest_date_val, errors='coerce')
-                        
-                        if pd.notna(latest_date):
-                            # 현재 실행 시간의 '분' 확인
-                            current_time_utc = dt.datetime.now(tz.UTC)
-                            current_minute = current_time_utc.minute
-                            current_hour = current_time_utc.hour
-                            current_date = current_time_utc.date()
-                            
-                            # 최신 캔들의 '분'이 현재 시간의 '분'과 같고, 날짜/시간도 같으면 미완성 -> 제거
-                            if (latest_date.minute == current_minute and 
-                                latest_date.hour == current_hour and 
-                                latest_date.date() == current_date):
-                                df_1m = df_1m.iloc[1:].reset_index(drop=True)
-                                latest_date_str = str(latest_date_val) if not isinstance(latest_date_val, pd.Timestamp) else latest_date_val.strftime('%y/%m/%d,%H:%M')
-                                print(f"{get_timestamp()} [{stage_prefix}] ✅ {ticker} 1분봉 미완성 캔들 제거: {latest_date_str}")
-                    except Exception as e:
-                        print(f"{get_timestamp()} [{stage_prefix}] ⚠️ {ticker} 1분봉 미완성 캔들 제거 실패: {e}")
-                
-                # 15분봉 미완성 캔들 제거 (UTC 기준)
-                # ⚠️중요: 30분 1초 실행 시 → 15분봉 03:15~03:30 (미완성), 03:00~03:15 (완성)
-                # 미완성 03:15~03:30 제거 → 03:00~03:15만 남음 (엑셀 표시: 03:00)
-                if len(df_15m) > 0 and 'Date(UTC)' in df_15m.columns:
-                    try:
-                        # 첫 번째 행(최신 캔들)의 시간 확인
-                        first_date_val = df_15m.iloc[0]['Date(UTC)']
-                        # Timestamp 객체인 경우 그대로 사용, 문자열인 경우 파싱
-                        if isinstance(first_date_val, pd.Timestamp):
-                            first_date = first_date_val
-                        elif pd.api.types.is_datetime64_any_dtype(pd.Series([first_date_val])):
-                            first_date = pd.to_datetime(first_date_val)
-                        else:
-                            first_date = pd.to_datetime(first_date_val, errors='coerce')
-                        
-                        if pd.notna(first_date):
-                            # 현재 실행 시간 확인
-                            current_time_utc = dt.datetime.now(tz.UTC)
-                            current_minute = current_time_utc.minute
-                            current_hour = current_time_utc.hour
-                            current_date = current_time_utc.date()
-                            
-                            # 15분봉의 시작 시간 계산 (15분 단위로 내림)
-                            first_start_minute = (first_date.minute // 15) * 15
-                            
-                            # ⚠️중요: 30분 1초 실행 시
-                            # API 반환 (최신순): 
-                            #   - 첫 번째 행: 03:30 (03:30~03:45 구간, 1초짜리 미완성)
-                            #   - 두 번째 행: 03:15 (03:15~03:30 구간, 15분짜리 완성)
-                            # → 03:30 미완성 제거 → 03:15만 남음
-                            current_15min_start = (current_minute // 15) * 15
-                            
-                            # 첫 번째 행(최신)이 현재 15분 구간이면 미완성 → 제거
-                            if (first_date.hour == current_hour and 
-                                first_start_minute == current_15min_start and
-                                first_date.date() == current_date):
-                                df_15m = df_15m.iloc[1:].reset_index(drop=True)
-                                first_date_str = str(first_date_val) if not isinstance(first_date_val, pd.Timestamp) else first_date_val.strftime('%y/%m/%d,%H:%M')
-                                print(f"{get_timestamp()} [{stage_prefix}] ✅ {ticker} 15분봉 미완성 캔들 제거: {first_date_str}")
-                    except Exception as e:
-                        print(f"{get_timestamp()} [{stage_prefix}] ⚠️ {ticker} 15분봉 미완성 캔들 제거 실패: {e}")
-                
-                # 1시간봉 미완성 캔들 제거 (UTC 기준)
-                # ⚠️중요: xx시 15/30/45/00분 1초 실행 시
-                # API 반환: 05:00 (미완성), 04:00 (완성)
-                # → 05:00 미완성 제거 → 04:00만 남음
-                if len(df_1h) > 0 and 'Date(UTC)' in df_1h.columns:
-                    try:
-                        # 첫 번째 행(최신 캔들)의 시간 확인
-                        first_date_val = df_1h.iloc[0]['Date(UTC)']
-                        # Timestamp 객체인 경우 그대로 사용, 문자열인 경우 파싱
-                        if isinstance(first_date_val, pd.Timestamp):
-                            first_date = first_date_val
-                        elif pd.api.types.is_datetime64_any_dtype(pd.Series([first_date_val])):
-                            first_date = pd.to_datetime(first_date_val)
-                        else:
-                            first_date = pd.to_datetime(first_date_val, errors='coerce')
-                        
-                        if pd.notna(first_date):
-                            # 현재 실행 시간 확인
-                            current_time_utc = dt.datetime.now(tz.UTC)
-                            current_hour = current_time_utc.hour
-                            current_date = current_time_utc.date()
-                            
-                            # 첫 번째 행(최신)이 현재 시간이면 미완성 → 제거
-                            # 1시간봉은 항상 00분으로 표시됨
-                            if (first_date.hour == current_hour and
-                                first_date.minute == 0 and
-                                first_date.date() == current_date):
-                                df_1h = df_1h.iloc[1:].reset_index(drop=True)
-                                first_date_str = str(first_date_val) if not isinstance(first_date_val, pd.Timestamp) else first_date_val.strftime('%y/%m/%d,%H:%M')
-                                print(f"{get_timestamp()} [{stage_prefix}] ✅ {ticker} 1시간봉 미완성 캔들 제거: {first_date_str}")
-                    except Exception as e:
-                        print(f"{get_timestamp()} [{stage_prefix}] ⚠️ {ticker} 1시간봉 미완성 캔들 제거 실패: {e}")
-                
-                pre_fetched_data[ticker] = {
-                    '1m': df_1m,
-                    '5m': df_5m,
-                    '15m': df_15m,
-                    '1d': df_1d,
-                    '1h': df_1h
-                }
-            except Exception as e:
-                print(f"{get_timestamp()} ⚠️ {ticker} 수집 실패: {e}")
-                pre_fetched_data[ticker] = {
-                    '1m': pd.DataFrame(),
-                    '5m': pd.DataFrame(),
-                    '15m': pd.DataFrame(),
-                    '1d': pd.DataFrame(),
-                    '1h': pd.DataFrame()
-                }
+        # 웹소켓 스트림 수신 중이면 직전 마감 캔들 도착을 기다린 뒤 버퍼에서 채움 (미수신 구간은 REST로 보수)
+        if wait_for_stream_candle_close(tickers_to_process, fixed_end_time_ms):
+            print(f"{get_timestamp()} [{stage_prefix}] 📡 스트림 마감 캔들 수신 완료 → 링버퍼 우선 사용")
+        
+        # 모든 티커 × 인터벌 동시 수집 후 미완성 캔들 공통 제거 (asyncio 엔진)
+        pre_fetched_data = collect_after_prefetch(tickers_to_process, fixed_end_time_ms, hour1_count, daily_count,
+                                                  include_today=include_today_rotation, stage_prefix=stage_prefix)
     
     # 각 티커의 15M 데이터를 저장할 리스트
     ticker_15m_data = []
@@ -14400,6 +16294,8 @@ def run_rotation_sequence(polling_start_time=None, skip_first_row=False, target_
         
         print(f"{get_timestamp()} [{stage_prefix}] ⚙️ 설정: 티커={TICKER}, 거래단위={TRADING_UNIT} USDT")
         
+        _stage_profiler.begin_ticker(ticker)
+        ticker_status = "ok"
         try:
             # main 함수 실행 (2단계 실행 시 미리 받은 데이터 전달)
             pre_fetched = pre_fetched_data.get(ticker) if not skip_first_row else None
@@ -14408,21 +16304,24 @@ def run_rotation_sequence(polling_start_time=None, skip_first_row=False, target_
             # main 함수가 None을 반환하면 (previous 파일 없음 등) 스킵
             if df_15m is None:
                 print(f"{get_timestamp()} [{stage_prefix}] ⚠️ {TICKER} 처리 스킵됨 (previous 파일 없음)")
+                _stage_profiler.end_ticker(status="skipped")
                 continue
             
             print(f"{get_timestamp()} [{stage_prefix}] ✅ {TICKER} 처리 완료")
             
-            # 15M 데이터 저장 (분석용, 2단계에서만)
+            # 15M 데이터 저장 (분석용, 2단계에서만) - 압축 캔들 테이블로 보관, 분석 시점에만 DataFrame 복원
             if not skip_first_row:
                 ticker_15m_data.append({
                     'ticker': ticker,
-                    'df_15m': df_15m.copy()
+                    'df_15m': CandleTable.from_frame(df_15m)
                 })
             
         except Exception as e:
+            ticker_status = "failed"
             print(f"{get_timestamp()} [{stage_prefix}] ❌ {TICKER} 처리 실패: {e}")
             import traceback
             traceback.print_exc()
+        _stage_profiler.end_ticker(status=ticker_status)
         
         # 다음 티커로 넘어가기 전 잠시 대기 (메모리 정리)
         if i < len(ROTATION_TICKERS) - 1:  # 마지막이 아닌 경우에만
@@ -14437,8 +16336,11 @@ def run_rotation_sequence(polling_start_time=None, skip_first_row=False, target_
     
     print(f"{get_timestamp()} [{stage_prefix}] 🎉 로테이션 시퀀스 완료!")
     print(f"{get_timestamp()} [{stage_prefix}] ⏱️ 전체 로테이션 소요시간: {total_execution_time.total_seconds():.2f}초")
+    print_http_connection_stats(stage_prefix)
+    print_endpoint_ranking(stage_prefix)
     
     # 로테이션 종료 후 메모리 정리
+    _stage_profiler.stage("정리·4day 분석·BE 확인")
     print(f"{get_timestamp()} [{stage_prefix}] 🧹 메모리 정리 중...")
     # 명시적으로 변수 삭제
     try:
@@ -14458,8 +16360,8 @@ def run_rotation_sequence(polling_start_time=None, skip_first_row=False, target_
     # 체인 상태 확인을 위해 마지막 티커의 df_15m 저장 (2단계에서만, ticker_15m_data 삭제 전에)
     result_df_15m = None
     if not skip_first_row and ticker_15m_data and len(ticker_15m_data) > 0:
-        # 마지막 티커의 df_15m 복사본 저장 (참조가 아닌 복사본)
-        result_df_15m = ticker_15m_data[-1]['df_15m'].copy()
+        # 마지막 티커의 df_15m 복원본 저장 (참조가 아닌 복사본)
+        result_df_15m = ticker_15m_data[-1]['df_15m'].to_frame()
     
     # 로테이션 완료 후 4day 분석 (2단계에서만, 한 번에 계산)
     if not skip_first_row:
@@ -14467,10 +16369,10 @@ def run_rotation_sequence(polling_start_time=None, skip_first_row=False, target_
             performance_results = []
             _4day_ticker_snapshots = {}
             for data in ticker_15m_data:
-                result = analyze_15m_performance(data['df_15m'], data['ticker'])
+                df_15m = data['df_15m'].to_frame()
+                result = analyze_15m_performance(df_15m, data['ticker'])
                 performance_results.append(result)
                 # 티커별 LS·1HMSFast·종가 스냅샷 (4day 분석 표시용)
-                df_15m = data['df_15m']
                 if df_15m is not None and len(df_15m) > 0:
                     row0 = df_15m.iloc[0]
                     _4day_ticker_snapshots[data['ticker']] = {
@@ -14505,6 +16407,9 @@ def run_rotation_sequence(polling_start_time=None, skip_first_row=False, target_
         collected = collected1 + collected2
         print(f"{get_timestamp()} [{stage_prefix}] ✅ 메모리 정리 완료 ({collected}개 객체 해제)")
     
+    # 단계별 프로파일 보고서 저장 (logs/profile_*.json)
+    _stage_profiler.end_cycle()
+    
     # 체인 상태 확인을 위해 df_15m 반환 (2단계에서만)
     if not skip_first_row:
         return result_df_15m  # 2단계: df_15m 반환 (None일 수도 있음)
@@ -14654,7 +16559,7 @@ def run_every_13_55_28_55_43_55_58_55(initial_window_id: str | None = None, skip
                                                 yesterday_utc = now_utc_check - dt.timedelta(days=1)
                                                 yesterday_str = yesterday_utc.strftime('%Y%m%d')
                                                 
-                                                log_dir = os.path.join(script_dir, LOG_DIR)
+                                                log_dir = LOG_DIR_ABS
                                                 yesterday_log_file = os.path.join(log_dir, f'BINANCE_FUTURES_log_{yesterday_str}.txt')
                                                 
                                                 # 4단계: 어제 로그 파일이 존재하면 PNL 분석 실행
@@ -14742,6 +16647,17 @@ if __name__ == "__main__":
     print(f"{get_timestamp()} [2단계] 1단계(7분/22분/37분/52분): previous 파일 생성")
     print(f"{get_timestamp()} [2단계] 2단계(15분1초/30분1초/45분1초/0분1초): after 파일 생성 및 주문 전송")
     
+    # 오프라인 대역 서버 (환경변수 BINANCE_STAND_IN 지정 시)
+    configure_stand_in_from_env()
+    
+    # 지표·신호 벤치마크 (환경변수 BINANCE_BENCHMARK 지정 시 실행 후 종료, 회귀가 있으면 종료 코드 1)
+    benchmark_exit_code = run_benchmark_suite_from_env()
+    if benchmark_exit_code is not None:
+        sys.exit(benchmark_exit_code)
+    
+    # AFTER 선수집용 kline 웹소켓 스트림 (백그라운드, 실패 시 REST만 사용)
+    start_kline_stream()
+    
     try:
         # 현재 시간
         start_time = dt.datetime.now()